@@ -0,0 +1,181 @@
+import html
+import time
+
+import streamlit as st
+
+from nervo_core import assets
+from nervo_core.archive import ArchiveError, open_archive
+from nervo_core.nervo import DX_CATEGORY_OPTIONS, MRC_SS_MAX, NIS_MAX_TOTAL
+from nervo_core.view import parts_html, snippet_html
+
+st.set_page_config(page_title="Busca nas consultas", layout="wide")
+
+# =========================================================
+# GLOBAL STYLES
+# =========================================================
+def page_stylesheet(name: str):
+    # static/ servido pelo Streamlit (.streamlit/config.toml): cada rerun manda só a tag <link>
+    static = st.get_option("server.enableStaticServing")
+    st.markdown(assets.link_tag(name) if static else assets.style_tag(name), unsafe_allow_html=True)
+
+page_stylesheet("busca.css")
+
+st.title("Busca nas consultas")
+st.markdown(
+    "<div style='font-size:27px; color:#666; margin-top:-0.5rem; margin-bottom:1rem;'>"
+    "arquivo local (nervo periférico e neuromuscular)"
+    "</div>",
+    unsafe_allow_html=True,
+)
+
+TEMPLATE_LABELS = {"": "Todos", "nervo": "Nervo periférico", "neuromusc": "Neuromuscular"}
+ANY = "Qualquer"
+RESULT_LIMIT = 200
+
+# =========================================================
+# ARQUIVO LOCAL
+# =========================================================
+@st.cache_resource
+def visit_archive():
+    # o mesmo das páginas dos templates: um por processo, conexão por operação
+    return open_archive()
+
+try:
+    archive = visit_archive()
+    facets = archive.facet_values() if archive is not None else {}
+except ArchiveError as e:
+    st.error(str(e))
+    st.stop()
+if archive is None:
+    st.info("Arquivo local não configurado: defina NERVO_ARCHIVE_PATH para salvar e buscar consultas.")
+    st.stop()
+
+# =========================================================
+# FILTROS
+# =========================================================
+st.subheader("**Filtros**")
+st.text_input(
+    "Texto livre",
+    key="busca_texto",
+    placeholder="Ex.: parestesia mãos, condução lenta, imunoglobulina",
+    help="Todas as palavras (por prefixo, sem acento) na história, ENMG, conduta e demais campos.",
+)
+
+c_f1, c_f2, c_f3, c_f4 = st.columns([2.0, 3.0, 2.0, 2.0])
+with c_f1:
+    st.selectbox("Template", list(TEMPLATE_LABELS), format_func=TEMPLATE_LABELS.get, key="busca_template")
+with c_f2:
+    st.selectbox("Categoria diagnóstica (nervo)", [ANY, *DX_CATEGORY_OPTIONS], key="busca_dx")
+with c_f3:
+    st.selectbox("Gene", [ANY, *facets.get("genes", [])], key="busca_gene")
+with c_f4:
+    st.text_input("CID", key="busca_icd", placeholder="Ex.: G71 ou G12.1", help="Prefixo do CID do diagnóstico nosológico (neuromuscular).")
+
+c_r1, c_r2 = st.columns(2)
+with c_r1:
+    use_nis = st.checkbox("Filtrar por NIS", key="busca_use_nis")
+    st.slider("NIS total", 0.0, float(NIS_MAX_TOTAL), (0.0, float(NIS_MAX_TOTAL)), step=1.0, key="busca_nis", disabled=not use_nis)
+with c_r2:
+    use_mrc = st.checkbox("Filtrar por MRC-SS", key="busca_use_mrc")
+    st.slider("MRC-SS", 0, MRC_SS_MAX, (0, MRC_SS_MAX), key="busca_mrc", disabled=not use_mrc)
+
+# =========================================================
+# RESULTADOS
+# =========================================================
+def _opt(key: str) -> str | None:
+    v = st.session_state.get(key)
+    return None if v in (None, "", ANY) else v
+
+def _fmt_date(iso: str) -> str:
+    return "/".join(reversed(iso.split("-")))
+
+t0 = time.perf_counter()
+try:
+    hits = archive.search(
+        st.session_state.get("busca_texto", ""),
+        template=_opt("busca_template"),
+        dx_category=_opt("busca_dx"),
+        gene=_opt("busca_gene"),
+        icd=_opt("busca_icd"),
+        nis=st.session_state["busca_nis"] if use_nis else None,
+        mrc_ss=st.session_state["busca_mrc"] if use_mrc else None,
+        limit=RESULT_LIMIT,
+    )
+except ArchiveError as e:
+    st.error(str(e))
+    st.stop()
+elapsed_ms = (time.perf_counter() - t0) * 1000
+
+st.subheader("**Consultas**")
+st.caption(
+    f"{len(hits)}{'+' if len(hits) == RESULT_LIMIT else ''} consulta(s) em {elapsed_ms:.0f} ms."
+    " Para editar uma consulta, use o prontuário em \"Carregar última consulta\" na página do template."
+)
+if hits:
+    st.dataframe(
+        [
+            {
+                "Prontuário": h["patient"],
+                "Template": TEMPLATE_LABELS.get(h["template"], h["template"]),
+                "Data": _fmt_date(h["visit_date"]),
+                "Categoria": h["dx_category"] or "",
+                "Gene": ", ".join(h["genes"]),
+                "CID": ", ".join(h["icd"]),
+                "NIS": h["nis"],
+                "MRC-SS": h["mrc_ss"],
+            }
+            for h in hits
+        ],
+        hide_index=True,
+        width="stretch",
+    )
+    snippets = [h for h in hits if h["snippet"]]
+    if snippets:
+        st.subheader("**Trechos**")
+        # texto livre das consultas: HTML escapado, nada dele vira markdown
+        items = "".join(
+            f"<p><b>{html.escape(h['patient'])}</b> · {_fmt_date(h['visit_date'])} — {snippet_html(h['snippet'])}</p>"
+            for h in snippets[:50]
+        )
+        st.html(f'<div class="busca-trechos">{items}</div>')
+
+# =========================================================
+# VISUALIZAR CONSULTA (somente leitura, um único bloco)
+# =========================================================
+def _hit_label(i: int) -> str:
+    h = hits[i]
+    return f"{h['patient']} · {TEMPLATE_LABELS.get(h['template'], h['template'])} · {_fmt_date(h['visit_date'])}"
+
+def _flip(delta: int, n: int):
+    st.session_state["busca_view"] = (st.session_state.get("busca_view", 0) + delta) % n
+
+if hits:
+    st.subheader("**Visualizar consulta**")
+    if st.session_state.get("busca_view", 0) >= len(hits):
+        st.session_state["busca_view"] = 0
+    c_v1, c_v2, c_v3 = st.columns([1.2, 8.0, 1.2], vertical_alignment="center")
+    with c_v1:
+        st.button("◀ Anterior", key="btn_view_prev", on_click=_flip, args=(-1, len(hits)))
+    with c_v2:
+        st.selectbox(
+            "Consulta",
+            options=list(range(len(hits))),
+            format_func=_hit_label,
+            key="busca_view",
+            label_visibility="collapsed",
+        )
+    with c_v3:
+        st.button("Próxima ▶", key="btn_view_next", on_click=_flip, args=(1, len(hits)))
+
+    h = hits[st.session_state["busca_view"]]
+    try:
+        parts = archive.get(h["patient"], h["template"], h["visit_date"])
+        if parts is None:
+            st.warning("Consulta não encontrada no arquivo local (índice desatualizado: rode archive-reindex).")
+            st.stop()
+        block = parts_html(h["template"], parts, title=_hit_label(st.session_state["busca_view"]))
+    except (ArchiveError, ValueError) as e:
+        st.error(str(e))
+        st.stop()
+    page_stylesheet("visit.css")
+    st.html(block)
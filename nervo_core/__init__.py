@@ -0,0 +1,9 @@
+"""
+Núcleo compartilhado dos templates (catálogos, escores, import/export).
+
+Carregado uma única vez por processo e usado apenas para leitura pelas
+sessões; não depende do Streamlit (``nervo_core.api`` opera em dicts comuns).
+"""
+from nervo_core import api, neuromusc, nervo, text
+
+__all__ = ["api", "nervo", "neuromusc", "text"]
@@ -0,0 +1,117 @@
+"""
+API sem Streamlit: estado em dicts comuns, para lote, testes e benchmarks.
+
+As páginas são adaptadores finos sobre as mesmas funções (passando
+``st.session_state`` como ``state``); nada aqui importa ``streamlit``.
+
+    from nervo_core import api
+    state = api.parse(texto)                  # template detectado pelos títulos
+    api.export(state, "evolucao", template="nervo")
+    api.export_json(state, template="nervo")  # formato estruturado, relido sem perda
+    api.score_nis(state)["total"]
+"""
+import json
+from collections.abc import Mapping
+
+from nervo_core import nervo, neuromusc
+from nervo_core.schema import looks_structured
+from nervo_core.text import IMPORT_MAX_CHARS, IMPORT_TIME_BUDGET_S, norm, split_header
+
+TEMPLATES = {"nervo": nervo, "neuromusc": neuromusc}
+MODES = ("evolucao", "completo")
+
+def _module(template: str):
+    try:
+        return TEMPLATES[template]
+    except KeyError:
+        raise ValueError(f"Template desconhecido: {template!r} (use {', '.join(TEMPLATES)}).") from None
+
+# =========================================================
+# ESTADO / EXPORT / IMPORT
+# =========================================================
+def new_state(template: str = "nervo") -> dict:
+    """Estado inicial do formulário (os mesmos valores padrão da página)."""
+    return _module(template).new_state()
+
+def export(state: Mapping, mode: str = "completo", template: str = "nervo") -> str:
+    """Texto de "Exportar evolução" (``mode="evolucao"``) ou "Exportar histórico completo"."""
+    if mode not in MODES:
+        raise ValueError(f"Modalidade desconhecida: {mode!r} (use {', '.join(MODES)}).")
+    mod = _module(template)
+    if mod is neuromusc:
+        # a página atualiza os resumos antes de exportar; não altera o dict do chamador
+        state = dict(state)
+        neuromusc.refresh_summaries(state)
+    return mod.build_export_text(state, include_all=(mode == "completo"))
+
+def export_json(state: Mapping, template: str = "nervo") -> str:
+    """Estado tipado do formulário em JSON versionado (o "Baixar .json" das páginas)."""
+    return _module(template).build_export_json(state)
+
+def detect_template(text: str) -> str | None:
+    """
+    Template gravado no cabeçalho do texto (ou no JSON estruturado); em
+    exports antigos, sem cabeçalho, o esquema que reconhece mais títulos de
+    seção (None se nenhum).
+    """
+    if looks_structured(text):
+        try:
+            name = json.loads(text).get("template")
+        except (ValueError, AttributeError):
+            return None
+        return name if name in TEMPLATES else None
+    header, _ = split_header(text)
+    if header is not None:
+        return header.template if header.template in TEMPLATES else None
+    lines = {ln.rstrip() for ln in norm(text).split("\n")}
+    hits = {name: len(lines & mod.SCHEMA.titles) for name, mod in TEMPLATES.items()}
+    best = max(hits, key=hits.get)
+    return best if hits[best] else None
+
+def parse(
+    text: str,
+    template: str | None = None,
+    max_chars: int | None = IMPORT_MAX_CHARS,
+    time_budget: float | None = IMPORT_TIME_BUDGET_S,
+) -> dict:
+    """
+    Estado lido de um texto exportado ou do JSON estruturado. Sem
+    ``template``, usa ``detect_template``. Levanta ValueError se nenhuma seção
+    for reconhecida e ImportAborted (subclasse de ValueError) se passar dos
+    limites.
+    """
+    if template is None:
+        template = detect_template(text)
+    if template and looks_structured(text):
+        return _module(template).SCHEMA.loads(text, max_chars)
+    state = _module(template).parse_export(text, max_chars, time_budget) if template else None
+    if state is None:
+        raise ValueError("Não foi possível identificar as seções do texto exportado.")
+    return state
+
+# =========================================================
+# ESCORES E RESUMOS
+# =========================================================
+def score_nis(state: Mapping) -> dict[str, float]:
+    w, r, s, t = nervo.compute_nis_components(state)
+    return {"weakness": w, "reflexes": r, "sensation": s, "total": t}
+
+def score_mrc_ss(state: Mapping) -> int | None:
+    """Soma dos 12 grupos do MRC-SS; None se algum estiver vazio ou fora de 0–5."""
+    ok, tot = nervo.compute_mrc_ss(state, nervo.MRC_SS_KEYS)
+    return tot if ok else None
+
+def score_incat(state: Mapping) -> dict[str, int | str]:
+    ul = int(state.get("incat_ul", 0))
+    ll = int(state.get("incat_ll", 0))
+    return {"ul": ul, "ll": ll, "total": ul + ll, "pnd": nervo.ll_to_pnd(ll)}
+
+def score_ibmfrs(state: Mapping) -> int:
+    return neuromusc.compute_ibmfrs_total(state)
+
+def summaries(state: Mapping) -> dict[str, str]:
+    """Resumos de suporte funcional e força motora (template neuromuscular)."""
+    return {
+        "func_resumo": neuromusc.build_func_summary(state),
+        "forca_resumo": neuromusc.build_forca_summary(state),
+    }
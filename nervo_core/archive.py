@@ -0,0 +1,409 @@
+"""
+Arquivo local de consultas (opcional): SQLite em modo WAL.
+
+Ativado pela variável de ambiente ``NERVO_ARCHIVE_PATH`` (caminho do
+arquivo .sqlite). Ao exportar, a página grava o formulário dividido em
+partes (``Template.dump_parts``: uma por seção) com o prontuário, o template
+e a data da consulta; "Carregar última consulta" busca a mais recente pela
+chave primária (prontuário, template, data), sem varrer a tabela.
+
+Cada parte é guardada uma única vez, endereçada pelo hash do conteúdo
+(``bodies``); a consulta só guarda ``{parte: hash}``. Identificação,
+antecedentes e medicações se repetem de uma consulta para outra e deixam de
+ocupar espaço a cada retorno. Remontar uma consulta = a linha da consulta +
+uma busca por chave para cada parte. ``report`` mostra o ganho
+(``python -m nervo_core archive-report``).
+
+As partes ficam comprimidas com zlib e um dicionário pré-carregado
+(``nervo_core.compress``): o primeiro vem dos esquemas dos templates;
+``archive-train`` gera outro a partir das consultas guardadas. Os
+dicionários nunca são apagados (cada parte guarda o id do seu), então
+trocar de dicionário não exige reprocessar o arquivo.
+
+Cada operação abre uma conexão curta: várias sessões (threads ou processos)
+gravam ao mesmo tempo; no WAL as leituras não esperam as escritas e cada
+gravação é uma transação pequena, então a espera pelo lock de escrita fica
+em milissegundos (``busy_timeout`` cobre os picos).
+
+A busca (texto livre + facetas, ``nervo_core.search``) fica no mesmo
+arquivo e é atualizada na mesma transação de cada gravação.
+
+Para leitura pesada de coortes há o formato alternativo ``*.vlog``
+(``nervo_core.visitlog``), escolhido pela extensão do caminho.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import zlib
+from collections.abc import Iterator, Mapping
+from contextlib import closing
+from datetime import datetime
+from pathlib import Path
+
+from nervo_core import search
+from nervo_core.compress import compress, decompress, template_dictionary
+
+try:
+    from zoneinfo import ZoneInfo  # Python 3.9+
+    _TZ_SP = ZoneInfo("America/Sao_Paulo")
+except Exception:
+    _TZ_SP = None
+
+ARCHIVE_ENV = "NERVO_ARCHIVE_PATH"
+_BUSY_TIMEOUT_S = 5.0
+
+_DDL = (
+    """
+    CREATE TABLE IF NOT EXISTS bodies (
+        hash TEXT PRIMARY KEY,  -- blake2b-128 do conteúdo (antes de comprimir)
+        body BLOB NOT NULL,     -- JSON canônico de uma parte, comprimido com o dicionário "dict"
+        dict INTEGER NOT NULL,  -- id em dictionaries
+        size INTEGER NOT NULL   -- bytes antes de comprimir
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS dictionaries (
+        id         INTEGER PRIMARY KEY,
+        created_at TEXT NOT NULL,
+        source     TEXT NOT NULL,  -- "template" | "corpus"
+        zdict      BLOB NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS visits (
+        patient    TEXT NOT NULL,  -- prontuário normalizado (patient_key)
+        template   TEXT NOT NULL,  -- Template.name
+        visit_date TEXT NOT NULL,  -- AAAA-MM-DD (uma linha por consulta/dia)
+        saved_at   TEXT NOT NULL,  -- ISO, horário de São Paulo
+        parts      TEXT NOT NULL,  -- JSON {parte: hash em bodies}
+        PRIMARY KEY (patient, template, visit_date)
+    ) WITHOUT ROWID
+    """,
+)
+
+_UPSERT = """
+INSERT INTO visits (patient, template, visit_date, saved_at, parts) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (patient, template, visit_date) DO UPDATE SET saved_at = excluded.saved_at, parts = excluded.parts
+"""
+
+_LATEST = """
+SELECT visit_date, parts FROM visits
+WHERE patient = ? AND template = ?
+ORDER BY visit_date DESC LIMIT 1
+"""
+
+_GET = """
+SELECT visit_date, parts FROM visits
+WHERE patient = ? AND template = ? AND visit_date = ?
+"""
+
+_HISTORY = """
+SELECT visit_date, parts FROM visits
+WHERE patient = ? AND template = ?
+ORDER BY visit_date
+"""
+
+class ArchiveError(RuntimeError):
+    """Falha do arquivo local (disco, permissão, banco corrompido); a mensagem vai para a UI."""
+
+def _now() -> datetime:
+    return datetime.now(_TZ_SP) if _TZ_SP else datetime.now()
+
+def patient_key(text: str) -> str:
+    # "rghc  123 " e "RGHC 123" são o mesmo paciente
+    return " ".join(str(text or "").split()).casefold()
+
+def body_hash(body: str) -> str:
+    return hashlib.blake2b(body.encode("utf-8"), digest_size=16).hexdigest()
+
+def _begin(con: sqlite3.Connection):
+    # IMMEDIATE: pega o lock de escrita já no início (sem deadlock de upgrade entre sessões)
+    con.execute("BEGIN IMMEDIATE")
+
+class VisitArchive:
+    def __init__(self, path: str | os.PathLike):
+        self.path = str(path)
+        self._zdicts: dict[int, bytes] = {}
+        self._current: int | None = None
+        self._search = False
+        try:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            with closing(self._connect()) as con:
+                con.execute("PRAGMA journal_mode=WAL")  # fica gravado no arquivo
+                _begin(con)
+                try:
+                    for ddl in _DDL:
+                        con.execute(ddl)
+                    self._search = search.ensure(con)
+                    if con.execute("SELECT 1 FROM dictionaries LIMIT 1").fetchone() is None:
+                        self._insert_dictionary(con, template_dictionary(), "template")
+                    con.execute("COMMIT")
+                except BaseException:
+                    con.execute("ROLLBACK")
+                    raise
+        except (OSError, sqlite3.Error) as e:
+            raise ArchiveError(f"Não foi possível abrir o arquivo local de consultas ({self.path}): {e}") from e
+
+    def _connect(self) -> sqlite3.Connection:
+        # autocommit: cada execute é a sua própria transação, salvo BEGIN explícito
+        con = sqlite3.connect(self.path, timeout=_BUSY_TIMEOUT_S, isolation_level=None)
+        con.execute("PRAGMA synchronous=NORMAL")
+        return con
+
+    @staticmethod
+    def _insert_dictionary(con: sqlite3.Connection, zdict: bytes, source: str) -> int:
+        cur = con.execute(
+            "INSERT INTO dictionaries (created_at, source, zdict) VALUES (?, ?, ?)",
+            (_now().isoformat(timespec="seconds"), source, zdict),
+        )
+        return cur.lastrowid
+
+    def _zdict(self, con: sqlite3.Connection, dict_id: int) -> bytes:
+        # imutáveis: cache por processo
+        zd = self._zdicts.get(dict_id)
+        if zd is None:
+            row = con.execute("SELECT zdict FROM dictionaries WHERE id = ?", (dict_id,)).fetchone()
+            if row is None:
+                raise ArchiveError(f"Dicionário {dict_id} ausente do arquivo local.")
+            zd = self._zdicts[dict_id] = bytes(row[0])
+        return zd
+
+    def _current_dict(self, con: sqlite3.Connection) -> tuple[int, bytes]:
+        # o mais novo na abertura (um archive-train vale para processos iniciados depois)
+        if self._current is None:
+            self._current = con.execute("SELECT max(id) FROM dictionaries").fetchone()[0]
+        return self._current, self._zdict(con, self._current)
+
+    def _decode(self, con: sqlite3.Connection, body: bytes, dict_id: int) -> str:
+        return decompress(bytes(body), self._zdict(con, dict_id)).decode("utf-8")
+
+    def save(self, patient: str, template: str, parts: Mapping[str, str], visit_date: str | None = None) -> str:
+        """
+        Grava (ou substitui) a consulta do dia a partir de ``Template.dump_parts``;
+        só as partes ainda não vistas ocupam espaço novo. Devolve a data usada.
+        """
+        key = patient_key(patient)
+        if not key:
+            raise ArchiveError("Informe o prontuário do paciente para salvar a consulta.")
+        now = _now()
+        visit_date = visit_date or now.date().isoformat()
+        refs = {name: body_hash(body) for name, body in parts.items()}
+        doc = search.document(template, parts) if self._search else None
+        try:
+            with closing(self._connect()) as con:
+                dict_id, zd = self._current_dict(con)
+                # comprime fora da transação: o lock de escrita fica só com os INSERTs
+                rows = []
+                for name, body in parts.items():
+                    raw = body.encode("utf-8")
+                    rows.append((refs[name], compress(raw, zd), dict_id, len(raw)))
+                _begin(con)
+                try:
+                    con.executemany("INSERT OR IGNORE INTO bodies (hash, body, dict, size) VALUES (?, ?, ?, ?)", rows)
+                    con.execute(_UPSERT, (key, template, visit_date, now.isoformat(timespec="seconds"), json.dumps(refs)))
+                    if doc is not None:
+                        search.index_visit(con, key, template, visit_date, doc)
+                    con.execute("COMMIT")
+                except BaseException:
+                    con.execute("ROLLBACK")
+                    raise
+        except sqlite3.Error as e:
+            raise ArchiveError(f"Não foi possível salvar a consulta no arquivo local: {e}") from e
+        return visit_date
+
+    def _visit(self, sql: str, args: tuple) -> tuple[str, dict[str, str]] | None:
+        # uma consulta: a linha dela + só as partes que ela usa
+        try:
+            with closing(self._connect()) as con:
+                row = con.execute(sql, args).fetchone()
+                if row is None:
+                    return None
+                visit_date, refs = row[0], json.loads(row[1])
+                hashes = sorted(set(refs.values()))
+                marks = ",".join("?" * len(hashes))
+                bodies = {
+                    h: self._decode(con, body, dict_id)
+                    for h, body, dict_id in con.execute(f"SELECT hash, body, dict FROM bodies WHERE hash IN ({marks})", hashes)
+                }
+        except (sqlite3.Error, ValueError, zlib.error) as e:
+            raise ArchiveError(f"Não foi possível ler o arquivo local de consultas: {e}") from e
+        missing = [name for name, h in refs.items() if h not in bodies]
+        if missing:
+            raise ArchiveError(f"Consulta de {visit_date} incompleta no arquivo local (faltam: {', '.join(missing)}).")
+        return visit_date, {name: bodies[h] for name, h in refs.items()}
+
+    def latest(self, patient: str, template: str) -> tuple[str, dict[str, str]] | None:
+        """(data, partes) da consulta mais recente; None se não houver."""
+        return self._visit(_LATEST, (patient_key(patient), template))
+
+    def get(self, patient: str, template: str, visit_date: str) -> dict[str, str] | None:
+        """Partes da consulta do dia (AAAA-MM-DD); None se não houver."""
+        found = self._visit(_GET, (patient_key(patient), template, visit_date))
+        return found[1] if found else None
+
+    def history(self, patient: str, template: str) -> list[tuple[str, dict[str, str]]]:
+        """Todas as consultas do paciente, (data, partes) da mais antiga à mais recente."""
+        try:
+            with closing(self._connect()) as con:
+                rows = [
+                    (visit_date, json.loads(refs))
+                    for visit_date, refs in con.execute(_HISTORY, (patient_key(patient), template))
+                ]
+                hashes = sorted({h for _, refs in rows for h in refs.values()})
+                marks = ",".join("?" * len(hashes))
+                bodies = {
+                    h: self._decode(con, body, dict_id)
+                    for h, body, dict_id in con.execute(f"SELECT hash, body, dict FROM bodies WHERE hash IN ({marks})", hashes)
+                }
+        except (sqlite3.Error, ValueError, zlib.error) as e:
+            raise ArchiveError(f"Não foi possível ler o arquivo local de consultas: {e}") from e
+        try:
+            return [(d, {name: bodies[h] for name, h in refs.items()}) for d, refs in rows]
+        except KeyError:
+            raise ArchiveError("Consulta incompleta no arquivo local.") from None
+
+    def _require_search(self):
+        if not self._search:
+            raise ArchiveError("Busca indisponível: o SQLite deste Python não tem FTS5.")
+
+    def search(self, text: str = "", **facets) -> list[dict]:
+        """Busca por texto e facetas (argumentos de ``nervo_core.search.search``)."""
+        self._require_search()
+        try:
+            with closing(self._connect()) as con:
+                return search.search(con, text, **facets)
+        except sqlite3.Error as e:
+            raise ArchiveError(f"Não foi possível buscar no arquivo local: {e}") from e
+
+    def facet_values(self) -> dict[str, list[str]]:
+        self._require_search()
+        try:
+            with closing(self._connect()) as con:
+                return search.facet_values(con)
+        except sqlite3.Error as e:
+            raise ArchiveError(f"Não foi possível ler o arquivo local de consultas: {e}") from e
+
+    def _all_visits(self, con: sqlite3.Connection):
+        for patient, template, visit_date, refs in con.execute(
+            "SELECT patient, template, visit_date, parts FROM visits"
+        ).fetchall():
+            refs = json.loads(refs)
+            bodies = {}
+            for name, h in refs.items():
+                row = con.execute("SELECT body, dict FROM bodies WHERE hash = ?", (h,)).fetchone()
+                if row is not None:
+                    bodies[name] = self._decode(con, *row)
+            yield patient, template, visit_date, bodies
+
+    def reindex(self) -> int:
+        """Refaz o índice de busca de todas as consultas (arquivos gravados antes da busca existir)."""
+        self._require_search()
+        try:
+            with closing(self._connect()) as con:
+                _begin(con)
+                try:
+                    n = search.rebuild(con, self._all_visits(con))
+                    con.execute("COMMIT")
+                except BaseException:
+                    con.execute("ROLLBACK")
+                    raise
+        except (sqlite3.Error, ValueError, zlib.error) as e:
+            raise ArchiveError(f"Não foi possível refazer o índice de busca: {e}") from e
+        return n
+
+    def report(self) -> dict[str, int | float]:
+        """
+        Tamanho lógico (soma das partes de todas as consultas), das partes
+        distintas e do que fica gravado (comprimido); as razões de cada etapa e
+        as partes que nenhuma consulta usa mais (substituídas por uma nova
+        exportação no mesmo dia).
+        """
+        try:
+            with closing(self._connect()) as con:
+                sizes, stored = {}, 0
+                for h, size, packed in con.execute("SELECT hash, size, length(body) FROM bodies"):
+                    sizes[h] = size
+                    stored += packed
+                used: dict[str, int] = {}
+                visits = 0
+                for (refs,) in con.execute("SELECT parts FROM visits"):
+                    visits += 1
+                    for h in json.loads(refs).values():
+                        used[h] = used.get(h, 0) + 1
+                indexed = search.count(con) if self._search else 0
+        except (sqlite3.Error, ValueError) as e:
+            raise ArchiveError(f"Não foi possível ler o arquivo local de consultas: {e}") from e
+        logical = sum(sizes.get(h, 0) * n for h, n in used.items())
+        unique = sum(sizes.values())
+        return {
+            "visits": visits,
+            "parts": sum(used.values()),
+            "bodies": len(sizes),
+            "orphan_bodies": len(sizes.keys() - used.keys()),
+            "logical_bytes": logical,
+            "unique_bytes": unique,
+            "stored_bytes": stored,
+            "dedup_ratio": round(logical / unique, 2) if unique else 1.0,
+            "compression_ratio": round(unique / stored, 2) if stored else 1.0,
+            "total_ratio": round(logical / stored, 2) if stored else 1.0,
+            "search_indexed": indexed,
+        }
+
+    def texts(self) -> Iterator[str]:
+        """Todas as partes guardadas, descomprimidas (corpus para treino e benchmark)."""
+        try:
+            with closing(self._connect()) as con:
+                for body, dict_id in con.execute("SELECT body, dict FROM bodies").fetchall():
+                    yield self._decode(con, body, dict_id)
+        except (sqlite3.Error, zlib.error) as e:
+            raise ArchiveError(f"Não foi possível ler o arquivo local de consultas: {e}") from e
+
+    def dictionary(self) -> tuple[int, bytes]:
+        """(id, dicionário) usado nas novas gravações."""
+        with closing(self._connect()) as con:
+            return self._current_dict(con)
+
+    def add_dictionary(self, zdict: bytes, recompress: bool = False, batch: int = 500) -> int:
+        """
+        Registra um dicionário novo (passa a valer nas gravações deste processo).
+        Com ``recompress``, regrava as partes com ele, em lotes curtos para não
+        segurar o lock de escrita das sessões em uso.
+        """
+        try:
+            with closing(self._connect()) as con:
+                _begin(con)
+                dict_id = self._insert_dictionary(con, zdict, "corpus")
+                con.execute("COMMIT")
+                self._zdicts[dict_id] = zdict
+                self._current = dict_id
+                if recompress:
+                    hashes = [h for (h,) in con.execute("SELECT hash FROM bodies WHERE dict != ?", (dict_id,))]
+                    for i in range(0, len(hashes), batch):
+                        chunk = hashes[i:i + batch]
+                        marks = ",".join("?" * len(chunk))
+                        rows = con.execute(f"SELECT hash, body, dict FROM bodies WHERE hash IN ({marks})", chunk).fetchall()
+                        new = []
+                        for h, body, old_id in rows:
+                            raw = self._decode(con, body, old_id).encode("utf-8")
+                            new.append((compress(raw, zdict), dict_id, len(raw), h))
+                        _begin(con)
+                        con.executemany("UPDATE bodies SET body = ?, dict = ?, size = ? WHERE hash = ?", new)
+                        con.execute("COMMIT")
+        except (sqlite3.Error, zlib.error) as e:
+            raise ArchiveError(f"Não foi possível gravar o dicionário no arquivo local: {e}") from e
+        return dict_id
+
+def open_archive(path: str | None = None):
+    """
+    Arquivo em ``path`` ou em ``$NERVO_ARCHIVE_PATH``; None se nenhum estiver
+    configurado. Caminho terminado em ``.vlog``: log só de acréscimo
+    (``nervo_core.visitlog.VisitLog``, mesma API); senão SQLite.
+    """
+    path = path or os.environ.get(ARCHIVE_ENV, "").strip()
+    if not path:
+        return None
+    if path.endswith(".vlog"):
+        from nervo_core.visitlog import VisitLog  # importa este módulo
+        return VisitLog(path)
+    return VisitArchive(path)
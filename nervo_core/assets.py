@@ -0,0 +1,30 @@
+"""
+Folhas de estilo das páginas (``static/*.css``).
+
+Com ``server.enableStaticServing`` (``.streamlit/config.toml``) o Streamlit
+serve ``static/`` em ``app/static/``: a cada rerun a página manda só a tag
+``<link>`` e o navegador guarda o CSS em cache. ``?v=`` muda junto com o
+conteúdo, então uma edição do CSS não fica presa no cache. Sem o servidor
+de estáticos (app iniciado fora do diretório do repositório), ``style_tag``
+devolve o CSS inline, como antes.
+"""
+import functools
+import hashlib
+from pathlib import Path
+
+STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
+STATIC_URL = "app/static"
+
+@functools.cache
+def stylesheet(name: str) -> str:
+    return (STATIC_DIR / name).read_text(encoding="utf-8")
+
+@functools.cache
+def version(name: str) -> str:
+    return hashlib.sha1(stylesheet(name).encode("utf-8")).hexdigest()[:10]
+
+def link_tag(name: str) -> str:
+    return f'<link rel="stylesheet" href="{STATIC_URL}/{name}?v={version(name)}">'
+
+def style_tag(name: str) -> str:
+    return f"<style>\n{stylesheet(name)}</style>"
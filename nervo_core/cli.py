@@ -0,0 +1,228 @@
+"""
+Linha de comando: lê em lote os .txt de "Exportar histórico completo".
+
+    python -m nervo_core parse PASTA --out notas.jsonl
+    python -m nervo_core parse PASTA --out notas.csv --workers 8 --chunksize 64
+    python -m nervo_core archive-report [--path arquivo.sqlite]
+    python -m nervo_core archive-train [--path arquivo.sqlite] [--recompress]
+    python -m nervo_core archive-bench [--path arquivo.sqlite]
+    python -m nervo_core archive-reindex [--path arquivo.sqlite]
+
+Cada arquivo é lido com a mesma lógica da importação das páginas
+(``api.parse``), com o template (nervo ou neuromuscular) detectado pelos
+títulos de seção. Sai um registro por nota (JSONL ou CSV, pela extensão de
+``--out`` ou por ``--format``); o progresso vai para o stderr.
+``archive-report`` mostra o espaço do arquivo local de consultas
+(``NERVO_ARCHIVE_PATH``) e o ganho da deduplicação por seção e da
+compressão; ``archive-train`` refaz o dicionário de compressão a partir das
+consultas guardadas e ``archive-bench`` compara zlib puro, o dicionário dos
+templates e um treinado. ``archive-reindex`` refaz o índice da busca
+(arquivos gravados antes dela).
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from nervo_core import api
+from nervo_core.archive import ArchiveError, open_archive
+from nervo_core.compress import ZDICT_MAX, bench, template_dictionary, train_dictionary
+
+_META = ("file", "template", "error")
+
+# =========================================================
+# UM ARQUIVO (roda nos processos do pool)
+# =========================================================
+def parse_file(path: str) -> dict:
+    rec: dict = {"file": path, "template": None, "error": None, "fields": {}}
+    try:
+        text = Path(path).read_text(encoding="utf-8-sig", errors="replace")
+        rec["template"] = api.detect_template(text)
+        if rec["template"] is None:
+            raise ValueError("Nenhuma seção de template reconhecida.")
+        rec["fields"] = api.parse(text, rec["template"])
+    except (OSError, ValueError) as e:
+        rec["error"] = str(e)
+    return rec
+
+def iter_files(root: Path, pattern: str) -> list[str]:
+    if root.is_file():
+        return [str(root)]
+    return sorted(str(p) for p in root.rglob(pattern) if p.is_file())
+
+def parse_many(paths: list[str], workers: int, chunksize: int) -> Iterator[dict]:
+    # ordem preservada (map); workers <= 1 roda no próprio processo
+    if workers <= 1:
+        yield from map(parse_file, paths)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(parse_file, paths, chunksize=chunksize)
+
+# =========================================================
+# SAÍDA
+# =========================================================
+def _csv_value(v) -> str:
+    if v is None:
+        return ""
+    if isinstance(v, (list, tuple)):
+        return "; ".join(str(x) for x in v)
+    return str(v)
+
+def csv_columns() -> list[str]:
+    # cabeçalho fixo: metadados + campos exportados dos dois templates, na ordem do esquema
+    keys = [k for mod in api.TEMPLATES.values() for k in mod.SCHEMA.export_keys[True]]
+    return [*_META, *dict.fromkeys(keys)]
+
+def write_jsonl(records: Iterable[dict], out) -> None:
+    for rec in records:
+        out.write(json.dumps(rec, ensure_ascii=False) + "\n")
+
+def write_csv(records: Iterable[dict], out) -> None:
+    cols = csv_columns()
+    w = csv.writer(out)
+    w.writerow(cols)
+    for rec in records:
+        row = {**rec["fields"], **{k: rec[k] for k in _META}}
+        w.writerow([_csv_value(row.get(c)) for c in cols])
+
+def _progress(records: Iterable[dict], total: int, every: int) -> Iterator[dict]:
+    t0 = time.perf_counter()
+    failed = 0
+    for i, rec in enumerate(records, 1):
+        failed += rec["error"] is not None
+        if i % every == 0 or i == total:
+            dt = time.perf_counter() - t0
+            print(
+                f"\r[{i}/{total}] {i / dt if dt else 0:.0f} notas/s, {failed} com erro",
+                end="\n" if i == total else "",
+                file=sys.stderr,
+                flush=True,
+            )
+        yield rec
+
+# =========================================================
+# ENTRADA
+# =========================================================
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(prog="python -m nervo_core", description=__doc__.split("\n\n")[0].strip())
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    pp = sub.add_parser("parse", help="lê uma pasta de exports e grava um registro por nota")
+    pp.add_argument("path", type=Path, help="pasta (percorrida recursivamente) ou arquivo")
+    pp.add_argument("--out", "-o", default="-", help="arquivo de saída (padrão: stdout)")
+    pp.add_argument("--format", choices=("jsonl", "csv"), help="padrão: pela extensão de --out, senão jsonl")
+    pp.add_argument("--glob", default="*.txt", help="padrão dos arquivos (padrão: *.txt)")
+    pp.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processos (1 = sem pool)")
+    pp.add_argument("--chunksize", type=int, default=32, help="arquivos por tarefa enviada ao pool")
+
+    pr = sub.add_parser("archive-report", help="espaço do arquivo local de consultas e razão de deduplicação")
+    pr.add_argument("--path", help="arquivo .sqlite (padrão: $NERVO_ARCHIVE_PATH)")
+
+    pt = sub.add_parser("archive-train", help="treina um dicionário de compressão com as consultas guardadas")
+    pt.add_argument("--path", help="arquivo .sqlite (padrão: $NERVO_ARCHIVE_PATH)")
+    pt.add_argument("--size", type=int, default=ZDICT_MAX, help=f"bytes do dicionário (padrão/máximo: {ZDICT_MAX})")
+    pt.add_argument("--recompress", action="store_true", help="regrava as partes já guardadas com o novo dicionário")
+
+    pb = sub.add_parser("archive-bench", help="razão e velocidade: zlib puro x dicionário dos templates x treinado")
+    pb.add_argument("--path", help="arquivo .sqlite (padrão: $NERVO_ARCHIVE_PATH)")
+    pb.add_argument("--repeat", type=int, default=3, help="repetições por medida")
+
+    pi = sub.add_parser("archive-reindex", help="refaz o índice de busca (texto livre + facetas)")
+    pi.add_argument("--path", help="arquivo .sqlite (padrão: $NERVO_ARCHIVE_PATH)")
+    return p
+
+def _archive(path: str | None):
+    archive = open_archive(path)
+    if archive is None:
+        raise ArchiveError("Arquivo local não configurado (use --path ou NERVO_ARCHIVE_PATH).")
+    return archive
+
+def archive_report(path: str | None) -> int:
+    try:
+        rep = _archive(path).report()
+    except ArchiveError as e:
+        print(e, file=sys.stderr)
+        return 1
+    for k, v in rep.items():
+        print(f"{k:17} {v}")
+    return 0
+
+def archive_train(path: str | None, size: int, recompress: bool) -> int:
+    try:
+        archive = _archive(path)
+        texts = list(archive.texts())
+        if not texts:
+            print("Arquivo local vazio: nada para treinar.", file=sys.stderr)
+            return 1
+        zdict = train_dictionary(texts, min(size, ZDICT_MAX))
+        dict_id = archive.add_dictionary(zdict, recompress=recompress)
+        rep = archive.report()
+    except ArchiveError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(f"dicionário {dict_id}: {len(zdict)} bytes, {len(texts)} partes", file=sys.stderr)
+    print(f"compression_ratio {rep['compression_ratio']}  total_ratio {rep['total_ratio']}", file=sys.stderr)
+    return 0
+
+def archive_bench(path: str | None, repeat: int) -> int:
+    try:
+        texts = list(_archive(path).texts())
+    except ArchiveError as e:
+        print(e, file=sys.stderr)
+        return 1
+    if len(texts) < 2:
+        print("Arquivo local com menos de duas partes: nada para comparar.", file=sys.stderr)
+        return 1
+    # treina nas partes pares e mede nas ímpares (sem medir o que o dicionário já viu)
+    train, test = texts[0::2], texts[1::2]
+    rows = bench(
+        test,
+        {"zlib": None, "template": template_dictionary(), "trained": train_dictionary(train)},
+        repeat=max(1, repeat),
+    )
+    cols = list(rows[0])
+    print("  ".join(f"{c:>15}" for c in cols))
+    for row in rows:
+        print("  ".join(f"{row[c]!s:>15}" for c in cols))
+    return 0
+
+def archive_reindex(path: str | None) -> int:
+    t0 = time.perf_counter()
+    try:
+        n = _archive(path).reindex()
+    except ArchiveError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(f"{n} consultas indexadas em {time.perf_counter() - t0:.1f} s", file=sys.stderr)
+    return 0
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.cmd == "archive-report":
+        return archive_report(args.path)
+    if args.cmd == "archive-train":
+        return archive_train(args.path, args.size, args.recompress)
+    if args.cmd == "archive-bench":
+        return archive_bench(args.path, args.repeat)
+    if args.cmd == "archive-reindex":
+        return archive_reindex(args.path)
+
+    fmt = args.format or ("csv" if str(args.out).lower().endswith(".csv") else "jsonl")
+    paths = iter_files(args.path, args.glob)
+    if not paths:
+        print(f"Nenhum arquivo '{args.glob}' em {args.path}.", file=sys.stderr)
+        return 1
+
+    records = _progress(parse_many(paths, args.workers, args.chunksize), len(paths), every=max(1, args.chunksize))
+    write = write_csv if fmt == "csv" else write_jsonl
+    if args.out == "-":
+        write(records, sys.stdout)
+    else:
+        with open(args.out, "w", encoding="utf-8", newline="") as out:
+            write(records, out)
+    return 0
@@ -0,0 +1,132 @@
+"""
+Compressão das partes do arquivo local: zlib (deflate puro) com dicionário.
+
+As partes arquivadas são JSON canônico por seção (``Template.dump_parts``):
+as mesmas chaves ("nis_cn_iii_r", "meds_atual_previo_texto"...) e os mesmos
+textos de catálogo (DX_NOSO_OPTIONS, TOPO_OPTIONS...) em quase toda
+consulta. Cada parte é pequena demais para o zlib aprender esse vocabulário
+sozinho; com um dicionário pré-carregado (``zdict``) ele já começa sabendo.
+
+- ``template_dictionary()``: dicionário inicial, gerado dos esquemas e
+  catálogos dos dois templates (não depende de dados).
+- ``train_dictionary(amostras)``: refeito a partir de um corpus real
+  (``python -m nervo_core archive-train``).
+- ``bench(...)``: razão e velocidade contra o zlib sem dicionário
+  (``python -m nervo_core archive-bench``).
+
+Só biblioteca padrão.
+"""
+import re
+import time
+import zlib
+from collections import Counter
+from collections.abc import Iterable, Mapping
+
+from nervo_core import nervo, neuromusc
+from nervo_core.schema import canonical_json
+
+ZDICT_MAX = 32 * 1024  # janela do deflate: bytes além disso nunca são referenciados
+_LEVEL = 9
+_WBITS = -15  # deflate puro: sem cabeçalho/adler (o id do dicionário fica na tabela)
+
+_CATALOGS = (
+    nervo.TRATAMENTO_OPTIONS,
+    nervo.CONTROLE_OPTIONS,
+    nervo.DX_CATEGORY_OPTIONS,
+    nervo.DX_GENETICA_OPTIONS,
+    nervo.DX_IMUNO_OPTIONS,
+    neuromusc.VENT_OPTIONS,
+    neuromusc.GENES_OPTIONS,
+    neuromusc.TOPO_OPTIONS,
+    neuromusc.DX_NOSO_OPTIONS,
+    neuromusc.DNPM_OPTIONS,
+    neuromusc.TG_OPTIONS,
+)
+
+# =========================================================
+# CODEC
+# =========================================================
+def compress(body: bytes, zdict: bytes | None = None) -> bytes:
+    c = zlib.compressobj(_LEVEL, zlib.DEFLATED, _WBITS, zdict=zdict) if zdict else zlib.compressobj(_LEVEL, zlib.DEFLATED, _WBITS)
+    return c.compress(body) + c.flush()
+
+def decompress(data: bytes, zdict: bytes | None = None) -> bytes:
+    d = zlib.decompressobj(_WBITS, zdict=zdict) if zdict else zlib.decompressobj(_WBITS)
+    return d.decompress(data) + d.flush()
+
+# =========================================================
+# DICIONÁRIOS
+# =========================================================
+def _fit(chunks: Iterable[bytes], size: int) -> bytes:
+    # o deflate alcança melhor o que está no fim do dicionário: mais úteis por último
+    picked, total = [], 0
+    for b in chunks:
+        if total + len(b) > size:
+            continue
+        picked.append(b)
+        total += len(b)
+    return b"".join(reversed(picked))
+
+def template_dictionary(size: int = ZDICT_MAX) -> bytes:
+    """Esqueleto JSON de cada seção (chaves em ordem canônica) + textos dos catálogos."""
+    chunks = []
+    for mod in (nervo, neuromusc):
+        for s in mod.SCHEMA.sections:
+            chunks.append(canonical_json(dict.fromkeys(s.field_keys, "")).encode("utf-8"))
+        chunks.append(canonical_json(dict.fromkeys(s.title for s in mod.SCHEMA.sections)).encode("utf-8"))
+        chunks += [f'"{o}"'.encode("utf-8") for f in mod.SCHEMA.fields.values() for o in f.options]
+    chunks += [f'"{o}"'.encode("utf-8") for cat in _CATALOGS for o in cat]
+    # catálogos (valores) são mais frequentes que esqueletos inteiros: vão para o fim
+    return _fit(reversed(list(dict.fromkeys(chunks))), size)
+
+# strings JSON ("chave": e "valor",) e números: as unidades que se repetem entre partes
+_TOKEN_RE = re.compile(r'"(?:[^"\\]|\\.)*"[:,]?|-?\d+(?:\.\d+)?[,}]')
+
+def train_dictionary(samples: Iterable[str], size: int = ZDICT_MAX) -> bytes:
+    """
+    Dicionário a partir de um corpus: tokens que aparecem em mais partes,
+    pontuados por frequência × tamanho (bytes economizados), até ``size``.
+    """
+    df: Counter[str] = Counter()
+    for s in samples:
+        df.update(set(_TOKEN_RE.findall(s)))
+    ranked = sorted(
+        ((tok, n) for tok, n in df.items() if n > 1),
+        key=lambda kv: kv[1] * len(kv[0]),
+        reverse=True,
+    )
+    return _fit((tok.encode("utf-8") for tok, _ in ranked), size)
+
+# =========================================================
+# BENCHMARK
+# =========================================================
+def bench(samples: list[str], dictionaries: Mapping[str, bytes | None], repeat: int = 3) -> list[dict]:
+    """
+    Para cada dicionário (None = zlib sem dicionário): razão (original /
+    comprimido) e MB/s de compressão e descompressão sobre ``samples``,
+    cada parte comprimida separadamente (como no arquivo).
+    """
+    raw = [s.encode("utf-8") for s in samples]
+    size = sum(map(len, raw))
+    rows = []
+    for name, zd in dictionaries.items():
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            packed = [compress(b, zd) for b in raw]
+        t_c = (time.perf_counter() - t0) / repeat
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            for p in packed:
+                decompress(p, zd)
+        t_d = (time.perf_counter() - t0) / repeat
+        stored = sum(map(len, packed))
+        rows.append({
+            "codec": name,
+            "dict_bytes": len(zd or b""),
+            "bytes": size,
+            "stored": stored,
+            "ratio": round(size / stored, 2) if stored else 0.0,
+            "compress_mb_s": round(size / t_c / 1e6, 1) if t_c else 0.0,
+            "decompress_mb_s": round(size / t_d / 1e6, 1) if t_d else 0.0,
+        })
+    return rows
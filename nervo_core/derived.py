@@ -0,0 +1,110 @@
+"""
+Valores derivados mantidos de forma incremental (MRC-SS, NIS, IBM-FRS, resumos).
+
+Cada widget de entrada chama ``Derived.on_change(state, chave)`` no seu
+callback: as somas guardam a contribuição de cada chave e só trocam a que
+mudou; os resumos de texto são refeitos apenas quando uma de suas entradas
+muda. A página lê os valores prontos em O(1). ``Derived.check`` recalcula
+tudo com as funções originais e lista as divergências (modo debug).
+"""
+from collections.abc import Callable, Mapping, MutableMapping
+from dataclasses import dataclass
+
+# =========================================================
+# SOMAS
+# =========================================================
+@dataclass(frozen=True)
+class Sum:
+    """
+    Soma por chave guardada em ``state[name]`` como
+    ``{"parts": {chave: contribuição}, "total": soma, "missing": n}``.
+    ``value`` converte o valor cru do campo (None = vazio/inválido).
+    """
+    name: str
+    keys: tuple[str, ...]
+    value: Callable[[object], int | float | None]
+    full: Callable[[Mapping], int | float | None]  # recálculo original, para o check
+
+    def rebuild(self, state: MutableMapping) -> dict:
+        parts = {k: self.value(state.get(k)) for k in self.keys}
+        valid = [v for v in parts.values() if v is not None]
+        acc = {"parts": parts, "total": sum(valid), "missing": len(parts) - len(valid)}
+        state[self.name] = acc
+        return acc
+
+    def update(self, state: MutableMapping, key: str):
+        acc = state.get(self.name)
+        if acc is None:
+            self.rebuild(state)
+            return
+        old = acc["parts"][key]
+        new = self.value(state.get(key))
+        if old is not None:
+            acc["total"] -= old
+        else:
+            acc["missing"] -= 1
+        if new is not None:
+            acc["total"] += new
+        else:
+            acc["missing"] += 1
+        acc["parts"][key] = new
+
+    def get(self, state: MutableMapping) -> int | float | None:
+        """Soma atual; None enquanto houver campo vazio/inválido."""
+        acc = state.get(self.name)
+        if acc is None:
+            acc = self.rebuild(state)
+        return None if acc["missing"] else acc["total"]
+
+# =========================================================
+# RESUMOS (texto refeito a partir das entradas)
+# =========================================================
+@dataclass(frozen=True)
+class Summary:
+    name: str  # chave do texto no state (ex.: "func_resumo")
+    keys: tuple[str, ...]
+    build: Callable[[Mapping], str]
+
+    @property
+    def full(self) -> Callable[[Mapping], str]:
+        return self.build
+
+    def rebuild(self, state: MutableMapping):
+        state[self.name] = self.build(state)
+
+    def update(self, state: MutableMapping, key: str):
+        self.rebuild(state)
+
+    def get(self, state: MutableMapping) -> str:
+        return state.get(self.name, "")
+
+# =========================================================
+# CONJUNTO POR TEMPLATE
+# =========================================================
+class Derived:
+    def __init__(self, items: list[Sum | Summary]):
+        self.items = tuple(items)
+        self.keys = tuple(dict.fromkeys(k for it in self.items for k in it.keys))
+        self._by_key: dict[str, list[Sum | Summary]] = {}
+        for it in self.items:
+            for k in it.keys:
+                self._by_key.setdefault(k, []).append(it)
+
+    def on_change(self, state: MutableMapping, key: str):
+        for it in self._by_key.get(key, ()):
+            it.update(state, key)
+
+    def rebuild(self, state: MutableMapping, keys: tuple[str, ...] | None = None):
+        # depois de mudanças em lote (limpar painel, copiar do pop-up, importar)
+        for it in self.items:
+            if keys is None or any(k in it.keys for k in keys):
+                it.rebuild(state)
+
+    def check(self, state: MutableMapping) -> list[str]:
+        """Compara os valores mantidos com o recálculo completo; devolve as divergências."""
+        out = []
+        for it in self.items:
+            cur, ref = it.get(state), it.full(state)
+            if cur != ref:
+                out.append(f"{it.name}: incremental={cur!r} recalculado={ref!r}")
+        return out
@@ -0,0 +1,133 @@
+"""
+Grades de ``st.data_editor`` das páginas, sem Streamlit: linhas e validação
+das edições.
+
+- MRC (modo "MRC em tabela"): itens ``(rótulo, chave_D, chave_E)``
+  (bilateral) ou ``(rótulo, chave)`` (axial), células de texto 0–5;
+- escolhas (painel NIS): itens ``(grupo, rótulo, chave_D, chave_E)``, células
+  com o rótulo da opção (``{valor: rótulo}``) e a pontuação da linha.
+
+As edições voltam para as mesmas chaves dos campos individuais, então
+export, import e derivados não mudam.
+"""
+import re
+from collections.abc import Mapping, MutableMapping, Sequence
+
+from nervo_core.text import get_str
+
+COL_LABEL = "Grupo muscular"
+COL_D = "Direito"
+COL_E = "Esquerdo"
+COL_VALUE = "Valor"
+COL_MARK = "MRC-SS"
+COL_GROUP = "Grupo"
+COL_ITEM = "Item"
+COL_POINTS = "Pontos"
+
+# mesmos formatos aceitos no import ("4", "4+", "4-")
+_MRC_RE = re.compile(r"[0-5]")
+_MRC_SIGN_RE = re.compile(r"[0-5][+-]?")
+
+def cell_pattern(allow_sign: bool) -> str:
+    """Regex (JS) da coluna: o data_editor recusa a célula antes de enviar."""
+    return r"^([0-5][+-]?)?$" if allow_sign else r"^[0-5]?$"
+
+def item_keys(items: Sequence[tuple]) -> tuple[str, ...]:
+    return tuple(k for it in items for k in it[1:])
+
+def normalize(value, allow_sign: bool = False) -> str:
+    """Valor de uma célula: "" (vazio) ou 0–5 (com +/- se permitido); ValueError se inválido."""
+    v = "" if value is None else str(value).strip()
+    if v and not (_MRC_SIGN_RE if allow_sign else _MRC_RE).fullmatch(v):
+        raise ValueError(f"use 0–5{' (com + ou -)' if allow_sign else ''}")
+    return v
+
+def rows(state: Mapping, items: Sequence[tuple], marked: frozenset | set = frozenset()) -> list[dict]:
+    """Uma linha por grupo muscular; ``marked`` = chaves destacadas (coluna MRC-SS)."""
+    out = []
+    for lbl, *keys in items:
+        if len(keys) == 1:
+            out.append({COL_LABEL: lbl.rstrip(":"), COL_VALUE: get_str(state, keys[0])})
+            continue
+        kd, ke = keys
+        row = {COL_LABEL: lbl.rstrip(":"), COL_D: get_str(state, kd), COL_E: get_str(state, ke)}
+        if marked:
+            row[COL_MARK] = kd in marked or ke in marked
+        out.append(row)
+    return out
+
+def apply_edits(
+    state: MutableMapping,
+    items: Sequence[tuple],
+    edited_rows: Mapping[int, Mapping[str, object]],
+    allow_sign: bool = False,
+) -> tuple[list[str], list[str]]:
+    """
+    Grava as células editadas (``edited_rows`` do data_editor: índice da
+    linha -> {coluna: valor}) nas chaves dos itens. Células inválidas não são
+    gravadas. Devolve (chaves alteradas, mensagens de erro).
+    """
+    changed, errors = [], []
+    for idx, cols in edited_rows.items():
+        lbl, *keys = items[int(idx)]
+        targets = {COL_VALUE: keys[0]} if len(keys) == 1 else {COL_D: keys[0], COL_E: keys[1]}
+        for col, value in cols.items():
+            key = targets.get(col)
+            if key is None:
+                continue
+            try:
+                v = normalize(value, allow_sign)
+            except ValueError as e:
+                errors.append(f"{lbl.rstrip(':')} ({col}): {e}.")
+                continue
+            if get_str(state, key) != v:
+                state[key] = v
+                changed.append(key)
+    return changed, errors
+
+# =========================================================
+# ESCOLHAS (NIS)
+# =========================================================
+def choice_rows(state: Mapping, items: Sequence[tuple], labels: Mapping) -> list[dict]:
+    """Uma linha por item: rótulo da opção de cada lado e a soma dos dois."""
+    out = []
+    for grp, lbl, kr, kl in items:
+        vr, vl = state.get(kr, 0), state.get(kl, 0)
+        out.append({
+            COL_GROUP: grp,
+            COL_ITEM: lbl,
+            COL_D: labels.get(vr),
+            COL_E: labels.get(vl),
+            COL_POINTS: float(vr) + float(vl),
+        })
+    return out
+
+def group_totals(state: Mapping, items: Sequence[tuple]) -> dict[str, float]:
+    """Subtotal de cada grupo, na ordem dos itens."""
+    out: dict[str, float] = {}
+    for grp, _lbl, kr, kl in items:
+        out[grp] = out.get(grp, 0.0) + float(state.get(kr, 0)) + float(state.get(kl, 0))
+    return out
+
+def apply_choice_edits(
+    state: MutableMapping,
+    items: Sequence[tuple],
+    edited_rows: Mapping[int, Mapping[str, object]],
+    labels: Mapping,
+) -> tuple[list[str], list[str]]:
+    """Como ``apply_edits``, com as células trazendo o rótulo da opção escolhida."""
+    values = {t: v for v, t in labels.items()}
+    changed, errors = [], []
+    for idx, cols in edited_rows.items():
+        _grp, lbl, kr, kl = items[int(idx)]
+        for col, key in ((COL_D, kr), (COL_E, kl)):
+            if col not in cols:
+                continue
+            if cols[col] not in values:
+                errors.append(f"{lbl} ({col}): escolha uma das opções.")
+                continue
+            v = values[cols[col]]
+            if state.get(key) != v:
+                state[key] = v
+                changed.append(key)
+    return changed, errors
@@ -0,0 +1,785 @@
+import re
+from collections.abc import Mapping, MutableMapping
+
+from nervo_core.derived import Derived, Sum
+from nervo_core.schema import Custom, Field, Section, Template, looks_structured
+from nervo_core.text import (
+    IMPORT_MAX_CHARS,
+    IMPORT_TIME_BUDGET_S,
+    SectionTokens,
+    get_str,
+    parse_keyvals_block,
+)
+
+# =========================================================
+# MRC-SS (calc helper) uses the 12 classic keys
+# =========================================================
+MRC_SS_KEYS = [
+    "mrc_ombro_D", "mrc_ombro_E",
+    "mrc_cotovelo_D", "mrc_cotovelo_E",
+    "mrc_punho_D", "mrc_punho_E",
+    "mrc_quadril_D", "mrc_quadril_E",
+    "mrc_joelho_D", "mrc_joelho_E",
+    "mrc_tornozelo_D", "mrc_tornozelo_E",
+]
+MRC_SS_KEYS_SET = set(MRC_SS_KEYS)
+
+def compute_mrc_ss(state: Mapping, mrc_keys_in: list[str]) -> tuple[bool, int | None]:
+    values = []
+    for k in mrc_keys_in:
+        v = state.get(k, "")
+        if v is None or str(v).strip() == "":
+            return (False, None)
+        try:
+            iv = int(str(v).strip())
+        except ValueError:
+            return (False, None)
+        if iv < 0 or iv > 5:
+            return (False, None)
+        values.append(iv)
+    return (True, sum(values))
+
+# =========================================================
+# NIS (defs + helpers)
+# =========================================================
+NIS_MAX_WEAKNESS = 192
+NIS_MAX_REFLEXES = 20
+NIS_MAX_SENSATION = 32
+NIS_MAX_TOTAL = 244
+
+NIS_WEAKNESS_OPTIONS = [
+    (0.00, "normal"),
+    (1.00, "fraqueza 25%"),
+    (2.00, "fraqueza 50%"),
+    (3.00, "fraqueza 75%"),
+    (3.25, "move apenas contra a gravidade"),
+    (3.50, "move apenas com gravidade eliminada"),
+    (3.75, "contração palpável/visível, sem movimento"),
+    (4.00, "paralisia"),
+]
+NIS_WEAKNESS_VALUES = [v for v, _ in NIS_WEAKNESS_OPTIONS]
+NIS_WEAKNESS_LABEL = {v: t for v, t in NIS_WEAKNESS_OPTIONS}
+
+NIS_RS_OPTIONS = [
+    (0, "normal"),
+    (1, "diminuído"),
+    (2, "ausente"),
+]
+NIS_RS_VALUES = [v for v, _ in NIS_RS_OPTIONS]
+NIS_RS_LABEL = {v: t for v, t in NIS_RS_OPTIONS}
+
+# Structure from the attached form (as provided)
+NIS_WEAKNESS_ITEMS = [
+    ("Nervos cranianos", "Nervo oculomotor", "nis_cn_iii_r", "nis_cn_iii_l"),
+    ("Nervos cranianos", "Nervo abducente", "nis_cn_vi_r", "nis_cn_vi_l"),
+    ("Nervos cranianos", "Fraqueza facial", "nis_cn_facial_r", "nis_cn_facial_l"),
+    ("Nervos cranianos", "Fraqueza de palato", "nis_cn_palato_r", "nis_cn_palato_l"),
+    ("Nervos cranianos", "Fraqueza de língua", "nis_cn_lingua_r", "nis_cn_lingua_l"),
+
+    ("Fraqueza muscular", "Respiratório", "nis_mw_resp_r", "nis_mw_resp_l"),
+    ("Fraqueza muscular", "Flexão cervical", "nis_mw_pescoco_r", "nis_mw_pescoco_l"),
+    ("Fraqueza muscular", "Abdução do ombro", "nis_mw_ombro_r", "nis_mw_ombro_l"),
+    ("Fraqueza muscular", "Flexão do cotovelo", "nis_mw_cotov_flex_r", "nis_mw_cotov_flex_l"),
+    ("Fraqueza muscular", "Braquiorradial", "nis_mw_braq_r", "nis_mw_braq_l"),
+    ("Fraqueza muscular", "Extensão do cotovelo", "nis_mw_cotov_ext_r", "nis_mw_cotov_ext_l"),
+    ("Fraqueza muscular", "Flexão do punho", "nis_mw_punho_flex_r", "nis_mw_punho_flex_l"),
+    ("Fraqueza muscular", "Extensão do punho", "nis_mw_punho_ext_r", "nis_mw_punho_ext_l"),
+    ("Fraqueza muscular", "Flexão dos dedos", "nis_mw_dedos_flex_r", "nis_mw_dedos_flex_l"),
+    ("Fraqueza muscular", "Abdução dos dedos", "nis_mw_dedos_abd_r", "nis_mw_dedos_abd_l"),
+    ("Fraqueza muscular", "Abdução do polegar", "nis_mw_polegar_r", "nis_mw_polegar_l"),
+
+    ("Membros inferiores", "Flexão do quadril", "nis_hip_flex_r", "nis_hip_flex_l"),
+    ("Membros inferiores", "Extensão do quadril", "nis_hip_ext_r", "nis_hip_ext_l"),
+    ("Membros inferiores", "Flexão do joelho", "nis_knee_flex_r", "nis_knee_flex_l"),
+    ("Membros inferiores", "Extensão do joelho", "nis_knee_ext_r", "nis_knee_ext_l"),
+    ("Membros inferiores", "Dorsiflexão do tornozelo", "nis_ankle_df_r", "nis_ankle_df_l"),
+    ("Membros inferiores", "Flexão plantar", "nis_ankle_pf_r", "nis_ankle_pf_l"),
+    ("Membros inferiores", "Extensão do hálux", "nis_toe_ext_r", "nis_toe_ext_l"),
+    ("Membros inferiores", "Flexão do hálux", "nis_toe_flex_r", "nis_toe_flex_l"),
+]
+
+NIS_REFLEX_ITEMS = [
+    ("Reflexos", "Bíceps braquial", "nis_ref_biceps_r", "nis_ref_biceps_l"),
+    ("Reflexos", "Tríceps braquial", "nis_ref_triceps_r", "nis_ref_triceps_l"),
+    ("Reflexos", "Estilorradial", "nis_ref_braq_r", "nis_ref_braq_l"),
+    ("Reflexos", "Patelar", "nis_ref_patellar_r", "nis_ref_patellar_l"),
+    ("Reflexos", "Aquileu", "nis_ref_achilles_r", "nis_ref_achilles_l"),
+]
+
+NIS_SENS_FINGER_ITEMS = [
+    ("Sensibilidade – dedo indicador", "Sensibilidade tátil", "nis_sf_touch_r", "nis_sf_touch_l"),
+    ("Sensibilidade – dedo indicador", "Sensibilidade dolorosa", "nis_sf_pin_r", "nis_sf_pin_l"),
+    ("Sensibilidade – dedo indicador", "Vibração", "nis_sf_vib_r", "nis_sf_vib_l"),
+    ("Sensibilidade – dedo indicador", "Artrestesia", "nis_sf_jps_r", "nis_sf_jps_l"),
+]
+
+NIS_SENS_TOE_ITEMS = [
+    ("Sensibilidade – hálux", "Sensibilidade tátil", "nis_st_touch_r", "nis_st_touch_l"),
+    ("Sensibilidade – hálux", "Sensibilidade dolorosa", "nis_st_pin_r", "nis_st_pin_l"),
+    ("Sensibilidade – hálux", "Vibração", "nis_st_vib_r", "nis_st_vib_l"),
+    ("Sensibilidade – hálux", "Artrestesia", "nis_st_jps_r", "nis_st_jps_l"),
+]
+
+NIS_KEYS_WEAKNESS = [k for _, _, kr, kl in NIS_WEAKNESS_ITEMS for k in (kr, kl)]
+NIS_KEYS_REFLEXES = [k for _, _, kr, kl in NIS_REFLEX_ITEMS for k in (kr, kl)]
+NIS_KEYS_SENSATION = [k for _, _, kr, kl in (NIS_SENS_FINGER_ITEMS + NIS_SENS_TOE_ITEMS) for k in (kr, kl)]
+NIS_ALL_KEYS = NIS_KEYS_WEAKNESS + NIS_KEYS_REFLEXES + NIS_KEYS_SENSATION
+NIS_KEYS_RS = NIS_KEYS_REFLEXES + NIS_KEYS_SENSATION
+NIS_KEYS_WEAKNESS_SET = set(NIS_KEYS_WEAKNESS)
+NIS_KEYS_RS_SET = set(NIS_KEYS_RS)
+
+def fmt_score(x: float) -> str:
+    s = f"{float(x):.2f}".rstrip("0").rstrip(".")
+    return s if s else "0"
+
+def format_nis_total(w: float, r: float, s: float, tot: float) -> str:
+    return (
+        f"Fraqueza ({fmt_score(w)}/{NIS_MAX_WEAKNESS}) + "
+        f"Reflexos ({fmt_score(r)}/{NIS_MAX_REFLEXES}) + "
+        f"Sensibilidade ({fmt_score(s)}/{NIS_MAX_SENSATION}) = "
+        f"Total ({fmt_score(tot)}/{NIS_MAX_TOTAL})"
+    )
+
+def init_nis_state(state: MutableMapping):
+    state.setdefault("nis_open", False)
+    state.setdefault("nis_total", "")
+
+    for k in NIS_KEYS_WEAKNESS:
+        if k not in state or state[k] not in NIS_WEAKNESS_VALUES:
+            state[k] = 0.00
+
+    for k in NIS_KEYS_RS:
+        if k not in state or state[k] not in NIS_RS_VALUES:
+            state[k] = 0
+
+def compute_nis_components(state: Mapping) -> tuple[float, float, float, float]:
+    w = sum(float(state.get(k, 0.0)) for k in NIS_KEYS_WEAKNESS)
+    r = sum(float(state.get(k, 0.0)) for k in NIS_KEYS_REFLEXES)
+    s = sum(float(state.get(k, 0.0)) for k in NIS_KEYS_SENSATION)
+    return w, r, s, (w + r + s)
+
+def _has_any_nis_data(state: Mapping) -> bool:
+    for k in NIS_KEYS_WEAKNESS:
+        if float(state.get(k, 0.0)) != 0.0:
+            return True
+    for k in NIS_KEYS_RS:
+        if int(state.get(k, 0)) != 0:
+            return True
+    return False
+
+# =========================================================
+# MRC - FULL LIST (for dialog + export/import)
+# =========================================================
+MRC_ALL_ITEMS_UPPER = [
+    ("Abdução do ombro", "mrc_ombro_D", "mrc_ombro_E"),  # used in MRC-SS
+    ("Adução do ombro", "mrc_ombro_add_D", "mrc_ombro_add_E"),
+    ("Flexores do cotovelo", "mrc_cotovelo_D", "mrc_cotovelo_E"),  # used in MRC-SS
+    ("Extensores do cotovelo", "mrc_cotovelo_ext_D", "mrc_cotovelo_ext_E"),
+    ("Extensores de punho", "mrc_punho_D", "mrc_punho_E"),  # used in MRC-SS
+    ("Flexores de punho", "mrc_punho_flex_D", "mrc_punho_flex_E"),
+    ("Extensores de dedos", "mrc_dedos_ext_D", "mrc_dedos_ext_E"),
+    ("Flexores profundos dos dedos", "mrc_dedos_flexprof_D", "mrc_dedos_flexprof_E"),
+    ("Abdução dos dedos", "mrc_dedos_abd_D", "mrc_dedos_abd_E"),
+    ("Oponência do polegar", "mrc_polegar_op_D", "mrc_polegar_op_E"),
+    ("Abdutor do dedo mínimo", "mrc_minimo_abd_D", "mrc_minimo_abd_E"),
+]
+
+MRC_ALL_ITEMS_LOWER = [
+    ("Flexores de quadril", "mrc_quadril_D", "mrc_quadril_E"),  # used in MRC-SS
+    ("Extensores do quadril", "mrc_quadril_ext_D", "mrc_quadril_ext_E"),
+    ("Abdutores do quadril", "mrc_quadril_abd_D", "mrc_quadril_abd_E"),
+    ("Adutores do quadril", "mrc_quadril_add_D", "mrc_quadril_add_E"),
+    ("Flexores do joelho", "mrc_joelho_flex_D", "mrc_joelho_flex_E"),
+    ("Extensores do joelho", "mrc_joelho_D", "mrc_joelho_E"),  # used in MRC-SS
+    ("Dorsiflexão do pé", "mrc_tornozelo_D", "mrc_tornozelo_E"),  # used in MRC-SS
+    ("Flexão do pé", "mrc_pe_flex_D", "mrc_pe_flex_E"),
+    ("Eversores do pé", "mrc_pe_evers_D", "mrc_pe_evers_E"),
+    ("Inversores do pé", "mrc_pe_invers_D", "mrc_pe_invers_E"),
+    ("Extensores do hálux", "mrc_halux_ext_D", "mrc_halux_ext_E"),
+    ("Flexores do hálux", "mrc_halux_flex_D", "mrc_halux_flex_E"),
+]
+
+MRC_ALL_ITEMS = MRC_ALL_ITEMS_UPPER + MRC_ALL_ITEMS_LOWER
+MRC_ALL_KEYS = [k for _, kd, ke in MRC_ALL_ITEMS for k in (kd, ke)]
+
+def init_mrc_all_state(state: MutableMapping):
+    for k in MRC_ALL_KEYS:
+        state.setdefault(k, "")
+
+# Backward-compatible aliases for older exports (optional)
+_MRC_LABEL_ALIASES = {
+    "Flexão do cotovelo": "Flexores do cotovelo",
+    "Extensão do punho": "Extensores de punho",
+    "Flexão do quadril": "Flexores de quadril",
+    "Extensão do joelho": "Extensores do joelho",
+    "Dorsiflexão do tornozelo": "Dorsiflexão do pé",
+}
+
+# texto com cabeçalho de versão: só os rótulos atuais; sem cabeçalho (export antigo): + aliases
+_MRC_LABEL_MAP = {lbl: (kd, ke) for (lbl, kd, ke) in MRC_ALL_ITEMS}
+_MRC_LABEL_MAP_LEGACY = {
+    **_MRC_LABEL_MAP,
+    **{alias: _MRC_LABEL_MAP[target] for alias, target in _MRC_LABEL_ALIASES.items() if target in _MRC_LABEL_MAP},
+}
+
+_MRC_LINE_RE = re.compile(r"^(.*?):\s*(.*)$")
+_MRC_D_RE = re.compile(r"\bD\s*([0-5])\b")
+_MRC_E_RE = re.compile(r"\bE\s*([0-5])\b")
+
+# =========================================================
+# DERIVADOS INCREMENTAIS (MRC-SS, subescores do NIS)
+# =========================================================
+def _mrc_value(v) -> int | None:
+    # mesmas regras do compute_mrc_ss: vazio, não inteiro ou fora de 0–5 = inválido
+    if v is None or str(v).strip() == "":
+        return None
+    try:
+        iv = int(str(v).strip())
+    except ValueError:
+        return None
+    return iv if 0 <= iv <= 5 else None
+
+def _nis_value(v) -> float:
+    return float(0.0 if v is None else v)
+
+def _mrc_ss_full(state: Mapping) -> int | None:
+    ok, tot = compute_mrc_ss(state, MRC_SS_KEYS)
+    return tot if ok else None
+
+MRC_SS_SUM = Sum("_mrc_ss_sum", tuple(MRC_SS_KEYS), _mrc_value, _mrc_ss_full)
+NIS_WEAKNESS_SUM = Sum("_nis_weakness_sum", tuple(NIS_KEYS_WEAKNESS), _nis_value, lambda s: compute_nis_components(s)[0])
+NIS_REFLEXES_SUM = Sum("_nis_reflexes_sum", tuple(NIS_KEYS_REFLEXES), _nis_value, lambda s: compute_nis_components(s)[1])
+NIS_SENSATION_SUM = Sum("_nis_sensation_sum", tuple(NIS_KEYS_SENSATION), _nis_value, lambda s: compute_nis_components(s)[2])
+
+DERIVED = Derived([MRC_SS_SUM, NIS_WEAKNESS_SUM, NIS_REFLEXES_SUM, NIS_SENSATION_SUM])
+
+def nis_components(state: MutableMapping) -> tuple[float, float, float, float]:
+    # como compute_nis_components, lendo as somas mantidas pelos callbacks
+    w = NIS_WEAKNESS_SUM.get(state)
+    r = NIS_REFLEXES_SUM.get(state)
+    s = NIS_SENSATION_SUM.get(state)
+    return w, r, s, (w + r + s)
+
+# =========================================================
+# INCAT / PND
+# =========================================================
+INCAT_UL_OPTIONS = {
+    0: "0 – Sem problemas nos membros superiores.",
+    1: (
+        "1 – Sintomas em um ou ambos os braços, sem afetar a capacidade de realizar nenhuma das seguintes funções:\n"
+        "• fechar todos os zíperes e botões\n"
+        "• lavar ou pentear o cabelo\n"
+        "• usar faca e garfo juntos\n"
+        "• manusear moedas pequenas"
+    ),
+    2: "2 – Sintomas em um ou ambos os braços, afetando, mas não impedindo, nenhuma das funções acima.",
+    3: "3 – Sintomas em um ou ambos os braços, impedindo uma ou duas das funções listadas acima.",
+    4: "4 – Sintomas em um ou ambos os braços, impedindo três ou todas as funções listadas acima, mas ainda com alguns movimentos propositais possíveis.",
+    5: "5 – Incapacidade de usar qualquer braço para qualquer movimento com finalidade.",
+}
+
+INCAT_LL_OPTIONS = {
+    0: "0 – Marcha não afetada.",
+    1: "1 – Marcha afetada, mas caminha independentemente em ambientes externos.",
+    2: "2 – Geralmente necessita apoio unilateral (bengala, muleta simples ou apoio de um braço) para caminhar em ambientes externos.",
+    3: "3 – Geralmente necessita apoio bilateral (duas bengalas, muletas, andador ou apoio de dois braços) para caminhar em ambientes externos.",
+    4: "4 – Geralmente usa cadeira de rodas para se locomover em ambientes externos, mas consegue ficar em pé e andar alguns passos com ajuda.",
+    5: "5 – Restrito à cadeira de rodas, incapaz de ficar em pé ou andar, ou apenas alguns passos mesmo com ajuda.",
+}
+
+def ll_to_pnd(ll_value: int) -> str:
+    if ll_value == 0:
+        return "PND I"
+    if ll_value == 1:
+        return "PND II"
+    if ll_value == 2:
+        return "PND IIIa"
+    if ll_value in (3, 4):
+        return "PND IIIb"
+    return "PND IV"
+
+def format_incat_total(ul: int, ll: int) -> str:
+    return f"MMSS ({ul}) + MMII ({ll}) = {ul + ll}"
+
+# =========================================================
+# OPÇÕES (medicações, evolução, diagnóstico)
+# =========================================================
+TRATAMENTO_OPTIONS = [
+    "em uso de tratamento medicamentoso",
+    "sem tratamento medicamentoso",
+]
+
+CONTROLE_OPTIONS = ["estável ou melhorando", "piorando"]
+
+DX_CATEGORY_OPTIONS = [
+    "Neuropatia genética",
+    "Neuropatia imunomediada",
+    "Outras neuropatias adquiridas (nutricional, endocrinológica, infecciosa, tóxica, etc.)",
+    "Outros diagnósticos (neurônio motor, junção e músculo)",
+    "Diagnóstico indefinido",
+]
+DX_GENETICA = DX_CATEGORY_OPTIONS[0]
+DX_IMUNO = DX_CATEGORY_OPTIONS[1]
+DX_OUTRAS_ADQUIRIDAS = DX_CATEGORY_OPTIONS[2]
+DX_OUTROS_DIAGNOSTICOS = DX_CATEGORY_OPTIONS[3]
+
+DX_GENETICA_OPTIONS = ["TTR", "PPOX", "HMBS", "CPOX", "PMP22", "MPZ", "GJB1", "MFN2", "Outro"]
+DX_IMUNO_OPTIONS = ["CIDP", "Vasculite", "Ganglionopatia", "Guillain-Barré", "Neuropatia motora multifocal", "Outro"]
+
+# =========================================================
+# ESQUEMA: trechos com formatação própria
+# =========================================================
+def _dlg_key(k: str) -> str:
+    return f"dlg_{k}"
+
+def _export_heranca(state: Mapping) -> list[str]:
+    padrao: list[str] = []
+    if state.get("hf_esporadico"):
+        padrao.append("Esporádico")
+    if state.get("hf_familiar"):
+        padrao.append("Familiar")
+    return [f"Padrão de herança: {', '.join(padrao)}"] if padrao else []
+
+def _parse_heranca(state: MutableMapping, tok: SectionTokens, ends: tuple[str, ...]):
+    padrao = tok.line("Padrão de herança:")
+    if padrao:
+        state["hf_esporadico"] = "Esporádico" in padrao
+        state["hf_familiar"] = "Familiar" in padrao
+
+def _export_nis(state: Mapping) -> list[str]:
+    out: list[str] = []
+    nis_any = _has_any_nis_data(state)
+    nis_sum = get_str(state, "nis_total")
+    if nis_any and not nis_sum:
+        nis_sum = format_nis_total(*compute_nis_components(state))
+    if nis_sum:
+        out.append(f"NIS: {nis_sum}")
+
+    if nis_any:
+        items = [f"{k}: {fmt_score(float(state.get(k, 0.0)))}" for k in NIS_KEYS_WEAKNESS]
+        items += [f"{k}: {int(state.get(k, 0))}" for k in NIS_KEYS_RS]
+        out.append("NIS_ITENS:\n" + "\n".join(items))
+    return out
+
+def _parse_nis(state: MutableMapping, tok: SectionTokens, ends: tuple[str, ...]):
+    nis = tok.line("NIS:")
+    if nis:
+        state["nis_total"] = nis
+
+    kv = parse_keyvals_block(tok.block("NIS_ITENS:", ends))
+    for k, v in kv.items():
+        if k in NIS_KEYS_WEAKNESS_SET:
+            try:
+                fv = float(str(v).replace(",", "."))
+                if fv in NIS_WEAKNESS_VALUES:
+                    state[k] = fv
+            except ValueError:
+                pass
+        elif k in NIS_KEYS_RS_SET:
+            try:
+                iv = int(str(v).strip())
+                if iv in NIS_RS_VALUES:
+                    state[k] = iv
+            except ValueError:
+                pass
+
+    if (not state.get("nis_total")) and kv:
+        state["nis_total"] = format_nis_total(*compute_nis_components(state))
+
+def _export_mrc(state: Mapping) -> list[str]:
+    # MRC: inclui só músculos preenchidos; e só lados preenchidos
+    mrc_lines: list[str] = []
+    for label, kd, ke in MRC_ALL_ITEMS:
+        vd = get_str(state, kd)
+        ve = get_str(state, ke)
+        if not vd and not ve:
+            continue
+
+        segs: list[str] = []
+        if vd:
+            segs.append(f"D {vd}")
+        if ve:
+            segs.append(f"E {ve}")
+
+        mrc_lines.append(f"{label}: " + " / ".join(segs))
+
+    return ["MRC:\n" + "\n".join(mrc_lines)] if mrc_lines else []
+
+def _parse_mrc(state: MutableMapping, tok: SectionTokens, ends: tuple[str, ...]):
+    labels = _MRC_LABEL_MAP if tok.version else _MRC_LABEL_MAP_LEGACY
+    for ln in tok.block("MRC:", ends).split("\n"):
+        mm = _MRC_LINE_RE.match(ln.strip())
+        if not mm:
+            continue
+
+        # aceita:
+        # "Grupo: D 5 / E 4"
+        # "Grupo: D 5"
+        # "Grupo: E 4"
+        # "Grupo: D - / E -" (exports antigos com lista completa)
+        lbl = mm.group(1).strip()
+        rest = mm.group(2).strip()
+        md = _MRC_D_RE.search(rest)
+        me = _MRC_E_RE.search(rest)
+
+        if lbl in labels:
+            kd, ke = labels[lbl]
+            if md:
+                state[kd] = md.group(1)
+            if me:
+                state[ke] = me.group(1)
+
+    ok_mrc, tot_mrc = compute_mrc_ss(state, MRC_SS_KEYS)
+    if ok_mrc and tot_mrc is not None:
+        state["mrc_ss_total"] = str(tot_mrc)
+
+_DX_KEYS = (
+    "radio_dx_categoria",
+    "dx_genetica_choice", "dx_genetica_outro",
+    "dx_imuno_choice", "dx_imuno_outro",
+    "dx_outras_adquiridas",
+    "dx_outros_diagnosticos",
+)
+
+def _export_dx(state: Mapping) -> list[str]:
+    dx_lines: list[str] = []
+    dx = get_str(state, "radio_dx_categoria")
+    if dx:
+        dx_lines.append(dx)
+
+    if dx == DX_GENETICA:
+        gene = get_str(state, "dx_genetica_choice")
+        if gene and gene != "Outro":
+            dx_lines.append(f"Gene: {gene}")
+        elif gene == "Outro":
+            extra = get_str(state, "dx_genetica_outro")
+            if extra:
+                dx_lines.append(f"Gene: {extra}")
+
+    if dx == DX_IMUNO:
+        sub = get_str(state, "dx_imuno_choice")
+        if sub and sub != "Outro":
+            dx_lines.append(f"Subtipo: {sub}")
+        elif sub == "Outro":
+            extra = get_str(state, "dx_imuno_outro")
+            if extra:
+                dx_lines.append(f"Subtipo: {extra}")
+
+    if dx == DX_OUTRAS_ADQUIRIDAS:
+        extra = get_str(state, "dx_outras_adquiridas")
+        if extra:
+            dx_lines.append(f"Especifique: {extra}")
+
+    if dx == DX_OUTROS_DIAGNOSTICOS:
+        extra = get_str(state, "dx_outros_diagnosticos")
+        if extra:
+            dx_lines.append(f"Especifique: {extra}")
+
+    return dx_lines
+
+def _set_choice_or_outro(state: MutableMapping, choice_key: str, outro_key: str, value: str, options: list[str]):
+    if value in options and value != "Outro":
+        state[choice_key] = value
+    else:
+        state[choice_key] = "Outro"
+        state[outro_key] = value
+
+def _parse_dx(state: MutableMapping, tok: SectionTokens, ends: tuple[str, ...]):
+    t = [ln.strip() for ln in tok.lines if ln.strip()]
+    if not t:
+        return
+
+    cat = t[0]
+    if cat in DX_CATEGORY_OPTIONS:
+        state["radio_dx_categoria"] = cat
+
+    for ln in t[1:]:
+        if ln.startswith("Gene:"):
+            gene = ln.split("Gene:", 1)[1].strip()
+            _set_choice_or_outro(state, "dx_genetica_choice", "dx_genetica_outro", gene, DX_GENETICA_OPTIONS)
+        if ln.startswith("Subtipo:"):
+            sub = ln.split("Subtipo:", 1)[1].strip()
+            _set_choice_or_outro(state, "dx_imuno_choice", "dx_imuno_outro", sub, DX_IMUNO_OPTIONS)
+        if ln.startswith("Especifique:"):
+            extra = ln.split("Especifique:", 1)[1].strip()
+            if cat == DX_OUTRAS_ADQUIRIDAS:
+                state["dx_outras_adquiridas"] = extra
+            if cat == DX_OUTROS_DIAGNOSTICOS:
+                state["dx_outros_diagnosticos"] = extra
+
+# =========================================================
+# ESQUEMA DO TEMPLATE (UI, reset, export e import)
+# =========================================================
+_TEMPO_PLACEHOLDER = "Ex.: desde jan/2021"
+
+SCHEMA = Template(
+    [
+        Section("IDENTIFICAÇÃO", (
+            Field("id_texto", lines=1),
+        ), full_only=True, carry=True),
+        Section("HISTÓRIA CLÍNICA", (
+            Field(
+                "idade_inicio_sintomas", "Idade ao início dos sintomas:", inline=True, kind="line",
+                label="Idade ao início dos sintomas", placeholder="Ex.: 45",
+            ),
+            Field("historia_clinica_texto", lines=10, placeholder="História da moléstia atual"),
+        ), full_only=True),
+        Section("ANTECEDENTES PATOLÓGICOS", (
+            Field(
+                "antecedentes_patologicos_texto", lines=4,
+                placeholder="Comorbidades, vícios, exposições ocupacionais/ambientais, histórico de perda ponderal, etc.",
+            ),
+        ), full_only=True, carry=True),
+        Section("HISTÓRIA FAMILIAR", (
+            Field(
+                "historia_familiar_texto", lines=4,
+                placeholder=(
+                    "Familiares acometidos; estado de saúde de pais, irmãos e filhos; cidade de origem dos pais; "
+                    "consanguinidade; etc."
+                ),
+            ),
+            Custom(
+                ("hf_esporadico", "hf_familiar"), _export_heranca, _parse_heranca,
+                markers=("Padrão de herança:",), inline=True,
+            ),
+        ), full_only=True, carry=True),
+        Section("MEDICAÇÕES MODIFICADORAS DE DOENÇA / IMUNOSSUPRESSORES", (
+            Field(
+                "tratamento_atual_radio", "Tratamento atual:", inline=True, kind="choice",
+                options=tuple(TRATAMENTO_OPTIONS),
+            ),
+            Field(
+                "trat_em_uso_tempo", "Há quanto tempo:", inline=True, kind="line",
+                label="há quanto tempo", placeholder=_TEMPO_PLACEHOLDER,
+                when=("tratamento_atual_radio", "em uso de tratamento medicamentoso"),
+            ),
+            Field(
+                "trat_sem_tempo", "Há quanto tempo:", inline=True, kind="line",
+                label="há quanto tempo", placeholder=_TEMPO_PLACEHOLDER,
+                when=("tratamento_atual_radio", "sem tratamento medicamentoso"),
+            ),
+            Field(
+                "meds_atual_previo_texto", "Medicamentos de uso atual ou prévio:", lines=5,
+                label="Histórico de medicamentos modificadores de doença/imunossupressores",
+                placeholder=(
+                    "Medicamento (uso atual ou prévio), data de início, data de término e motivo da suspensão.\n"
+                    "Ex.: Rituximabe 1g D1/D15, início 01/2024, suspensão 07/2024 por infecção"
+                ),
+            ),
+            Field("outros_meds_texto", "Outros medicamentos:", lines=5, label="Outros medicamentos"),
+            Field(
+                "paciente_transplantado", "Paciente transplantado hepático:", inline=True, kind="flag",
+                label="Paciente transplantado hepático",
+            ),
+        ), carry=True),
+        Section("EVOLUÇÃO CLÍNICA", (
+            Field("controle_atual_radio", "Controle atual:", inline=True, kind="choice", options=tuple(CONTROLE_OPTIONS)),
+            Field(
+                "evo_estavel_tempo", "Há quanto tempo:", inline=True, kind="line",
+                label="há quanto tempo", placeholder=_TEMPO_PLACEHOLDER,
+                when=("controle_atual_radio", "estável ou melhorando"),
+            ),
+            Field(
+                "evo_descricao_texto", "Descrição da evolução:", lines=5, label="Descrição da evolução:",
+                placeholder="Evolução dos sintomas motores, sensitivos e autonômicos. Adesão e efeitos colaterais dos medicamentos.",
+            ),
+            Field(
+                "evo_reabilitacao_texto", "Reabilitação:", lines=3, label="Reabilitação:",
+                placeholder="Fisioterapia e frequência. Outras modalidades de reabilitação.",
+            ),
+            Field("incat_total", "Escala INCAT:", inline=True, kind="derived"),
+            Field("pnd_total", "Escala PND:", inline=True, kind="derived"),
+            Custom(("nis_total", *NIS_ALL_KEYS), _export_nis, _parse_nis, markers=("NIS:", "NIS_ITENS:")),
+            Field("mrc_ss_total", "MRC-SS:", inline=True, kind="derived"),
+            Field(
+                "outras_escalas_seguimento", "Outras escalas e métricas:", lines=5,
+                label="Outras escalas e métricas de seguimento",
+                placeholder="NIS, dinamometria, tempo de marcha, TUG, RODS, Norfolk, COMPASS-31, etc.",
+            ),
+        )),
+        Section("EXAME FÍSICO NEUROLÓGICO", (
+            Field(
+                "exame_fisico_neuro_texto", lines=5,
+                placeholder="Força, tônus, reflexo, equilíbrio, sensibilidade, nervos cranianos, alterações autonômicas, cognição",
+            ),
+            Custom(tuple(MRC_ALL_KEYS), _export_mrc, _parse_mrc, markers=("MRC:",)),
+            Field(
+                "deformidades_osteo_texto", "Deformidades osteoesqueléticas e exame clínico geral:", lines=3,
+                label="Deformidades osteoesqueléticas e exame clínico geral:",
+            ),
+        ), joiner="\n\n"),
+        Section("EXAMES COMPLEMENTARES", (
+            Field("exames_enmg", "ENMG:", inline=True, label="ENMG"),
+            Field("exames_liquor", "Líquor:", inline=True, label="Líquor"),
+            Field("exames_usg_nervos", "USG nervos:", inline=True, label="USG nervos"),
+            Field("exames_biopsia", "Biópsia:", inline=True, label="Biópsia"),
+            Field(
+                "exames_demais", "Demais exames:", inline=True, label="Demais exames",
+                placeholder="Data e descrição dos demais exames relevantes (laboratoriais, RM, teste genético)",
+            ),
+        )),
+        Section("IMPRESSÃO E DISCUSSÃO", (
+            Field(
+                "impressao_discussao", lines=4,
+                placeholder="Impressão diagnóstica.\nControle atual da doença (estável, progredindo), baseado em quais métricas",
+            ),
+        )),
+        Section("DIAGNÓSTICO / HIPÓTESE DIAGNÓSTICA", (
+            Custom(_DX_KEYS, _export_dx, _parse_dx),
+        )),
+        Section("CONDUTA", (
+            Field("conduta", lines=4),
+        )),
+    ],
+    ui_keys=(
+        # INCAT panel internal
+        "incat_ul", "incat_ll",
+        # prontuário do arquivo local de consultas
+        "archive_patient",
+    ),
+    transient_keys=(
+        "incat_open", "radio_incat_ul", "radio_incat_ll",
+        # NIS panel internal
+        "nis_open",
+        # MRC dialog temp keys
+        *(_dlg_key(k) for k in MRC_ALL_KEYS),
+        # Export/import UI states
+        "export_mode", "export_text", "import_text",
+        # somas incrementais (refeitas sob demanda)
+        *(it.name for it in DERIVED.items),
+    ),
+    name="nervo",
+)
+
+# =========================================================
+# RESET / IMPORT / EXPORT
+# =========================================================
+def reset_form_state(state: MutableMapping):
+    SCHEMA.reset(state)
+
+def new_state() -> dict:
+    state: dict = {}
+    init_mrc_all_state(state)
+    init_nis_state(state)
+    return state
+
+def parse_export(
+    text: str,
+    max_chars: int | None = IMPORT_MAX_CHARS,
+    time_budget: float | None = IMPORT_TIME_BUDGET_S,
+) -> dict | None:
+    """
+    Lê um texto exportado para um dict novo; None se nenhuma seção foi
+    reconhecida. Levanta ImportAborted (limites de tamanho/tempo).
+    """
+    new = new_state()
+    if not SCHEMA.load(new, text, max_chars, time_budget):
+        return None
+    return new
+
+def _read_export(text: str, max_chars: int | None, time_budget: float | None) -> dict | None:
+    # texto exportado ou JSON estruturado ("Baixar .json"), sempre para um dict novo
+    if looks_structured(text):
+        return SCHEMA.loads(text, max_chars)
+    return parse_export(text, max_chars, time_budget)
+
+def import_full_export(
+    state: MutableMapping,
+    text: str,
+    max_chars: int | None = IMPORT_MAX_CHARS,
+    time_budget: float | None = IMPORT_TIME_BUDGET_S,
+) -> tuple[bool, str]:
+    # lê para um dict novo: se o texto for recusado, o formulário atual fica intacto
+    try:
+        new = _read_export(text, max_chars, time_budget)
+    except ValueError as e:
+        return False, str(e)
+    if new is None:
+        return False, "Não foi possível identificar as seções. Confirme se o texto foi exportado por 'Exportar histórico completo'."
+
+    reset_form_state(state)
+    state.update(new)
+
+    return True, "Importação concluída. Campos ausentes no texto permaneceram em branco."
+
+def carry_forward_export(
+    state: MutableMapping,
+    text: str,
+    cache: MutableMapping | None = None,
+    max_chars: int | None = IMPORT_MAX_CHARS,
+    time_budget: float | None = IMPORT_TIME_BUDGET_S,
+) -> tuple[bool, str]:
+    """
+    Consulta de retorno: herda de uma consulta anterior (texto ou JSON) só
+    as seções estáveis (``Section.carry``); o resto do formulário fica como
+    está. Com ``cache`` (o ``_section_cache`` da sessão), o texto dessas
+    seções já fica pronto para a exportação.
+    """
+    try:
+        new = _read_export(text, max_chars, time_budget)
+    except ValueError as e:
+        return False, str(e)
+    if new is None:
+        return False, "Não foi possível identificar as seções. Confirme se o texto foi exportado por 'Exportar histórico completo'."
+
+    titles = SCHEMA.carry_forward(state, new, cache)
+    return True, "Herdado da consulta anterior: " + "; ".join(titles) + ". As demais seções não foram alteradas."
+
+def build_export_text(state: Mapping, include_all: bool, cache: MutableMapping | None = None) -> str:
+    return SCHEMA.export(state, include_all, cache)
+
+def build_export_json(state: Mapping) -> str:
+    return SCHEMA.dump(state)
+
+# =========================================================
+# MODO PASSO A PASSO (páginas): (rótulo, seções resumidas com o passo fechado)
+# =========================================================
+STEPS = (
+    ("Anamnese", ("IDENTIFICAÇÃO", "HISTÓRIA CLÍNICA", "ANTECEDENTES PATOLÓGICOS", "HISTÓRIA FAMILIAR")),
+    ("Medicações e evolução", ("MEDICAÇÕES MODIFICADORAS DE DOENÇA / IMUNOSSUPRESSORES", "EVOLUÇÃO CLÍNICA")),
+    ("Exame físico", ("EXAME FÍSICO NEUROLÓGICO",)),
+    ("Exames e impressão", ("EXAMES COMPLEMENTARES", "IMPRESSÃO E DISCUSSÃO")),
+    ("Diagnóstico e conduta", ("DIAGNÓSTICO / HIPÓTESE DIAGNÓSTICA", "CONDUTA")),
+)
+
+# =========================================================
+# BUSCA NO ARQUIVO LOCAL (nervo_core.search)
+# =========================================================
+SEARCH_TEXT = {"historia": "historia_clinica_texto", "enmg": "exames_enmg", "conduta": "conduta"}
+
+def search_facets(state: Mapping) -> dict:
+    dx = get_str(state, "radio_dx_categoria")
+    genes = []
+    if dx == DX_GENETICA:
+        gene = get_str(state, "dx_genetica_choice")
+        if gene == "Outro":
+            gene = get_str(state, "dx_genetica_outro")
+        if gene:
+            genes.append(gene)
+    ok_mrc, tot_mrc = compute_mrc_ss(state, MRC_SS_KEYS)
+    return {
+        "dx_category": dx or None,
+        "genes": genes,
+        "icd": [],
+        "nis": compute_nis_components(state)[3] if _has_any_nis_data(state) else None,
+        "mrc_ss": tot_mrc if ok_mrc else None,
+    }
+
+# =========================================================
+# VISUALIZAÇÃO DA CONSULTA (nervo_core.view)
+# =========================================================
+MRC_SS_MAX = 5 * len(MRC_SS_KEYS)
+# itens do NIS, um por linha: só para a reimportação (a tabela de escalas já traz o NIS)
+VIEW_OMIT = re.compile(r"^NIS_ITENS:\n(?:nis_\w+: \S+\n?)*", re.M)
+
+def scale_rows(state: Mapping) -> list[tuple[str, str]]:
+    """Escalas preenchidas, (nome, resultado), para a tabela da visualização."""
+    rows = [(name, get_str(state, key)) for name, key in (("INCAT", "incat_total"), ("PND", "pnd_total"))]
+    # a mesma regra de _export_nis: vale o total salvo; calculado dos itens só sem ele
+    nis = get_str(state, "nis_total")
+    if not nis and _has_any_nis_data(state):
+        nis = format_nis_total(*compute_nis_components(state))
+    rows.append(("NIS", nis))
+    mrc = get_str(state, "mrc_ss_total")
+    rows.append(("MRC-SS", f"{mrc}/{MRC_SS_MAX}" if mrc else ""))
+    return [(name, v) for name, v in rows if v]
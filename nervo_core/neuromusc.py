@@ -0,0 +1,1025 @@
+import re
+from collections.abc import Mapping, MutableMapping
+from datetime import datetime
+
+from nervo_core.derived import Derived, Sum, Summary
+from nervo_core.schema import Custom, Field, Section, Template, looks_structured, memo
+from nervo_core.text import (
+    IMPORT_MAX_CHARS,
+    IMPORT_TIME_BUDGET_S,
+    SectionTokens,
+    get_str,
+)
+
+try:
+    from zoneinfo import ZoneInfo  # Python 3.9+
+    _TZ_SP = ZoneInfo("America/Sao_Paulo")
+except Exception:
+    _TZ_SP = None
+
+# =========================================================
+# CONSTANTES (usadas pela UI E pelo IMPORT/EXPORT)
+# =========================================================
+
+VENT_OPTIONS = [
+    "Sem indicação",
+    "Tem indicação de VNI (BiPAP), mas não faz uso",
+    "VNI (BiPAP) – uso noturno",
+    "VNI (BiPAP) – uso diurno e noturno",
+    "Traqueostomia",
+    "Ventilação invasiva permanente",
+]
+
+GENES_OPTIONS = [
+    "Inconclusivo",
+    "ACTA1", "ANO5", "CAPN3", "CHRNE", "CLCN1", "CPT2", "D4Z4", "DES", "DMD", "DMPK", "DOK7",
+    "DUX4", "DYSF", "FKRP", "GAA", "GJB1", "GNE", "LAMA2", "LMNA", "MFN2", "MPZ", "MTM1",
+    "NEB", "PYGM", "RAPSN", "RYR1", "SMN1", "TPM3", "TTN", "TTR", "POMT1", "POMT2",
+    "POMGNT1", "COL6A1", "COL6A2", "COL6A3", "SGCA", "SGCB", "SGCD", "SGCG",
+    "Outro",
+]
+
+TOPO_OPTIONS = [
+    "Central",
+    "Ponta anterior",
+    "Gânglio da raiz dorsal",
+    "Raiz",
+    "Polirradiculoneuropatia",
+    "Polineuropatia",
+    "Mononeuropatia",
+    "Múltiplos nervos",
+    "Junção neuromuscular",
+    "Músculo esquelético",
+    "Funcional",
+    "Outro",
+]
+
+DX_NOSO_OPTIONS = [
+    "Não esclarecido (provavelmente genético)",
+    "Não esclarecido (provavelmente adquirido)",
+    "Atrofia muscular espinhal tipo 1 (SMN1) (G12.0)",
+    "Atrofia muscular espinhal tipo 2 (SMN1) (G12.1)",
+    "Atrofia muscular espinhal tipo 3 (SMN1) (G12.1)",
+    "Atrofia muscular espinhal tipo 4 (SMN1) (G12.1)",
+    "Atrofia espinhal muscular não 5q (G12.1)",
+    "Doenças do neurônio motor (outras formas) (G12.2)",
+    "Esclerose lateral amiotrófica (G12.2)",
+    "Polineuropatia tóxico/metabólica/diabetes (G62–G63)",
+    "Neuropatias sensitivo-motoras hereditárias (CMT) (G60.0)",
+    "Polirradiculoneurite inflamatória aguda ou crônica (G61)",
+    "CIAP (Chronic idiopathic axonal polyneuropathy) (G61)",
+    "Radiculopatias / plexopatias (M54.1)",
+    "Mononeuropatia isolada ou múltipla (vasculítica, hansênica e outras) (G56, G67)",
+    "Miastenia congênita (G70.2)",
+    "Miastenia gravis (G70.0)",
+    "Outras formas de distúrbios da junção (G70)",
+    "Miopatia congênita nemalínica (G71.2)",
+    "Miopatia congênita cores (G71.2)",
+    "Miopatia congênita centronuclear (G71.2)",
+    "Miopatia congênita miotubular / portadoras sintomáticas MTM (G71.2)",
+    "Miopatia congênita – desproporção congênita fibras (G71.2)",
+    "Miopatia congênita não classificada (G71.2)",
+    "Distrofia muscular congênita – Merosina (G71.2)",
+    "Distrofia muscular congênita – Colágeno 6 (G71.2)",
+    "Distrofia muscular congênita – Alfa-distroglicana (G71.2)",
+    "Distrofia muscular congênita – outras formas e não classificadas (G71.2)",
+    "Distrofia muscular de Duchenne (G71.0)",
+    "Distrofia muscular de Becker (G71.0)",
+    "Distrofinopatia – mulher portadora (G71.0)",
+    "Distrofia muscular de cinturas (G71.0)",
+    "Distrofia de Emery-Dreifuss (G71.0)",
+    "Distrofia fascioescapuloumeral (G71.0)",
+    "Distrofia miotônica de Steinert (G71.0)",
+    "Miotonia congênita / paramiotonia / Síndrome hiperexcitabilidade (G72)",
+    "Paralisia periódica (G72)",
+    "Miosite com corpos de inclusão (IBM) (M60)",
+    "Miopatia miofibrilar (G72)",
+    "Miopatia distal (G72)",
+    "Miopatia vacuolar (G72)",
+    "Miopatia associada ao HIV (G72)",
+    "Miopatia de causa sistêmica (G72)",
+    "Miosites outras (M60)",
+    "Glicogenose (Pompe, McArdle, outros) (G72)",
+    "Lipidose (G72)",
+    "Mitocondrial (G71.3)",
+    "Miopatia inespecífica (G72.9)",
+    "Miopatia inflamatória (polimiosite/necrotizante/dermatomiosite) (M33, M33.2)",
+    "Quadro funcional",
+    "Central",
+    "Outros",
+]
+
+# =========================================================
+# IBM-FRS (PT-BR) — conforme PDF anexo
+# =========================================================
+
+def _mm_yyyy_now() -> str:
+    dt = datetime.now(_TZ_SP) if _TZ_SP else datetime.now()
+    return dt.strftime("%m/%Y")
+
+IBM_FRS_ITEMS_PT = [
+    {
+        "n": 1,
+        "title": "Deglutição",
+        "key": "ibmfrs_swallow",
+        "desc": {
+            4: "Normal",
+            3: "Problemas iniciais ao comer — engasgos ocasionais",
+            2: "Mudança na consistência da dieta",
+            1: "Engasgos frequentes",
+            0: "Necessita alimentação por sonda",
+        },
+    },
+    {
+        "n": 2,
+        "title": "Escrita (com a mão dominante)",
+        "key": "ibmfrs_handwriting",
+        "desc": {
+            4: "Normal",
+            3: "Lenta ou “desleixada”; todas as palavras são legíveis",
+            2: "Nem todas as palavras são legíveis",
+            1: "Consegue segurar a caneta, mas é incapaz de escrever",
+            0: "Incapaz de segurar a caneta",
+        },
+    },
+    {
+        "n": 3,
+        "title": "Cortar alimentos e manusear utensílios",
+        "key": "ibmfrs_cutting",
+        "desc": {
+            4: "Normal",
+            3: "Um pouco lento e desajeitado, mas não precisa de ajuda",
+            2: "Corta a maioria dos alimentos, porém lento/desajeitado; precisa de alguma ajuda",
+            1: "Alguém precisa cortar os alimentos, mas ainda consegue se alimentar lentamente",
+            0: "Precisa ser alimentado",
+        },
+    },
+    {
+        "n": 4,
+        "title": "Tarefas motoras finas (abrir portas, usar chaves, pegar objetos pequenos)",
+        "key": "ibmfrs_fine_motor",
+        "desc": {
+            4: "Independente",
+            3: "Lento ou desajeitado para completar a tarefa",
+            2: "Independente, mas requer técnicas modificadas ou dispositivos auxiliares",
+            1: "Frequentemente requer assistência do cuidador",
+            0: "Incapaz",
+        },
+    },
+    {
+        "n": 5,
+        "title": "Vestir-se",
+        "key": "ibmfrs_dressing",
+        "desc": {
+            4: "Normal",
+            3: "Independente, mas com maior esforço ou menor eficiência",
+            2: "Independente, mas requer dispositivos auxiliares ou técnicas modificadas (velcro, camisas sem botões etc.)",
+            1: "Requer assistência do cuidador para algumas peças de roupa",
+            0: "Dependência total",
+        },
+    },
+    {
+        "n": 6,
+        "title": "Higiene (banho e ida ao banheiro)",
+        "key": "ibmfrs_hygiene",
+        "desc": {
+            4: "Normal",
+            3: "Independente, mas com maior esforço ou atividade diminuída",
+            2: "Independente, mas requer dispositivos auxiliares (cadeira de banho, assento de vaso sanitário, etc.)",
+            1: "Requer assistência ocasional do cuidador",
+            0: "Completamente dependente",
+        },
+    },
+    {
+        "n": 7,
+        "title": "Virar na cama e ajustar cobertas/lençóis",
+        "key": "ibmfrs_turning_bed",
+        "desc": {
+            4: "Normal",
+            3: "Um pouco lento e desajeitado, mas não precisa de ajuda",
+            2: "Consegue virar sozinho ou ajustar lençóis, mas com grande dificuldade",
+            1: "Consegue iniciar, mas não consegue virar/ajustar lençóis sozinho",
+            0: "Incapaz ou requer assistência total",
+        },
+    },
+    {
+        "n": 8,
+        "title": "Sentar para ficar em pé (sit-to-stand)",
+        "key": "ibmfrs_sit_to_stand",
+        "desc": {
+            4: "Independente (sem uso dos braços)",
+            3: "Faz com movimentos compensatórios (inclinar para frente, balançar), mas sem usar os braços",
+            2: "Requer uso dos braços",
+            1: "Requer assistência de dispositivo ou de pessoa",
+            0: "Incapaz de ficar em pé",
+        },
+    },
+    {
+        "n": 9,
+        "title": "Marcha",
+        "key": "ibmfrs_walking",
+        "desc": {
+            4: "Normal",
+            3: "Lenta ou com leve instabilidade",
+            2: "Uso intermitente de dispositivo auxiliar (órtese, bengala, andador)",
+            1: "Dependente de dispositivo auxiliar",
+            0: "Dependente de cadeira de rodas",
+        },
+    },
+    {
+        "n": 10,
+        "title": "Subir escadas",
+        "key": "ibmfrs_stairs",
+        "desc": {
+            4: "Normal",
+            3: "Lento, com hesitação ou esforço aumentado; usa corrimão intermitentemente",
+            2: "Dependente do corrimão",
+            1: "Dependente do corrimão e de suporte adicional (bengala ou pessoa)",
+            0: "Não consegue subir escadas",
+        },
+    },
+]
+
+IBM_FRS_EXPORT_ORDER = [
+    ("Deglutição", "ibmfrs_swallow"),
+    ("Escrita", "ibmfrs_handwriting"),
+    ("Alimentação", "ibmfrs_cutting"),
+    ("Destreza", "ibmfrs_fine_motor"),
+    ("Vestir-se", "ibmfrs_dressing"),
+    ("Higiene", "ibmfrs_hygiene"),
+    ("Lençóis", "ibmfrs_turning_bed"),
+    ("Levantar", "ibmfrs_sit_to_stand"),
+    ("Marcha", "ibmfrs_walking"),
+    ("Escadas", "ibmfrs_stairs"),
+]
+
+IBM_FRS_KEYS = [it["key"] for it in IBM_FRS_ITEMS_PT]
+IBM_FRS_MAX_TOTAL = 40
+
+def compute_ibmfrs_total(state: Mapping) -> int:
+    return sum(int(state.get(k, 4)) for k in IBM_FRS_KEYS)
+
+def upsert_scale_line(state: MutableMapping, prefix: str, new_line: str, target_key: str = "escalas"):
+    """Remove linhas antigas com o mesmo prefixo e adiciona a nova ao final (sem apagar outras escalas)."""
+    cur = (state.get(target_key) or "").strip()
+    lines = [ln.strip() for ln in cur.split("\n") if ln.strip()]
+    kept = [ln for ln in lines if not ln.lower().startswith(prefix.lower())]
+    kept.append(new_line.strip())
+    state[target_key] = "\n".join(kept).strip()
+
+def build_ibmfrs_line(state: Mapping, total: int) -> str:
+    mm_yyyy = _mm_yyyy_now()  # "02/2026"
+    parts = []
+    for lbl, key in IBM_FRS_EXPORT_ORDER:
+        v = int(state.get(key, 4))
+        parts.append(f"{lbl}.{v}")
+    return f"IBM-FRS ({mm_yyyy}): " + " / ".join(parts) + f" = {total}/{IBM_FRS_MAX_TOTAL}"
+
+# =========================================================
+# FORÇA MOTORA (MRC) — grupos musculares do painel
+# =========================================================
+FORCA_AXIAL_ITEMS = [
+    ("Extensores do tronco", "mrc_ext_tronco"),
+    ("Flexores do pescoço", "mrc_flex_pescoco"),
+    ("Flexores do tronco", "mrc_flex_tronco"),
+]
+
+FORCA_UPPER_ITEMS = [
+    ("Abdução do ombro", "mrc_abd_ombro_D", "mrc_abd_ombro_E"),
+    ("Adução do ombro", "mrc_add_ombro_D", "mrc_add_ombro_E"),
+    ("Flexores do cotovelo", "mrc_flex_cotovelo_D", "mrc_flex_cotovelo_E"),
+    ("Extensores do cotovelo", "mrc_ext_cotovelo_D", "mrc_ext_cotovelo_E"),
+    ("Extensores de punho", "mrc_ext_punho_D", "mrc_ext_punho_E"),
+    ("Flexores de punho", "mrc_flex_punho_D", "mrc_flex_punho_E"),
+    ("Extensores de dedos", "mrc_ext_dedos_D", "mrc_ext_dedos_E"),
+    ("Flexores profundos dos dedos", "mrc_fpd_D", "mrc_fpd_E"),
+    ("Abdução dos dedos", "mrc_abd_dedos_D", "mrc_abd_dedos_E"),
+    ("Oponência do polegar", "mrc_op_polegar_D", "mrc_op_polegar_E"),
+    ("Abdutor do dedo mínimo", "mrc_op_minimo_D", "mrc_op_minimo_E"),
+]
+
+FORCA_LOWER_ITEMS = [
+    ("Flexores de quadril", "mrc_flex_quadril_D", "mrc_flex_quadril_E"),
+    ("Extensores do quadril", "mrc_ext_quadril_D", "mrc_ext_quadril_E"),
+    ("Abdutores do quadril", "mrc_abd_quadril_D", "mrc_abd_quadril_E"),
+    ("Adutores do quadril", "mrc_add_quadril_D", "mrc_add_quadril_E"),
+    ("Flexores do joelho", "mrc_flex_joelho_D", "mrc_flex_joelho_E"),
+    ("Extensores do joelho", "mrc_ext_joelho_D", "mrc_ext_joelho_E"),
+    ("Dorsiflexão do pé", "mrc_df_pe_D", "mrc_df_pe_E"),
+    ("Flexão do pé", "mrc_pf_pe_D", "mrc_pf_pe_E"),
+    ("Eversores do pé", "mrc_ev_pe_D", "mrc_ev_pe_E"),
+    ("Inversores do pé", "mrc_inv_pe_D", "mrc_inv_pe_E"),
+    ("Extensores do hálux", "mrc_ext_halux_D", "mrc_ext_halux_E"),
+    ("Flexores do hálux", "mrc_flex_halux_D", "mrc_flex_halux_E"),
+]
+
+FORCA_BILATERAL_ITEMS = FORCA_UPPER_ITEMS + FORCA_LOWER_ITEMS
+FORCA_MRC_KEYS = [k for _, k in FORCA_AXIAL_ITEMS] + [k for _, kd, ke in FORCA_BILATERAL_ITEMS for k in (kd, ke)]
+
+_FORCA_AXIAL_MAP = {lbl: k for lbl, k in FORCA_AXIAL_ITEMS}
+_FORCA_BILATERAL_MAP = {lbl: (kd, ke) for lbl, kd, ke in FORCA_BILATERAL_ITEMS}
+
+# =========================================================
+# OUTRAS OPÇÕES (DNPM / teste genético)
+# =========================================================
+DNPM_OPTIONS = ["Normal", "Não sabe informar", "Atraso desenvolvimento"]
+
+DNPM_MILESTONES = [
+    ("Sustento cefálico", "dnpm_sustento_cefalico"),
+    ("Engatinhar", "dnpm_engatinhar"),
+    ("Andar sem apoio", "dnpm_andar_sem_apoio"),
+    ("Formar frases", "dnpm_formar_frases"),
+    ("Sentar (meses)", "dnpm_sentar_meses"),
+    ("Ficar de pé (anos)", "dnpm_ficar_de_pe_anos"),
+    ("Andar com apoio (anos)", "dnpm_andar_com_apoio_anos"),
+    ("Primeiras palavras (anos)", "dnpm_primeiras_palavras_anos"),
+    ("Controle esfincteriano (meses)", "dnpm_controle_esfincteriano_meses"),
+]
+_DNPM_MILESTONE_MAP = {lbl: k for lbl, k in DNPM_MILESTONES}
+
+TG_OPTIONS = ["Não se aplica", "Não realizado", "Teste genético realizado"]
+TG_REALIZADO = TG_OPTIONS[2]
+
+# =========================================================
+# RESUMOS
+# =========================================================
+def build_func_summary(state: Mapping) -> str:
+    parts: list[str] = []
+
+    # MMII
+    mmii = []
+    if state.get("mi_marcha_aux"):
+        mmii.append("Marcha com auxiliar de marcha")
+    if state.get("mi_cr_longas"):
+        mmii.append("Cadeira de rodas para longas distâncias")
+    if state.get("mi_cr_perm"):
+        mmii.append("Cadeira de rodas permanente")
+    if state.get("mi_nao_transfere"):
+        mmii.append("Não faz transferências sem ajuda")
+    if mmii:
+        parts.append("MMII: " + "; ".join(mmii))
+
+    perda_idade = get_str(state, "perda_marcha_idade")
+    perda_ano = get_str(state, "perda_marcha_ano")
+    if perda_idade or perda_ano:
+        msg = "Perda da marcha independente: "
+        if perda_idade:
+            msg += f"idade {perda_idade}"
+        if perda_ano:
+            msg += (" / " if perda_idade else "") + f"ano {perda_ano}"
+        parts.append(msg)
+
+    # MMSS
+    ms = []
+    for lbl, k in [
+        ("Não eleva os braços acima da cabeça", "ms_nao_acima_cabeca"),
+        ("Não eleva os braços acima dos ombros", "ms_nao_acima_ombros"),
+        ("Não faz flexão dos antebraços", "ms_nao_flex_antebraco"),
+    ]:
+        if state.get(k):
+            ms.append(lbl)
+    if ms:
+        parts.append("MMSS: " + "; ".join(ms))
+
+    # Ventilação
+    vent_line = get_str(state, "vent_radio")
+    vent_inicio_idade = get_str(state, "vent_inicio_idade")
+    vent_inicio_ano = get_str(state, "vent_inicio_ano")
+    vent_info = get_str(state, "vent_info_adicional")
+    if vent_line or vent_inicio_idade or vent_inicio_ano or vent_info:
+        vtxt = vent_line if vent_line else ""
+        if vent_inicio_idade or vent_inicio_ano:
+            inicio = "Início: "
+            if vent_inicio_idade:
+                inicio += f"idade {vent_inicio_idade}"
+            if vent_inicio_ano:
+                inicio += (" / " if vent_inicio_idade else "") + f"ano {vent_inicio_ano}"
+            vtxt += (" — " if vtxt else "") + inicio
+        if vent_info:
+            vtxt += (" — " if vtxt else "") + vent_info
+        parts.append("Ventilação: " + vtxt)
+
+    # Ortopédicos
+    ort = []
+    if state.get("ortese_mi"):
+        ort.append("Órtese MMII")
+    if state.get("ortese_ms"):
+        ort.append("Órtese MMSS")
+    if state.get("colete_ortopedico"):
+        ort.append("Colete ortopédico")
+
+    ort_inicio_idade = get_str(state, "ort_inicio_idade")
+    ort_inicio_ano = get_str(state, "ort_inicio_ano")
+
+    if ort or ort_inicio_idade or ort_inicio_ano:
+        otxt = "; ".join(ort) if ort else ""
+        if ort_inicio_idade or ort_inicio_ano:
+            inicio = "Início: "
+            if ort_inicio_idade:
+                inicio += f"idade {ort_inicio_idade}"
+            if ort_inicio_ano:
+                inicio += (" / " if ort_inicio_idade else "") + f"ano {ort_inicio_ano}"
+            otxt += (" — " if otxt else "") + inicio
+        parts.append("Ortopédicos: " + otxt)
+
+    # Nutrição
+    nut_inicio_idade = get_str(state, "nut_inicio_idade")
+    nut_inicio_ano = get_str(state, "nut_inicio_ano")
+    if state.get("nut_gtt") or nut_inicio_idade or nut_inicio_ano:
+        ntxt = "Gastrostomia (GTT)" if state.get("nut_gtt") else ""
+        if nut_inicio_idade or nut_inicio_ano:
+            inicio = "Início: "
+            if nut_inicio_idade:
+                inicio += f"idade {nut_inicio_idade}"
+            if nut_inicio_ano:
+                inicio += (" / " if nut_inicio_idade else "") + f"ano {nut_inicio_ano}"
+            ntxt += (" — " if ntxt else "") + inicio
+        parts.append("Nutrição: " + ntxt)
+
+    return "\n".join([p for p in parts if p.strip()]).strip()
+
+def build_forca_summary(state: Mapping) -> str:
+    lines: list[str] = []
+
+    # Axial
+    axial = []
+    for lbl, k in FORCA_AXIAL_ITEMS:
+        v = get_str(state, k)
+        if v:
+            axial.append(f"{lbl} {v}")
+    if axial:
+        lines.append("Axiais: " + " | ".join(axial))
+
+    # Upper + lower
+    for lbl, kd, ke in FORCA_BILATERAL_ITEMS:
+        vd = get_str(state, kd)
+        ve = get_str(state, ke)
+        if vd != "" or ve != "":
+            lines.append(f"{lbl}: D {vd or '-'} / E {ve or '-'}")
+
+    if not lines:
+        return ""
+    return "Força motora (MRC): " + " | ".join(lines)
+
+# =========================================================
+# ESQUEMA: trechos com formatação própria
+# =========================================================
+def _parse_freq(line: str) -> tuple[bool, str]:
+    # "Nome: 2x/sem" -> (True, "2")
+    m = re.search(r":\s*([0-9]+(?:[.,][0-9]+)?)\s*x/", line)
+    if m:
+        return True, m.group(1).replace(",", ".").strip()
+    return True, ""  # marcou sim, mas não tem número
+
+def _export_marcos(state: Mapping) -> list[str]:
+    if get_str(state, "dnpm_radio") != "Atraso desenvolvimento":
+        return []
+    milestones = []
+    for lbl, k in DNPM_MILESTONES:
+        v = get_str(state, k)
+        if v:
+            milestones.append(f"{lbl}: {v}")
+    return ["Marcos:\n" + "\n".join(milestones)] if milestones else []
+
+def _parse_marcos(state: MutableMapping, tok: SectionTokens, ends: tuple[str, ...]):
+    if state.get("dnpm_radio") != "Atraso desenvolvimento":
+        return
+    for ln in tok.block("Marcos:", ends).split("\n"):
+        if ":" in ln:
+            k, v = ln.split(":", 1)
+            k = k.strip()
+            v = v.strip()
+            if k in _DNPM_MILESTONE_MAP:
+                state[_DNPM_MILESTONE_MAP[k]] = v
+
+_FUNC_KEYS = (
+    "mi_marcha_aux", "mi_cr_longas", "mi_cr_perm", "mi_nao_transfere",
+    "perda_marcha_idade", "perda_marcha_ano",
+    "ms_nao_acima_cabeca", "ms_nao_acima_ombros", "ms_nao_flex_antebraco",
+    "vent_radio", "vent_inicio_idade", "vent_inicio_ano", "vent_info_adicional",
+    "ortese_mi", "ortese_ms", "colete_ortopedico", "ort_inicio_idade", "ort_inicio_ano",
+    "nut_gtt", "nut_inicio_idade", "nut_inicio_ano",
+    "func_resumo",
+)
+
+def _export_func(state: Mapping) -> list[str]:
+    func_block = get_str(state, "func_resumo") or build_func_summary(state)
+    return [func_block] if func_block else []
+
+def _parse_func(state: MutableMapping, tok: SectionTokens, ends: tuple[str, ...]):
+    for ln in tok.lines:
+        l = ln.strip()
+        if l.startswith("MMII:"):
+            items = [x.strip() for x in l.split("MMII:", 1)[1].split(";") if x.strip()]
+            state["mi_marcha_aux"] = any("Marcha com auxiliar" in x for x in items)
+            state["mi_cr_longas"] = any("longas distâncias" in x for x in items)
+            state["mi_cr_perm"] = any("permanente" in x for x in items)
+            state["mi_nao_transfere"] = any("transferências" in x for x in items)
+
+        if l.startswith("Perda da marcha independente:"):
+            idade = re.search(r"idade\s+([0-9]+)", l)
+            ano = re.search(r"ano\s+([0-9]{4})", l)
+            if idade:
+                state["perda_marcha_idade"] = idade.group(1)
+            if ano:
+                state["perda_marcha_ano"] = ano.group(1)
+
+        if l.startswith("MMSS:"):
+            items = [x.strip() for x in l.split("MMSS:", 1)[1].split(";") if x.strip()]
+            state["ms_nao_acima_cabeca"] = any("acima da cabeça" in x for x in items)
+            state["ms_nao_acima_ombros"] = any("acima dos ombros" in x for x in items)
+            state["ms_nao_flex_antebraco"] = any("flexão dos antebraços" in x for x in items)
+
+        if l.startswith("Ventilação:"):
+            rest = l.split("Ventilação:", 1)[1].strip()
+            parts = [p.strip() for p in rest.split("—") if p.strip()]
+            if parts:
+                opt = parts[0].strip()
+                if opt in VENT_OPTIONS:
+                    state["vent_radio"] = opt
+            for p in parts[1:]:
+                if p.startswith("Início:"):
+                    idade = re.search(r"idade\s+([0-9]+)", p)
+                    ano = re.search(r"ano\s+([0-9]{4})", p)
+                    if idade:
+                        state["vent_inicio_idade"] = idade.group(1)
+                    if ano:
+                        state["vent_inicio_ano"] = ano.group(1)
+                else:
+                    state["vent_info_adicional"] = (
+                        (state.get("vent_info_adicional", "") + ("\n" if state.get("vent_info_adicional") else "") + p).strip()
+                    )
+
+        if l.startswith("Ortopédicos:"):
+            rest = l.split("Ortopédicos:", 1)[1].strip()
+            chunks = [p.strip() for p in rest.split("—") if p.strip()]
+            items = [x.strip() for x in chunks[0].split(";") if x.strip()] if chunks else []
+            state["ortese_mi"] = any("Órtese MMII" in x for x in items)
+            state["ortese_ms"] = any("Órtese MMSS" in x for x in items)
+            state["colete_ortopedico"] = any("Colete" in x for x in items)
+            for p in chunks[1:]:
+                if p.startswith("Início:"):
+                    idade = re.search(r"idade\s+([0-9]+)", p)
+                    ano = re.search(r"ano\s+([0-9]{4})", p)
+                    if idade:
+                        state["ort_inicio_idade"] = idade.group(1)
+                    if ano:
+                        state["ort_inicio_ano"] = ano.group(1)
+
+        if l.startswith("Nutrição:"):
+            rest = l.split("Nutrição:", 1)[1].strip()
+            state["nut_gtt"] = "Gastrostomia (GTT)" in rest
+            if "Início:" in rest:
+                idade = re.search(r"idade\s+([0-9]+)", rest)
+                ano = re.search(r"ano\s+([0-9]{4})", rest)
+                if idade:
+                    state["nut_inicio_idade"] = idade.group(1)
+                if ano:
+                    state["nut_inicio_ano"] = ano.group(1)
+
+    state["func_resumo"] = build_func_summary(state)
+
+def _freq_item(name: str, chk: str, freq: str, suffix: str) -> Custom:
+    def export(state: Mapping) -> list[str]:
+        if not state.get(chk):
+            return []
+        f = get_str(state, freq)
+        return [f"{name}: {f + suffix if f else '(freq. não informada)'}"]
+
+    def parse(state: MutableMapping, tok: SectionTokens, ends: tuple[str, ...]):
+        for ln in tok.lines:
+            if ln.strip().startswith(f"{name}:"):
+                state[chk], state[freq] = _parse_freq(ln.strip())
+
+    return Custom((chk, freq), export, parse, markers=(f"{name}:",), inline=True)
+
+def _export_forca(state: Mapping) -> list[str]:
+    forca = get_str(state, "forca_resumo") or build_forca_summary(state)
+    return [forca] if forca else []
+
+def _parse_forca(state: MutableMapping, tok: SectionTokens, ends: tuple[str, ...]):
+    # Força (tenta reconstituir os MRCs)
+    line = tok.line("Força motora (MRC):")
+    if not line:
+        return
+
+    items = [x.strip() for x in line.split("|") if x.strip()]
+
+    for it in items:
+        it = it.replace("Axiais:", "").strip()
+
+        # UPDATED: accepts 0-5 plus optional +/-
+        mm = re.match(
+            r"^(Extensores do tronco|Flexores do pescoço|Flexores do tronco)\s+([0-5][+-]?)\s*$",
+            it,
+        )
+        if mm:
+            state[_FORCA_AXIAL_MAP[mm.group(1)]] = mm.group(2)
+            continue
+
+        # UPDATED: accepts 0-5 plus optional +/- OR '-' placeholder
+        mm = re.match(
+            r"^(.*?):\s*D\s*([0-5][+-]?|-)?\s*/\s*E\s*([0-5][+-]?|-)?\s*$",
+            it,
+        )
+        if mm:
+            lbl = mm.group(1).strip()
+            vd = (mm.group(2) or "").strip()
+            ve = (mm.group(3) or "").strip()
+            vd = "" if vd == "-" else vd
+            ve = "" if ve == "-" else ve
+            if lbl in _FORCA_BILATERAL_MAP:
+                kd, ke = _FORCA_BILATERAL_MAP[lbl]
+                state[kd] = vd
+                state[ke] = ve
+
+    state["forca_resumo"] = build_forca_summary(state)
+
+_TG_KEYS = ("tg_radio", "tg_gene_sel", "tg_gene_outro", "tg_exame_nome", "tg_data", "tg_local")
+
+def _export_tg(state: Mapping) -> list[str]:
+    tg_radio = state.get("tg_radio")
+    tg_lines = []
+    if tg_radio:
+        tg_lines.append(str(tg_radio))
+        if tg_radio == TG_REALIZADO:
+            gene_sel = get_str(state, "tg_gene_sel")
+            if gene_sel:
+                if gene_sel == "Outro":
+                    gene_outro = get_str(state, "tg_gene_outro")
+                    tg_lines.append("Gene/resultado: " + (gene_outro if gene_outro else "Outro (não especificado)"))
+                else:
+                    tg_lines.append("Gene/resultado: " + gene_sel)
+
+            det = []
+            if get_str(state, "tg_exame_nome"):
+                det.append("Exame: " + get_str(state, "tg_exame_nome"))
+            if get_str(state, "tg_data"):
+                det.append("Data: " + get_str(state, "tg_data"))
+            if get_str(state, "tg_local"):
+                det.append("Local: " + get_str(state, "tg_local"))
+            if det:
+                tg_lines.append("Detalhes: " + " | ".join(det))
+    return tg_lines
+
+def _parse_tg(state: MutableMapping, tok: SectionTokens, ends: tuple[str, ...]):
+    lines = [ln.strip() for ln in tok.lines if ln.strip()]
+    if lines:
+        status = lines[0]
+        if status in TG_OPTIONS:
+            state["tg_radio"] = status
+
+    for ln in lines[1:]:
+        if ln.startswith("Gene/resultado:"):
+            gene = ln.split("Gene/resultado:", 1)[1].strip()
+            if gene in GENES_OPTIONS:
+                state["tg_gene_sel"] = gene
+            else:
+                state["tg_gene_sel"] = "Outro"
+                state["tg_gene_outro"] = gene
+
+        if ln.startswith("Detalhes:"):
+            det = ln.split("Detalhes:", 1)[1].strip()
+            for part in [p.strip() for p in det.split("|") if p.strip()]:
+                if part.startswith("Exame:"):
+                    state["tg_exame_nome"] = part.split("Exame:", 1)[1].strip()
+                if part.startswith("Data:"):
+                    state["tg_data"] = part.split("Data:", 1)[1].strip()
+                if part.startswith("Local:"):
+                    state["tg_local"] = part.split("Local:", 1)[1].strip()
+
+def _export_topo(state: Mapping) -> list[str]:
+    topo_list = state.get("dx_topografico", []) or []
+    topo_list = [str(x).strip() for x in topo_list if str(x).strip()]
+    if not topo_list:
+        return []
+    topo_fmt = []
+    for item in topo_list:
+        if item == "Outro":
+            other = get_str(state, "dx_topografico_outro")
+            topo_fmt.append(other if other else "Outro (não especificado)")
+        else:
+            topo_fmt.append(item)
+    return ["Topográfico: " + " | ".join(topo_fmt)]
+
+def _parse_topo(state: MutableMapping, tok: SectionTokens, ends: tuple[str, ...]):
+    line = tok.line("Topográfico:")
+    if not line:
+        return
+    sel = []
+    other_txts = []
+    for it in [x.strip() for x in line.split("|")]:
+        if it in TOPO_OPTIONS:
+            sel.append(it)
+        elif it:
+            other_txts.append(it)
+    if other_txts:
+        if "Outro" not in sel:
+            sel.append("Outro")
+        state["dx_topografico_outro"] = " / ".join(other_txts)
+    state["dx_topografico"] = sel
+
+def _export_noso(state: Mapping) -> list[str]:
+    noso = get_str(state, "dx_noso_sel")
+    if not noso:
+        return []
+    if noso == "Outros":
+        noso = get_str(state, "dx_noso_outros") or "Outros (não especificado)"
+    return [f"Nosológico: {noso}"]
+
+def _parse_noso(state: MutableMapping, tok: SectionTokens, ends: tuple[str, ...]):
+    val = tok.line("Nosológico:")
+    if not val:
+        return
+    if val in DX_NOSO_OPTIONS:
+        state["dx_noso_sel"] = val
+    else:
+        state["dx_noso_sel"] = "Outros"
+        state["dx_noso_outros"] = val
+
+# =========================================================
+# DERIVADOS INCREMENTAIS (IBM-FRS, resumos de função e força)
+# =========================================================
+_FUNC_INPUT_KEYS = tuple(k for k in _FUNC_KEYS if k != "func_resumo")
+_FORCA_INPUT_KEYS = tuple(FORCA_MRC_KEYS)
+
+IBM_FRS_SUM = Sum("_ibmfrs_sum", tuple(IBM_FRS_KEYS), lambda v: int(4 if v is None else v), compute_ibmfrs_total)
+FUNC_SUMMARY = Summary("func_resumo", _FUNC_INPUT_KEYS, build_func_summary)
+FORCA_SUMMARY = Summary("forca_resumo", _FORCA_INPUT_KEYS, build_forca_summary)
+
+DERIVED = Derived([IBM_FRS_SUM, FUNC_SUMMARY, FORCA_SUMMARY])
+
+# =========================================================
+# ESQUEMA DO TEMPLATE (UI, reset, export e import)
+# =========================================================
+SCHEMA = Template(
+    [
+        Section("ANAMNESE", (
+            Field("Id", "# Identificação:", label="Identificação:", lines=1),
+            Field(
+                "idade_inicio", "Idade de início:", inline=True, kind="line",
+                label="Idade de início", placeholder="Ex.: 12 anos / 2021 / infância",
+            ),
+            Field(
+                "idade_diagnostico", "Idade ao diagnóstico:", inline=True, kind="line",
+                label="Idade ao diagnóstico", placeholder="Ex.: 15 anos / 2024",
+            ),
+            Field("hda", "# HMA:", label="História da doença atual:", lines=10),
+        ), joiner="\n\n", full_only=True, carry=True),
+        Section("ANTECEDENTES", (
+            Field(
+                "antecedentes_pessoais", "# Antecedentes pessoais:", label="Antecedentes pessoais:", lines=6,
+                placeholder=(
+                    "Descrever cardiopatias, distúrbios do sono, catarata, neoplasias, distúrbios respiratórios, "
+                    "endocrinopatias, exposição ocupacional, diabetes, hipertensão, etilismo, cirurgias prévias, etc."
+                ),
+            ),
+            Field(
+                "antecedentes_familiares", "# História familiar:", label="História familiar:", lines=4,
+                placeholder=(
+                    "Familiares acometidos / estado de saúde de pais, irmãos e filhos / cidade de origem dos pais / "
+                    "consanguinidade / etc."
+                ),
+            ),
+            Field("meds_em_uso", "# Medicações em uso:", label="Medicações em uso:", lines=6),
+            Field(
+                "meds_previas", "Medicações prévias / motivo da suspensão:",
+                label="Medicações de uso prévio e motivo da suspensão:", lines=1,
+            ),
+        ), joiner="\n\n", full_only=True, carry=True),
+        Section("DESENVOLVIMENTO NEUROPSICOMOTOR", (
+            Field("dnpm_radio", "Status:", inline=True, kind="choice", options=tuple(DNPM_OPTIONS)),
+            Custom(tuple(k for _, k in DNPM_MILESTONES), _export_marcos, _parse_marcos, markers=("Marcos:",)),
+        ), full_only=True, carry=True),
+        Section("EVOLUÇÃO CLÍNICA", (
+            Field("evolucao", label="Descrição da evolução:", lines=5),
+        )),
+        Section(">> Dispositivos e suporte funcional:", (
+            Custom(_FUNC_KEYS, _export_func, _parse_func),
+        )),
+        Section(">> Seguimento multidisciplinar", (
+            _freq_item("Fisioterapia motora", "fisio_motora_chk", "fisio_motora_freq", "x/sem"),
+            _freq_item("Fisioterapia respiratória", "fisio_resp_chk", "fisio_resp_freq", "x/sem"),
+            _freq_item("AMBU / máscara facial", "ambu_chk", "ambu_freq", "x/dia"),
+            _freq_item("Fonoterapia", "fono_chk", "fono_freq", "x/sem"),
+            Field(
+                "outras_terapias", "Outras:", label="Outras terapias e informações:", lines=3,
+                placeholder="Ex.: Terapia ocupacional (frequência), Psicoterapia (frequência), outras",
+            ),
+            Field(
+                "escalas", "Escalas:", label="Escalas:", lines=2,
+                placeholder="IBM-FRS, ALS-FRS, CHOP INTEND, HFMSE, etc.",
+            ),
+        )),
+        Section("EXAME FÍSICO", (
+            Field(
+                "neuro_geral", "# Exame Neurológico:", label="Exame neurológico geral", lines=5,
+                placeholder=(
+                    "Descrever cognição, força, reflexos osteotendinosos, reflexos patológicos (cutâneo plantar, axiais da face), "
+                    "tônus, sensibilidade, coordenação, marcha, nervos cranianos"
+                ),
+            ),
+            Custom(
+                (*FORCA_MRC_KEYS, "forca_resumo"), _export_forca, _parse_forca,
+                markers=("Força motora (MRC):",), inline=True,
+            ),
+            Field(
+                "exame_neuromuscular_especifico", "Exame neuromuscular específico:",
+                label="Exame neuromuscular específico", lines=4,
+                placeholder=(
+                    "Testes de fatigabilidade para miastenia, Simpson, Cogan, sinal da cortina, língua tri-sulcada, "
+                    "facilitação do reflexo pós-esforço, lentificação do reflexo pupilar.\n"
+                    "Fasciculações, mioquimias, rippling.\n"
+                    "Miotonia (língua, membros, percussão)."
+                ),
+            ),
+            Field(
+                "pele_clinico_geral", "Alterações de pele e exame clínico geral:",
+                label="Alterações de pele e exame clínico geral", lines=3,
+                placeholder="Alterações da pele (quelóide, hiperqueratose folicular), cardíaco, respiratório, abdominal, etc.",
+            ),
+            Field(
+                "osteo_dismorfismos", "Alterações osteoesqueléticas e dismorfismos:",
+                label="Alterações osteoesqueléticas e dismorfismos", lines=3,
+                placeholder=(
+                    "Deformidades de coluna, retrações articulares, deformidades torácicas, deformidade de quadril, "
+                    "escápula alada, hiperextensibilidade distal, palato em ogiva, maloclusão dentária."
+                ),
+            ),
+        ), joiner="\n\n"),
+        Section("EXAMES COMPLEMENTARES", (
+            Field("ex_cpk", "CPK:", inline=True, kind="line", label="CPK", placeholder="Ex.: 350 U/L (data)"),
+            Field("ex_enmg", "Eletroneuromiografia:", label="Eletroneuromiografia"),
+            Field("ex_decremento_jitter", "Decremento / Jitter na EMG:", inline=True, kind="line", label="Decremento / Jitter na EMG"),
+            Field("ex_anticorpos_juncao", "Anticorpos de junção:", inline=True, kind="line", label="Anticorpos de junção"),
+            Field("ex_rm_muscular", "RM muscular:", label="RM muscular e USG de nervos"),
+            Field("ex_biopsia_muscular", "Biópsia muscular:", label="Biópsia muscular"),
+            Field("ex_eco", "ECO:", lines=2, placeholder="ECO (data e achados)"),
+            Field("ex_holter", "Holter:", lines=2, placeholder="Holter (data e achados)"),
+            Field("ex_espirometria", "Espirometria:", lines=2, placeholder="Espirometria (data e achados)"),
+            Field("ex_polissonografia", "Polissonografia:", lines=2, placeholder="Polissonografia (data e achados)"),
+            Field("ex_outros", "Outros exames:", label="Outros exames"),
+        ), joiner="\n\n"),
+        Section(">> Teste genético", (
+            Custom(_TG_KEYS, _export_tg, _parse_tg),
+        )),
+        Section("DIAGNÓSTICO", (
+            Custom(("dx_topografico", "dx_topografico_outro"), _export_topo, _parse_topo, markers=("Topográfico:",), inline=True),
+            Custom(("dx_noso_sel", "dx_noso_outros"), _export_noso, _parse_noso, markers=("Nosológico:",), inline=True),
+        )),
+        Section("IMPRESSÃO", (
+            Field("impressao", lines=4),
+        )),
+        Section("CONDUTA", (
+            Field("conduta", lines=4),
+        )),
+    ],
+    ui_keys=(*IBM_FRS_KEYS, "archive_patient"),
+    transient_keys=("export_text", "export_json", "ibmfrs_open", IBM_FRS_SUM.name),
+    name="neuromusc",
+)
+
+# =========================================================
+# RESET / IMPORT / EXPORT
+# =========================================================
+def reset_form_state(state: MutableMapping):
+    SCHEMA.reset(state)
+
+def new_state() -> dict:
+    return {}
+
+def parse_export(
+    text: str,
+    max_chars: int | None = IMPORT_MAX_CHARS,
+    time_budget: float | None = IMPORT_TIME_BUDGET_S,
+) -> dict | None:
+    """
+    Lê um texto exportado para um dict novo; None se nenhuma seção foi
+    reconhecida. Levanta ImportAborted (limites de tamanho/tempo).
+    """
+    new = new_state()
+    if not SCHEMA.load(new, text, max_chars, time_budget):
+        return None
+
+    # Recalcula resumos (garante consistência)
+    new["func_resumo"] = build_func_summary(new)
+    new["forca_resumo"] = build_forca_summary(new)
+    return new
+
+def _read_export(text: str, max_chars: int | None, time_budget: float | None) -> dict | None:
+    # texto exportado ou JSON estruturado ("Baixar .json"), sempre para um dict novo
+    if looks_structured(text):
+        return SCHEMA.loads(text, max_chars)
+    return parse_export(text, max_chars, time_budget)
+
+def import_full_export(
+    state: MutableMapping,
+    text: str,
+    max_chars: int | None = IMPORT_MAX_CHARS,
+    time_budget: float | None = IMPORT_TIME_BUDGET_S,
+) -> tuple[bool, str]:
+    """
+    Importa um texto colado cuja formatação esteja exatamente no padrão do
+    'Exportar histórico completo' (ou o JSON do 'Baixar .json', lido sem
+    perda). Campos ausentes -> ficam em branco.
+    Textos acima de ``max_chars`` ou que demorem mais que ``time_budget``
+    segundos são recusados sem alterar o formulário.
+    """
+    try:
+        new = _read_export(text, max_chars, time_budget)
+    except ValueError as e:
+        return False, str(e)
+    if new is None:
+        return False, "Não foi possível identificar as seções. Confirme se o texto foi exportado pelo botão 'Exportar histórico completo'."
+
+    reset_form_state(state)
+    state.update(new)
+
+    return True, "Importação concluída. Campos ausentes no texto permaneceram em branco."
+
+def refresh_summaries(state: MutableMapping, cache: MutableMapping | None = None):
+    # Atualiza os resumos mesmo se o usuário não clicou em "Salvar"; com cache, só refaz o que mudou
+    state["func_resumo"] = memo(cache, "func_resumo", state, _FUNC_INPUT_KEYS, build_func_summary)
+    state["forca_resumo"] = memo(cache, "forca_resumo", state, _FORCA_INPUT_KEYS, build_forca_summary)
+
+def carry_forward_export(
+    state: MutableMapping,
+    text: str,
+    cache: MutableMapping | None = None,
+    max_chars: int | None = IMPORT_MAX_CHARS,
+    time_budget: float | None = IMPORT_TIME_BUDGET_S,
+) -> tuple[bool, str]:
+    """
+    Consulta de retorno: herda de uma consulta anterior (texto ou JSON) só
+    as seções estáveis (``Section.carry``); o resto do formulário fica como
+    está. Com ``cache`` (o ``_section_cache`` da sessão), o texto dessas
+    seções já fica pronto para a exportação.
+    """
+    try:
+        new = _read_export(text, max_chars, time_budget)
+    except ValueError as e:
+        return False, str(e)
+    if new is None:
+        return False, "Não foi possível identificar as seções. Confirme se o texto foi exportado pelo botão 'Exportar histórico completo'."
+
+    titles = SCHEMA.carry_forward(state, new, cache)
+    return True, "Herdado da consulta anterior: " + "; ".join(titles) + ". As demais seções não foram alteradas."
+
+def build_export_text(state: Mapping, include_all: bool, cache: MutableMapping | None = None) -> str:
+    return SCHEMA.export(state, include_all, cache)
+
+def build_export_json(state: Mapping) -> str:
+    return SCHEMA.dump(state)
+
+# =========================================================
+# MODO PASSO A PASSO (páginas): (rótulo, seções resumidas com o passo fechado)
+# =========================================================
+STEPS = (
+    ("Anamnese", ("ANAMNESE", "ANTECEDENTES", "DESENVOLVIMENTO NEUROPSICOMOTOR")),
+    ("Evolução e funcionalidade", ("EVOLUÇÃO CLÍNICA", ">> Dispositivos e suporte funcional:", ">> Seguimento multidisciplinar")),
+    ("Exame físico", ("EXAME FÍSICO",)),
+    ("Exames e teste genético", ("EXAMES COMPLEMENTARES", ">> Teste genético")),
+    ("Diagnóstico e conduta", ("DIAGNÓSTICO", "IMPRESSÃO", "CONDUTA")),
+)
+
+# =========================================================
+# BUSCA NO ARQUIVO LOCAL (nervo_core.search)
+# =========================================================
+SEARCH_TEXT = {"historia": "hda", "enmg": "ex_enmg", "conduta": "conduta"}
+
+# CID no fim da opção: "(G71.0)", "(G62–G63)", "(G56, G67)", "(M33, M33.2)"
+_ICD_TAIL_RE = re.compile(r"\(([A-Z]\d{2}[^()]*)\)\s*$")
+_ICD_RE = re.compile(r"[A-Z]\d{2}(?:\.\d)?")
+
+def icd_codes(noso: str) -> list[str]:
+    m = _ICD_TAIL_RE.search(noso or "")
+    return _ICD_RE.findall(m.group(1)) if m else []
+
+def search_facets(state: Mapping) -> dict:
+    genes = []
+    if state.get("tg_radio") == TG_REALIZADO:
+        gene = get_str(state, "tg_gene_sel")
+        if gene == "Outro":
+            gene = get_str(state, "tg_gene_outro")
+        if gene:
+            genes.append(gene)
+    return {
+        "dx_category": None,
+        "genes": genes,
+        "icd": icd_codes(get_str(state, "dx_noso_sel")),
+        "nis": None,
+        "mrc_ss": None,
+    }
+
+# =========================================================
+# VISUALIZAÇÃO DA CONSULTA (nervo_core.view)
+# =========================================================
+VIEW_OMIT = None  # nada só para a reimportação no texto exportado
+
+# linha gravada por "Salvar IBM-FRS" em Escalas (build_ibmfrs_line)
+_IBMFRS_LINE_RE = re.compile(r"^IBM-FRS \(([^)]*)\):.*=\s*(\d+)/(\d+)\s*$", re.M)
+
+def scale_rows(state: Mapping) -> list[tuple[str, str]]:
+    """Escalas preenchidas, (nome, resultado), para a tabela da visualização."""
+    m = _IBMFRS_LINE_RE.search(get_str(state, "escalas"))
+    return [("IBM-FRS", f"{m[2]}/{m[3]} ({m[1]})")] if m else []
@@ -0,0 +1,390 @@
+"""
+Esquema declarativo dos templates: seção -> campos -> tipo/rótulo/prefixo.
+
+Cada template descreve seus campos uma única vez (``nervo.SCHEMA`` e
+``neuromusc.SCHEMA``). A lista de chaves do reset, a exportação e a
+importação são geradas dessa tabela, compilada na carga do módulo (uma vez
+por processo); as páginas usam os mesmos campos para desenhar os widgets.
+O mesmo esquema define o formato estruturado (JSON com versão), que guarda
+o estado tipado do formulário e volta sem passar pelo texto.
+"""
+import json
+import re
+from collections.abc import Callable, Mapping, MutableMapping
+from dataclasses import dataclass, field
+
+from nervo_core.text import (
+    IMPORT_MAX_CHARS,
+    IMPORT_TIME_BUDGET_S,
+    SectionTokens,
+    check_deadline,
+    check_header,
+    check_import_size,
+    compile_markers_pattern,
+    export_header,
+    get_str,
+    import_deadline,
+    section,
+    split_header,
+    tokenize_sections,
+)
+
+# =========================================================
+# CAMPOS
+# =========================================================
+@dataclass(frozen=True)
+class Field:
+    """
+    Campo simples: um widget e, no texto exportado, o corpo da seção
+    (prefixo vazio), uma linha "Prefixo: valor" (inline) ou um bloco
+    "Prefixo:\\nvalor".
+    """
+    key: str
+    prefix: str = ""
+    inline: bool = False
+    kind: str = "text"  # "text" | "line" | "flag" | "choice" | "derived" (calculado, sem widget)
+    label: str = ""
+    placeholder: str = ""
+    lines: int = 3
+    options: tuple[str, ...] = ()
+    when: tuple[str, str] | None = None  # só vale se state[chave] == valor
+
+    @property
+    def keys(self) -> tuple[str, ...]:
+        return (self.key,)
+
+    @property
+    def markers(self) -> tuple[str, ...]:
+        return (self.prefix,) if self.prefix else ()
+
+    def _active(self, state: Mapping) -> bool:
+        return self.when is None or get_str(state, self.when[0]) == self.when[1]
+
+    def export(self, state: Mapping) -> list[str]:
+        if not self._active(state):
+            return []
+        if self.kind == "flag":
+            # Checkbox: só exporta se marcado (evita "Não" quando o usuário não preencheu intencionalmente)
+            v = "Sim" if state.get(self.key) else ""
+        else:
+            v = get_str(state, self.key)
+        if not v:
+            return []
+        if not self.prefix:
+            return [v]
+        return [f"{self.prefix} {v}" if self.inline else f"{self.prefix}\n{v}"]
+
+    def parse(self, state: MutableMapping, tok: SectionTokens, free: str, ends: tuple[str, ...]):
+        if not self._active(state):
+            return
+        if not self.prefix:
+            v = free
+        elif self.inline:
+            v = tok.line(self.prefix)
+        else:
+            v = tok.block(self.prefix, ends)
+        if not v:
+            return
+
+        if self.kind == "flag":
+            state[self.key] = v.lower().startswith("sim")
+        elif self.kind == "choice":
+            if v in self.options:
+                state[self.key] = v
+        else:
+            state[self.key] = v
+
+@dataclass(frozen=True)
+class Custom:
+    """
+    Trecho com formatação própria (tabelas, listas, linhas compostas).
+
+    ``export(state)`` devolve os pedaços do texto; ``parse(state, tok, ends)``
+    recebe o corpo tokenizado da seção e os marcadores dos campos seguintes.
+    """
+    keys: tuple[str, ...]
+    export: Callable[[Mapping], list[str]]
+    parse: Callable[[MutableMapping, SectionTokens, tuple[str, ...]], None]
+    markers: tuple[str, ...] = ()
+    inline: bool = False
+
+# =========================================================
+# SEÇÕES
+# =========================================================
+@dataclass
+class Section:
+    title: str
+    fields: tuple[Field | Custom, ...]
+    joiner: str = "\n"
+    full_only: bool = False  # só no "histórico completo"
+    carry: bool = False  # estável entre consultas: herdada no retorno (carry_forward)
+
+    _ends: tuple[tuple[str, ...], ...] = field(init=False, repr=False)
+    _line_markers: tuple[str, ...] = field(init=False, repr=False)
+    _block_markers: tuple[str, ...] = field(init=False, repr=False)
+    _markers_re: re.Pattern | None = field(init=False, repr=False)
+    export_keys: tuple[str, ...] = field(init=False, repr=False)
+    field_keys: tuple[str, ...] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        # marcadores dos campos seguintes = fim de cada bloco na importação
+        self._ends = tuple(
+            tuple(m for f in self.fields[i + 1:] for m in f.markers)
+            for i in range(len(self.fields))
+        )
+        self._line_markers = tuple(m for f in self.fields if f.inline for m in f.markers)
+        self._block_markers = tuple(m for f in self.fields if not f.inline for m in f.markers)
+        self._markers_re = compile_markers_pattern([m for f in self.fields for m in f.markers])
+        # chaves lidas pela exportação desta seção (inclui as das condições "when")
+        self.field_keys = tuple(k for f in self.fields for k in f.keys)
+        keys = list(self.field_keys)
+        keys += [f.when[0] for f in self.fields if isinstance(f, Field) and f.when]
+        self.export_keys = tuple(dict.fromkeys(keys))
+
+    def export(self, state: Mapping) -> str:
+        pieces = [p for f in self.fields for p in f.export(state)]
+        return section(self.title, self.joiner.join(p.rstrip() for p in pieces if p.strip()))
+
+    def parse(self, state: MutableMapping, tok: SectionTokens):
+        free = tok.free(self._block_markers, self._line_markers)
+        for f, ends in zip(self.fields, self._ends):
+            if isinstance(f, Field):
+                f.parse(state, tok, free, ends)
+            else:
+                f.parse(state, tok, ends)
+
+# =========================================================
+# CACHE POR SESSÃO (impressão digital das chaves lidas)
+# =========================================================
+def _freeze(v):
+    # o tipo entra junto: True == 1 == 1.0, mas cada um vira um texto diferente
+    return (type(v), tuple(v) if isinstance(v, (list, set)) else v)
+
+def state_fingerprint(state: Mapping, keys: tuple[str, ...]) -> tuple:
+    return tuple(_freeze(state.get(k)) for k in keys)
+
+def _loose_fingerprint(state: Mapping, keys: tuple[str, ...]) -> tuple:
+    # vazio é vazio: na primeira execução o widget troca a chave ausente (None) por "" ou []
+    return tuple(None if v is None or v == "" or v == [] else _freeze(v) for v in map(state.get, keys))
+
+def memo(
+    cache: MutableMapping | None,
+    name: str,
+    state: Mapping,
+    keys: tuple[str, ...],
+    build: Callable[[Mapping], str],
+) -> str:
+    """
+    ``build(state)`` guardado em ``cache[name]`` junto com a impressão digital
+    de ``keys``; só recalcula quando alguma dessas chaves muda.
+    """
+    if cache is None:
+        return build(state)
+    fp = state_fingerprint(state, keys)
+    hit = cache.get(name)
+    if hit is None or hit[0] != fp:
+        hit = cache[name] = (fp, build(state))
+    return hit[1]
+
+# =========================================================
+# FORMATO ESTRUTURADO (JSON)
+# =========================================================
+CARRY_KEY = "_carried"  # {título: impressão digital} das seções herdadas no retorno
+
+STRUCTURED_FORMAT = "template_nervo"
+STRUCTURED_VERSION = 1
+
+def looks_structured(text: str) -> bool:
+    return text.lstrip().startswith("{")
+
+def canonical_json(obj: Mapping) -> str:
+    # mesma entrada, mesmo texto (chaves ordenadas): base da deduplicação no arquivo local
+    return json.dumps(obj, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+def _plain(v) -> bool:
+    # só valores que o JSON devolve com o mesmo tipo
+    if v is None or isinstance(v, (str, bool, int, float)):
+        return True
+    return isinstance(v, list) and all(isinstance(x, str) for x in v)
+
+# =========================================================
+# TEMPLATE (compilado uma vez por processo)
+# =========================================================
+class Template:
+    def __init__(
+        self,
+        sections: list[Section],
+        ui_keys: tuple[str, ...] = (),
+        transient_keys: tuple[str, ...] = (),
+        name: str = "",
+    ):
+        self.name = name
+        self.sections = tuple(sections)
+        self.titles = frozenset(s.title for s in self.sections)
+        self.markers = {s.title: s._markers_re for s in self.sections}
+        self.fields = {f.key: f for s in self.sections for f in s.fields if isinstance(f, Field)}
+        # chaves zeradas no reset: tudo o que o esquema exporta + estado de UI (+ temporárias)
+        self.keys = tuple(k for s in self.sections for f in s.fields for k in f.keys) + tuple(ui_keys)
+        # chaves guardadas no formato estruturado (sem botões, prévias e somas em cache)
+        self.data_keys = tuple(dict.fromkeys(self.keys))
+        self.keys += (*transient_keys, CARRY_KEY)
+        self.carry_sections = tuple(s for s in self.sections if s.carry)
+        # por modalidade (include_all): chaves que alimentam a exportação
+        self.export_keys = {
+            inc: tuple(k for s in self.sections if inc or not s.full_only for k in s.export_keys)
+            for inc in (False, True)
+        }
+
+    def reset(self, state: MutableMapping):
+        for k in self.keys:
+            state.pop(k, None)
+
+    def tokenize(
+        self, text: str, deadline: float | None = None, version: int | None = None
+    ) -> dict[str, SectionTokens]:
+        return tokenize_sections(text, self.titles, self.markers, deadline, version)
+
+    def apply(self, state: MutableMapping, secs: Mapping[str, SectionTokens], deadline: float | None = None):
+        for s in self.sections:
+            tok = secs.get(s.title)
+            if tok is not None and tok.lines:
+                check_deadline(deadline)
+                s.parse(state, tok)
+
+    def load(
+        self,
+        state: MutableMapping,
+        text: str,
+        max_chars: int | None = IMPORT_MAX_CHARS,
+        time_budget: float | None = IMPORT_TIME_BUDGET_S,
+    ) -> bool:
+        """
+        Lê um texto exportado para ``state`` (normalmente um dict novo, para
+        que a sessão só seja tocada se a leitura terminar). Devolve False se
+        nenhuma seção foi reconhecida; levanta ImportAborted se o texto passar
+        de ``max_chars``, a leitura passar de ``time_budget`` segundos ou o
+        cabeçalho não conferir (outro template, versão futura, texto cortado).
+        """
+        check_import_size(text, max_chars)
+        deadline = import_deadline(time_budget)
+        header, body = split_header(text)
+        if header is not None:
+            check_header(header, body, self.name)
+        secs = self.tokenize(body, deadline, header.version if header else None)
+        if not secs:
+            return False
+        self.apply(state, secs, deadline)
+        return True
+
+    def carry_forward(self, state: MutableMapping, previous: Mapping, cache: MutableMapping | None = None) -> list[str]:
+        """
+        Copia de ``previous`` (estado de uma consulta anterior) só as seções
+        ``carry``; o resto do formulário fica como está. Guarda a impressão
+        digital de cada seção em ``state[CARRY_KEY]`` (herdada enquanto não
+        for editada) e, com ``cache``, deixa o texto dela pronto para a
+        exportação. Devolve os títulos herdados.
+        """
+        carried = {}
+        for s in self.carry_sections:
+            for k in s.field_keys:
+                if k in previous:
+                    state[k] = previous[k]
+                else:
+                    state.pop(k, None)
+            carried[s.title] = _loose_fingerprint(state, s.export_keys)
+            if cache is not None:
+                cache[s.title] = (state_fingerprint(state, s.export_keys), s.export(state))
+        state[CARRY_KEY] = carried
+        return list(carried)
+
+    def inherited(self, state: Mapping) -> set[str]:
+        """Títulos das seções herdadas que o usuário ainda não editou."""
+        carried = state.get(CARRY_KEY) or {}
+        return {
+            s.title for s in self.carry_sections
+            if s.title in carried and carried[s.title] == _loose_fingerprint(state, s.export_keys)
+        }
+
+    def fingerprint(self, state: Mapping, include_all: bool) -> tuple:
+        """Impressão digital dos campos que alimentam a exportação (cache por sessão)."""
+        return state_fingerprint(state, self.export_keys[include_all])
+
+    def export(self, state: Mapping, include_all: bool, cache: MutableMapping | None = None) -> str:
+        """Com ``cache`` (um dict da sessão), só as seções com chaves alteradas são refeitas."""
+        parts = [
+            memo(cache, s.title, state, s.export_keys, s.export)
+            for s in self.sections
+            if include_all or not s.full_only
+        ]
+        body = "\n".join(p for p in parts if p.strip()).strip()
+        if not body:
+            return "\n"
+        return export_header(self.name, body) + "\n" + body + "\n"
+
+    def summary(self, state: Mapping, titles: tuple[str, ...], cache: MutableMapping | None = None) -> str:
+        """Texto exportado só das seções ``titles`` (mesmo cache de ``export``)."""
+        unknown = set(titles) - self.titles
+        if unknown:
+            raise KeyError(f"seções desconhecidas: {sorted(unknown)}")
+        parts = [memo(cache, s.title, state, s.export_keys, s.export) for s in self.sections if s.title in titles]
+        return "\n".join(p for p in parts if p.strip()).strip()
+
+    def dump(self, state: Mapping) -> str:
+        """Estado tipado do formulário em JSON compacto (``data_keys`` presentes em ``state``)."""
+        data = {k: state[k] for k in self.data_keys if k in state and _plain(state[k])}
+        doc = {"format": STRUCTURED_FORMAT, "version": STRUCTURED_VERSION, "template": self.name, "state": data}
+        return json.dumps(doc, ensure_ascii=False, separators=(",", ":"))
+
+    def loads(self, text: str, max_chars: int | None = IMPORT_MAX_CHARS) -> dict:
+        """
+        Estado lido de um JSON gerado por ``dump``. Chaves desconhecidas ou com
+        tipo inesperado são ignoradas; levanta ValueError se o documento não for
+        deste template/versão e ImportAborted se passar de ``max_chars``.
+        """
+        check_import_size(text, max_chars)
+        try:
+            doc = json.loads(text)
+        except ValueError:
+            raise ValueError("O texto não é um JSON válido.") from None
+        if not isinstance(doc, dict) or doc.get("format") != STRUCTURED_FORMAT:
+            raise ValueError("O JSON não foi gerado pelo template.")
+        if doc.get("template") != self.name:
+            raise ValueError(f"O JSON é do template {doc.get('template')!r}, não {self.name!r}.")
+        version = doc.get("version")
+        if not isinstance(version, int) or version > STRUCTURED_VERSION:
+            raise ValueError(f"Versão do JSON não suportada: {version!r} (máximo {STRUCTURED_VERSION}).")
+        data = doc.get("state")
+        if not isinstance(data, dict):
+            raise ValueError("O JSON não contém o estado do formulário.")
+        allowed = set(self.data_keys)
+        return {k: v for k, v in data.items() if k in allowed and _plain(v)}
+
+    def dump_parts(self, state: Mapping) -> dict[str, str]:
+        """
+        ``dump`` dividido para o arquivo deduplicado: "_doc" (formato, versão,
+        template), um JSON canônico por seção preenchida e "_ui" (o restante).
+        Seções iguais em consultas diferentes geram exatamente o mesmo texto.
+        """
+        data = {k: state[k] for k in self.data_keys if k in state and _plain(state[k])}
+        head = {"format": STRUCTURED_FORMAT, "version": STRUCTURED_VERSION, "template": self.name}
+        parts = {"_doc": canonical_json(head)}
+        for s in self.sections:
+            sub = {k: data.pop(k) for k in s.field_keys if k in data}
+            if sub:
+                parts[s.title] = canonical_json(sub)
+        if data:
+            parts["_ui"] = canonical_json(data)
+        return parts
+
+    def join_parts(self, parts: Mapping[str, str]) -> str:
+        """Inverso de ``dump_parts``: o JSON de ``dump`` (lido depois por ``loads``)."""
+        try:
+            doc = json.loads(parts["_doc"])
+            state: dict = {}
+            for name, body in parts.items():
+                if name != "_doc":
+                    state.update(json.loads(body))
+            doc["state"] = state
+        except (KeyError, ValueError, AttributeError):
+            raise ValueError("Consulta arquivada incompleta ou corrompida.") from None
+        return json.dumps(doc, ensure_ascii=False, separators=(",", ":"))
@@ -0,0 +1,233 @@
+"""
+Busca nas consultas do arquivo local: SQLite FTS5 + facetas.
+
+Cada gravação (``VisitArchive.save`` / ``VisitLog.save``) atualiza o índice
+da consulta no mesmo passo, então a busca nunca precisa reler as partes:
+
+- ``search_fts`` (FTS5, sem acento e sem caixa): história, ENMG, conduta e
+  os demais textos do formulário (``outros``);
+- ``search_visits``: uma linha por (prontuário, template, data), com as
+  facetas de valor único (categoria diagnóstica, NIS, MRC-SS);
+- ``search_tags``: facetas com vários valores (gene, CID), indexadas por
+  (tipo, valor).
+
+Os campos de cada template vêm de ``SEARCH_TEXT`` e ``search_facets`` no
+módulo do template. ``rebuild`` refaz o índice de um arquivo antigo
+(``python -m nervo_core archive-reindex``).
+"""
+import re
+import sqlite3
+from collections.abc import Iterable, Mapping
+
+from nervo_core.api import TEMPLATES
+from nervo_core.text import get_str
+
+TEXT_COLUMNS = ("historia", "enmg", "conduta", "outros")
+# marcas dos termos achados no trecho ("snippet"): caracteres de controle,
+# que o texto das consultas não tem; quem exibe escapa o texto e troca as marcas
+MARK_OPEN, MARK_CLOSE = "\x02", "\x03"
+
+_DDL = (
+    """
+    CREATE TABLE IF NOT EXISTS search_visits (
+        id          INTEGER PRIMARY KEY,  -- rowid em search_fts
+        patient     TEXT NOT NULL,
+        template    TEXT NOT NULL,
+        visit_date  TEXT NOT NULL,
+        dx_category TEXT,
+        nis         REAL,
+        mrc_ss      INTEGER,
+        UNIQUE (patient, template, visit_date)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS search_visits_date ON search_visits (visit_date)",
+    """
+    CREATE TABLE IF NOT EXISTS search_tags (
+        kind  TEXT NOT NULL,  -- "gene" | "icd"
+        value TEXT NOT NULL COLLATE NOCASE,
+        id    INTEGER NOT NULL,
+        PRIMARY KEY (kind, value, id)
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS search_tags_id ON search_tags (id)",
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(
+        {", ".join(TEXT_COLUMNS)},
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+)
+
+_TAG_KINDS = {"genes": "gene", "icd": "icd"}
+
+def ensure(con: sqlite3.Connection) -> bool:
+    """Cria as tabelas; False se este SQLite não tiver FTS5 (a busca fica desligada)."""
+    try:
+        for ddl in _DDL:
+            con.execute(ddl)
+    except sqlite3.OperationalError as e:
+        if "fts5" in str(e):
+            return False
+        raise
+    return True
+
+# =========================================================
+# DOCUMENTO DA CONSULTA
+# =========================================================
+def document(template: str, parts: Mapping[str, str]) -> dict | None:
+    """
+    Textos e facetas de uma consulta arquivada (``Template.dump_parts``);
+    None se o template for desconhecido ou as partes não forem legíveis (a
+    consulta é gravada mesmo assim, só fica fora da busca).
+    """
+    mod = TEMPLATES.get(template)
+    if mod is None:
+        return None
+    try:
+        state = mod.SCHEMA.loads(mod.SCHEMA.join_parts(parts))
+    except ValueError:
+        return None
+    doc = {col: get_str(state, key) for col, key in mod.SEARCH_TEXT.items()}
+    named = set(mod.SEARCH_TEXT.values())
+    # demais campos de texto/escolha; números e checkboxes ficam só nas facetas
+    doc["outros"] = "\n".join(
+        get_str(state, k)
+        for k in mod.SCHEMA.fields
+        if k not in named and isinstance(state.get(k), (str, list)) and get_str(state, k)
+    )
+    doc.update(mod.search_facets(state))
+    return doc
+
+def index_visit(con: sqlite3.Connection, patient: str, template: str, visit_date: str, doc: Mapping):
+    """Substitui a entrada da consulta (mesmo dia = mesma consulta). Roda dentro da transação do chamador."""
+    row = con.execute(
+        "SELECT id FROM search_visits WHERE patient = ? AND template = ? AND visit_date = ?",
+        (patient, template, visit_date),
+    ).fetchone()
+    if row is not None:
+        con.execute("DELETE FROM search_fts WHERE rowid = ?", row)
+        con.execute("DELETE FROM search_tags WHERE id = ?", row)
+        con.execute("DELETE FROM search_visits WHERE id = ?", row)
+    cur = con.execute(
+        "INSERT INTO search_visits (patient, template, visit_date, dx_category, nis, mrc_ss) VALUES (?, ?, ?, ?, ?, ?)",
+        (patient, template, visit_date, doc.get("dx_category"), doc.get("nis"), doc.get("mrc_ss")),
+    )
+    vid = cur.lastrowid
+    con.execute(
+        f"INSERT INTO search_fts (rowid, {', '.join(TEXT_COLUMNS)}) VALUES (?{', ?' * len(TEXT_COLUMNS)})",
+        (vid, *(doc.get(c, "") for c in TEXT_COLUMNS)),
+    )
+    con.executemany(
+        "INSERT OR IGNORE INTO search_tags (kind, value, id) VALUES (?, ?, ?)",
+        [(kind, v, vid) for facet, kind in _TAG_KINDS.items() for v in doc.get(facet) or ()],
+    )
+
+def rebuild(con: sqlite3.Connection, visits: Iterable[tuple[str, str, str, Mapping[str, str]]]) -> int:
+    """Apaga e refaz o índice a partir de (prontuário, template, data, partes). Devolve quantas foram indexadas."""
+    for table in ("search_fts", "search_tags", "search_visits"):
+        con.execute(f"DELETE FROM {table}")
+    n = 0
+    for patient, template, visit_date, parts in visits:
+        doc = document(template, parts)
+        if doc is not None:
+            index_visit(con, patient, template, visit_date, doc)
+            n += 1
+    return n
+
+# =========================================================
+# CONSULTA
+# =========================================================
+_WORD_RE = re.compile(r"\w+")
+
+def fts_query(text: str) -> str:
+    # cada palavra vira um prefixo entre aspas (AND implícito): nada da sintaxe FTS5 vaza do usuário
+    return " ".join(f'"{w}"*' for w in _WORD_RE.findall(text or ""))
+
+def search(
+    con: sqlite3.Connection,
+    text: str = "",
+    *,
+    template: str | None = None,
+    dx_category: str | None = None,
+    gene: str | None = None,
+    icd: str | None = None,
+    nis: tuple[float, float] | None = None,
+    mrc_ss: tuple[int, int] | None = None,
+    limit: int = 50,
+) -> list[dict]:
+    """
+    Consultas que batem com o texto (todas as palavras, por prefixo) e com
+    as facetas informadas; por relevância com texto, senão da mais recente.
+    ``icd`` casa por prefixo ("G71" acha "G71.0"); faixas são inclusivas.
+    """
+    match = fts_query(text)
+    cols = "v.patient, v.template, v.visit_date, v.dx_category, v.nis, v.mrc_ss, v.id"
+    where, args = [], []
+    if match:
+        sql = (
+            f"SELECT {cols}, snippet(search_fts, -1, char(2), char(3), '…', 16) FROM search_fts"
+            " JOIN search_visits v ON v.id = search_fts.rowid"
+        )
+        where.append("search_fts MATCH ?")
+        args.append(match)
+        order = "bm25(search_fts)"
+    else:
+        sql = f"SELECT {cols}, '' FROM search_visits v"
+        order = "v.visit_date DESC"
+    if template:
+        where.append("v.template = ?")
+        args.append(template)
+    if dx_category:
+        where.append("v.dx_category = ?")
+        args.append(dx_category)
+    if gene:
+        where.append("v.id IN (SELECT id FROM search_tags WHERE kind = 'gene' AND value = ?)")
+        args.append(gene.strip())
+    if icd:
+        where.append("v.id IN (SELECT id FROM search_tags WHERE kind = 'icd' AND value >= ? AND value < ?)")
+        code = icd.strip().upper()
+        args += [code, code + "\uffff"]
+    for col, rng in (("nis", nis), ("mrc_ss", mrc_ss)):
+        if rng is not None:
+            where.append(f"v.{col} BETWEEN ? AND ?")
+            args += list(rng)
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {order} LIMIT ?"
+    args.append(limit)
+
+    rows = con.execute(sql, args).fetchall()
+    tags: dict[int, dict[str, list[str]]] = {}
+    if rows:
+        ids = [r[6] for r in rows]
+        marks = ",".join("?" * len(ids))
+        for kind, value, vid in con.execute(f"SELECT kind, value, id FROM search_tags WHERE id IN ({marks})", ids):
+            tags.setdefault(vid, {}).setdefault(kind, []).append(value)
+    return [
+        {
+            "patient": patient,
+            "template": template,
+            "visit_date": visit_date,
+            "dx_category": dx,
+            "genes": tags.get(vid, {}).get("gene", []),
+            "icd": tags.get(vid, {}).get("icd", []),
+            "nis": nis_v,
+            "mrc_ss": mrc_v,
+            "snippet": snip,
+        }
+        for patient, template, visit_date, dx, nis_v, mrc_v, vid, snip in rows
+    ]
+
+def facet_values(con: sqlite3.Connection) -> dict[str, list[str]]:
+    """Valores presentes no índice, para as listas de escolha da página de busca."""
+    out = {
+        "dx_category": [v for (v,) in con.execute(
+            "SELECT DISTINCT dx_category FROM search_visits WHERE dx_category IS NOT NULL ORDER BY 1"
+        )],
+    }
+    for facet, kind in _TAG_KINDS.items():
+        out[facet] = [v for (v,) in con.execute("SELECT DISTINCT value FROM search_tags WHERE kind = ? ORDER BY 1", (kind,))]
+    return out
+
+def count(con: sqlite3.Connection) -> int:
+    return con.execute("SELECT count(*) FROM search_visits").fetchone()[0]
@@ -0,0 +1,150 @@
+"""
+Corpus de entradas patológicas para a importação ("Importar histórico").
+
+Cada caso gera um texto que já travou ou poderia travar o importador:
+colagens enormes (sumários de alta inteiros), marcadores repetidos em todas
+as linhas, blocos sem fim, linhas gigantes com muitos espaços, quebras de
+linha "\\r" etc. Rodar com::
+
+    python -m nervo_core.stress
+
+Para cada template e caso, mostra o tempo e o resultado do
+``import_full_export``; sai com código 1 se algum caso estourar o orçamento
+de tempo (com folga) ou levantar exceção. Os casos de ida e volta
+(``ROUNDTRIP``) exportam um campo e conferem que a importação devolve o
+mesmo texto.
+"""
+import sys
+import time
+from collections.abc import Callable
+
+from nervo_core import nervo, neuromusc
+from nervo_core.text import IMPORT_MAX_CHARS, IMPORT_TIME_BUDGET_S
+
+_SLACK_S = 0.5  # além do orçamento: granularidade da verificação do prazo
+
+def _titles(mod) -> list[str]:
+    return [s.title for s in mod.SCHEMA.sections]
+
+def _markers(mod) -> list[str]:
+    return [m for s in mod.SCHEMA.sections for f in s.fields for m in f.markers]
+
+# =========================================================
+# CASOS (template -> texto)
+# =========================================================
+def _too_large(mod) -> str:
+    # sumário de alta colado inteiro: recusado antes de qualquer leitura
+    return "Paciente internado para investigação de fraqueza. " * (IMPORT_MAX_CHARS // 40)
+
+def _just_under_limit(mod) -> str:
+    title = _titles(mod)[1]
+    body = "Evolução sem intercorrências; mantida a medicação.\n"
+    return title + "\n" + body * ((IMPORT_MAX_CHARS - 100) // len(body))
+
+def _no_sections(mod) -> str:
+    return "texto livre sem nenhum título de seção\n" * 20_000
+
+def _markers_every_line(mod) -> str:
+    # todos os marcadores em todas as linhas de todas as seções
+    lines = [m + " x" for m in _markers(mod)] + [m for m in _markers(mod)]
+    body = "\n".join(lines) + "\n"
+    reps = max(1, (IMPORT_MAX_CHARS // 2) // (len(body) * len(_titles(mod))))
+    return "".join(t + "\n" + body * reps for t in _titles(mod))
+
+def _unterminated_blocks(mod) -> str:
+    # cabeçalhos de bloco seguidos de texto enorme, sem o marcador seguinte
+    out = []
+    for t in _titles(mod):
+        out.append(t)
+        for m in _markers(mod):
+            out.append(m)
+            out.append("linha de bloco sem fim\n" * 1_000)
+    return "\n".join(out)[:IMPORT_MAX_CHARS]
+
+def _repeated_titles(mod) -> str:
+    return "\n".join(_titles(mod) * 3_000)
+
+def _long_whitespace_line(mod) -> str:
+    # "chave: valor" com espaços longos (backtracking em regex preguiçosa)
+    body = "\n".join([
+        "NIS_ITENS:", "nis_x: a" + " " * 20_000 + "b",
+        "MRC:", "Ombro: D" + " " * 20_000 + "x",
+        "Marcos:", "Sentou:" + " " * 20_000 + "x",
+        "Força motora (MRC): " + ": D  " * 4_000,
+    ])
+    return "\n".join(t + "\n" + body for t in _titles(mod))[:IMPORT_MAX_CHARS]
+
+def _carriage_returns(mod) -> str:
+    return "\r".join(t + "\rTexto\r" + "\r".join(_markers(mod)) for t in _titles(mod)) * 50
+
+def _many_colons(mod) -> str:
+    return "\n".join(t + "\n" + (":" * 10_000 + "\n") * 6 for t in _titles(mod))
+
+CASES: list[tuple[str, Callable]] = [
+    ("too_large", _too_large),
+    ("just_under_limit", _just_under_limit),
+    ("no_sections", _no_sections),
+    ("markers_every_line", _markers_every_line),
+    ("unterminated_blocks", _unterminated_blocks),
+    ("repeated_titles", _repeated_titles),
+    ("long_whitespace_line", _long_whitespace_line),
+    ("carriage_returns", _carriage_returns),
+    ("many_colons", _many_colons),
+]
+
+# =========================================================
+# IDA E VOLTA (template, chave, texto que tem de voltar igual)
+# =========================================================
+ROUNDTRIP: list[tuple[object, str, str]] = [
+    # bloco livre cuja primeira linha começa pelo marcador de um campo seguinte
+    (nervo, "evo_descricao_texto", "Reabilitação: fisioterapia motora 2x/semana\nmelhora da marcha"),
+    (nervo, "meds_atual_previo_texto", "Outros medicamentos: nenhum em uso\nIGIV desde 2021"),
+    (neuromusc, "ex_rm_muscular", "ECO: hiperecogenicidade em quadríceps\nRM: lipossubstituição em posterior de coxa"),
+]
+
+def roundtrip() -> list[tuple[str, str, bool]]:
+    rows = []
+    for mod, key, value in ROUNDTRIP:
+        state: dict = {}
+        ok, _ = mod.import_full_export(state, mod.build_export_text({key: value}, True))
+        rows.append((mod.__name__.rsplit(".", 1)[-1], key, ok and state.get(key) == value))
+    return rows
+
+# =========================================================
+# EXECUÇÃO
+# =========================================================
+def run(time_budget: float = IMPORT_TIME_BUDGET_S) -> list[tuple[str, str, int, float, bool, str]]:
+    rows = []
+    for mod in (nervo, neuromusc):
+        for name, build in CASES:
+            text = build(mod)
+            t0 = time.perf_counter()
+            ok, msg = mod.import_full_export({}, text, time_budget=time_budget)
+            rows.append((mod.__name__.rsplit(".", 1)[-1], name, len(text), time.perf_counter() - t0, ok, msg))
+    return rows
+
+def main() -> int:
+    failed = False
+    try:
+        rows = run()
+        trips = roundtrip()
+        # orçamento zerado: o prazo tem de interromper a leitura
+        ok, _ = nervo.import_full_export({}, _just_under_limit(nervo), time_budget=0.0)
+    except Exception as e:  # noqa: BLE001 - qualquer exceção é falha do importador
+        print(f"ERRO: {type(e).__name__}: {e}")
+        return 1
+    if ok:
+        print("ERRO: importação com time_budget=0 não foi interrompida")
+        failed = True
+    for tpl, name, size, dt, ok, msg in rows:
+        slow = dt > IMPORT_TIME_BUDGET_S + _SLACK_S
+        failed |= slow
+        flag = "LENTO" if slow else "ok"
+        print(f"{tpl:10} {name:22} {size:>9} chars {dt * 1000:8.1f} ms  {flag:5}  {'importado' if ok else msg[:60]}")
+    for tpl, key, ok in trips:
+        failed |= not ok
+        print(f"{tpl:10} {'ida e volta':22} {key:>27}  {'ok' if ok else 'DIFERE'}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
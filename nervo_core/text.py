@@ -0,0 +1,248 @@
+import re
+import time
+import zlib
+from bisect import bisect_right
+from collections.abc import Mapping
+from dataclasses import dataclass
+
+# =========================================================
+# HELPERS (EXPORT/IMPORT) compartilhados pelos templates
+# =========================================================
+def norm(text: str) -> str:
+    return (text or "").replace("\r\n", "\n").replace("\r", "\n")
+
+def get_str(state: Mapping, key: str, default: str = "") -> str:
+    v = state.get(key, default)
+    if v is None:
+        return ""
+    if isinstance(v, list):
+        return "; ".join([str(x) for x in v if str(x).strip()])
+    return str(v).strip()
+
+def bool_to_txt(v: bool) -> str:
+    return "Sim" if v else "Não"
+
+def section(title: str, body: str) -> str:
+    body = (body or "").strip()
+    if not body:
+        return ""
+    return f"{title}\n{body}\n"
+
+# =========================================================
+# LIMITES DA IMPORTAÇÃO (texto colado pelo usuário)
+# =========================================================
+IMPORT_MAX_CHARS = 1_000_000  # um histórico de vários anos tem ~100 mil caracteres
+IMPORT_TIME_BUDGET_S = 2.0
+
+class ImportAborted(ValueError):
+    """
+    Importação interrompida (texto grande demais, tempo esgotado ou texto
+    cortado/alterado segundo o cabeçalho); a mensagem vai para a UI.
+    """
+
+def import_deadline(time_budget: float | None) -> float | None:
+    return None if time_budget is None else time.monotonic() + time_budget
+
+def check_deadline(deadline: float | None):
+    if deadline is not None and time.monotonic() > deadline:
+        raise ImportAborted(
+            "A importação excedeu o tempo limite e foi interrompida. "
+            "Confirme se o texto colado é apenas o 'Exportar histórico completo'."
+        )
+
+def check_import_size(text: str, max_chars: int | None):
+    if max_chars is not None and len(text or "") > max_chars:
+        raise ImportAborted(
+            f"Texto grande demais para importar ({len(text):,} caracteres; limite {max_chars:,}). ".replace(",", ".")
+            + "Cole apenas o texto gerado por 'Exportar histórico completo'."
+        )
+
+# =========================================================
+# CABEÇALHO DO EXPORT (template, versão do formato, checksum)
+# =========================================================
+# Primeira linha do texto exportado, ex.: "[nervo v1 n=2345 crc=8f3a2c1d]". Fica no
+# topo porque o limite de caracteres do prontuário corta o fim da nota
+EXPORT_FORMAT_VERSION = 1
+_HEADER_RE = re.compile(r"^\[(\w+) v(\d+) n=(\d+) crc=([0-9a-f]{8})\]$")
+
+@dataclass(frozen=True)
+class ExportHeader:
+    template: str
+    version: int
+    length: int
+    crc: str
+
+def _canonical(body: str) -> str:
+    # espaços no fim das linhas e \r\n não contam (o prontuário costuma mexer neles)
+    return "\n".join(ln.rstrip() for ln in norm(body).split("\n")).strip()
+
+def _checksum(canonical: str) -> str:
+    return f"{zlib.crc32(canonical.encode('utf-8')):08x}"
+
+def export_header(template: str, body: str) -> str:
+    c = _canonical(body)
+    return f"[{template} v{EXPORT_FORMAT_VERSION} n={len(c)} crc={_checksum(c)}]"
+
+def split_header(text: str) -> tuple[ExportHeader | None, str]:
+    """Cabeçalho (se a primeira linha não vazia for um) e o restante do texto."""
+    stripped = norm(text).lstrip("\n")
+    first, _, rest = stripped.partition("\n")
+    m = _HEADER_RE.match(first.strip())
+    if not m:
+        return None, text
+    return ExportHeader(m.group(1), int(m.group(2)), int(m.group(3)), m.group(4)), rest
+
+def check_header(header: ExportHeader, body: str, template: str):
+    """Recusa texto de outro template, de versão futura ou cortado/alterado depois de exportado."""
+    if header.template != template:
+        raise ImportAborted(f"Texto exportado pelo template '{header.template}', não '{template}'.")
+    if header.version > EXPORT_FORMAT_VERSION:
+        raise ImportAborted(
+            f"Texto exportado numa versão mais nova do template (v{header.version}; esta lê até v{EXPORT_FORMAT_VERSION})."
+        )
+    c = _canonical(body)
+    if len(c) < header.length:
+        raise ImportAborted(
+            f"O texto colado parece cortado ({len(c):,} de {header.length:,} caracteres). ".replace(",", ".")
+            + "Copie a nota inteira do prontuário e tente novamente."
+        )
+    if len(c) != header.length or _checksum(c) != header.crc:
+        raise ImportAborted(
+            "O texto foi alterado depois de exportado (checksum não confere); nada foi importado. "
+            "Para importar mesmo assim, apague a primeira linha (\"[...]\")."
+        )
+
+# =========================================================
+# TOKENIZADOR (uma passada pelo texto exportado)
+# =========================================================
+def compile_markers_pattern(markers: list[str]) -> re.Pattern | None:
+    # mais longos primeiro: "NIS_ITENS:" não pode ser lido como "NIS:"
+    if not markers:
+        return None
+    alts = sorted(set(markers), key=len, reverse=True)
+    return re.compile("|".join(re.escape(m) for m in alts))
+
+class SectionTokens:
+    """
+    Corpo de uma seção já quebrado em linhas, com o índice das linhas que
+    começam por cada marcador ("Prefixo:" ou cabeçalho de bloco).
+    ``version`` é a versão do formato lida no cabeçalho (None em exports
+    antigos, sem cabeçalho: os parsers aceitam também rótulos antigos).
+    """
+    __slots__ = ("lines", "starts", "version")
+
+    def __init__(self, version: int | None = None):
+        self.lines: list[str] = []
+        self.starts: dict[str, list[int]] = {}
+        self.version = version
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.lines).strip()
+
+    def line(self, prefix: str) -> str:
+        idx = self.starts.get(prefix)
+        if not idx:
+            return ""
+        return self.lines[idx[0]].strip()[len(prefix):].strip()
+
+    def _header(self, marker: str) -> int:
+        for i in self.starts.get(marker, ()):
+            if self.lines[i].strip() == marker:
+                return i
+        return -1
+
+    def block(self, marker: str, ends: tuple[str, ...]) -> str:
+        i = self._header(marker)
+        if i == -1:
+            return ""
+        # o fim só vale da segunda linha do corpo em diante (como "\n" + marcador
+        # no regex antigo): a primeira linha é do bloco mesmo se começar por um fim
+        stop = len(self.lines)
+        for e in ends:
+            idx = self.starts.get(e)
+            if idx:
+                j = bisect_right(idx, i + 1)
+                if j < len(idx) and idx[j] < stop:
+                    stop = idx[j]
+        return "\n".join(self.lines[i + 1:stop]).strip()
+
+    def free(self, block_markers: tuple[str, ...], line_markers: tuple[str, ...]) -> str:
+        # corpo livre: antes do primeiro bloco, sem as linhas "Prefixo: valor"
+        stop = len(self.lines)
+        for m in block_markers:
+            i = self._header(m)
+            if i != -1 and i < stop:
+                stop = i
+        skip = {i for m in line_markers for i in self.starts.get(m, ())}
+        return "\n".join(ln for i, ln in enumerate(self.lines[:stop]) if i not in skip).strip()
+
+def tokenize_sections(
+    text: str,
+    titles: frozenset[str],
+    markers: Mapping[str, re.Pattern | None],
+    deadline: float | None = None,
+    version: int | None = None,
+) -> dict[str, SectionTokens]:
+    """
+    Percorre o texto uma única vez: cada linha é um título de seção, uma
+    linha que começa por um marcador da seção atual ou texto comum.
+    """
+    out: dict[str, SectionTokens] = {}
+    cur: SectionTokens | None = None
+    pat: re.Pattern | None = None
+    for n, ln in enumerate(norm(text).split("\n")):
+        if not n & 0xFFF:
+            check_deadline(deadline)
+        title = ln.rstrip()
+        if title in titles:
+            cur = out[title] = SectionTokens(version)
+            pat = markers.get(title)
+            continue
+        if cur is None:
+            continue
+        if pat is not None:
+            m = pat.match(ln.strip())
+            if m:
+                cur.starts.setdefault(m.group(0), []).append(len(cur.lines))
+        cur.lines.append(ln)
+
+    # remove linhas em branco nas bordas (como o antigo split por regex)
+    for tok in out.values():
+        lines = tok.lines
+        while lines and not lines[-1].strip():
+            lines.pop()
+        lead = 0
+        while lead < len(lines) and not lines[lead].strip():
+            lead += 1
+        if lead:
+            del lines[:lead]
+            tok.starts = {k: [i - lead for i in v] for k, v in tok.starts.items()}
+    return out
+
+# valor guloso + strip(): "(.+?)\s*$" é quadrático em linhas com muitos espaços
+_KEYVAL_RE = re.compile(r"^([A-Za-z0-9_]+)\s*[:=]\s*(.+)$")
+
+def parse_keyvals_block(block: str) -> dict[str, str]:
+    out: dict[str, str] = {}
+    if not block:
+        return out
+    for ln in norm(block).split("\n"):
+        ln = ln.strip()
+        if not ln or ln.startswith("#"):
+            continue
+        m = _KEYVAL_RE.match(ln)
+        if not m:
+            continue
+        out[m.group(1)] = m.group(2).strip()
+    return out
+
+def add_line(lines: list[str], prefix: str, value: str):
+    v = (value or "").strip()
+    if v:
+        lines.append(f"{prefix}{v}")
+
+def add_block(lines: list[str], header: str, value: str):
+    v = (value or "").strip()
+    if v:
+        lines.append(f"{header}\n{v}")
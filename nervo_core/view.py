@@ -0,0 +1,66 @@
+"""
+Visualização da consulta (somente leitura): um único bloco HTML montado a
+partir da exportação, sem nenhum widget.
+
+Usada pelo modo "Visualizar consulta" das páginas dos templates e pela
+página de busca. As seções saem do mesmo texto da exportação (``memo`` com
+o cache por seção da sessão, quando houver); as escalas do template
+(``scale_rows`` no módulo dele) viram uma tabela compacta no topo e os
+trechos só para a reimportação (``VIEW_OMIT``) saem. O estilo fica em
+``static/visit.css``. ``snippet_html`` monta os trechos da busca.
+"""
+import html
+from collections.abc import Mapping, MutableMapping
+
+from nervo_core.api import TEMPLATES
+from nervo_core.schema import memo
+from nervo_core.search import MARK_CLOSE, MARK_OPEN
+
+def scales_table(rows: list[tuple[str, str]]) -> str:
+    if not rows:
+        return ""
+    cells = "".join(f"<tr><th>{html.escape(name)}</th><td>{html.escape(value)}</td></tr>" for name, value in rows)
+    return f'<table class="visit-scales"><tbody>{cells}</tbody></table>'
+
+def visit_html(
+    template: str,
+    state: Mapping,
+    cache: MutableMapping | None = None,
+    include_all: bool = True,
+    title: str = "",
+) -> str:
+    """Consulta inteira (histórico completo, por padrão) como um bloco HTML escapado."""
+    mod = TEMPLATES[template]
+    out = ['<div class="visit-view">']
+    if title:
+        out.append(f'<div class="visit-meta">{html.escape(title)}</div>')
+    out.append(scales_table(mod.scale_rows(state)))
+    n = 0
+    for s in mod.SCHEMA.sections:
+        if s.full_only and not include_all:
+            continue
+        text = memo(cache, s.title, state, s.export_keys, s.export)
+        if not text.strip():
+            continue
+        # section(): "TÍTULO\ncorpo\n"
+        body = text.split("\n", 1)[1]
+        if mod.VIEW_OMIT is not None:
+            body = mod.VIEW_OMIT.sub("", body)
+        body = body.rstrip()
+        out.append(f"<h4>{html.escape(s.title)}</h4><div class=\"visit-body\">{html.escape(body)}</div>")
+        n += 1
+    if not n:
+        out.append('<p class="visit-meta">Nada preenchido.</p>')
+    out.append("</div>")
+    return "".join(out)
+
+def snippet_html(snippet: str) -> str:
+    """Trecho de ``search.search`` com o texto escapado e os termos achados em <mark>."""
+    text = html.escape(" ".join(snippet.split()))
+    return text.replace(MARK_OPEN, "<mark>").replace(MARK_CLOSE, "</mark>")
+
+def parts_html(template: str, parts: Mapping[str, str], title: str = "") -> str:
+    """Consulta arquivada (``Template.dump_parts``); ValueError se as partes não forem legíveis."""
+    mod = TEMPLATES[template]
+    state = mod.SCHEMA.loads(mod.SCHEMA.join_parts(parts))
+    return visit_html(template, state, title=title)
@@ -0,0 +1,390 @@
+"""
+Arquivo local de consultas, alternativa só de acréscimo (``*.vlog``).
+
+Para leitura pesada (coortes, ``history`` de muitos pacientes): cada
+consulta é um registro novo no fim do arquivo de dados, nunca reescrito, e
+um índice de largura fixa, ordenado e mapeado em memória (mmap), leva
+direto aos registros de um paciente por busca binária, sem ler os demais.
+``open_archive`` escolhe este formato quando o caminho termina em ``.vlog``.
+
+Arquivos (``X.vlog`` = caminho configurado):
+
+- ``X.vlog``: registros ``NVL1 | tamanho u32 | crc32 u32 | JSON comprimido``
+  (a consulta inteira: prontuário, template, data e ``{parte: conteúdo}``);
+- ``X.vlog.idx``: entradas ``hash(prontuário, template) 8B | AAAAMMDD u32 |
+  offset u64 | tamanho u32`` em big-endian, ordenadas: a ordem dos bytes é
+  a ordem (paciente, data, gravação);
+- ``X.vlog.tail``: as mesmas entradas, na ordem de gravação, das consultas
+  ainda fora do ``.idx``; com ``_TAIL_MAX`` entradas, elas entram no ``.idx``
+  (reescrito em arquivo temporário + ``os.replace``).
+
+Gravar = registro no fim do ``.vlog`` (fsync) e depois a entrada no
+``.tail`` (fsync), com lock exclusivo (flock) entre processos. Se o
+processo cair no meio, ``_recover`` (na abertura) reindexa registros
+íntegros sem entrada e corta o resto de um registro incompleto. Consulta
+regravada no mesmo dia = registro novo; vale o de maior offset.
+
+A busca (``nervo_core.search``) fica num SQLite ao lado (``X.vlog.search``),
+derivado do log: ``reindex`` o refaz inteiro.
+"""
+import bisect
+import hashlib
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+import zlib
+from collections.abc import Iterator, Mapping
+from contextlib import closing, contextmanager
+from pathlib import Path
+
+from nervo_core import search
+from nervo_core.archive import _BUSY_TIMEOUT_S, ArchiveError, _now, patient_key
+from nervo_core.compress import compress, decompress
+
+try:
+    import fcntl  # POSIX; sem ele, só o lock entre threads do mesmo processo
+except ImportError:
+    fcntl = None
+
+_MAGIC = b"NVL1"
+_HEAD = struct.Struct(">4sII")      # magic, tamanho do payload, crc32
+_ENTRY = struct.Struct(">8sIQI")    # chave, AAAAMMDD, offset, tamanho
+_KEY = 8
+_TAIL_MAX = 1024
+
+def _key(patient: str, template: str) -> bytes:
+    return hashlib.blake2b(f"{patient_key(patient)}\0{template}".encode("utf-8"), digest_size=_KEY).digest()
+
+def _day(visit_date: str) -> int:
+    return int(visit_date.replace("-", ""))
+
+def _fsync_append(path: str, data: bytes) -> int:
+    # devolve o offset onde os bytes começaram
+    with open(path, "ab") as f:
+        offset = f.tell()
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    return offset
+
+class _Index:
+    """Vista do ``.idx`` (mmap) + ``.tail``; remapeia quando algum dos dois muda no disco.
+
+    A vista é trocada inteira, ``(mmap, tail)``, e o mmap antigo não é
+    fechado: quem ainda lê por ele (outra sessão, outra thread) segue com a
+    vista que pegou, e o coletor de lixo fecha o mapa quando ninguém mais o usa.
+    """
+
+    def __init__(self, idx_path: str, tail_path: str):
+        self.idx_path, self.tail_path = idx_path, tail_path
+        self._idx_sig = self._tail_sig = None
+        self._view: tuple[mmap.mmap | bytes, list[bytes]] = (b"", [])
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _sig(path: str):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def refresh(self):
+        # tail antes do idx: a compactação troca o idx antes de zerar o tail,
+        # então quem vê o tail vazio já enxerga o idx novo
+        with self._lock:
+            mm, tail = self._view
+            sig = self._sig(self.tail_path)
+            if sig != self._tail_sig:
+                data = Path(self.tail_path).read_bytes() if sig else b""
+                n = len(data) // _ENTRY.size  # entrada incompleta no fim = gravação em curso
+                tail = sorted(data[i * _ENTRY.size:(i + 1) * _ENTRY.size] for i in range(n))
+                self._tail_sig = sig
+            sig = self._sig(self.idx_path)
+            if sig != self._idx_sig:
+                mm = b""
+                if sig and sig[1]:
+                    with open(self.idx_path, "rb") as f:
+                        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._idx_sig = sig
+            self._view = (mm, tail)
+
+    def __len__(self) -> int:
+        return len(self._view[0]) // _ENTRY.size
+
+    @property
+    def tail_len(self) -> int:
+        return len(self._view[1])
+
+    @staticmethod
+    def _lower_bound(mm, prefix: bytes) -> int:
+        size, p = _ENTRY.size, len(prefix)
+        lo, hi = 0, len(mm) // size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if mm[mid * size:mid * size + p] < prefix:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def find(self, key: bytes) -> list[tuple[int, int, int]]:
+        """(data, offset, tamanho) das entradas da chave, em ordem."""
+        mm, tail = self._view
+        size, n = _ENTRY.size, len(mm) // _ENTRY.size
+        raw = []
+        i = self._lower_bound(mm, key)
+        while i < n and mm[i * size:i * size + _KEY] == key:
+            raw.append(mm[i * size:(i + 1) * size])
+            i += 1
+        i = bisect.bisect_left(tail, key)
+        while i < len(tail) and tail[i][:_KEY] == key:
+            raw.append(tail[i])
+            i += 1
+        return [_ENTRY.unpack(e)[1:] for e in sorted(set(raw))]
+
+    def entries(self) -> list[bytes]:
+        mm, tail = self._view
+        size = _ENTRY.size
+        return sorted({mm[i * size:(i + 1) * size] for i in range(len(mm) // size)} | set(tail))
+
+class VisitLog:
+    def __init__(self, path: str | os.PathLike):
+        self.path = str(path)
+        self._idx_path = self.path + ".idx"
+        self._tail_path = self.path + ".tail"
+        self._lock_path = self.path + ".lock"
+        self._search_path = self.path + ".search"
+        self._thread_lock = threading.Lock()
+        self._index = _Index(self._idx_path, self._tail_path)
+        try:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            Path(self.path).touch()
+            with self._writing():
+                self._recover()
+            with closing(self._search_db()) as con:
+                con.execute("PRAGMA journal_mode=WAL")
+                self._search = search.ensure(con)
+        except (OSError, sqlite3.Error) as e:
+            raise ArchiveError(f"Não foi possível abrir o arquivo local de consultas ({self.path}): {e}") from e
+
+    @contextmanager
+    def _writing(self):
+        with self._thread_lock, open(self._lock_path, "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    def _search_db(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._search_path, timeout=_BUSY_TIMEOUT_S, isolation_level=None)
+
+    # =========================================================
+    # REGISTROS
+    # =========================================================
+    def _read_record(self, f, offset: int, size: int | None = None) -> dict:
+        f.seek(offset)
+        magic, length, crc = _HEAD.unpack(f.read(_HEAD.size))
+        payload = f.read(length)
+        if magic != _MAGIC or (size is not None and length != size) or len(payload) != length or zlib.crc32(payload) != crc:
+            raise ArchiveError(f"Registro corrompido no arquivo local (offset {offset}).")
+        return json.loads(decompress(payload))
+
+    def _recover(self):
+        # registros depois da última entrada indexada: reindexa os íntegros, corta o incompleto
+        tail = os.path.getsize(self._tail_path) if os.path.exists(self._tail_path) else 0
+        if tail % _ENTRY.size:
+            os.truncate(self._tail_path, tail - tail % _ENTRY.size)  # entrada pela metade
+        self._index.refresh()
+        end = max((off + _HEAD.size + n for _, off, n in (_ENTRY.unpack(e)[1:] for e in self._index.entries())), default=0)
+        size = os.path.getsize(self.path)
+        if size <= end:
+            return
+        entries = []
+        with open(self.path, "rb") as f:
+            while end + _HEAD.size <= size:
+                f.seek(end)
+                magic, length, _ = _HEAD.unpack(f.read(_HEAD.size))
+                if magic != _MAGIC or end + _HEAD.size + length > size:
+                    break
+                try:
+                    rec = self._read_record(f, end)
+                except (ArchiveError, ValueError, zlib.error):
+                    break
+                entries.append(_ENTRY.pack(_key(rec["patient"], rec["template"]), _day(rec["visit_date"]), end, length))
+                end += _HEAD.size + length
+        if end < size:
+            os.truncate(self.path, end)
+        if entries:
+            _fsync_append(self._tail_path, b"".join(entries))
+
+    def _compact(self):
+        # tail -> idx ordenado; idx novo entra inteiro (os.replace) antes de zerar o tail
+        self._index.refresh()
+        tmp = self._idx_path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(b"".join(self._index.entries()))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._idx_path)
+        with open(self._tail_path, "wb") as f:
+            os.fsync(f.fileno())
+
+    # =========================================================
+    # API (a mesma do VisitArchive)
+    # =========================================================
+    def save(self, patient: str, template: str, parts: Mapping[str, str], visit_date: str | None = None) -> str:
+        """Acrescenta a consulta (substitui a do mesmo dia na leitura). Devolve a data usada."""
+        key = patient_key(patient)
+        if not key:
+            raise ArchiveError("Informe o prontuário do paciente para salvar a consulta.")
+        now = _now()
+        visit_date = visit_date or now.date().isoformat()
+        doc = {
+            "patient": key,
+            "template": template,
+            "visit_date": visit_date,
+            "saved_at": now.isoformat(timespec="seconds"),
+            "parts": dict(parts),
+        }
+        payload = compress(json.dumps(doc, ensure_ascii=False).encode("utf-8"))
+        found = search.document(template, parts) if self._search else None
+        try:
+            with self._writing():
+                offset = _fsync_append(self.path, _HEAD.pack(_MAGIC, len(payload), zlib.crc32(payload)) + payload)
+                _fsync_append(self._tail_path, _ENTRY.pack(_key(key, template), _day(visit_date), offset, len(payload)))
+                if os.path.getsize(self._tail_path) >= _TAIL_MAX * _ENTRY.size:
+                    self._compact()
+                if found is not None:
+                    with closing(self._search_db()) as con:
+                        con.execute("BEGIN IMMEDIATE")
+                        search.index_visit(con, key, template, visit_date, found)
+                        con.execute("COMMIT")
+        except (OSError, sqlite3.Error) as e:
+            raise ArchiveError(f"Não foi possível salvar a consulta no arquivo local: {e}") from e
+        return visit_date
+
+    def _records(self, patient: str, template: str, day: int | None = None) -> list[dict]:
+        # um registro por dia (o mais recente gravado), em ordem de data; com ``day``, só o desse dia
+        key = patient_key(patient)
+        latest: dict[int, tuple[int, int]] = {}
+        out = []
+        try:
+            self._index.refresh()
+            for d, offset, size in self._index.find(_key(key, template)):
+                if day is None or d == day:
+                    latest[d] = (offset, size)
+            with open(self.path, "rb") as f:
+                for d in sorted(latest):
+                    rec = self._read_record(f, *latest[d])
+                    if rec["patient"] == key and rec["template"] == template:  # colisão do hash de 8 bytes
+                        out.append(rec)
+        except (OSError, ValueError, zlib.error, struct.error) as e:
+            raise ArchiveError(f"Não foi possível ler o arquivo local de consultas: {e}") from e
+        return out
+
+    def latest(self, patient: str, template: str) -> tuple[str, dict[str, str]] | None:
+        """(data, partes) da consulta mais recente; None se não houver."""
+        recs = self._records(patient, template)
+        return (recs[-1]["visit_date"], recs[-1]["parts"]) if recs else None
+
+    def get(self, patient: str, template: str, visit_date: str) -> dict[str, str] | None:
+        """Partes da consulta do dia (AAAA-MM-DD); None se não houver."""
+        recs = self._records(patient, template, _day(visit_date))
+        return recs[-1]["parts"] if recs else None
+
+    def history(self, patient: str, template: str) -> list[tuple[str, dict[str, str]]]:
+        """Todas as consultas do paciente, (data, partes) da mais antiga à mais recente."""
+        return [(r["visit_date"], r["parts"]) for r in self._records(patient, template)]
+
+    def _live(self) -> Iterator[tuple[bytes, int, int]]:
+        # (chave, offset, tamanho) do registro que vale em cada (paciente, data)
+        live: dict[tuple[bytes, int], tuple[int, int]] = {}
+        for e in self._index.entries():
+            key, day, offset, size = _ENTRY.unpack(e)
+            live[key, day] = (offset, size)
+        for (key, _), (offset, size) in live.items():
+            yield key, offset, size
+
+    def _require_search(self):
+        if not self._search:
+            raise ArchiveError("Busca indisponível: o SQLite deste Python não tem FTS5.")
+
+    def search(self, text: str = "", **facets) -> list[dict]:
+        """Busca por texto e facetas (argumentos de ``nervo_core.search.search``)."""
+        self._require_search()
+        try:
+            with closing(self._search_db()) as con:
+                return search.search(con, text, **facets)
+        except sqlite3.Error as e:
+            raise ArchiveError(f"Não foi possível buscar no arquivo local: {e}") from e
+
+    def facet_values(self) -> dict[str, list[str]]:
+        self._require_search()
+        try:
+            with closing(self._search_db()) as con:
+                return search.facet_values(con)
+        except sqlite3.Error as e:
+            raise ArchiveError(f"Não foi possível ler o arquivo local de consultas: {e}") from e
+
+    def reindex(self) -> int:
+        """Refaz o índice de busca a partir do log."""
+        self._require_search()
+        try:
+            self._index.refresh()
+            with self._writing(), open(self.path, "rb") as f, closing(self._search_db()) as con:
+                recs = (self._read_record(f, offset, size) for _, offset, size in self._live())
+                con.execute("BEGIN IMMEDIATE")
+                try:
+                    n = search.rebuild(con, ((r["patient"], r["template"], r["visit_date"], r["parts"]) for r in recs))
+                    con.execute("COMMIT")
+                except BaseException:
+                    con.execute("ROLLBACK")
+                    raise
+        except (OSError, ValueError, zlib.error, struct.error, sqlite3.Error) as e:
+            raise ArchiveError(f"Não foi possível refazer o índice de busca: {e}") from e
+        return n
+
+    def report(self) -> dict[str, int | float]:
+        """Registros (e os substituídos por uma regravação no mesmo dia), entradas do índice e bytes."""
+        self._index.refresh()
+        entries = len(self._index.entries())
+        live = list(self._live())
+        stored = sum(_HEAD.size + size for _, _, size in live)
+        data_bytes = os.path.getsize(self.path)
+        return {
+            "visits": len(live),
+            "records": entries,
+            "superseded": entries - len(live),
+            "index_entries": len(self._index),
+            "tail_entries": self._index.tail_len,
+            "stored_bytes": stored,
+            "data_bytes": data_bytes,
+            "index_bytes": entries * _ENTRY.size,
+            "search_indexed": self._search_count(),
+        }
+
+    def _search_count(self) -> int:
+        if not self._search:
+            return 0
+        with closing(self._search_db()) as con:
+            return search.count(con)
+
+    def texts(self) -> Iterator[str]:
+        """Partes das consultas em vigor (corpus para o benchmark de compressão)."""
+        try:
+            self._index.refresh()
+            with open(self.path, "rb") as f:
+                for _, offset, size in self._live():
+                    yield from self._read_record(f, offset, size)["parts"].values()
+        except (OSError, ValueError, zlib.error, struct.error) as e:
+            raise ArchiveError(f"Não foi possível ler o arquivo local de consultas: {e}") from e
+
+    def add_dictionary(self, zdict: bytes, recompress: bool = False) -> int:
+        raise ArchiveError("Dicionário de compressão treinado só no arquivo SQLite (o .vlog usa zlib sem dicionário).")
@@ -1,100 +1,74 @@
-import re
+from contextlib import contextmanager
+
 import streamlit as st
 
+from nervo_core import assets, grid
+from nervo_core.archive import ArchiveError, VisitArchive, open_archive
+from nervo_core.nervo import (
+    CONTROLE_OPTIONS,
+    DERIVED,
+    DX_CATEGORY_OPTIONS,
+    DX_GENETICA,
+    DX_GENETICA_OPTIONS,
+    DX_IMUNO,
+    DX_IMUNO_OPTIONS,
+    DX_OUTRAS_ADQUIRIDAS,
+    DX_OUTROS_DIAGNOSTICOS,
+    INCAT_LL_OPTIONS,
+    INCAT_UL_OPTIONS,
+    MRC_ALL_ITEMS_LOWER,
+    MRC_ALL_ITEMS_UPPER,
+    MRC_ALL_KEYS,
+    MRC_SS_KEYS,
+    MRC_SS_KEYS_SET,
+    MRC_SS_SUM,
+    NIS_ALL_KEYS,
+    NIS_KEYS_REFLEXES,
+    NIS_KEYS_SENSATION,
+    NIS_KEYS_WEAKNESS,
+    NIS_MAX_REFLEXES,
+    NIS_MAX_SENSATION,
+    NIS_MAX_TOTAL,
+    NIS_MAX_WEAKNESS,
+    NIS_REFLEX_ITEMS,
+    NIS_RS_LABEL,
+    NIS_SENS_FINGER_ITEMS,
+    NIS_SENS_TOE_ITEMS,
+    NIS_WEAKNESS_ITEMS,
+    NIS_WEAKNESS_LABEL,
+    SCHEMA,
+    STEPS,
+    TRATAMENTO_OPTIONS,
+    build_export_json,
+    build_export_text,
+    carry_forward_export,
+    compute_mrc_ss,
+    fmt_score,
+    format_incat_total,
+    format_nis_total,
+    import_full_export,
+    init_mrc_all_state,
+    init_nis_state,
+    ll_to_pnd,
+    nis_components,
+)
+from nervo_core.schema import state_fingerprint
+from nervo_core.view import visit_html
+
 st.set_page_config(page_title="Template nervo periférico", layout="wide")
 
+# Execuções completas do script nesta sessão (exibido com ?debug=1)
+st.session_state["_script_runs"] = st.session_state.get("_script_runs", 0) + 1
+
 # =========================================================
 # GLOBAL STYLES
 # =========================================================
-st.markdown(
-    """
-    <style>
-      section.main > div.block-container{
-        max-width: 100% !important;
-        padding-left: 2rem !important;
-        padding-right: 2rem !important;
-      }
-
-      /* Make all subheader titles (st.subheader) red */
-      h3 { color: #c00000 !important; }
-      h3 strong { color: #c00000 !important; }
-
-      /* Inline label look (used by inline_label_input) */
-      .inline-label{
-        font-size: 0.95rem;
-        color: #333;
-        padding-top: 0.35rem;
-        white-space: nowrap;
-        word-break: normal;
-        overflow-wrap: normal;
-      }
-
-      /* ==========================
-         GLOBAL VERTICAL SPACING TIGHTENER
-         ========================== */
-
-      div[data-testid="stMarkdown"] p,
-      div[data-testid="stMarkdown"] h1,
-      div[data-testid="stMarkdown"] h2,
-      div[data-testid="stMarkdown"] h3,
-      div[data-testid="stMarkdown"] h4,
-      div[data-testid="stMarkdown"] h5,
-      div[data-testid="stMarkdown"] h6 {
-        margin-bottom: 0.15rem !important;
-        margin-top: 0.15rem !important;
-      }
-
-      div[data-testid="stVerticalBlock"] > div[data-testid="stElementContainer"] {
-        margin-bottom: 0.35rem !important;
-      }
-
-      div[data-testid="stTextArea"],
-      div[data-testid="stRadio"],
-      div[data-testid="stCheckbox"],
-      div[data-testid="stTextInput"],
-      div[data-testid="stSelectbox"] {
-        margin-top: -0.35rem !important;
-      }
-
-      label, .stTextArea label, .stRadio label, .stCheckbox label {
-        margin-bottom: 0.15rem !important;
-      }
-
-      /* ==========================
-         FIX: st.dialog layout (MRC todos os músculos)
-         ========================== */
-
-      /* tenta cobrir diferentes versões do Streamlit */
-      div[role="dialog"], div[data-testid="stDialog"]{
-        width: min(1100px, 96vw) !important;
-      }
-
-      /* dentro do dialog: não usar nowrap (evita label invadir os inputs) */
-      div[role="dialog"] .inline-label,
-      div[data-testid="stDialog"] .inline-label{
-        white-space: normal !important;
-        padding-top: 0.15rem !important;
-      }
-
-      /* dentro do dialog: desliga seus "tighteners" que podem colapsar spacing */
-      div[role="dialog"] div[data-testid="stTextInput"],
-      div[data-testid="stDialog"] div[data-testid="stTextInput"]{
-        margin-top: 0rem !important;
-      }
-
-      div[role="dialog"] div[data-testid="stVerticalBlock"] > div[data-testid="stElementContainer"],
-      div[data-testid="stDialog"] div[data-testid="stVerticalBlock"] > div[data-testid="stElementContainer"]{
-        margin-bottom: 0.55rem !important;
-      }
-
-      /* MRC-SS em vermelho no popup */
-      .mrc-ss-red{
-        color: #c00000 !important;
-      }
-    </style>
-    """,
-    unsafe_allow_html=True,
-)
+def page_stylesheet(name: str):
+    # static/ servido pelo Streamlit (.streamlit/config.toml): cada rerun manda só a tag <link>
+    static = st.get_option("server.enableStaticServing")
+    st.markdown(assets.link_tag(name) if static else assets.style_tag(name), unsafe_allow_html=True)
+
+page_stylesheet("nervo.css")
 
 st.title("Template nervo periférico")
 st.markdown(
@@ -128,6 +102,17 @@ def inline_label_display(label_text: str, value: str):
     with c_box:
         st.text_input("", value=value, disabled=True, label_visibility="collapsed")
 
+def schema_field(key: str):
+    # Widget desenhado a partir do esquema do template (rótulo, placeholder, altura)
+    f = SCHEMA.fields[key]
+    if f.kind == "line":
+        return inline_label_input(f.label, key=f.key, placeholder=f.placeholder)
+    if f.kind == "flag":
+        return st.checkbox(f.label, key=f.key)
+    if f.label:
+        st.markdown(f"**{f.label}**")
+    return text_area_lines("", f.lines, f.key, placeholder=f.placeholder)
+
 def small_mrc_box(key: str):
     return st.text_input(
         "Valor (0–5)",
@@ -135,1046 +120,708 @@ def small_mrc_box(key: str):
         placeholder="0-5",
         label_visibility="collapsed",
         max_chars=1,
+        **track(key),
     )
 
-# =========================================================
-# MRC-SS (calc helper) uses the 12 classic keys
-# =========================================================
-MRC_SS_KEYS = [
-    "mrc_ombro_D", "mrc_ombro_E",
-    "mrc_cotovelo_D", "mrc_cotovelo_E",
-    "mrc_punho_D", "mrc_punho_E",
-    "mrc_quadril_D", "mrc_quadril_E",
-    "mrc_joelho_D", "mrc_joelho_E",
-    "mrc_tornozelo_D", "mrc_tornozelo_E",
-]
-MRC_SS_KEYS_SET = set(MRC_SS_KEYS)
-
-def compute_mrc_ss(mrc_keys_in: list[str]) -> tuple[bool, int | None]:
-    values = []
-    for k in mrc_keys_in:
-        v = st.session_state.get(k, "")
-        if v is None or str(v).strip() == "":
-            return (False, None)
-        try:
-            iv = int(str(v).strip())
-        except ValueError:
-            return (False, None)
-        if iv < 0 or iv > 5:
-            return (False, None)
-        values.append(iv)
-    return (True, sum(values))
-
-# =========================================================
-# HELPERS (EXPORT/IMPORT)
-# =========================================================
-def _norm(text: str) -> str:
-    return (text or "").replace("\r\n", "\n").replace("\r", "\n")
-
-def _get(key: str, default: str = "") -> str:
-    v = st.session_state.get(key, default)
-    if v is None:
-        return ""
-    return str(v).strip()
-
-def _bool_to_txt(v: bool) -> str:
-    return "Sim" if v else "Não"
-
-def _section(title: str, body: str) -> str:
-    body = (body or "").strip()
-    if not body:
-        return ""
-    return f"{title}\n{body}\n"
-
-_SECTION_TITLES = [
-    "IDENTIFICAÇÃO",
-    "HISTÓRIA CLÍNICA",
-    "ANTECEDENTES PATOLÓGICOS",
-    "HISTÓRIA FAMILIAR",
-    "MEDICAÇÕES MODIFICADORAS DE DOENÇA / IMUNOSSUPRESSORES",
-    "EVOLUÇÃO CLÍNICA",
-    "EXAME FÍSICO NEUROLÓGICO",
-    "EXAMES COMPLEMENTARES",
-    "IMPRESSÃO E DISCUSSÃO",
-    "DIAGNÓSTICO / HIPÓTESE DIAGNÓSTICA",
-    "CONDUTA",
-]
-
-def split_sections(text: str) -> dict[str, str]:
-    text = _norm(text).strip()
-    if not text:
-        return {}
-    patt = r"^(%s)\s*$" % "|".join(re.escape(t) for t in _SECTION_TITLES)
-    matches = list(re.finditer(patt, text, flags=re.M))
-    if not matches:
-        return {}
-    out: dict[str, str] = {}
-    for i, m in enumerate(matches):
-        title = m.group(1)
-        start = m.end()
-        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
-        out[title] = text[start:end].strip("\n").strip()
-    return out
-
-def _extract_line_value(body: str, prefix: str) -> str:
-    body = _norm(body)
-    for ln in body.split("\n"):
-        if ln.strip().startswith(prefix):
-            return ln.split(prefix, 1)[1].strip()
-    return ""
-
-def _extract_block(body: str, marker: str, end_markers: list[str]) -> str:
-    body = _norm(body)
-    esc_end = "|".join(re.escape(e) for e in end_markers) if end_markers else ""
-    pattern = (
-        re.escape(marker) + r"\n(.*?)(?=\n(?:" + esc_end + r")|\Z)"
-        if esc_end
-        else re.escape(marker) + r"\n(.*)\Z"
-    )
-    m = re.search(pattern, body, flags=re.S)
-    return (m.group(1).strip() if m else "")
+# Fragment: widgets inside rerun only their own block (fallback: whole page)
+fragment_decorator = getattr(st, "fragment", None)
+if fragment_decorator is None:
+    fragment_decorator = getattr(st, "experimental_fragment", None)
+if fragment_decorator is None:
+    def fragment_decorator(func):
+        return func
+
+def mark_commit(flag: str):
+    # chamado no callback: registra em qual execução completa o clique aconteceu
+    st.session_state[flag] = st.session_state["_script_runs"]
+
+def rerun_after_commit(flag: str):
+    # O callback já gravou o estado. Se o clique rodou só o fragment, os resumos fora
+    # dele precisam de um rerun completo; se a página inteira já rodou, nada a fazer.
+    if st.session_state.pop(flag, None) == st.session_state["_script_runs"]:
+        st.rerun()
 
-# =========================================================
-# NIS (defs + helpers)
-# =========================================================
-NIS_MAX_WEAKNESS = 192
-NIS_MAX_REFLEXES = 20
-NIS_MAX_SENSATION = 32
-NIS_MAX_TOTAL = 244
-
-NIS_WEAKNESS_OPTIONS = [
-    (0.00, "normal"),
-    (1.00, "fraqueza 25%"),
-    (2.00, "fraqueza 50%"),
-    (3.00, "fraqueza 75%"),
-    (3.25, "move apenas contra a gravidade"),
-    (3.50, "move apenas com gravidade eliminada"),
-    (3.75, "contração palpável/visível, sem movimento"),
-    (4.00, "paralisia"),
-]
-NIS_WEAKNESS_VALUES = [v for v, _ in NIS_WEAKNESS_OPTIONS]
-NIS_WEAKNESS_LABEL = {v: t for v, t in NIS_WEAKNESS_OPTIONS}
-
-NIS_RS_OPTIONS = [
-    (0, "normal"),
-    (1, "diminuído"),
-    (2, "ausente"),
-]
-NIS_RS_VALUES = [v for v, _ in NIS_RS_OPTIONS]
-NIS_RS_LABEL = {v: t for v, t in NIS_RS_OPTIONS}
-
-# Structure from the attached form (as provided)
-NIS_WEAKNESS_ITEMS = [
-    ("Nervos cranianos", "Nervo oculomotor", "nis_cn_iii_r", "nis_cn_iii_l"),
-    ("Nervos cranianos", "Nervo abducente", "nis_cn_vi_r", "nis_cn_vi_l"),
-    ("Nervos cranianos", "Fraqueza facial", "nis_cn_facial_r", "nis_cn_facial_l"),
-    ("Nervos cranianos", "Fraqueza de palato", "nis_cn_palato_r", "nis_cn_palato_l"),
-    ("Nervos cranianos", "Fraqueza de língua", "nis_cn_lingua_r", "nis_cn_lingua_l"),
-
-    ("Fraqueza muscular", "Respiratório", "nis_mw_resp_r", "nis_mw_resp_l"),
-    ("Fraqueza muscular", "Flexão cervical", "nis_mw_pescoco_r", "nis_mw_pescoco_l"),
-    ("Fraqueza muscular", "Abdução do ombro", "nis_mw_ombro_r", "nis_mw_ombro_l"),
-    ("Fraqueza muscular", "Flexão do cotovelo", "nis_mw_cotov_flex_r", "nis_mw_cotov_flex_l"),
-    ("Fraqueza muscular", "Braquiorradial", "nis_mw_braq_r", "nis_mw_braq_l"),
-    ("Fraqueza muscular", "Extensão do cotovelo", "nis_mw_cotov_ext_r", "nis_mw_cotov_ext_l"),
-    ("Fraqueza muscular", "Flexão do punho", "nis_mw_punho_flex_r", "nis_mw_punho_flex_l"),
-    ("Fraqueza muscular", "Extensão do punho", "nis_mw_punho_ext_r", "nis_mw_punho_ext_l"),
-    ("Fraqueza muscular", "Flexão dos dedos", "nis_mw_dedos_flex_r", "nis_mw_dedos_flex_l"),
-    ("Fraqueza muscular", "Abdução dos dedos", "nis_mw_dedos_abd_r", "nis_mw_dedos_abd_l"),
-    ("Fraqueza muscular", "Abdução do polegar", "nis_mw_polegar_r", "nis_mw_polegar_l"),
-
-    ("Membros inferiores", "Flexão do quadril", "nis_hip_flex_r", "nis_hip_flex_l"),
-    ("Membros inferiores", "Extensão do quadril", "nis_hip_ext_r", "nis_hip_ext_l"),
-    ("Membros inferiores", "Flexão do joelho", "nis_knee_flex_r", "nis_knee_flex_l"),
-    ("Membros inferiores", "Extensão do joelho", "nis_knee_ext_r", "nis_knee_ext_l"),
-    ("Membros inferiores", "Dorsiflexão do tornozelo", "nis_ankle_df_r", "nis_ankle_df_l"),
-    ("Membros inferiores", "Flexão plantar", "nis_ankle_pf_r", "nis_ankle_pf_l"),
-    ("Membros inferiores", "Extensão do hálux", "nis_toe_ext_r", "nis_toe_ext_l"),
-    ("Membros inferiores", "Flexão do hálux", "nis_toe_flex_r", "nis_toe_flex_l"),
-]
-
-NIS_REFLEX_ITEMS = [
-    ("Reflexos", "Bíceps braquial", "nis_ref_biceps_r", "nis_ref_biceps_l"),
-    ("Reflexos", "Tríceps braquial", "nis_ref_triceps_r", "nis_ref_triceps_l"),
-    ("Reflexos", "Estilorradial", "nis_ref_braq_r", "nis_ref_braq_l"),
-    ("Reflexos", "Patelar", "nis_ref_patellar_r", "nis_ref_patellar_l"),
-    ("Reflexos", "Aquileu", "nis_ref_achilles_r", "nis_ref_achilles_l"),
-]
-
-NIS_SENS_FINGER_ITEMS = [
-    ("Sensibilidade – dedo indicador", "Sensibilidade tátil", "nis_sf_touch_r", "nis_sf_touch_l"),
-    ("Sensibilidade – dedo indicador", "Sensibilidade dolorosa", "nis_sf_pin_r", "nis_sf_pin_l"),
-    ("Sensibilidade – dedo indicador", "Vibração", "nis_sf_vib_r", "nis_sf_vib_l"),
-    ("Sensibilidade – dedo indicador", "Artrestesia", "nis_sf_jps_r", "nis_sf_jps_l"),
-]
-
-NIS_SENS_TOE_ITEMS = [
-    ("Sensibilidade – hálux", "Sensibilidade tátil", "nis_st_touch_r", "nis_st_touch_l"),
-    ("Sensibilidade – hálux", "Sensibilidade dolorosa", "nis_st_pin_r", "nis_st_pin_l"),
-    ("Sensibilidade – hálux", "Vibração", "nis_st_vib_r", "nis_st_vib_l"),
-    ("Sensibilidade – hálux", "Artrestesia", "nis_st_jps_r", "nis_st_jps_l"),
-]
-
-NIS_KEYS_WEAKNESS = [k for _, _, kr, kl in NIS_WEAKNESS_ITEMS for k in (kr, kl)]
-NIS_KEYS_REFLEXES = [k for _, _, kr, kl in NIS_REFLEX_ITEMS for k in (kr, kl)]
-NIS_KEYS_SENSATION = [k for _, _, kr, kl in (NIS_SENS_FINGER_ITEMS + NIS_SENS_TOE_ITEMS) for k in (kr, kl)]
-NIS_ALL_KEYS = NIS_KEYS_WEAKNESS + NIS_KEYS_REFLEXES + NIS_KEYS_SENSATION
-
-def _fmt_score(x: float) -> str:
-    s = f"{float(x):.2f}".rstrip("0").rstrip(".")
-    return s if s else "0"
-
-def init_nis_state():
-    st.session_state.setdefault("nis_open", False)
-    st.session_state.setdefault("nis_total", "")
-
-    for k in NIS_KEYS_WEAKNESS:
-        if k not in st.session_state or st.session_state[k] not in NIS_WEAKNESS_VALUES:
-            st.session_state[k] = 0.00
+# Derivados (MRC-SS, NIS): cada widget de entrada atualiza só a sua parcela da soma
+def _derived_changed(key: str):
+    DERIVED.on_change(st.session_state, key)
 
-    for k in (NIS_KEYS_REFLEXES + NIS_KEYS_SENSATION):
-        if k not in st.session_state or st.session_state[k] not in NIS_RS_VALUES:
-            st.session_state[k] = 0
+def track(key: str) -> dict:
+    return {"on_change": _derived_changed, "args": (key,)}
 
-def compute_nis_components() -> tuple[float, float, float, float]:
-    w = sum(float(st.session_state.get(k, 0.0)) for k in NIS_KEYS_WEAKNESS)
-    r = sum(float(st.session_state.get(k, 0.0)) for k in NIS_KEYS_REFLEXES)
-    s = sum(float(st.session_state.get(k, 0.0)) for k in NIS_KEYS_SENSATION)
-    return w, r, s, (w + r + s)
+# Digitação em lote: cada bloco de texto vira um st.form (um único rerun no "Aplicar")
+@contextmanager
+def entry_block(name: str):
+    if not st.session_state.get("batch_entry", False):
+        yield
+        return
+    with st.form(f"form_{name}", border=False):
+        yield
+        st.form_submit_button("Aplicar")
 
-def nis_row(label: str, key_r: str, key_l: str, *, kind: str):
-    c0, c1, c2, _fill = st.columns([3.2, 1.8, 1.8, 10.0], vertical_alignment="center")
-    with c0:
-        st.markdown(f'<div class="inline-label">{label}</div>', unsafe_allow_html=True)
-    with c1:
-        if kind == "weakness":
-            st.selectbox(
-                "",
-                options=NIS_WEAKNESS_VALUES,
-                key=key_r,
-                format_func=lambda v: NIS_WEAKNESS_LABEL[v],
-                label_visibility="collapsed",
-            )
-        else:
-            st.selectbox(
-                "",
-                options=NIS_RS_VALUES,
-                key=key_r,
-                format_func=lambda v: NIS_RS_LABEL[v],
-                label_visibility="collapsed",
-            )
-    with c2:
-        if kind == "weakness":
-            st.selectbox(
-                "",
-                options=NIS_WEAKNESS_VALUES,
-                key=key_l,
-                format_func=lambda v: NIS_WEAKNESS_LABEL[v],
+# =========================================================
+# PASSO A PASSO (só o passo ativo é desenhado; os demais viram resumo)
+# =========================================================
+SUMMARY_MAX_CHARS = 600
+
+def _go_step(i: int):
+    st.session_state["wizard_step"] = i
+
+def wizard_nav():
+    # barra fixa no topo da página (CSS: .st-key-wizard_nav)
+    if not st.session_state.get("wizard", False):
+        return
+    cur = st.session_state.get("wizard_step", 0)
+    with st.container(key="wizard_nav"):
+        c_prev, c_steps, c_next = st.columns([1.3, 10.0, 1.3], vertical_alignment="center")
+        with c_prev:
+            st.button("◀ Anterior", key="btn_wizard_prev", on_click=_go_step, args=(cur - 1,), disabled=cur == 0)
+        with c_steps:
+            st.radio(
+                "Passo",
+                options=list(range(len(STEPS))),
+                format_func=lambda i: STEPS[i][0],
+                key="wizard_step",
+                horizontal=True,
                 label_visibility="collapsed",
             )
+        with c_next:
+            st.button("Próximo ▶", key="btn_wizard_next", on_click=_go_step, args=(cur + 1,), disabled=cur == len(STEPS) - 1)
+
+def step(i: int) -> bool:
+    # Fora do passo a passo tudo é desenhado. Passo fechado: resumo com o texto que iria
+    # para a exportação (mesmo cache por seção), sem nenhum widget do formulário
+    if not st.session_state.get("wizard", False) or st.session_state.get("wizard_step", 0) == i:
+        return True
+    label, titles = STEPS[i]
+    cache = st.session_state.setdefault("_section_cache", {})
+    text = SCHEMA.summary(st.session_state, titles, cache)
+    with st.container(border=True):
+        c_lbl, c_btn = st.columns([10.0, 1.3], vertical_alignment="center")
+        with c_lbl:
+            st.markdown(f"**{label}**")
+        with c_btn:
+            st.button("Editar", key=f"btn_wizard_edit_{i}", on_click=_go_step, args=(i,))
+        if text:
+            st.text(text if len(text) <= SUMMARY_MAX_CHARS else text[:SUMMARY_MAX_CHARS].rstrip() + " …")
         else:
-            st.selectbox(
-                "",
-                options=NIS_RS_VALUES,
-                key=key_l,
-                format_func=lambda v: NIS_RS_LABEL[v],
-                label_visibility="collapsed",
-            )
+            st.caption("Nada preenchido.")
+    return False
 
 # =========================================================
-# MRC - FULL LIST (for dialog + export/import)
+# GRADES (st.data_editor no lugar de uma caixa por célula: MRC em tabela, NIS)
 # =========================================================
-MRC_ALL_ITEMS_UPPER = [
-    ("Abdução do ombro", "mrc_ombro_D", "mrc_ombro_E"),  # used in MRC-SS
-    ("Adução do ombro", "mrc_ombro_add_D", "mrc_ombro_add_E"),
-    ("Flexores do cotovelo", "mrc_cotovelo_D", "mrc_cotovelo_E"),  # used in MRC-SS
-    ("Extensores do cotovelo", "mrc_cotovelo_ext_D", "mrc_cotovelo_ext_E"),
-    ("Extensores de punho", "mrc_punho_D", "mrc_punho_E"),  # used in MRC-SS
-    ("Flexores de punho", "mrc_punho_flex_D", "mrc_punho_flex_E"),
-    ("Extensores de dedos", "mrc_dedos_ext_D", "mrc_dedos_ext_E"),
-    ("Flexores profundos dos dedos", "mrc_dedos_flexprof_D", "mrc_dedos_flexprof_E"),
-    ("Abdução dos dedos", "mrc_dedos_abd_D", "mrc_dedos_abd_E"),
-    ("Oponência do polegar", "mrc_polegar_op_D", "mrc_polegar_op_E"),
-    ("Abdutor do dedo mínimo", "mrc_minimo_abd_D", "mrc_minimo_abd_E"),
-]
-
-MRC_ALL_ITEMS_LOWER = [
-    ("Flexores de quadril", "mrc_quadril_D", "mrc_quadril_E"),  # used in MRC-SS
-    ("Extensores do quadril", "mrc_quadril_ext_D", "mrc_quadril_ext_E"),
-    ("Abdutores do quadril", "mrc_quadril_abd_D", "mrc_quadril_abd_E"),
-    ("Adutores do quadril", "mrc_quadril_add_D", "mrc_quadril_add_E"),
-    ("Flexores do joelho", "mrc_joelho_flex_D", "mrc_joelho_flex_E"),
-    ("Extensores do joelho", "mrc_joelho_D", "mrc_joelho_E"),  # used in MRC-SS
-    ("Dorsiflexão do pé", "mrc_tornozelo_D", "mrc_tornozelo_E"),  # used in MRC-SS
-    ("Flexão do pé", "mrc_pe_flex_D", "mrc_pe_flex_E"),
-    ("Eversores do pé", "mrc_pe_evers_D", "mrc_pe_evers_E"),
-    ("Inversores do pé", "mrc_pe_invers_D", "mrc_pe_invers_E"),
-    ("Extensores do hálux", "mrc_halux_ext_D", "mrc_halux_ext_E"),
-    ("Flexores do hálux", "mrc_halux_flex_D", "mrc_halux_flex_E"),
-]
-
-MRC_ALL_ITEMS = MRC_ALL_ITEMS_UPPER + MRC_ALL_ITEMS_LOWER
-MRC_ALL_KEYS = [k for _, kd, ke in MRC_ALL_ITEMS for k in (kd, ke)]
-
-def init_mrc_all_state():
-    for k in MRC_ALL_KEYS:
-        st.session_state.setdefault(k, "")
+def _grid_key(name: str, sig: tuple) -> str:
+    # Valores alterados fora da grade (import, limpar, pop-up) trocam a geração da key:
+    # sem isso as edições antigas do data_editor seriam reaplicadas por cima
+    if st.session_state.get(f"_grid_sync_{name}") != sig:
+        st.session_state[f"_grid_gen_{name}"] = st.session_state.get(f"_grid_gen_{name}", 0) + 1
+        st.session_state[f"_grid_sync_{name}"] = sig
+    return f"grid_{name}_{st.session_state[f'_grid_gen_{name}']}"
+
+def _grid_applied(name: str, changed: list[str], errors: list[str], sig, derived: bool = True):
+    if derived:
+        for k in changed:
+            _derived_changed(k)
+    if errors:
+        # editor novo: as células recusadas voltam ao valor gravado
+        st.session_state[f"_grid_errors_{name}"] = errors
+        st.session_state.pop(f"_grid_sync_{name}", None)
+    else:
+        st.session_state[f"_grid_sync_{name}"] = sig()
+
+def _grid_warnings(name: str):
+    errors = st.session_state.pop(f"_grid_errors_{name}", None)
+    if errors:
+        st.warning("Valores não gravados:\n\n" + "\n".join(f"- {e}" for e in errors))
+
+def _mrc_signature(items, marked) -> tuple:
+    return tuple(tuple(r.values()) for r in grid.rows(st.session_state, items, marked))
+
+def _apply_mrc_grid(name: str, wkey: str, items, marked, allow_sign: bool, derived: bool):
+    edits = st.session_state.get(wkey, {}).get("edited_rows", {})
+    changed, errors = grid.apply_edits(st.session_state, items, edits, allow_sign)
+    _grid_applied(name, changed, errors, lambda: _mrc_signature(items, marked), derived)
+
+def mrc_grid(name: str, items, *, marked=frozenset(), allow_sign: bool = False, derived: bool = True):
+    wkey = _grid_key(name, _mrc_signature(items, marked))
+    cell = st.column_config.TextColumn(max_chars=2 if allow_sign else 1, validate=grid.cell_pattern(allow_sign))
+    config = {
+        grid.COL_LABEL: st.column_config.TextColumn(grid.COL_LABEL, disabled=True, width="large"),
+        grid.COL_D: cell,
+        grid.COL_E: cell,
+        grid.COL_VALUE: cell,
+    }
+    if marked:
+        config[grid.COL_MARK] = st.column_config.CheckboxColumn(grid.COL_MARK, disabled=True, width="small")
+    st.data_editor(
+        grid.rows(st.session_state, items, marked),
+        key=wkey,
+        column_config=config,
+        hide_index=True,
+        num_rows="fixed",
+        height=35 * (len(items) + 1) + 3,  # todas as linhas, sem rolagem interna
+        on_change=_apply_mrc_grid,
+        args=(name, wkey, items, marked, allow_sign, derived),
+    )
+    _grid_warnings(name)
+
+def _nis_signature(items) -> tuple:
+    return tuple(st.session_state.get(k) for _grp, _lbl, kr, kl in items for k in (kr, kl))
+
+def _apply_nis_grid(name: str, wkey: str, items, labels):
+    edits = st.session_state.get(wkey, {}).get("edited_rows", {})
+    changed, errors = grid.apply_choice_edits(st.session_state, items, edits, labels)
+    _grid_applied(name, changed, errors, lambda: _nis_signature(items))
+
+def nis_grid(name: str, items, labels: dict):
+    wkey = _grid_key(name, _nis_signature(items))
+    cell = st.column_config.SelectboxColumn(options=list(labels.values()), required=True, width="medium")
+    st.data_editor(
+        grid.choice_rows(st.session_state, items, labels),
+        key=wkey,
+        column_config={
+            grid.COL_GROUP: st.column_config.TextColumn(grid.COL_GROUP, disabled=True),
+            grid.COL_ITEM: st.column_config.TextColumn(grid.COL_ITEM, disabled=True),
+            grid.COL_D: cell,
+            grid.COL_E: cell,
+            grid.COL_POINTS: st.column_config.NumberColumn(grid.COL_POINTS, disabled=True, format="%g", width="small"),
+        },
+        hide_index=True,
+        num_rows="fixed",
+        height=35 * (len(items) + 1) + 3,
+        on_change=_apply_nis_grid,
+        args=(name, wkey, items, labels),
+    )
+    _grid_warnings(name)
+    st.caption(" · ".join(f"{grp}: **{fmt_score(v)}**" for grp, v in grid.group_totals(st.session_state, items).items()))
 
 # =========================================================
-# RESET / IMPORT
+# ARQUIVO LOCAL DE CONSULTAS (opcional: NERVO_ARCHIVE_PATH)
 # =========================================================
-def _dlg_key(k: str) -> str:
-    return f"dlg_{k}"
-
-def _reset_form_state():
-    keys_to_clear = [
-        # Identificação
-        "id_texto",
-        # História clínica
-        "idade_inicio_sintomas", "historia_clinica_texto",
-        # Antecedentes / familiar
-        "antecedentes_patologicos_texto", "historia_familiar_texto",
-        "hf_esporadico", "hf_familiar",
-        # Medicações
-        "tratamento_atual_radio", "trat_em_uso_tempo", "trat_sem_tempo",
-        "meds_atual_previo_texto", "outros_meds_texto", "paciente_transplantado",
-        # Evolução
-        "controle_atual_radio", "evo_estavel_tempo", "evo_descricao_texto", "evo_reabilitacao_texto",
-        "incat_total", "pnd_total", "mrc_ss_total", "nis_total", "outras_escalas_seguimento",
-        # INCAT panel internal
-        "incat_open", "incat_ul", "incat_ll", "radio_incat_ul", "radio_incat_ll",
-        # NIS panel internal
-        "nis_open",
-        # Exame físico
-        "exame_fisico_neuro_texto", "deformidades_osteo_texto",
-        # Exames complementares
-        "exames_enmg", "exames_liquor", "exames_usg_nervos", "exames_biopsia", "exames_demais",
-        # Impressão / dx / conduta
-        "impressao_discussao", "radio_dx_categoria",
-        "dx_genetica_choice", "dx_genetica_outro",
-        "dx_imuno_choice", "dx_imuno_outro",
-        "dx_outras_adquiridas",
-        "dx_outros_diagnosticos",
-        "conduta",
-        # Export/import UI states
-        "export_mode", "export_text", "import_text",
-    ]
-
-    # also clear dialog temp keys
-    dlg_keys = [_dlg_key(k) for k in MRC_ALL_KEYS]
-
-    for k in keys_to_clear + MRC_ALL_KEYS + NIS_ALL_KEYS + dlg_keys:
-        st.session_state.pop(k, None)
-
-def _parse_keyvals_block(block: str) -> dict[str, str]:
-    out: dict[str, str] = {}
-    if not block:
-        return out
-    for ln in _norm(block).split("\n"):
-        ln = ln.strip()
-        if not ln or ln.startswith("#"):
-            continue
-        m = re.match(r"^([A-Za-z0-9_]+)\s*[:=]\s*(.+?)\s*$", ln)
-        if not m:
-            continue
-        out[m.group(1)] = m.group(2).strip()
-    return out
-
-# Backward-compatible aliases for older exports (optional)
-_MRC_LABEL_ALIASES = {
-    "Flexão do cotovelo": "Flexores do cotovelo",
-    "Extensão do punho": "Extensores de punho",
-    "Flexão do quadril": "Flexores de quadril",
-    "Extensão do joelho": "Extensores do joelho",
-    "Dorsiflexão do tornozelo": "Dorsiflexão do pé",
-}
-
-def _import_from_full_export(text: str) -> tuple[bool, str]:
-    secs = split_sections(text)
-    if not secs:
-        return False, "Não foi possível identificar as seções. Confirme se o texto foi exportado por 'Exportar histórico completo'."
-
-    _reset_form_state()
-    init_mrc_all_state()
-    init_nis_state()
-
-    ident = secs.get("IDENTIFICAÇÃO", "")
-    if ident:
-        st.session_state["id_texto"] = _norm(ident).strip()
-
-    hc = secs.get("HISTÓRIA CLÍNICA", "")
-    if hc:
-        hc_n = _norm(hc)
-        idade = _extract_line_value(hc_n, "Idade ao início dos sintomas:")
-        if idade:
-            st.session_state["idade_inicio_sintomas"] = idade
-            lines = [ln for ln in hc_n.split("\n") if not ln.strip().startswith("Idade ao início dos sintomas:")]
-            st.session_state["historia_clinica_texto"] = "\n".join(lines).strip()
-        else:
-            st.session_state["historia_clinica_texto"] = hc_n.strip()
-
-    ap = secs.get("ANTECEDENTES PATOLÓGICOS", "")
-    if ap:
-        st.session_state["antecedentes_patologicos_texto"] = _norm(ap).strip()
-
-    hf = secs.get("HISTÓRIA FAMILIAR", "")
-    if hf:
-        t = _norm(hf).strip()
-        padrao = _extract_line_value(t, "Padrão de herança:")
-        if padrao:
-            st.session_state["hf_esporadico"] = "Esporádico" in padrao
-            st.session_state["hf_familiar"] = "Familiar" in padrao
-            lines = [ln for ln in t.split("\n") if not ln.strip().startswith("Padrão de herança:")]
-            st.session_state["historia_familiar_texto"] = "\n".join(lines).strip()
-        else:
-            st.session_state["historia_familiar_texto"] = t
-
-    meds = secs.get("MEDICAÇÕES MODIFICADORAS DE DOENÇA / IMUNOSSUPRESSORES", "")
-    if meds:
-        t = _norm(meds)
-
-        trat = _extract_line_value(t, "Tratamento atual:")
-        if trat in ["em uso de tratamento medicamentoso", "sem tratamento medicamentoso"]:
-            st.session_state["tratamento_atual_radio"] = trat
-
-        tempo = _extract_line_value(t, "Há quanto tempo:")
-        if tempo:
-            if trat == "em uso de tratamento medicamentoso":
-                st.session_state["trat_em_uso_tempo"] = tempo
-            elif trat == "sem tratamento medicamentoso":
-                st.session_state["trat_sem_tempo"] = tempo
-
-        st.session_state["meds_atual_previo_texto"] = _extract_block(
-            t,
-            "Medicamentos de uso atual ou prévio:",
-            ["Outros medicamentos:", "Paciente transplantado hepático:"],
-        )
-        st.session_state["outros_meds_texto"] = _extract_block(
-            t,
-            "Outros medicamentos:",
-            ["Paciente transplantado hepático:"],
+@st.cache_resource
+def visit_archive() -> VisitArchive | None:
+    # um por processo; cada operação abre a própria conexão (sessões gravam em paralelo)
+    return open_archive()
+
+def _fmt_date(iso: str) -> str:
+    return "/".join(reversed(iso.split("-")))
+
+def _load_last_visit(carry: bool = False):
+    patient = st.session_state.get("archive_patient", "")
+    try:
+        hit = visit_archive().latest(patient, SCHEMA.name)
+        if hit is None:
+            st.session_state["_archive_result"] = (False, "Nenhuma consulta deste prontuário no arquivo local.")
+            return
+        visit_date, state_json = hit[0], SCHEMA.join_parts(hit[1])
+    except (ArchiveError, ValueError) as e:
+        st.session_state["_archive_result"] = (False, str(e))
+        return
+    if carry:
+        cache = st.session_state.setdefault("_section_cache", {})
+        ok, msg = carry_forward_export(st.session_state, state_json, cache=cache)
+        st.session_state["_archive_result"] = (ok, f"Consulta de {_fmt_date(visit_date)}. {msg}" if ok else msg)
+        return
+    ok, msg = import_full_export(st.session_state, state_json)
+    st.session_state["_archive_result"] = (ok, f"Consulta de {_fmt_date(visit_date)} carregada no formulário." if ok else msg)
+
+def archive_visit():
+    # Exportar = consulta pronta: grava o estado estruturado (por seção) no arquivo local, se ativo
+    patient = st.session_state.get("archive_patient", "").strip()
+    if not patient:
+        return
+    try:
+        archive = visit_archive()
+        if archive is None:
+            return
+        visit_date = archive.save(patient, SCHEMA.name, SCHEMA.dump_parts(st.session_state))
+    except ArchiveError as e:
+        st.session_state["_archive_saved"] = (False, str(e))
+        return
+    st.session_state["_archive_saved"] = (True, f"Consulta salva no arquivo local ({patient}, {_fmt_date(visit_date)}).")
+
+def archive_panel():
+    try:
+        archive = visit_archive()
+    except ArchiveError as e:
+        st.error(str(e))
+        return
+    if archive is None:
+        return
+    no_patient = not st.session_state.get("archive_patient", "").strip()
+    c_a1, c_a2, c_a3, _fill = st.columns([3.0, 2.2, 2.6, 5.4], vertical_alignment="bottom")
+    with c_a1:
+        st.text_input("Prontuário do paciente", key="archive_patient", placeholder="Ex.: RGHC 1234567")
+    with c_a2:
+        st.button(
+            "Carregar última consulta",
+            key="btn_archive_load",
+            on_click=_load_last_visit,
+            disabled=no_patient,
         )
-
-        transp = _extract_line_value(t, "Paciente transplantado hepático:")
-        if transp:
-            st.session_state["paciente_transplantado"] = transp.strip().lower().startswith("sim")
-
-    evo = secs.get("EVOLUÇÃO CLÍNICA", "")
-    if evo:
-        t = _norm(evo)
-
-        ctrl = _extract_line_value(t, "Controle atual:")
-        if ctrl in ["estável ou melhorando", "piorando"]:
-            st.session_state["controle_atual_radio"] = ctrl
-
-        tempo = _extract_line_value(t, "Há quanto tempo:")
-        if tempo:
-            st.session_state["evo_estavel_tempo"] = tempo
-
-        desc = _extract_block(
-            t,
-            "Descrição da evolução:",
-            ["Reabilitação:", "NIS:", "NIS_ITENS:", "Escala INCAT:", "MRC-SS:", "Outras escalas e métricas:"],
+    with c_a3:
+        st.button(
+            "Retorno: herdar seções estáveis",
+            key="btn_archive_carry",
+            on_click=_load_last_visit,
+            kwargs={"carry": True},
+            disabled=no_patient,
+            help="Herda da última consulta só identificação, antecedentes patológicos, história familiar e medicações; o resto do formulário fica como está.",
         )
-        if desc:
-            st.session_state["evo_descricao_texto"] = desc
-
-        reab = _extract_block(
-            t,
-            "Reabilitação:",
-            ["NIS:", "NIS_ITENS:", "Escala INCAT:", "MRC-SS:", "Outras escalas e métricas:"],
-        )
-        if reab:
-            st.session_state["evo_reabilitacao_texto"] = reab
-
-        nis = _extract_line_value(t, "NIS:")
-        if nis:
-            st.session_state["nis_total"] = nis
-
-        nis_items_block = _extract_block(
-            t,
-            "NIS_ITENS:",
-            ["Escala INCAT:", "MRC-SS:", "Outras escalas e métricas:"],
-        )
-        kv = _parse_keyvals_block(nis_items_block)
-        for k, v in kv.items():
-            if k in NIS_KEYS_WEAKNESS:
-                try:
-                    fv = float(str(v).replace(",", "."))
-                    if fv in NIS_WEAKNESS_VALUES:
-                        st.session_state[k] = fv
-                except ValueError:
-                    pass
-            elif k in (NIS_KEYS_REFLEXES + NIS_KEYS_SENSATION):
-                try:
-                    iv = int(str(v).strip())
-                    if iv in NIS_RS_VALUES:
-                        st.session_state[k] = iv
-                except ValueError:
-                    pass
-
-        if (not st.session_state.get("nis_total")) and kv:
-            w, r, s, tot = compute_nis_components()
-            st.session_state["nis_total"] = (
-                f"Fraqueza ({_fmt_score(w)}/{NIS_MAX_WEAKNESS}) + "
-                f"Reflexos ({_fmt_score(r)}/{NIS_MAX_REFLEXES}) + "
-                f"Sensibilidade ({_fmt_score(s)}/{NIS_MAX_SENSATION}) = "
-                f"Total ({_fmt_score(tot)}/{NIS_MAX_TOTAL})"
-            )
-
-        incat = _extract_line_value(t, "Escala INCAT:")
-        if incat:
-            st.session_state["incat_total"] = incat
-
-        mrcss = _extract_line_value(t, "MRC-SS:")
-        if mrcss:
-            st.session_state["mrc_ss_total"] = mrcss
-
-        outras = _extract_block(t, "Outras escalas e métricas:", [])
-        if outras:
-            st.session_state["outras_escalas_seguimento"] = outras
-
-    exf = secs.get("EXAME FÍSICO NEUROLÓGICO", "")
-    if exf:
-        t = _norm(exf).strip()
-
-        deform = _extract_block(t, "Deformidades osteoesqueléticas e exame clínico geral:", [])
-        if deform:
-            st.session_state["deformidades_osteo_texto"] = deform
-
-        mrc_block = _extract_block(t, "MRC:", ["Deformidades osteoesqueléticas e exame clínico geral:"])
-
-        idx_mrc = t.find("MRC:\n")
-        idx_def = t.find("Deformidades osteoesqueléticas e exame clínico geral:\n")
-        candidates = [i for i in [idx_mrc, idx_def] if i != -1]
-        split_idx = min(candidates) if candidates else None
-
-        if split_idx is not None:
-            neuro_txt = t[:split_idx].strip()
-            if neuro_txt:
-                st.session_state["exame_fisico_neuro_texto"] = neuro_txt
+    res = st.session_state.pop("_archive_result", None)
+    if res:
+        ok, msg = res
+        if ok:
+            st.success(msg)
         else:
-            if t:
-                st.session_state["exame_fisico_neuro_texto"] = t
-
-        if mrc_block:
-            map_lbl = {lbl: (kd, ke) for (lbl, kd, ke) in MRC_ALL_ITEMS}
-            # add aliases for older labels
-            map_lbl.update({alias: map_lbl[target] for alias, target in _MRC_LABEL_ALIASES.items() if target in map_lbl})
-
-            for ln in mrc_block.split("\n"):
-                ln = ln.strip()
-                if not ln:
-                    continue
-            
-                mm = re.match(r"^(.*?):\s*(.*)$", ln)
-                if not mm:
-                    continue
-            
-                lbl = mm.group(1).strip()
-                rest = mm.group(2).strip()
-            
-                # aceita:
-                # "Grupo: D 5 / E 4"
-                # "Grupo: D 5"
-                # "Grupo: E 4"
-                md = re.search(r"\bD\s*([0-5])\b", rest)
-                me = re.search(r"\bE\s*([0-5])\b", rest)
-            
-                vd = (md.group(1) if md else "").strip()
-                ve = (me.group(1) if me else "").strip()
-
-    if lbl in map_lbl:
-        kd, ke = map_lbl[lbl]
-        if vd:
-            st.session_state[kd] = vd
-        if ve:
-            st.session_state[ke] = ve
-
-        ok_mrc, tot_mrc = compute_mrc_ss(MRC_SS_KEYS)
-        if ok_mrc and tot_mrc is not None:
-            st.session_state["mrc_ss_total"] = str(tot_mrc)
-
-    exc = secs.get("EXAMES COMPLEMENTARES", "")
-    if exc:
-        t = _norm(exc).strip()
-        for prefix, key in [
-            ("ENMG:", "exames_enmg"),
-            ("Líquor:", "exames_liquor"),
-            ("USG nervos:", "exames_usg_nervos"),
-            ("Biópsia:", "exames_biopsia"),
-            ("Demais exames:", "exames_demais"),
-        ]:
-            val = _extract_line_value(t, prefix)
-            if val:
-                st.session_state[key] = val
-
-    imp = secs.get("IMPRESSÃO E DISCUSSÃO", "")
-    if imp:
-        st.session_state["impressao_discussao"] = _norm(imp).strip()
-
-    dx = secs.get("DIAGNÓSTICO / HIPÓTESE DIAGNÓSTICA", "")
-    if dx:
-        t = [ln.strip() for ln in _norm(dx).split("\n") if ln.strip()]
-        if t:
-            cat = t[0]
-            if cat in [
-                "Neuropatia genética",
-                "Neuropatia imunomediada",
-                "Outras neuropatias adquiridas (nutricional, endocrinológica, infecciosa, tóxica, etc.)",
-                "Outros diagnósticos (neurônio motor, junção e músculo)",
-                "Diagnóstico indefinido",
-            ]:
-                st.session_state["radio_dx_categoria"] = cat
-
-            for ln in t[1:]:
-                if ln.startswith("Gene:"):
-                    st.session_state["dx_genetica_choice"] = "Outro"
-                    st.session_state["dx_genetica_outro"] = ln.split("Gene:", 1)[1].strip()
-                if ln.startswith("Subtipo:"):
-                    st.session_state["dx_imuno_choice"] = "Outro"
-                    st.session_state["dx_imuno_outro"] = ln.split("Subtipo:", 1)[1].strip()
-                if ln.startswith("Especifique:"):
-                    extra = ln.split("Especifique:", 1)[1].strip()
-                    if cat == "Outras neuropatias adquiridas (nutricional, endocrinológica, infecciosa, tóxica, etc.)":
-                        st.session_state["dx_outras_adquiridas"] = extra
-                    if cat == "Outros diagnósticos (neurônio motor, junção e músculo)":
-                        st.session_state["dx_outros_diagnosticos"] = extra
-
-    cnd = secs.get("CONDUTA", "")
-    if cnd:
-        st.session_state["conduta"] = _norm(cnd).strip()
-
-    return True, "Importação concluída. Campos ausentes no texto permaneceram em branco."
+            st.warning(msg)
+    st.caption("Ao exportar, o formulário é salvo no arquivo local com este prontuário e a data de hoje.")
+
+def archive_saved_message():
+    res = st.session_state.pop("_archive_saved", None)
+    if res:
+        ok, msg = res
+        if ok:
+            st.caption(msg)
+        else:
+            st.error(msg)
+
+# Retorno: seções herdadas ficam marcadas até o usuário editá-las (o texto delas já está no cache)
+def inherited_note(title: str):
+    if title in SCHEMA.inherited(st.session_state):
+        st.caption("Herdado da consulta anterior, sem alterações.")
 
 # =========================================================
 # IMPORT TRIGGER (runs before UI)
 # =========================================================
 if st.session_state.get("_do_import", False):
     st.session_state["_do_import"] = False
-    ok, msg = _import_from_full_export(st.session_state.get("_import_raw", ""))
+    raw = st.session_state.get("_import_raw", "")
+    if st.session_state.pop("_import_carry", False):
+        ok, msg = carry_forward_export(st.session_state, raw, cache=st.session_state.setdefault("_section_cache", {}))
+    else:
+        ok, msg = import_full_export(st.session_state, raw)
     st.session_state["_import_result"] = (ok, msg)
     st.rerun()
 
 # =========================================================
 # INIT STATES
 # =========================================================
-init_mrc_all_state()
-init_nis_state()
+# As entradas dos derivados ficam em painéis que nem sempre são desenhados: reatribuir
+# a cada execução impede o Streamlit de descartar o valor (e as somas de ficarem defasadas)
+for _k in DERIVED.keys:
+    if _k in st.session_state:
+        st.session_state[_k] = st.session_state[_k]
+
+# Passo a passo e visualização: os widgets fora da tela não são desenhados; reatribuir as
+# chaves do formulário mantém os valores deles pelo mesmo motivo
+if st.session_state.get("wizard", False) or st.session_state.get("visit_view", False):
+    for _k in SCHEMA.data_keys:
+        if _k in st.session_state:
+            st.session_state[_k] = st.session_state[_k]
+
+init_mrc_all_state(st.session_state)
+init_nis_state(st.session_state)
+
+st.toggle(
+    "Digitação em lote",
+    key="batch_entry",
+    help="Os campos de texto de cada bloco só são enviados ao clicar em 'Aplicar' (um recarregamento por bloco).",
+)
+st.toggle(
+    "MRC em tabela",
+    key="mrc_table",
+    help="Cada grade de MRC vira uma tabela editável (um único elemento na tela) em vez de duas caixas por músculo.",
+)
+st.toggle(
+    "Passo a passo",
+    key="wizard",
+    help="Mostra só a seção em edição; as demais aparecem resumidas. Exportar e importar continuam no fim da página.",
+)
+st.toggle(
+    "Visualizar consulta",
+    key="visit_view",
+    help="Consulta inteira em um único bloco somente leitura (o texto da exportação, com as escalas em tabela).",
+)
+archive_panel()
+
+if st.session_state.get("visit_view", False):
+    # Somente leitura: um único bloco montado da exportação, sem nenhum widget do formulário
+    cache = st.session_state.setdefault("_section_cache", {})
+    page_stylesheet("visit.css")
+    st.html(visit_html(SCHEMA.name, st.session_state, cache))
+    st.stop()
+
+wizard_nav()
+
+if step(0):
+    with entry_block("anamnese"):
+        # =========================================================
+        # IDENTIFICAÇÃO
+        # =========================================================
+        st.subheader("Identificação:")
+        inherited_note("IDENTIFICAÇÃO")
+        _ = schema_field("id_texto")
+
+        # =========================================================
+        # 1) História clínica
+        # =========================================================
+        st.subheader("História clínica:")
+
+        _ = schema_field("idade_inicio_sintomas")
+
+        _ = schema_field("historia_clinica_texto")
+
+        # =========================================================
+        # 2) Antecedentes Patológicos
+        # =========================================================
+        st.subheader("Antecedentes Patológicos")
+        inherited_note("ANTECEDENTES PATOLÓGICOS")
+        _ = schema_field("antecedentes_patologicos_texto")
+
+        # =========================================================
+        # 3) História familiar
+        # =========================================================
+        st.subheader("História familiar")
+        inherited_note("HISTÓRIA FAMILIAR")
+        _ = schema_field("historia_familiar_texto")
+
+    c0, c1, c2, _hf_fill = st.columns([2.2, 1.4, 1.4, 10.0], vertical_alignment="center")
+    with c0:
+        st.markdown('<div class="inline-label">Padrão de herança</div>', unsafe_allow_html=True)
+    with c1:
+        esporadico = st.checkbox("Esporádico", key="hf_esporadico")
+    with c2:
+        familiar = st.checkbox("Familiar", key="hf_familiar")
 
-# =========================================================
-# IDENTIFICAÇÃO
-# =========================================================
-st.subheader("Identificação:")
-_ = text_area_lines(label="", lines=1, key="id_texto", placeholder="")
+    if esporadico and familiar:
+        st.warning("Você marcou **Esporádico** e **Familiar** ao mesmo tempo. Se preferir, selecione apenas um.")
 
-# =========================================================
-# 1) História clínica
-# =========================================================
-st.subheader("História clínica:")
+if step(1):
+    # =========================================================
+    # 4) Medicações
+    # =========================================================
+    st.subheader("Medicamentos")
+    inherited_note("MEDICAÇÕES MODIFICADORAS DE DOENÇA / IMUNOSSUPRESSORES")
+    st.markdown("**Tratamento atual:**")
 
-_ = inline_label_input(
-    "Idade ao início dos sintomas",
-    key="idade_inicio_sintomas",
-    placeholder="Ex.: 45",
-)
+    tratamento_atual = st.radio(
+        "",
+        options=TRATAMENTO_OPTIONS,
+        index=None,
+        key="tratamento_atual_radio",
+    )
 
-_ = text_area_lines(
-    label="",
-    lines=10,
-    key="historia_clinica_texto",
-    placeholder="História da moléstia atual",
-)
+    if tratamento_atual == "em uso de tratamento medicamentoso":
+        _ = schema_field("trat_em_uso_tempo")
+    elif tratamento_atual == "sem tratamento medicamentoso":
+        _ = schema_field("trat_sem_tempo")
 
-# =========================================================
-# 2) Antecedentes Patológicos
-# =========================================================
-st.subheader("Antecedentes Patológicos")
-_ = text_area_lines(
-    label="",
-    lines=4,
-    key="antecedentes_patologicos_texto",
-    placeholder="Comorbidades, vícios, exposições ocupacionais/ambientais, histórico de perda ponderal, etc.",
-)
+    with entry_block("medicamentos"):
+        _ = schema_field("meds_atual_previo_texto")
 
-# =========================================================
-# 3) História familiar
-# =========================================================
-st.subheader("História familiar")
-_ = text_area_lines(
-    label="",
-    lines=4,
-    key="historia_familiar_texto",
-    placeholder="Familiares acometidos; estado de saúde de pais, irmãos e filhos; cidade de origem dos pais; consanguinidade; etc.",
-)
+        _ = schema_field("outros_meds_texto")
 
-c0, c1, c2, _hf_fill = st.columns([2.2, 1.4, 1.4, 10.0], vertical_alignment="center")
-with c0:
-    st.markdown('<div class="inline-label">Padrão de herança</div>', unsafe_allow_html=True)
-with c1:
-    esporadico = st.checkbox("Esporádico", key="hf_esporadico")
-with c2:
-    familiar = st.checkbox("Familiar", key="hf_familiar")
+        schema_field("paciente_transplantado")
 
-if esporadico and familiar:
-    st.warning("Você marcou **Esporádico** e **Familiar** ao mesmo tempo. Se preferir, selecione apenas um.")
+    # =========================================================
+    # 5) Evolução clínica
+    # =========================================================
+    st.subheader("Evolução clínica")
+    st.markdown("**Controle atual:**")
 
-# =========================================================
-# 4) Medicações
-# =========================================================
-st.subheader("Medicamentos")
-st.markdown("**Tratamento atual:**")
-
-tratamento_atual = st.radio(
-    "",
-    options=[
-        "em uso de tratamento medicamentoso",
-        "sem tratamento medicamentoso",
-    ],
-    index=None,
-    key="tratamento_atual_radio",
-)
+    controle_atual = st.radio(
+        "",
+        options=CONTROLE_OPTIONS,
+        index=None,
+        key="controle_atual_radio",
+    )
 
-if tratamento_atual == "em uso de tratamento medicamentoso":
-    _ = inline_label_input("há quanto tempo", key="trat_em_uso_tempo", placeholder="Ex.: desde jan/2021")
-elif tratamento_atual == "sem tratamento medicamentoso":
-    _ = inline_label_input("há quanto tempo", key="trat_sem_tempo", placeholder="Ex.: desde jan/2021")
-
-st.markdown("**Histórico de medicamentos modificadores de doença/imunossupressores**")
-_ = text_area_lines(
-    label="",
-    lines=5,
-    key="meds_atual_previo_texto",
-    placeholder=(
-        "Medicamento (uso atual ou prévio), data de início, data de término e motivo da suspensão.\n"
-        "Ex.: Rituximabe 1g D1/D15, início 01/2024, suspensão 07/2024 por infecção"
-    ),
-)
+    if controle_atual == "estável ou melhorando":
+        _ = schema_field("evo_estavel_tempo")
 
-st.markdown("**Outros medicamentos**")
-_ = text_area_lines(label="", lines=5, key="outros_meds_texto", placeholder="")
+    with entry_block("evolucao"):
+        _ = schema_field("evo_descricao_texto")
 
-st.checkbox("Paciente transplantado hepático", key="paciente_transplantado")
+        _ = schema_field("evo_reabilitacao_texto")
 
-# =========================================================
-# 5) Evolução clínica
-# =========================================================
-st.subheader("Evolução clínica")
-st.markdown("**Controle atual:**")
-
-controle_atual = st.radio(
-    "",
-    options=["estável ou melhorando", "piorando"],
-    index=None,
-    key="controle_atual_radio",
-)
+    # =========================================================
+    # INCAT + PND + NIS + MRC-SS display
+    # =========================================================
+    st.session_state.setdefault("incat_open", False)
+    st.session_state.setdefault("incat_ul", 0)
+    st.session_state.setdefault("incat_ll", 0)
+    st.session_state.setdefault("incat_total", "")
+    st.session_state.setdefault("pnd_total", "")
+    st.session_state.setdefault("mrc_ss_total", "")
 
-if controle_atual == "estável ou melhorando":
-    _ = inline_label_input("há quanto tempo", key="evo_estavel_tempo", placeholder="Ex.: desde jan/2021")
+    c_left, c_right = st.columns([2.2, 9.8], vertical_alignment="top")
 
-st.markdown("**Descrição da evolução:**")
-_ = text_area_lines(
-    label="",
-    lines=5,
-    key="evo_descricao_texto",
-    placeholder="Evolução dos sintomas motores, sensitivos e autonômicos. Adesão e efeitos colaterais dos medicamentos.",
-)
+    with c_left:
+        if st.button("Escala INCAT e PND", key="btn_open_incat"):
+            st.session_state["incat_open"] = True
 
-st.markdown("**Reabilitação:**")
-_ = text_area_lines(
-    label="",
-    lines=3,
-    key="evo_reabilitacao_texto",
-    placeholder="Fisioterapia e frequência. Outras modalidades de reabilitação.",
-)
+        if st.button("Escala NIS", key="btn_open_nis"):
+            st.session_state["nis_open"] = True
 
-# =========================================================
-# INCAT + PND + NIS + MRC-SS display
-# =========================================================
-def ll_to_pnd(ll_value: int) -> str:
-    if ll_value == 0:
-        return "PND I"
-    if ll_value == 1:
-        return "PND II"
-    if ll_value == 2:
-        return "PND IIIa"
-    if ll_value in (3, 4):
-        return "PND IIIb"
-    return "PND IV"
-
-st.session_state.setdefault("incat_open", False)
-st.session_state.setdefault("incat_ul", 0)
-st.session_state.setdefault("incat_ll", 0)
-st.session_state.setdefault("incat_total", "")
-st.session_state.setdefault("pnd_total", "")
-st.session_state.setdefault("mrc_ss_total", "")
-
-c_left, c_right = st.columns([2.2, 9.8], vertical_alignment="top")
-
-with c_left:
-    if st.button("Escala INCAT e PND", key="btn_open_incat"):
-        st.session_state["incat_open"] = True
-
-    if st.button("Escala NIS", key="btn_open_nis"):
-        st.session_state["nis_open"] = True
-
-with c_right:
-    st.text_input(
-        "Escala INCAT (MMSS + MMII)",
-        value=st.session_state.get("incat_total") or "Calculada automaticamente",
-        disabled=True,
-    )
-    st.text_input(
-        "Escala PND",
-        value=st.session_state.get("pnd_total") or "Calculada automaticamente",
-        disabled=True,
-    )
+    with c_right:
+        st.text_input(
+            "Escala INCAT (MMSS + MMII)",
+            value=st.session_state.get("incat_total") or "Calculada automaticamente",
+            disabled=True,
+        )
+        st.text_input(
+            "Escala PND",
+            value=st.session_state.get("pnd_total") or "Calculada automaticamente",
+            disabled=True,
+        )
 
-    nis_placeholder = (
-        f"Calculada automaticamente (Fraqueza máx {NIS_MAX_WEAKNESS}; "
-        f"Reflexos máx {NIS_MAX_REFLEXES}; Sensibilidade máx {NIS_MAX_SENSATION}; "
-        f"Total máx {NIS_MAX_TOTAL})"
-    )
-    nis_display_value = (
-        str(st.session_state.get("nis_total", "")).strip()
-        if str(st.session_state.get("nis_total", "")).strip() != ""
-        else nis_placeholder
-    )
-    st.text_input("Escala NIS", value=nis_display_value, disabled=True)
+        nis_placeholder = (
+            f"Calculada automaticamente (Fraqueza máx {NIS_MAX_WEAKNESS}; "
+            f"Reflexos máx {NIS_MAX_REFLEXES}; Sensibilidade máx {NIS_MAX_SENSATION}; "
+            f"Total máx {NIS_MAX_TOTAL})"
+        )
+        nis_display_value = (
+            str(st.session_state.get("nis_total", "")).strip()
+            if str(st.session_state.get("nis_total", "")).strip() != ""
+            else nis_placeholder
+        )
+        st.text_input("Escala NIS", value=nis_display_value, disabled=True)
 
-    mrc_display_value = (
-        str(st.session_state.get("mrc_ss_total", "")).strip()
-        if str(st.session_state.get("mrc_ss_total", "")).strip() != ""
-        else "Calculada automaticamente, conforme exame físico"
-    )
-    st.text_input("Escala MRC-SS", value=mrc_display_value, disabled=True)
-
-# --------------------------
-# INCAT PANEL
-# --------------------------
-if st.session_state["incat_open"]:
-    st.markdown("#### Escala INCAT")
-
-    st.markdown("**Membros Superiores**")
-    ul_options = {
-        0: "0 – Sem problemas nos membros superiores.",
-        1: (
-            "1 – Sintomas em um ou ambos os braços, sem afetar a capacidade de realizar nenhuma das seguintes funções:\n"
-            "• fechar todos os zíperes e botões\n"
-            "• lavar ou pentear o cabelo\n"
-            "• usar faca e garfo juntos\n"
-            "• manusear moedas pequenas"
-        ),
-        2: "2 – Sintomas em um ou ambos os braços, afetando, mas não impedindo, nenhuma das funções acima.",
-        3: "3 – Sintomas em um ou ambos os braços, impedindo uma ou duas das funções listadas acima.",
-        4: "4 – Sintomas em um ou ambos os braços, impedindo três ou todas as funções listadas acima, mas ainda com alguns movimentos propositais possíveis.",
-        5: "5 – Incapacidade de usar qualquer braço para qualquer movimento com finalidade.",
-    }
+        mrc_display_value = (
+            str(st.session_state.get("mrc_ss_total", "")).strip()
+            if str(st.session_state.get("mrc_ss_total", "")).strip() != ""
+            else "Calculada automaticamente, conforme exame físico"
+        )
+        st.text_input("Escala MRC-SS", value=mrc_display_value, disabled=True)
+
+    # --------------------------
+    # INCAT PANEL (fragment)
+    # --------------------------
+    def _save_incat():
+        ul = int(st.session_state.get("radio_incat_ul", 0))
+        ll = int(st.session_state.get("radio_incat_ll", 0))
+        st.session_state["incat_ul"] = ul
+        st.session_state["incat_ll"] = ll
+        st.session_state["incat_total"] = format_incat_total(ul, ll)
+        st.session_state["pnd_total"] = ll_to_pnd(ll)
+        st.session_state["incat_open"] = False
+        mark_commit("_incat_commit")
+
+    def _cancel_incat():
+        st.session_state["incat_open"] = False
+
+    @fragment_decorator
+    def incat_panel():
+        rerun_after_commit("_incat_commit")
+        if not st.session_state.get("incat_open", False):
+            return
+
+        st.markdown("#### Escala INCAT")
+
+        st.markdown("**Membros Superiores**")
+        ul_options = INCAT_UL_OPTIONS
+
+        st.session_state["incat_ul"] = st.radio(
+            "",
+            options=list(ul_options.keys()),
+            format_func=lambda k: ul_options[k],
+            index=list(ul_options.keys()).index(st.session_state.get("incat_ul", 0)),
+            key="radio_incat_ul",
+        )
 
-    st.session_state["incat_ul"] = st.radio(
-        "",
-        options=list(ul_options.keys()),
-        format_func=lambda k: ul_options[k],
-        index=list(ul_options.keys()).index(st.session_state.get("incat_ul", 0)),
-        key="radio_incat_ul",
-    )
+        st.markdown("---")
+        st.markdown("**Marcha (Membros Inferiores)**")
+        ll_options = INCAT_LL_OPTIONS
 
-    st.markdown("---")
-    st.markdown("**Marcha (Membros Inferiores)**")
-    ll_options = {
-        0: "0 – Marcha não afetada.",
-        1: "1 – Marcha afetada, mas caminha independentemente em ambientes externos.",
-        2: "2 – Geralmente necessita apoio unilateral (bengala, muleta simples ou apoio de um braço) para caminhar em ambientes externos.",
-        3: "3 – Geralmente necessita apoio bilateral (duas bengalas, muletas, andador ou apoio de dois braços) para caminhar em ambientes externos.",
-        4: "4 – Geralmente usa cadeira de rodas para se locomover em ambientes externos, mas consegue ficar em pé e andar alguns passos com ajuda.",
-        5: "5 – Restrito à cadeira de rodas, incapaz de ficar em pé ou andar, ou apenas alguns passos mesmo com ajuda.",
-    }
+        st.session_state["incat_ll"] = st.radio(
+            "",
+            options=list(ll_options.keys()),
+            format_func=lambda k: ll_options[k],
+            index=list(ll_options.keys()).index(st.session_state.get("incat_ll", 0)),
+            key="radio_incat_ll",
+        )
 
-    st.session_state["incat_ll"] = st.radio(
-        "",
-        options=list(ll_options.keys()),
-        format_func=lambda k: ll_options[k],
-        index=list(ll_options.keys()).index(st.session_state.get("incat_ll", 0)),
-        key="radio_incat_ll",
-    )
+        ul = int(st.session_state["incat_ul"])
+        ll = int(st.session_state["incat_ll"])
+        total = ul + ll
+        pnd = ll_to_pnd(ll)
+
+        st.markdown(f"**MMSS ({ul}) + MMII ({ll}) = {total}**")
+        st.markdown(f"**PND: {pnd}**")
+
+        b1, b2, _bfill = st.columns([1.4, 1.0, 10.0])
+        with b1:
+            st.button("Salvar INCAT/PND", key="btn_save_incat", type="primary", on_click=_save_incat)
+        with b2:
+            st.button("Cancelar", key="btn_cancel_incat", on_click=_cancel_incat)
+
+    incat_panel()
+
+    # --------------------------
+    # NIS PANEL (fragment)
+    # --------------------------
+    def _save_nis():
+        st.session_state["nis_total"] = format_nis_total(*nis_components(st.session_state))
+        st.session_state["nis_open"] = False
+        mark_commit("_nis_commit")
+
+    def _cancel_nis():
+        st.session_state["nis_open"] = False
+
+    def _all_normal_nis():
+        for k in NIS_KEYS_WEAKNESS:
+            st.session_state[k] = 0.00
+        for k in (NIS_KEYS_REFLEXES + NIS_KEYS_SENSATION):
+            st.session_state[k] = 0
+        DERIVED.rebuild(st.session_state, NIS_ALL_KEYS)
+
+    def _clear_nis():
+        _all_normal_nis()
+        st.session_state["nis_total"] = ""
+        mark_commit("_nis_commit")
+
+    @fragment_decorator
+    def nis_panel():
+        rerun_after_commit("_nis_commit")
+        if not st.session_state.get("nis_open", False):
+            return
 
-    ul = int(st.session_state["incat_ul"])
-    ll = int(st.session_state["incat_ll"])
-    total = ul + ll
-    pnd = ll_to_pnd(ll)
-
-    st.markdown(f"**MMSS ({ul}) + MMII ({ll}) = {total}**")
-    st.markdown(f"**PND: {pnd}**")
-
-    b1, b2, _bfill = st.columns([1.4, 1.0, 10.0])
-    with b1:
-        if st.button("Salvar INCAT/PND", key="btn_save_incat", type="primary"):
-            st.session_state["incat_total"] = f"MMSS ({ul}) + MMII ({ll}) = {total}"
-            st.session_state["pnd_total"] = pnd
-            st.session_state["incat_open"] = False
-            st.rerun()
-    with b2:
-        if st.button("Cancelar", key="btn_cancel_incat"):
-            st.session_state["incat_open"] = False
-            st.rerun()
-
-# --------------------------
-# NIS PANEL
-# --------------------------
-if st.session_state.get("nis_open", False):
-    st.markdown("#### Escala NIS")
-
-    h0, h1, h2, _hf = st.columns([3.2, 1.8, 1.8, 10.0], vertical_alignment="center")
-    with h0:
-        st.markdown("**Item**")
-    with h1:
-        st.markdown("**Direito**")
-    with h2:
-        st.markdown("**Esquerdo**")
-
-    def render_group(title: str, items: list[tuple[str, str, str, str]], kind: str):
-        st.markdown(f"**{title}**")
-        for _grp, lbl, kr, kl in items:
-            nis_row(lbl, kr, kl, kind=kind)
+        st.markdown("#### Escala NIS")
+
+        st.markdown("**Fraqueza**")
+        nis_grid("nis_weakness", NIS_WEAKNESS_ITEMS, NIS_WEAKNESS_LABEL)
+        st.markdown("**Reflexos e sensibilidade**")
+        nis_grid("nis_rs", NIS_REFLEX_ITEMS + NIS_SENS_FINGER_ITEMS + NIS_SENS_TOE_ITEMS, NIS_RS_LABEL)
         st.markdown("---")
 
-    render_group("Nervos cranianos (fraqueza)", [x for x in NIS_WEAKNESS_ITEMS if x[0] == "Nervos cranianos"], kind="weakness")
-    render_group("Fraqueza muscular", [x for x in NIS_WEAKNESS_ITEMS if x[0] == "Fraqueza muscular"], kind="weakness")
-    render_group("Membros inferiores", [x for x in NIS_WEAKNESS_ITEMS if x[0] == "Membros inferiores"], kind="weakness")
-
-    st.markdown("**Reflexos**")
-    for _grp, lbl, kr, kl in NIS_REFLEX_ITEMS:
-        nis_row(lbl, kr, kl, kind="rs")
-    st.markdown("---")
-
-    st.markdown("**Sensibilidade – dedo indicador**")
-    for _grp, lbl, kr, kl in NIS_SENS_FINGER_ITEMS:
-        nis_row(lbl, kr, kl, kind="rs")
-    st.markdown("---")
-
-    st.markdown("**Sensibilidade – hálux**")
-    for _grp, lbl, kr, kl in NIS_SENS_TOE_ITEMS:
-        nis_row(lbl, kr, kl, kind="rs")
-    st.markdown("---")
-
-    w, r, s, t = compute_nis_components()
-    st.markdown(
-        f"**Prévia:** Fraqueza **{_fmt_score(w)}/{NIS_MAX_WEAKNESS}** · "
-        f"Reflexos **{_fmt_score(r)}/{NIS_MAX_REFLEXES}** · "
-        f"Sensibilidade **{_fmt_score(s)}/{NIS_MAX_SENSATION}** · "
-        f"Total **{_fmt_score(t)}/{NIS_MAX_TOTAL}**"
-    )
+        w, r, s, t = nis_components(st.session_state)
+        st.markdown(
+            f"**Prévia:** Fraqueza **{fmt_score(w)}/{NIS_MAX_WEAKNESS}** · "
+            f"Reflexos **{fmt_score(r)}/{NIS_MAX_REFLEXES}** · "
+            f"Sensibilidade **{fmt_score(s)}/{NIS_MAX_SENSATION}** · "
+            f"Total **{fmt_score(t)}/{NIS_MAX_TOTAL}**"
+        )
 
-    b1, b2, b3, _bfill = st.columns([1.4, 1.0, 1.2, 10.0], vertical_alignment="center")
-    with b1:
-        if st.button("Salvar NIS", key="btn_save_nis", type="primary"):
-            w, r, s, t = compute_nis_components()
-            st.session_state["nis_total"] = (
-                f"Fraqueza ({_fmt_score(w)}/{NIS_MAX_WEAKNESS}) + "
-                f"Reflexos ({_fmt_score(r)}/{NIS_MAX_REFLEXES}) + "
-                f"Sensibilidade ({_fmt_score(s)}/{NIS_MAX_SENSATION}) = "
-                f"Total ({_fmt_score(t)}/{NIS_MAX_TOTAL})"
-            )
-            st.session_state["nis_open"] = False
-            st.rerun()
-    with b2:
-        if st.button("Cancelar", key="btn_cancel_nis"):
-            st.session_state["nis_open"] = False
-            st.rerun()
-    with b3:
-        if st.button("Limpar NIS", key="btn_clear_nis"):
-            for k in NIS_KEYS_WEAKNESS:
-                st.session_state[k] = 0.00
-            for k in (NIS_KEYS_REFLEXES + NIS_KEYS_SENSATION):
-                st.session_state[k] = 0
-            st.session_state["nis_total"] = ""
-            st.rerun()
-
-st.markdown("**Outras escalas e métricas de seguimento**")
-_ = text_area_lines(
-    "",
-    5,
-    "outras_escalas_seguimento",
-    placeholder="NIS, dinamometria, tempo de marcha, TUG, RODS, Norfolk, COMPASS-31, etc.",
-)
+        b1, b2, b3, b4, _bfill = st.columns([1.4, 1.0, 1.4, 1.2, 8.6], vertical_alignment="center")
+        with b1:
+            st.button("Salvar NIS", key="btn_save_nis", type="primary", on_click=_save_nis)
+        with b2:
+            st.button("Cancelar", key="btn_cancel_nis", on_click=_cancel_nis)
+        with b3:
+            st.button("Todos normais", key="btn_normal_nis", on_click=_all_normal_nis)
+        with b4:
+            st.button("Limpar NIS", key="btn_clear_nis", on_click=_clear_nis)
+
+    nis_panel()
+
+    with entry_block("escalas"):
+        _ = schema_field("outras_escalas_seguimento")
+
+if step(2):
+    # =========================================================
+    # 6) Exame físico neurológico
+    # =========================================================
+    st.subheader("Exame físico neurológico")
+
+    with entry_block("exame_fisico"):
+        _ = schema_field("exame_fisico_neuro_texto")
+
+    st.markdown("**MRC:**")
+
+    # Keep current muscle groups in main page (same keys)
+    MRC_MAIN_ITEMS = [
+        ("Abdução do ombro:", "mrc_ombro_D", "mrc_ombro_E"),
+        ("Flexão do cotovelo:", "mrc_cotovelo_D", "mrc_cotovelo_E"),
+        ("Extensão do punho:", "mrc_punho_D", "mrc_punho_E"),
+        ("Flexão do quadril:", "mrc_quadril_D", "mrc_quadril_E"),
+        ("Extensão do joelho:", "mrc_joelho_D", "mrc_joelho_E"),
+        ("Dorsiflexão do tornozelo:", "mrc_tornozelo_D", "mrc_tornozelo_E"),
+    ]
 
-# =========================================================
-# 6) Exame físico neurológico
-# =========================================================
-st.subheader("Exame físico neurológico")
+    def mrc_row(label: str, key_d: str, key_e: str):
+        c0, c1, c2, _fill = st.columns([3.2, 1.4, 1.4, 10.0], vertical_alignment="center")
+        with c0:
+            st.markdown(f'<div class="inline-label">{label}</div>', unsafe_allow_html=True)
+        with c1:
+            small_mrc_box(key_d)
+        with c2:
+            small_mrc_box(key_e)
+
+    if st.session_state.get("mrc_table", False):
+        g0, _gf = st.columns([6.0, 10.0])
+        with g0:
+            mrc_grid("mrc_main", MRC_MAIN_ITEMS)
+    else:
+        h0, h1, h2, _hf = st.columns([3.2, 1.4, 1.4, 10.0], vertical_alignment="center")
+        with h0:
+            st.markdown("**Grupo muscular**")
+        with h1:
+            st.markdown("**Direito**")
+        with h2:
+            st.markdown("**Esquerdo**")
 
-_ = text_area_lines(
-    "",
-    5,
-    "exame_fisico_neuro_texto",
-    placeholder="Força, tônus, reflexo, equilíbrio, sensibilidade, nervos cranianos, alterações autonômicas, cognição",
-)
+        for _lbl, _kd, _ke in MRC_MAIN_ITEMS:
+            mrc_row(_lbl, _kd, _ke)
 
-st.markdown("**MRC:**")
+    # =========================================================
+    # MRC FULL DIALOG (use temporary keys to avoid duplicates)
+    # =========================================================
+    dialog_decorator = getattr(st, "dialog", None)
+    if dialog_decorator is None:
+        dialog_decorator = getattr(st, "experimental_dialog", None)
 
-h0, h1, h2, _hf = st.columns([3.2, 1.4, 1.4, 10.0], vertical_alignment="center")
-with h0:
-    st.markdown("**Grupo muscular**")
-with h1:
-    st.markdown("**Direito**")
-with h2:
-    st.markdown("**Esquerdo**")
+    def _dlg_key(k: str) -> str:
+        return f"dlg_{k}"
 
-def mrc_row(label: str, key_d: str, key_e: str):
-    c0, c1, c2, _fill = st.columns([3.2, 1.4, 1.4, 10.0], vertical_alignment="center")
-    with c0:
-        st.markdown(f'<div class="inline-label">{label}</div>', unsafe_allow_html=True)
-    with c1:
-        small_mrc_box(key_d)
-    with c2:
-        small_mrc_box(key_e)
+    def _mrc_all_row_dialog(label_html: str, main_key_d: str, main_key_e: str):
+        # SEM coluna filler: no dialog ela destrói a largura útil
+        c0, c1, c2 = st.columns([6.0, 2.0, 2.0], vertical_alignment="center")
 
-# Keep current muscle groups in main page (same keys)
-mrc_row("Abdução do ombro:", "mrc_ombro_D", "mrc_ombro_E")
-mrc_row("Flexão do cotovelo:", "mrc_cotovelo_D", "mrc_cotovelo_E")
-mrc_row("Extensão do punho:", "mrc_punho_D", "mrc_punho_E")
-mrc_row("Flexão do quadril:", "mrc_quadril_D", "mrc_quadril_E")
-mrc_row("Extensão do joelho:", "mrc_joelho_D", "mrc_joelho_E")
-mrc_row("Dorsiflexão do tornozelo:", "mrc_tornozelo_D", "mrc_tornozelo_E")
+        with c0:
+            st.markdown(f'<div class="inline-label">{label_html}</div>', unsafe_allow_html=True)
 
-# =========================================================
-# MRC FULL DIALOG (use temporary keys to avoid duplicates)
-# =========================================================
-dialog_decorator = getattr(st, "dialog", None)
-if dialog_decorator is None:
-    dialog_decorator = getattr(st, "experimental_dialog", None)
+        with c1:
+            st.text_input(
+                "",
+                key=_dlg_key(main_key_d),
+                placeholder="0-5",
+                label_visibility="collapsed",
+                max_chars=1,
+            )
+
+        with c2:
+            st.text_input(
+                "",
+                key=_dlg_key(main_key_e),
+                placeholder="0-5",
+                label_visibility="collapsed",
+                max_chars=1,
+            )
 
-def _dlg_key(k: str) -> str:
-    return f"dlg_{k}"
+    def _save_mrc_all():
+        # copia do dialog -> main
+        for k in MRC_ALL_KEYS:
+            st.session_state[k] = st.session_state.get(_dlg_key(k), "")
+        DERIVED.rebuild(st.session_state, tuple(MRC_SS_KEYS))
 
-def _mrc_all_row_dialog(label_html: str, main_key_d: str, main_key_e: str):
-    # SEM coluna filler: no dialog ela destrói a largura útil
-    c0, c1, c2 = st.columns([6.0, 2.0, 2.0], vertical_alignment="center")
+        tot2 = MRC_SS_SUM.get(st.session_state)
+        if tot2 is not None:
+            st.session_state["mrc_ss_total"] = str(tot2)
 
-    with c0:
-        st.markdown(f'<div class="inline-label">{label_html}</div>', unsafe_allow_html=True)
+        _close_mrc_all()
 
-    with c1:
-        st.text_input(
-            "",
-            key=_dlg_key(main_key_d),
-            placeholder="0-5",
-            label_visibility="collapsed",
-            max_chars=1,
-        )
+    def _close_mrc_all():
+        # limpa temporários
+        for k in MRC_ALL_KEYS:
+            st.session_state.pop(_dlg_key(k), None)
+        mark_commit("_mrc_all_commit")
 
-    with c2:
-        st.text_input(
-            "",
-            key=_dlg_key(main_key_e),
-            placeholder="0-5",
-            label_visibility="collapsed",
-            max_chars=1,
-        )
+    def _clear_mrc_all():
+        for k in MRC_ALL_KEYS:
+            st.session_state[_dlg_key(k)] = ""
 
-if dialog_decorator is not None:
-    @dialog_decorator("MRC – todos os músculos")
-    def mrc_all_dialog():
+    def _mrc_all_rows_dialog():
         st.markdown("**Membros superiores**")
 
         hh0, hh1, hh2 = st.columns([6.0, 2.0, 2.0], vertical_alignment="center")
@@ -1209,419 +856,176 @@ if dialog_decorator is not None:
             lbl_show = f'<span class="mrc-ss-red">{lbl}:</span>' if is_mrcss_row else f"{lbl}:"
             _mrc_all_row_dialog(lbl_show, kd, ke)
 
-        # prévia do MRC-SS (usando as chaves temporárias do dialog)
-        dlg_mrc_keys = [_dlg_key(k) for k in MRC_SS_KEYS]
-        ok_mrc, tot_mrc = compute_mrc_ss(dlg_mrc_keys)
-
-        st.markdown("---")
-        if ok_mrc and tot_mrc is not None:
-            st.success(f"MRC-SS (prévia): {tot_mrc}")
-        else:
-            st.info("MRC-SS será calculado ao salvar, se os 12 campos do MRC-SS estiverem preenchidos (0–5).")
-
-        b1, b2, b3 = st.columns([1.4, 1.0, 1.2], vertical_alignment="center")
-        with b1:
-            if st.button("Salvar", type="primary", key="btn_mrc_all_save"):
-                # copia do dialog -> main
-                for k in MRC_ALL_KEYS:
-                    st.session_state[k] = st.session_state.get(_dlg_key(k), "")
+    if dialog_decorator is not None:
+        @dialog_decorator("MRC – todos os músculos")
+        def mrc_all_dialog():
+            # Salvar/Cancelar já gravaram o estado no callback: um único rerun fecha o pop-up
+            rerun_after_commit("_mrc_all_commit")
+
+            if st.session_state.get("mrc_table", False):
+                # mesmas chaves temporárias do pop-up; Salvar/Cancelar/Limpar não mudam
+                dlg_marked = frozenset(_dlg_key(k) for k in MRC_SS_KEYS)
+                st.markdown("**Membros superiores**")
+                mrc_grid(
+                    "mrc_all_upper",
+                    [(lbl, _dlg_key(kd), _dlg_key(ke)) for lbl, kd, ke in MRC_ALL_ITEMS_UPPER],
+                    marked=dlg_marked,
+                    derived=False,
+                )
+                st.markdown("**Membros inferiores**")
+                mrc_grid(
+                    "mrc_all_lower",
+                    [(lbl, _dlg_key(kd), _dlg_key(ke)) for lbl, kd, ke in MRC_ALL_ITEMS_LOWER],
+                    marked=dlg_marked,
+                    derived=False,
+                )
+            else:
+                _mrc_all_rows_dialog()
+
+            # prévia do MRC-SS (usando as chaves temporárias do dialog)
+            dlg_mrc_keys = [_dlg_key(k) for k in MRC_SS_KEYS]
+            ok_mrc, tot_mrc = compute_mrc_ss(st.session_state, dlg_mrc_keys)
+
+            st.markdown("---")
+            if ok_mrc and tot_mrc is not None:
+                st.success(f"MRC-SS (prévia): {tot_mrc}")
+            else:
+                st.info("MRC-SS será calculado ao salvar, se os 12 campos do MRC-SS estiverem preenchidos (0–5).")
+
+            b1, b2, b3 = st.columns([1.4, 1.0, 1.2], vertical_alignment="center")
+            with b1:
+                st.button("Salvar", type="primary", key="btn_mrc_all_save", on_click=_save_mrc_all)
+            with b2:
+                st.button("Cancelar", key="btn_mrc_all_cancel", on_click=_close_mrc_all)
+            with b3:
+                st.button("Limpar todos (popup)", key="btn_mrc_all_clear", on_click=_clear_mrc_all)
+
+        def open_mrc_all_dialog():
+            # preenche temporários com valores atuais
+            for k in MRC_ALL_KEYS:
+                st.session_state[_dlg_key(k)] = st.session_state.get(k, "")
+            mrc_all_dialog()
 
-                ok2, tot2 = compute_mrc_ss(MRC_SS_KEYS)
-                if ok2 and tot2 is not None:
-                    st.session_state["mrc_ss_total"] = str(tot2)
-
-                # limpa temporários
-                for k in MRC_ALL_KEYS:
-                    st.session_state.pop(_dlg_key(k), None)
-
-                st.rerun()
-        with b2:
-            if st.button("Cancelar", key="btn_mrc_all_cancel"):
-                for k in MRC_ALL_KEYS:
-                    st.session_state.pop(_dlg_key(k), None)
-                st.rerun()
-        with b3:
-            if st.button("Limpar todos (popup)", key="btn_mrc_all_clear"):
-                for k in MRC_ALL_KEYS:
-                    st.session_state[_dlg_key(k)] = ""
-                st.rerun()
-
-    def open_mrc_all_dialog():
-        # preenche temporários com valores atuais
-        for k in MRC_ALL_KEYS:
-            st.session_state[_dlg_key(k)] = st.session_state.get(k, "")
-        mrc_all_dialog()
-
-else:
-    def open_mrc_all_dialog():
-        st.warning("Sua versão do Streamlit não suporta pop-up (st.dialog). Atualize para usar 'Todos os músculos'.")
-
-# =========================================================
-# MRC-SS buttons row (NOW calling open_mrc_all_dialog)
-# =========================================================
-complete, total = compute_mrc_ss(MRC_SS_KEYS)
-
-bcalc1, bcalc2, bcalc3, _fill = st.columns([2.2, 2.2, 2.2, 10.0], vertical_alignment="center")
-with bcalc1:
-    if complete:
-        if st.button("Calcular MRC-SS", key="btn_calc_mrcss", type="primary"):
-            st.session_state["mrc_ss_total"] = str(total)
-            st.success(f"MRC-SS calculado: {total}")
-            st.rerun()
     else:
-        st.caption("Preencha todos os 12 campos (0–5) para habilitar o cálculo do MRC-SS.")
-with bcalc2:
-    if st.button("Limpar MRC-SS", key="btn_clear_mrcss"):
+        def open_mrc_all_dialog():
+            st.warning("Sua versão do Streamlit não suporta pop-up (st.dialog). Atualize para usar 'Todos os músculos'.")
+
+    # =========================================================
+    # MRC-SS buttons row (NOW calling open_mrc_all_dialog)
+    # =========================================================
+    def _calc_mrcss():
+        tot = MRC_SS_SUM.get(st.session_state)
+        if tot is not None:
+            st.session_state["mrc_ss_total"] = str(tot)
+
+    def _clear_mrcss():
         st.session_state["mrc_ss_total"] = ""
-        st.rerun()
-with bcalc3:
-    if st.button("Todos os músculos", key="btn_open_mrc_all"):
-        open_mrc_all_dialog()
-
-st.markdown("**Deformidades osteoesqueléticas e exame clínico geral:**")
-_ = text_area_lines("", 3, "deformidades_osteo_texto", placeholder="")
-
-# =========================================================
-# Exames complementares
-# =========================================================
-st.subheader("Exames complementares")
-st.markdown("**ENMG**")
-_ = text_area_lines("", 3, "exames_enmg", placeholder="")
-st.markdown("**Líquor**")
-_ = text_area_lines("", 3, "exames_liquor", placeholder="")
-st.markdown("**USG nervos**")
-_ = text_area_lines("", 3, "exames_usg_nervos", placeholder="")
-st.markdown("**Biópsia**")
-_ = text_area_lines("", 3, "exames_biopsia", placeholder="")
-st.markdown("**Demais exames**")
-_ = text_area_lines(
-    "",
-    3,
-    "exames_demais",
-    placeholder="Data e descrição dos demais exames relevantes (laboratoriais, RM, teste genético)",
-)
-
-# =========================================================
-# Impressão e discussão
-# =========================================================
-st.subheader("Impressão e discussão:")
-_ = text_area_lines(
-    "",
-    4,
-    "impressao_discussao",
-    placeholder="Impressão diagnóstica.\nControle atual da doença (estável, progredindo), baseado em quais métricas",
-)
-
-# =========================================================
-# Diagnóstico/Hipótese diagnóstica
-# =========================================================
-st.subheader("Diagnóstico/Hipótese diagnóstica:")
-
-dx_options = [
-    "Neuropatia genética",
-    "Neuropatia imunomediada",
-    "Outras neuropatias adquiridas (nutricional, endocrinológica, infecciosa, tóxica, etc.)",
-    "Outros diagnósticos (neurônio motor, junção e músculo)",
-    "Diagnóstico indefinido",
-]
-dx_categoria = st.radio("", options=dx_options, key="radio_dx_categoria")
-
-if dx_categoria == "Neuropatia genética":
-    with st.expander("Detalhar (Neuropatia genética)", expanded=True):
-        gen_options = ["TTR", "PPOX", "HMBS", "CPOX", "PMP22", "MPZ", "GJB1", "MFN2", "Outro"]
-        dx_genetica_choice = st.radio("Gene:", options=gen_options, key="dx_genetica_choice")
-        if dx_genetica_choice == "Outro":
-            st.text_input("Especifique:", key="dx_genetica_outro", placeholder="Ex.: GDAP1, etc.")
-
-if dx_categoria == "Neuropatia imunomediada":
-    with st.expander("Detalhar (Neuropatia imunomediada)", expanded=True):
-        imuno_options = ["CIDP", "Vasculite", "Ganglionopatia", "Guillain-Barré", "Neuropatia motora multifocal", "Outro"]
-        dx_imuno_choice = st.radio("Especifique:", options=imuno_options, key="dx_imuno_choice")
-        if dx_imuno_choice == "Outro":
-            st.text_input("Especifique", key="dx_imuno_outro", placeholder="Ex.: anti-MAG, paraneoplásica, etc.")
-
-if dx_categoria == "Outras neuropatias adquiridas (nutricional, endocrinológica, infecciosa, tóxica, etc.)":
-    st.text_input(
-        "Especifique:",
-        key="dx_outras_adquiridas",
-        placeholder="Ex.: neuropatia alcoólica / hipotireoidismo / B12 / HIV / quimioterapia / etc.",
-    )
-
-if dx_categoria == "Outros diagnósticos (neurônio motor, junção e músculo)":
-    st.text_input(
-        "Especifique:",
-        key="dx_outros_diagnosticos",
-        placeholder="Ex.: ELA / Miastenia / Miopatia / Doença do neurônio motor / etc.",
-    )
-
-summary = dx_categoria
-if dx_categoria == "Neuropatia genética":
-    choice = st.session_state.get("dx_genetica_choice", "")
-    if choice == "Outro":
-        extra = st.session_state.get("dx_genetica_outro", "").strip()
-        summary += f" | Gene: {extra}" if extra else " | Gene: outro (não especificado)"
-    elif choice:
-        summary += f" | Gene: {choice}"
-
-if dx_categoria == "Neuropatia imunomediada":
-    choice = st.session_state.get("dx_imuno_choice", "")
-    if choice == "Outro":
-        extra = st.session_state.get("dx_imuno_outro", "").strip()
-        summary += f" | Subtipo: {extra}" if extra else " | Subtipo: outro (não especificado)"
-    elif choice:
-        summary += f" | Subtipo: {choice}"
-
-if dx_categoria == "Outras neuropatias adquiridas (nutricional, endocrinológica, infecciosa, tóxica, etc.)":
-    extra = st.session_state.get("dx_outras_adquiridas", "").strip()
-    if extra:
-        summary += f" | Especifique: {extra}"
-
-if dx_categoria == "Outros diagnósticos (neurônio motor, junção e músculo)":
-    extra = st.session_state.get("dx_outros_diagnosticos", "").strip()
-    if extra:
-        summary += f" | Especifique: {extra}"
-
-st.caption(summary)
-
-# =========================================================
-# Conduta
-# =========================================================
-st.subheader("Conduta:")
-_ = text_area_lines("", 4, "conduta", placeholder="")
 
-# =========================================================
-# EXPORT
-# =========================================================
-def _has_any_nis_data() -> bool:
-    for k in NIS_KEYS_WEAKNESS:
-        if float(st.session_state.get(k, 0.0)) != 0.0:
-            return True
-    for k in (NIS_KEYS_REFLEXES + NIS_KEYS_SENSATION):
-        if int(st.session_state.get(k, 0)) != 0:
-            return True
-    return False
+    complete = MRC_SS_SUM.get(st.session_state) is not None
 
-def _add_line(lines: list[str], prefix: str, value: str):
-    v = (value or "").strip()
-    if v:
-        lines.append(f"{prefix}{v}")
-
-def _add_block(lines: list[str], header: str, value: str):
-    v = (value or "").strip()
-    if v:
-        lines.append(f"{header}\n{v}")
-
-def build_export_text(include_all: bool) -> str:
-    parts: list[str] = []
-
-    def add_section(title: str, body_or_lines) -> None:
-        if isinstance(body_or_lines, list):
-            body = "\n".join([str(x).rstrip() for x in body_or_lines if str(x).strip()])
+    bcalc1, bcalc2, bcalc3, _fill = st.columns([2.2, 2.2, 2.2, 10.0], vertical_alignment="center")
+    with bcalc1:
+        if complete:
+            st.button("Calcular MRC-SS", key="btn_calc_mrcss", type="primary", on_click=_calc_mrcss)
         else:
-            body = (str(body_or_lines or "")).strip()
-
-        sec = _section(title, body)
-        if sec.strip():
-            parts.append(sec)
-
-    # =========================
-    # IDENTIFICAÇÃO / HISTÓRIA / ANTECEDENTES / FAMÍLIA
-    # (somente no "histórico completo")
-    # =========================
-    if include_all:
-        add_section("IDENTIFICAÇÃO", _get("id_texto"))
-
-        hc_lines: list[str] = []
-        _add_line(hc_lines, "Idade ao início dos sintomas: ", _get("idade_inicio_sintomas"))
-        hc_txt = _get("historia_clinica_texto")
-        if hc_txt:
-            hc_lines.append(hc_txt)
-        add_section("HISTÓRIA CLÍNICA", hc_lines)
-
-        add_section("ANTECEDENTES PATOLÓGICOS", _get("antecedentes_patologicos_texto"))
-
-        hf_lines: list[str] = []
-        hf_txt = _get("historia_familiar_texto")
-        if hf_txt:
-            hf_lines.append(hf_txt)
-
-        padrao: list[str] = []
-        if st.session_state.get("hf_esporadico"):
-            padrao.append("Esporádico")
-        if st.session_state.get("hf_familiar"):
-            padrao.append("Familiar")
-        if padrao:
-            hf_lines.append(f"Padrão de herança: {', '.join(padrao)}")
-
-        add_section("HISTÓRIA FAMILIAR", hf_lines)
-
-    # =========================
-    # MEDICAÇÕES (na ordem do template)
-    # =========================
-    meds_lines: list[str] = []
-
-    trat = _get("tratamento_atual_radio")
-    _add_line(meds_lines, "Tratamento atual: ", trat)
-
-    tempo = ""
-    if trat == "em uso de tratamento medicamentoso":
-        tempo = _get("trat_em_uso_tempo")
-    elif trat == "sem tratamento medicamentoso":
-        tempo = _get("trat_sem_tempo")
-    _add_line(meds_lines, "Há quanto tempo: ", tempo)
-
-    _add_block(meds_lines, "Medicamentos de uso atual ou prévio:", _get("meds_atual_previo_texto"))
-    _add_block(meds_lines, "Outros medicamentos:", _get("outros_meds_texto"))
-
-    # Checkbox: só exporta se marcado (evita “Não” quando usuário não preencheu intencionalmente)
-    if bool(st.session_state.get("paciente_transplantado")):
-        meds_lines.append("Paciente transplantado hepático: Sim")
-
-    add_section("MEDICAÇÕES MODIFICADORAS DE DOENÇA / IMUNOSSUPRESSORES", meds_lines)
-
-    # =========================
-    # EVOLUÇÃO CLÍNICA (na ordem do template)
-    # =========================
-    evo_lines: list[str] = []
-
-    controle = _get("controle_atual_radio")
-    _add_line(evo_lines, "Controle atual: ", controle)
-
-    if controle == "estável ou melhorando":
-        _add_line(evo_lines, "Há quanto tempo: ", _get("evo_estavel_tempo"))
-
-    _add_block(evo_lines, "Descrição da evolução:", _get("evo_descricao_texto"))
-    _add_block(evo_lines, "Reabilitação:", _get("evo_reabilitacao_texto"))
-
-    # INCAT / PND / NIS / MRC-SS / Outras
-    incat = _get("incat_total")
-    if incat:
-        evo_lines.append(f"Escala INCAT: {incat}")
-
-    pnd = _get("pnd_total")
-    if pnd:
-        evo_lines.append(f"Escala PND: {pnd}")
-
-    nis_any = _has_any_nis_data()
-    nis_sum = _get("nis_total")
-    if nis_any and not nis_sum:
-        w, r, s, tot = compute_nis_components()
-        nis_sum = (
-            f"Fraqueza ({_fmt_score(w)}/{NIS_MAX_WEAKNESS}) + "
-            f"Reflexos ({_fmt_score(r)}/{NIS_MAX_REFLEXES}) + "
-            f"Sensibilidade ({_fmt_score(s)}/{NIS_MAX_SENSATION}) = "
-            f"Total ({_fmt_score(tot)}/{NIS_MAX_TOTAL})"
+            st.caption("Preencha todos os 12 campos (0–5) para habilitar o cálculo do MRC-SS.")
+    with bcalc2:
+        st.button("Limpar MRC-SS", key="btn_clear_mrcss", on_click=_clear_mrcss)
+    with bcalc3:
+        if st.button("Todos os músculos", key="btn_open_mrc_all"):
+            open_mrc_all_dialog()
+
+    with entry_block("deformidades"):
+        _ = schema_field("deformidades_osteo_texto")
+
+if step(3):
+    with entry_block("exames"):
+        # =========================================================
+        # Exames complementares
+        # =========================================================
+        st.subheader("Exames complementares")
+        _ = schema_field("exames_enmg")
+        _ = schema_field("exames_liquor")
+        _ = schema_field("exames_usg_nervos")
+        _ = schema_field("exames_biopsia")
+        _ = schema_field("exames_demais")
+
+        # =========================================================
+        # Impressão e discussão
+        # =========================================================
+        st.subheader("Impressão e discussão:")
+        _ = schema_field("impressao_discussao")
+
+if step(4):
+    # =========================================================
+    # Diagnóstico/Hipótese diagnóstica
+    # =========================================================
+    st.subheader("Diagnóstico/Hipótese diagnóstica:")
+
+    dx_options = DX_CATEGORY_OPTIONS
+    dx_categoria = st.radio("", options=dx_options, key="radio_dx_categoria")
+
+    if dx_categoria == DX_GENETICA:
+        with st.expander("Detalhar (Neuropatia genética)", expanded=True):
+            dx_genetica_choice = st.radio("Gene:", options=DX_GENETICA_OPTIONS, key="dx_genetica_choice")
+            if dx_genetica_choice == "Outro":
+                st.text_input("Especifique:", key="dx_genetica_outro", placeholder="Ex.: GDAP1, etc.")
+
+    if dx_categoria == DX_IMUNO:
+        with st.expander("Detalhar (Neuropatia imunomediada)", expanded=True):
+            dx_imuno_choice = st.radio("Especifique:", options=DX_IMUNO_OPTIONS, key="dx_imuno_choice")
+            if dx_imuno_choice == "Outro":
+                st.text_input("Especifique", key="dx_imuno_outro", placeholder="Ex.: anti-MAG, paraneoplásica, etc.")
+
+    if dx_categoria == DX_OUTRAS_ADQUIRIDAS:
+        st.text_input(
+            "Especifique:",
+            key="dx_outras_adquiridas",
+            placeholder="Ex.: neuropatia alcoólica / hipotireoidismo / B12 / HIV / quimioterapia / etc.",
         )
-    if nis_sum:
-        evo_lines.append(f"NIS: {nis_sum}")
 
-    if nis_any:
-        evo_lines.append("NIS_ITENS:")
-        for k in NIS_KEYS_WEAKNESS:
-            evo_lines.append(f"{k}: {_fmt_score(float(st.session_state.get(k, 0.0)))}")
-        for k in NIS_KEYS_REFLEXES:
-            evo_lines.append(f"{k}: {int(st.session_state.get(k, 0))}")
-        for k in NIS_KEYS_SENSATION:
-            evo_lines.append(f"{k}: {int(st.session_state.get(k, 0))}")
-
-    mrc_ss = _get("mrc_ss_total")
-    if mrc_ss:
-        evo_lines.append(f"MRC-SS: {mrc_ss}")
-
-    _add_block(evo_lines, "Outras escalas e métricas:", _get("outras_escalas_seguimento"))
-
-    add_section("EVOLUÇÃO CLÍNICA", evo_lines)
-
-    # =========================
-    # EXAME FÍSICO NEUROLÓGICO (na ordem do template)
-    # =========================
-    ex_parts: list[str] = []
-
-    exame_neuro = _get("exame_fisico_neuro_texto")
-    if exame_neuro:
-        ex_parts.append(exame_neuro)
-
-    # MRC: inclui só músculos preenchidos; e só lados preenchidos
-    mrc_lines: list[str] = []
-    for label, kd, ke in MRC_ALL_ITEMS:
-        vd = _get(kd)
-        ve = _get(ke)
-        if not vd and not ve:
-            continue
-
-        segs: list[str] = []
-        if vd:
-            segs.append(f"D {vd}")
-        if ve:
-            segs.append(f"E {ve}")
-
-        mrc_lines.append(f"{label}: " + " / ".join(segs))
-
-    if mrc_lines:
-        ex_parts.append("MRC:\n" + "\n".join(mrc_lines))
-
-    deform = _get("deformidades_osteo_texto")
-    if deform:
-        ex_parts.append("Deformidades osteoesqueléticas e exame clínico geral:\n" + deform)
-
-    add_section("EXAME FÍSICO NEUROLÓGICO", "\n\n".join(ex_parts))
-
-    # =========================
-    # EXAMES COMPLEMENTARES (na ordem do template)
-    # =========================
-    exames_lines: list[str] = []
-    _add_line(exames_lines, "ENMG: ", _get("exames_enmg"))
-    _add_line(exames_lines, "Líquor: ", _get("exames_liquor"))
-    _add_line(exames_lines, "USG nervos: ", _get("exames_usg_nervos"))
-    _add_line(exames_lines, "Biópsia: ", _get("exames_biopsia"))
-    _add_line(exames_lines, "Demais exames: ", _get("exames_demais"))
-    add_section("EXAMES COMPLEMENTARES", exames_lines)
-
-    # =========================
-    # IMPRESSÃO / DX / CONDUTA (na ordem do template)
-    # =========================
-    add_section("IMPRESSÃO E DISCUSSÃO", _get("impressao_discussao"))
-
-    dx_lines: list[str] = []
-    dx = _get("radio_dx_categoria")
-    if dx:
-        dx_lines.append(dx)
-
-    if dx == "Neuropatia genética":
-        gene = _get("dx_genetica_choice")
-        if gene and gene != "Outro":
-            dx_lines.append(f"Gene: {gene}")
-        elif gene == "Outro":
-            extra = _get("dx_genetica_outro")
-            if extra:
-                dx_lines.append(f"Gene: {extra}")
-
-    if dx == "Neuropatia imunomediada":
-        sub = _get("dx_imuno_choice")
-        if sub and sub != "Outro":
-            dx_lines.append(f"Subtipo: {sub}")
-        elif sub == "Outro":
-            extra = _get("dx_imuno_outro")
-            if extra:
-                dx_lines.append(f"Subtipo: {extra}")
-
-    if dx == "Outras neuropatias adquiridas (nutricional, endocrinológica, infecciosa, tóxica, etc.)":
-        extra = _get("dx_outras_adquiridas")
-        if extra:
-            dx_lines.append(f"Especifique: {extra}")
+    if dx_categoria == DX_OUTROS_DIAGNOSTICOS:
+        st.text_input(
+            "Especifique:",
+            key="dx_outros_diagnosticos",
+            placeholder="Ex.: ELA / Miastenia / Miopatia / Doença do neurônio motor / etc.",
+        )
 
-    if dx == "Outros diagnósticos (neurônio motor, junção e músculo)":
-        extra = _get("dx_outros_diagnosticos")
+    summary = dx_categoria
+    if dx_categoria == DX_GENETICA:
+        choice = st.session_state.get("dx_genetica_choice", "")
+        if choice == "Outro":
+            extra = st.session_state.get("dx_genetica_outro", "").strip()
+            summary += f" | Gene: {extra}" if extra else " | Gene: outro (não especificado)"
+        elif choice:
+            summary += f" | Gene: {choice}"
+
+    if dx_categoria == DX_IMUNO:
+        choice = st.session_state.get("dx_imuno_choice", "")
+        if choice == "Outro":
+            extra = st.session_state.get("dx_imuno_outro", "").strip()
+            summary += f" | Subtipo: {extra}" if extra else " | Subtipo: outro (não especificado)"
+        elif choice:
+            summary += f" | Subtipo: {choice}"
+
+    if dx_categoria == DX_OUTRAS_ADQUIRIDAS:
+        extra = st.session_state.get("dx_outras_adquiridas", "").strip()
         if extra:
-            dx_lines.append(f"Especifique: {extra}")
+            summary += f" | Especifique: {extra}"
 
-    add_section("DIAGNÓSTICO / HIPÓTESE DIAGNÓSTICA", dx_lines)
-    add_section("CONDUTA", _get("conduta"))
-
-    cleaned = [p for p in parts if p.strip()]
-    return "\n".join(cleaned).strip() + "\n"
+    if dx_categoria == DX_OUTROS_DIAGNOSTICOS:
+        extra = st.session_state.get("dx_outros_diagnosticos", "").strip()
+        if extra:
+            summary += f" | Especifique: {extra}"
 
+    st.caption(summary)
 
+    # =========================================================
+    # Conduta
+    # =========================================================
+    st.subheader("Conduta:")
+    with entry_block("conduta"):
+        _ = schema_field("conduta")
 
 # =========================================================
 # SEÇÃO: EXPORTAR / IMPORTAR (TESTES)
@@ -1643,24 +1047,49 @@ c_exp1, c_exp2, c_exp3 = st.columns([1.2, 1.8, 1.2], vertical_alignment="center"
 with c_exp1:
     if st.button("Exportar evolução", key="btn_export_evolucao"):
         st.session_state["export_mode"] = "evolucao"
+        archive_visit()
 with c_exp2:
     if st.button("Exportar histórico completo", key="btn_export_completo"):
         st.session_state["export_mode"] = "completo"
+        archive_visit()
 with c_exp3:
     if st.button("Trocar modalidade de exportação", key="btn_clear_export"):
         st.session_state["export_mode"] = None
         st.session_state["export_text"] = ""
         st.rerun()
 
+def cached_export(mode: str) -> tuple[str, bytes]:
+    # Texto e bytes do download guardados por modalidade; se mudou algum campo exportado,
+    # só as seções afetadas são refeitas (_section_cache)
+    include_all = mode == "completo"
+    fp = SCHEMA.fingerprint(st.session_state, include_all)
+    cache = st.session_state.setdefault("_export_cache", {})
+    hit = cache.get(mode)
+    if hit is None or hit[0] != fp:
+        sections = st.session_state.setdefault("_section_cache", {})
+        text = build_export_text(st.session_state, include_all=include_all, cache=sections)
+        hit = cache[mode] = (fp, text, text.encode("utf-8"))
+    return hit[1], hit[2]
+
+archive_saved_message()
+
+def cached_json() -> bytes:
+    # Formato estruturado (estado tipado, sem perda): refeito só quando algum campo muda
+    fp = state_fingerprint(st.session_state, SCHEMA.data_keys)
+    cache = st.session_state.setdefault("_export_cache", {})
+    hit = cache.get("json")
+    if hit is None or hit[0] != fp:
+        hit = cache["json"] = (fp, build_export_json(st.session_state).encode("utf-8"))
+    return hit[1]
+
 mode = st.session_state.get("export_mode")
-if mode == "evolucao":
-    export_text = build_export_text(include_all=False)
-    st.session_state["export_text"] = export_text
-elif mode == "completo":
-    export_text = build_export_text(include_all=True)
+if mode in ("evolucao", "completo"):
+    export_text, export_data = cached_export(mode)
     st.session_state["export_text"] = export_text
+    if st.session_state.get("batch_entry", False):
+        st.caption("Digitação em lote: a prévia é atualizada ao clicar em 'Aplicar' nos blocos de texto.")
 else:
-    export_text = ""
+    export_text, export_data = "", b""
 
 if export_text:
     st.text_area(
@@ -1669,13 +1098,24 @@ if export_text:
         height=320,
         key="export_text_area",
     )
-    st.download_button(
-        "Baixar .txt",
-        data=export_text.encode("utf-8"),
-        file_name="template_nervo_export.txt",
-        mime="text/plain",
-        key="download_txt_export",
-    )
+    c_dl1, c_dl2, _ = st.columns([1.0, 1.0, 8.0], vertical_alignment="center")
+    with c_dl1:
+        st.download_button(
+            "Baixar .txt",
+            data=export_data,
+            file_name="template_nervo_export.txt",
+            mime="text/plain",
+            key="download_txt_export",
+        )
+    with c_dl2:
+        st.download_button(
+            "Baixar .json",
+            data=cached_json(),
+            file_name="template_nervo_export.json",
+            mime="application/json",
+            key="download_json_export",
+            help="Formato estruturado: colado abaixo, volta ao formulário sem perda.",
+        )
 
 # =========================================================
 # IMPORTAR PARA O FORMULÁRIO
@@ -1685,7 +1125,8 @@ st.subheader("Importar para o formulário")
 
 st.markdown(
     "<div style='background:#f5f5f5; padding:8px; border-radius:6px; font-size:14px;'>"
-    "A importação funciona apenas para texto no formato exato gerado por <strong>Exportar histórico completo</strong>."
+    "A importação funciona apenas para texto no formato exato gerado por <strong>Exportar histórico completo</strong>"
+    " ou para o conteúdo do <strong>Baixar .json</strong> (lido sem perda)."
     "</div>",
     unsafe_allow_html=True,
 )
@@ -1697,10 +1138,11 @@ st.text_area(
     placeholder="Cole aqui o texto exportado por 'Exportar histórico completo'",
 )
 
-c_i1, c_i2, _ = st.columns([1.8, 1.4, 10.0], vertical_alignment="center")
+c_i1, c_i2, c_i3, _ = st.columns([1.8, 1.8, 1.4, 8.2], vertical_alignment="center")
 
-def _request_import():
+def _request_import(carry: bool = False):
     st.session_state["_import_raw"] = st.session_state.get("import_text", "")
+    st.session_state["_import_carry"] = carry
     st.session_state["_do_import"] = True
 
 with c_i1:
@@ -1712,6 +1154,15 @@ with c_i1:
     )
 
 with c_i2:
+    st.button(
+        "Importar como retorno",
+        key="btn_import_carry",
+        on_click=_request_import,
+        kwargs={"carry": True},
+        help="Consulta de retorno: herda só as seções estáveis (identificação, antecedentes patológicos, história familiar e medicações); o resto do formulário fica como está.",
+    )
+
+with c_i3:
     def clear_import():
         st.session_state["import_text"] = ""
     st.button("Limpar texto colado", key="btn_clear_import", on_click=clear_import)
@@ -1724,3 +1175,11 @@ if res:
     else:
         st.error(msg)
     st.session_state.pop("_import_result", None)
+
+if st.query_params.get("debug") == "1":
+    st.caption(f"Execuções completas do script nesta sessão: {st.session_state['_script_runs']}")
+    problems = DERIVED.check(st.session_state)
+    if problems:
+        st.error("Derivados divergentes do recálculo completo:\n\n" + "\n".join(f"- {p}" for p in problems))
+    else:
+        st.caption("Derivados incrementais conferem com o recálculo completo.")
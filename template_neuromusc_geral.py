@@ -1,298 +1,52 @@
-import re
-import streamlit as st
-from datetime import datetime
-
-try:
-    from zoneinfo import ZoneInfo  # Python 3.9+
-    _TZ_SP = ZoneInfo("America/Sao_Paulo")
-except Exception:
-    _TZ_SP = None
-
-# =========================================================
-# CONSTANTES (usadas pela UI E pelo IMPORT/EXPORT)
-# =========================================================
+from contextlib import contextmanager
 
-VENT_OPTIONS = [
-    "Sem indicação",
-    "Tem indicação de VNI (BiPAP), mas não faz uso",
-    "VNI (BiPAP) – uso noturno",
-    "VNI (BiPAP) – uso diurno e noturno",
-    "Traqueostomia",
-    "Ventilação invasiva permanente",
-]
-
-GENES_OPTIONS = [
-    "Inconclusivo",
-    "ACTA1", "ANO5", "CAPN3", "CHRNE", "CLCN1", "CPT2", "D4Z4", "DES", "DMD", "DMPK", "DOK7",
-    "DUX4", "DYSF", "FKRP", "GAA", "GJB1", "GNE", "LAMA2", "LMNA", "MFN2", "MPZ", "MTM1",
-    "NEB", "PYGM", "RAPSN", "RYR1", "SMN1", "TPM3", "TTN", "TTR", "POMT1", "POMT2",
-    "POMGNT1", "COL6A1", "COL6A2", "COL6A3", "SGCA", "SGCB", "SGCD", "SGCG",
-    "Outro",
-]
-
-TOPO_OPTIONS = [
-    "Central",
-    "Ponta anterior",
-    "Gânglio da raiz dorsal",
-    "Raiz",
-    "Polirradiculoneuropatia",
-    "Polineuropatia",
-    "Mononeuropatia",
-    "Múltiplos nervos",
-    "Junção neuromuscular",
-    "Músculo esquelético",
-    "Funcional",
-    "Outro",
-]
-
-DX_NOSO_OPTIONS = [
-    "Não esclarecido (provavelmente genético)",
-    "Não esclarecido (provavelmente adquirido)",
-    "Atrofia muscular espinhal tipo 1 (SMN1) (G12.0)",
-    "Atrofia muscular espinhal tipo 2 (SMN1) (G12.1)",
-    "Atrofia muscular espinhal tipo 3 (SMN1) (G12.1)",
-    "Atrofia muscular espinhal tipo 4 (SMN1) (G12.1)",
-    "Atrofia espinhal muscular não 5q (G12.1)",
-    "Doenças do neurônio motor (outras formas) (G12.2)",
-    "Esclerose lateral amiotrófica (G12.2)",
-    "Polineuropatia tóxico/metabólica/diabetes (G62–G63)",
-    "Neuropatias sensitivo-motoras hereditárias (CMT) (G60.0)",
-    "Polirradiculoneurite inflamatória aguda ou crônica (G61)",
-    "CIAP (Chronic idiopathic axonal polyneuropathy) (G61)",
-    "Radiculopatias / plexopatias (M54.1)",
-    "Mononeuropatia isolada ou múltipla (vasculítica, hansênica e outras) (G56, G67)",
-    "Miastenia congênita (G70.2)",
-    "Miastenia gravis (G70.0)",
-    "Outras formas de distúrbios da junção (G70)",
-    "Miopatia congênita nemalínica (G71.2)",
-    "Miopatia congênita cores (G71.2)",
-    "Miopatia congênita centronuclear (G71.2)",
-    "Miopatia congênita miotubular / portadoras sintomáticas MTM (G71.2)",
-    "Miopatia congênita – desproporção congênita fibras (G71.2)",
-    "Miopatia congênita não classificada (G71.2)",
-    "Distrofia muscular congênita – Merosina (G71.2)",
-    "Distrofia muscular congênita – Colágeno 6 (G71.2)",
-    "Distrofia muscular congênita – Alfa-distroglicana (G71.2)",
-    "Distrofia muscular congênita – outras formas e não classificadas (G71.2)",
-    "Distrofia muscular de Duchenne (G71.0)",
-    "Distrofia muscular de Becker (G71.0)",
-    "Distrofinopatia – mulher portadora (G71.0)",
-    "Distrofia muscular de cinturas (G71.0)",
-    "Distrofia de Emery-Dreifuss (G71.0)",
-    "Distrofia fascioescapuloumeral (G71.0)",
-    "Distrofia miotônica de Steinert (G71.0)",
-    "Miotonia congênita / paramiotonia / Síndrome hiperexcitabilidade (G72)",
-    "Paralisia periódica (G72)",
-    "Miosite com corpos de inclusão (IBM) (M60)",
-    "Miopatia miofibrilar (G72)",
-    "Miopatia distal (G72)",
-    "Miopatia vacuolar (G72)",
-    "Miopatia associada ao HIV (G72)",
-    "Miopatia de causa sistêmica (G72)",
-    "Miosites outras (M60)",
-    "Glicogenose (Pompe, McArdle, outros) (G72)",
-    "Lipidose (G72)",
-    "Mitocondrial (G71.3)",
-    "Miopatia inespecífica (G72.9)",
-    "Miopatia inflamatória (polimiosite/necrotizante/dermatomiosite) (M33, M33.2)",
-    "Quadro funcional",
-    "Central",
-    "Outros",
-]
-
-# =========================================================
-# IBM-FRS (PT-BR) — conforme PDF anexo
-# =========================================================
+import streamlit as st
 
-def _mm_yyyy_now() -> str:
-    dt = datetime.now(_TZ_SP) if _TZ_SP else datetime.now()
-    return dt.strftime("%m/%Y")
-
-IBM_FRS_ITEMS_PT = [
-    {
-        "n": 1,
-        "title": "Deglutição",
-        "key": "ibmfrs_swallow",
-        "desc": {
-            4: "Normal",
-            3: "Problemas iniciais ao comer — engasgos ocasionais",
-            2: "Mudança na consistência da dieta",
-            1: "Engasgos frequentes",
-            0: "Necessita alimentação por sonda",
-        },
-    },
-    {
-        "n": 2,
-        "title": "Escrita (com a mão dominante)",
-        "key": "ibmfrs_handwriting",
-        "desc": {
-            4: "Normal",
-            3: "Lenta ou “desleixada”; todas as palavras são legíveis",
-            2: "Nem todas as palavras são legíveis",
-            1: "Consegue segurar a caneta, mas é incapaz de escrever",
-            0: "Incapaz de segurar a caneta",
-        },
-    },
-    {
-        "n": 3,
-        "title": "Cortar alimentos e manusear utensílios",
-        "key": "ibmfrs_cutting",
-        "desc": {
-            4: "Normal",
-            3: "Um pouco lento e desajeitado, mas não precisa de ajuda",
-            2: "Corta a maioria dos alimentos, porém lento/desajeitado; precisa de alguma ajuda",
-            1: "Alguém precisa cortar os alimentos, mas ainda consegue se alimentar lentamente",
-            0: "Precisa ser alimentado",
-        },
-    },
-    {
-        "n": 4,
-        "title": "Tarefas motoras finas (abrir portas, usar chaves, pegar objetos pequenos)",
-        "key": "ibmfrs_fine_motor",
-        "desc": {
-            4: "Independente",
-            3: "Lento ou desajeitado para completar a tarefa",
-            2: "Independente, mas requer técnicas modificadas ou dispositivos auxiliares",
-            1: "Frequentemente requer assistência do cuidador",
-            0: "Incapaz",
-        },
-    },
-    {
-        "n": 5,
-        "title": "Vestir-se",
-        "key": "ibmfrs_dressing",
-        "desc": {
-            4: "Normal",
-            3: "Independente, mas com maior esforço ou menor eficiência",
-            2: "Independente, mas requer dispositivos auxiliares ou técnicas modificadas (velcro, camisas sem botões etc.)",
-            1: "Requer assistência do cuidador para algumas peças de roupa",
-            0: "Dependência total",
-        },
-    },
-    {
-        "n": 6,
-        "title": "Higiene (banho e ida ao banheiro)",
-        "key": "ibmfrs_hygiene",
-        "desc": {
-            4: "Normal",
-            3: "Independente, mas com maior esforço ou atividade diminuída",
-            2: "Independente, mas requer dispositivos auxiliares (cadeira de banho, assento de vaso sanitário, etc.)",
-            1: "Requer assistência ocasional do cuidador",
-            0: "Completamente dependente",
-        },
-    },
-    {
-        "n": 7,
-        "title": "Virar na cama e ajustar cobertas/lençóis",
-        "key": "ibmfrs_turning_bed",
-        "desc": {
-            4: "Normal",
-            3: "Um pouco lento e desajeitado, mas não precisa de ajuda",
-            2: "Consegue virar sozinho ou ajustar lençóis, mas com grande dificuldade",
-            1: "Consegue iniciar, mas não consegue virar/ajustar lençóis sozinho",
-            0: "Incapaz ou requer assistência total",
-        },
-    },
-    {
-        "n": 8,
-        "title": "Sentar para ficar em pé (sit-to-stand)",
-        "key": "ibmfrs_sit_to_stand",
-        "desc": {
-            4: "Independente (sem uso dos braços)",
-            3: "Faz com movimentos compensatórios (inclinar para frente, balançar), mas sem usar os braços",
-            2: "Requer uso dos braços",
-            1: "Requer assistência de dispositivo ou de pessoa",
-            0: "Incapaz de ficar em pé",
-        },
-    },
-    {
-        "n": 9,
-        "title": "Marcha",
-        "key": "ibmfrs_walking",
-        "desc": {
-            4: "Normal",
-            3: "Lenta ou com leve instabilidade",
-            2: "Uso intermitente de dispositivo auxiliar (órtese, bengala, andador)",
-            1: "Dependente de dispositivo auxiliar",
-            0: "Dependente de cadeira de rodas",
-        },
-    },
-    {
-        "n": 10,
-        "title": "Subir escadas",
-        "key": "ibmfrs_stairs",
-        "desc": {
-            4: "Normal",
-            3: "Lento, com hesitação ou esforço aumentado; usa corrimão intermitentemente",
-            2: "Dependente do corrimão",
-            1: "Dependente do corrimão e de suporte adicional (bengala ou pessoa)",
-            0: "Não consegue subir escadas",
-        },
-    },
-]
-
-IBM_FRS_EXPORT_ORDER = [
-    ("Deglutição", "ibmfrs_swallow"),
-    ("Escrita", "ibmfrs_handwriting"),
-    ("Alimentação", "ibmfrs_cutting"),
-    ("Destreza", "ibmfrs_fine_motor"),
-    ("Vestir-se", "ibmfrs_dressing"),
-    ("Higiene", "ibmfrs_hygiene"),
-    ("Lençóis", "ibmfrs_turning_bed"),
-    ("Levantar", "ibmfrs_sit_to_stand"),
-    ("Marcha", "ibmfrs_walking"),
-    ("Escadas", "ibmfrs_stairs"),
-]
-
-def _upsert_scale_line(prefix: str, new_line: str, target_key: str = "escalas"):
-    """Remove linhas antigas com o mesmo prefixo e adiciona a nova ao final (sem apagar outras escalas)."""
-    cur = (st.session_state.get(target_key) or "").strip()
-    lines = [ln.strip() for ln in cur.split("\n") if ln.strip()]
-    kept = [ln for ln in lines if not ln.lower().startswith(prefix.lower())]
-    kept.append(new_line.strip())
-    st.session_state[target_key] = "\n".join(kept).strip()
-
-def _build_ibmfrs_line(total: int) -> str:
-    mm_yyyy = _mm_yyyy_now()  # "02/2026"
-    parts = []
-    for lbl, key in IBM_FRS_EXPORT_ORDER:
-        v = int(st.session_state.get(key, 4))
-        parts.append(f"{lbl}.{v}")
-    return f"IBM-FRS ({mm_yyyy}): " + " / ".join(parts) + f" = {total}/40"
-
-# ---------- IMPORT PARSER ----------
-_SECTION_TITLES = [
-    "ANAMNESE",
-    "ANTECEDENTES",
-    "DESENVOLVIMENTO NEUROPSICOMOTOR",
-    "EVOLUÇÃO CLÍNICA",
-    ">> Dispositivos e suporte funcional:",
-    ">> Seguimento multidisciplinar",
-    "EXAME FÍSICO",
-    "EXAMES COMPLEMENTARES",
-    ">> Teste genético",
-    "DIAGNÓSTICO",
-    "IMPRESSÃO",
-    "CONDUTA",
-]
+from nervo_core import assets, grid
+from nervo_core.archive import ArchiveError, VisitArchive, open_archive
+from nervo_core.neuromusc import (
+    DERIVED,
+    DNPM_OPTIONS,
+    FORCA_AXIAL_ITEMS,
+    FORCA_LOWER_ITEMS,
+    FORCA_UPPER_ITEMS,
+    GENES_OPTIONS,
+    IBM_FRS_ITEMS_PT,
+    IBM_FRS_MAX_TOTAL,
+    IBM_FRS_SUM,
+    DX_NOSO_OPTIONS,
+    SCHEMA,
+    STEPS,
+    TG_OPTIONS,
+    TG_REALIZADO,
+    TOPO_OPTIONS,
+    VENT_OPTIONS,
+    build_export_json,
+    build_export_text,
+    carry_forward_export,
+    build_forca_summary,
+    build_func_summary,
+    build_ibmfrs_line,
+    import_full_export,
+    refresh_summaries,
+    upsert_scale_line,
+)
+from nervo_core.view import visit_html
 
 # =========================================================
 # CONFIG + GLOBAL STYLES
 # =========================================================
 st.set_page_config(page_title="Template neuromuscular geral", layout="wide")
 
-st.markdown(
-    """
-    <style>
-      section.main > div.block-container{
-        max-width: 100% !important;
-        padding-left: 2rem !important;
-        padding-right: 2rem !important;
-      }
-    </style>
-    """,
-    unsafe_allow_html=True,
-)
+# Execuções completas do script nesta sessão (exibido com ?debug=1)
+st.session_state["_script_runs"] = st.session_state.get("_script_runs", 0) + 1
+
+def page_stylesheet(name: str):
+    # static/ servido pelo Streamlit (.streamlit/config.toml): cada rerun manda só a tag <link>
+    static = st.get_option("server.enableStaticServing")
+    st.markdown(assets.link_tag(name) if static else assets.style_tag(name), unsafe_allow_html=True)
+
+page_stylesheet("neuromusc.css")
 
 st.title("Template neuromuscular geral")
 
@@ -303,68 +57,12 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
-# Subheaders in medical red + inline label CSS
-st.markdown(
-    """
-    <style>
-      h3 { color: #c00000 !important; }
-      h3 strong { color: #c00000 !important; }
-
-      .inline-label{
-        font-size: 0.95rem;
-        color: #333;
-        padding-top: 0.35rem;
-        white-space: nowrap;
-        word-break: normal;
-        overflow-wrap: normal;
-      }
-    </style>
-    """,
-    unsafe_allow_html=True,
-)
-
-# Tighten vertical spacing
-st.markdown(
-    """
-    <style>
-      div[data-testid="stMarkdown"] p,
-      div[data-testid="stMarkdown"] h1,
-      div[data-testid="stMarkdown"] h2,
-      div[data-testid="stMarkdown"] h3,
-      div[data-testid="stMarkdown"] h4,
-      div[data-testid="stMarkdown"] h5,
-      div[data-testid="stMarkdown"] h6 {
-        margin-bottom: 0.15rem !important;
-        margin-top: 0.15rem !important;
-      }
-
-      div[data-testid="stVerticalBlock"] > div[data-testid="stElementContainer"] {
-        margin-bottom: 0.35rem !important;
-      }
-
-      div[data-testid="stTextArea"],
-      div[data-testid="stRadio"],
-      div[data-testid="stCheckbox"],
-      div[data-testid="stTextInput"],
-      div[data-testid="stSelectbox"],
-      div[data-testid="stMultiSelect"] {
-        margin-top: -0.35rem !important;
-      }
-
-      label, .stTextArea label, .stRadio label, .stCheckbox label {
-        margin-bottom: 0.15rem !important;
-      }
-    </style>
-    """,
-    unsafe_allow_html=True,
-)
-
 # =========================================================
 # HELPERS
 # =========================================================
-def text_area_lines(label: str, lines: int, key: str, placeholder: str = ""):
+def text_area_lines(label: str, lines: int, key: str, placeholder: str = "", **kwargs):
     height_px = max(80, int(lines * 24 + 20))
-    return st.text_area(label, key=key, height=height_px, placeholder=placeholder)
+    return st.text_area(label, key=key, height=height_px, placeholder=placeholder, **kwargs)
 
 def inline_label_input(label_html: str, key: str, placeholder: str = ""):
     c_label, c_input, _fill = st.columns([3.2, 4.2, 10.0], vertical_alignment="center")
@@ -373,6 +71,17 @@ def inline_label_input(label_html: str, key: str, placeholder: str = ""):
     with c_input:
         return st.text_input("", key=key, placeholder=placeholder, label_visibility="collapsed")
 
+def schema_field(key: str):
+    # Widget desenhado a partir do esquema do template (rótulo, placeholder, altura)
+    f = SCHEMA.fields[key]
+    if f.kind == "line":
+        return inline_label_input(f.label, key=f.key, placeholder=f.placeholder)
+    if f.kind == "flag":
+        return st.checkbox(f.label, key=f.key)
+    if f.label:
+        st.markdown(f"**{f.label}**")
+    return text_area_lines("", f.lines, f.key, placeholder=f.placeholder)
+
 def inline_label_input_dnpm(label_text: str, key: str, placeholder: str = ""):
     c_label, c_input = st.columns([5.2, 2.8], vertical_alignment="center")
     with c_label:
@@ -390,176 +99,240 @@ def small_mrc_box(key: str, placeholder: str = "0-5"):
         placeholder=placeholder,
         label_visibility="collapsed",
         max_chars=2,  # UPDATED (was 1)
+        **track(key),
     )
 
-def _get(key: str, default: str = "") -> str:
-    v = st.session_state.get(key, default)
-    if v is None:
-        return ""
-    if isinstance(v, list):
-        return "; ".join([str(x) for x in v if str(x).strip()])
-    return str(v).strip()
+# Fragment: widgets inside rerun only their own block (fallback: whole page)
+fragment_decorator = getattr(st, "fragment", None)
+if fragment_decorator is None:
+    fragment_decorator = getattr(st, "experimental_fragment", None)
+if fragment_decorator is None:
+    def fragment_decorator(func):
+        return func
+
+def mark_commit(flag: str):
+    # chamado no callback: registra em qual execução completa o clique aconteceu
+    st.session_state[flag] = st.session_state["_script_runs"]
+
+def rerun_after_commit(flag: str):
+    # O callback já gravou o estado. Se o clique rodou só o fragment, os resumos fora
+    # dele precisam de um rerun completo; se a página inteira já rodou, nada a fazer.
+    if st.session_state.pop(flag, None) == st.session_state["_script_runs"]:
+        st.rerun()
+
+# Derivados (IBM-FRS, resumos): cada widget de entrada atualiza o que depende dele
+def _derived_changed(key: str):
+    DERIVED.on_change(st.session_state, key)
+
+def track(key: str) -> dict:
+    return {"on_change": _derived_changed, "args": (key,)}
+
+# Digitação em lote: cada bloco de texto vira um st.form (um único rerun no "Aplicar")
+@contextmanager
+def entry_block(name: str):
+    if not st.session_state.get("batch_entry", False):
+        yield
+        return
+    with st.form(f"form_{name}", border=False):
+        yield
+        st.form_submit_button("Aplicar")
 
-def _section(title: str, body: str) -> str:
-    body = (body or "").strip()
-    if not body:
-        return ""
-    return f"{title}\n{body}\n"
+# =========================================================
+# PASSO A PASSO (só o passo ativo é desenhado; os demais viram resumo)
+# =========================================================
+SUMMARY_MAX_CHARS = 600
 
-def _norm(text: str) -> str:
-    return (text or "").replace("\r\n", "\n").replace("\r", "\n")
+def _go_step(i: int):
+    st.session_state["wizard_step"] = i
+
+def wizard_nav():
+    # barra fixa no topo da página (CSS: .st-key-wizard_nav)
+    if not st.session_state.get("wizard", False):
+        return
+    cur = st.session_state.get("wizard_step", 0)
+    with st.container(key="wizard_nav"):
+        c_prev, c_steps, c_next = st.columns([1.3, 10.0, 1.3], vertical_alignment="center")
+        with c_prev:
+            st.button("◀ Anterior", key="btn_wizard_prev", on_click=_go_step, args=(cur - 1,), disabled=cur == 0)
+        with c_steps:
+            st.radio(
+                "Passo",
+                options=list(range(len(STEPS))),
+                format_func=lambda i: STEPS[i][0],
+                key="wizard_step",
+                horizontal=True,
+                label_visibility="collapsed",
+            )
+        with c_next:
+            st.button("Próximo ▶", key="btn_wizard_next", on_click=_go_step, args=(cur + 1,), disabled=cur == len(STEPS) - 1)
+
+def step(i: int) -> bool:
+    # Fora do passo a passo tudo é desenhado. Passo fechado: resumo com o texto que iria
+    # para a exportação (mesmo cache por seção), sem nenhum widget do formulário
+    if not st.session_state.get("wizard", False) or st.session_state.get("wizard_step", 0) == i:
+        return True
+    label, titles = STEPS[i]
+    cache = st.session_state.setdefault("_section_cache", {})
+    refresh_summaries(st.session_state, cache)
+    text = SCHEMA.summary(st.session_state, titles, cache)
+    with st.container(border=True):
+        c_lbl, c_btn = st.columns([10.0, 1.3], vertical_alignment="center")
+        with c_lbl:
+            st.markdown(f"**{label}**")
+        with c_btn:
+            st.button("Editar", key=f"btn_wizard_edit_{i}", on_click=_go_step, args=(i,))
+        if text:
+            st.text(text if len(text) <= SUMMARY_MAX_CHARS else text[:SUMMARY_MAX_CHARS].rstrip() + " …")
+        else:
+            st.caption("Nada preenchido.")
+    return False
 
 # =========================================================
-# RESUMOS (precisam existir ANTES do import)
+# MRC EM TABELA (um st.data_editor por grade no lugar de duas caixas por músculo)
 # =========================================================
-def build_func_summary() -> str:
-    parts: list[str] = []
-
-    # MMII
-    mmii = []
-    if st.session_state.get("mi_marcha_aux"):
-        mmii.append("Marcha com auxiliar de marcha")
-    if st.session_state.get("mi_cr_longas"):
-        mmii.append("Cadeira de rodas para longas distâncias")
-    if st.session_state.get("mi_cr_perm"):
-        mmii.append("Cadeira de rodas permanente")
-    if st.session_state.get("mi_nao_transfere"):
-        mmii.append("Não faz transferências sem ajuda")
-    if mmii:
-        parts.append("MMII: " + "; ".join(mmii))
-
-    perda_idade = _get("perda_marcha_idade")
-    perda_ano = _get("perda_marcha_ano")
-    if perda_idade or perda_ano:
-        msg = "Perda da marcha independente: "
-        if perda_idade:
-            msg += f"idade {perda_idade}"
-        if perda_ano:
-            msg += (" / " if perda_idade else "") + f"ano {perda_ano}"
-        parts.append(msg)
-
-    # MMSS
-    ms = []
-    for lbl, k in [
-        ("Não eleva os braços acima da cabeça", "ms_nao_acima_cabeca"),
-        ("Não eleva os braços acima dos ombros", "ms_nao_acima_ombros"),
-        ("Não faz flexão dos antebraços", "ms_nao_flex_antebraco"),
-    ]:
-        if st.session_state.get(k):
-            ms.append(lbl)
-    if ms:
-        parts.append("MMSS: " + "; ".join(ms))
-
-    # Ventilação
-    vent_line = _get("vent_radio")
-    vent_inicio_idade = _get("vent_inicio_idade")
-    vent_inicio_ano = _get("vent_inicio_ano")
-    vent_info = _get("vent_info_adicional")
-    if vent_line or vent_inicio_idade or vent_inicio_ano or vent_info:
-        vtxt = vent_line if vent_line else ""
-        if vent_inicio_idade or vent_inicio_ano:
-            inicio = "Início: "
-            if vent_inicio_idade:
-                inicio += f"idade {vent_inicio_idade}"
-            if vent_inicio_ano:
-                inicio += (" / " if vent_inicio_idade else "") + f"ano {vent_inicio_ano}"
-            vtxt += (" — " if vtxt else "") + inicio
-        if vent_info:
-            vtxt += (" — " if vtxt else "") + vent_info
-        parts.append("Ventilação: " + vtxt)
-
-    # Ortopédicos
-    ort = []
-    if st.session_state.get("ortese_mi"):
-        ort.append("Órtese MMII")
-    if st.session_state.get("ortese_ms"):
-        ort.append("Órtese MMSS")
-    if st.session_state.get("colete_ortopedico"):
-        ort.append("Colete ortopédico")
-
-    ort_inicio_idade = _get("ort_inicio_idade")
-    ort_inicio_ano = _get("ort_inicio_ano")
-
-    if ort or ort_inicio_idade or ort_inicio_ano:
-        otxt = "; ".join(ort) if ort else ""
-        if ort_inicio_idade or ort_inicio_ano:
-            inicio = "Início: "
-            if ort_inicio_idade:
-                inicio += f"idade {ort_inicio_idade}"
-            if ort_inicio_ano:
-                inicio += (" / " if ort_inicio_idade else "") + f"ano {ort_inicio_ano}"
-            otxt += (" — " if otxt else "") + inicio
-        parts.append("Ortopédicos: " + otxt)
-
-    # Nutrição
-    nut_inicio_idade = _get("nut_inicio_idade")
-    nut_inicio_ano = _get("nut_inicio_ano")
-    if st.session_state.get("nut_gtt") or nut_inicio_idade or nut_inicio_ano:
-        ntxt = "Gastrostomia (GTT)" if st.session_state.get("nut_gtt") else ""
-        if nut_inicio_idade or nut_inicio_ano:
-            inicio = "Início: "
-            if nut_inicio_idade:
-                inicio += f"idade {nut_inicio_idade}"
-            if nut_inicio_ano:
-                inicio += (" / " if nut_inicio_idade else "") + f"ano {nut_inicio_ano}"
-            ntxt += (" — " if ntxt else "") + inicio
-        parts.append("Nutrição: " + ntxt)
-
-    return "\n".join([p for p in parts if p.strip()]).strip()
-
-def build_forca_summary() -> str:
-    lines: list[str] = []
-
-    def add_bilat(lbl: str, kd: str, ke: str):
-        vd = _get(kd)
-        ve = _get(ke)
-        if vd != "" or ve != "":
-            lines.append(f"{lbl}: D {vd or '-'} / E {ve or '-'}")
-
-    # Axial
-    axial = []
-    v = _get("mrc_ext_tronco")
-    if v:
-        axial.append(f"Extensores do tronco {v}")
-    v = _get("mrc_flex_pescoco")
-    if v:
-        axial.append(f"Flexores do pescoço {v}")
-    v = _get("mrc_flex_tronco")
-    if v:
-        axial.append(f"Flexores do tronco {v}")
-    if axial:
-        lines.append("Axiais: " + " | ".join(axial))
-
-    # Upper
-    add_bilat("Abdução do ombro", "mrc_abd_ombro_D", "mrc_abd_ombro_E")
-    add_bilat("Adução do ombro", "mrc_add_ombro_D", "mrc_add_ombro_E")
-    add_bilat("Flexores do cotovelo", "mrc_flex_cotovelo_D", "mrc_flex_cotovelo_E")
-    add_bilat("Extensores do cotovelo", "mrc_ext_cotovelo_D", "mrc_ext_cotovelo_E")
-    add_bilat("Extensores de punho", "mrc_ext_punho_D", "mrc_ext_punho_E")
-    add_bilat("Flexores de punho", "mrc_flex_punho_D", "mrc_flex_punho_E")
-    add_bilat("Extensores de dedos", "mrc_ext_dedos_D", "mrc_ext_dedos_E")
-    add_bilat("Flexores profundos dos dedos", "mrc_fpd_D", "mrc_fpd_E")
-    add_bilat("Abdução dos dedos", "mrc_abd_dedos_D", "mrc_abd_dedos_E")
-    add_bilat("Oponência do polegar", "mrc_op_polegar_D", "mrc_op_polegar_E")
-    add_bilat("Abdutor do dedo mínimo", "mrc_op_minimo_D", "mrc_op_minimo_E")
-
-    # Lower
-    add_bilat("Flexores de quadril", "mrc_flex_quadril_D", "mrc_flex_quadril_E")
-    add_bilat("Extensores do quadril", "mrc_ext_quadril_D", "mrc_ext_quadril_E")
-    add_bilat("Abdutores do quadril", "mrc_abd_quadril_D", "mrc_abd_quadril_E")
-    add_bilat("Adutores do quadril", "mrc_add_quadril_D", "mrc_add_quadril_E")
-    add_bilat("Flexores do joelho", "mrc_flex_joelho_D", "mrc_flex_joelho_E")
-    add_bilat("Extensores do joelho", "mrc_ext_joelho_D", "mrc_ext_joelho_E")
-    add_bilat("Dorsiflexão do pé", "mrc_df_pe_D", "mrc_df_pe_E")
-    add_bilat("Flexão do pé", "mrc_pf_pe_D", "mrc_pf_pe_E")
-    add_bilat("Eversores do pé", "mrc_ev_pe_D", "mrc_ev_pe_E")
-    add_bilat("Inversores do pé", "mrc_inv_pe_D", "mrc_inv_pe_E")
-    add_bilat("Extensores do hálux", "mrc_ext_halux_D", "mrc_ext_halux_E")
-    add_bilat("Flexores do hálux", "mrc_flex_halux_D", "mrc_flex_halux_E")
-
-    if not lines:
-        return ""
-    return "Força motora (MRC): " + " | ".join(lines)
+def _grid_signature(items, marked) -> tuple:
+    return tuple(tuple(r.values()) for r in grid.rows(st.session_state, items, marked))
+
+def _apply_mrc_grid(name: str, wkey: str, items, marked, allow_sign: bool, derived: bool):
+    edits = st.session_state.get(wkey, {}).get("edited_rows", {})
+    changed, errors = grid.apply_edits(st.session_state, items, edits, allow_sign)
+    if derived:
+        for k in changed:
+            _derived_changed(k)
+    if errors:
+        # editor novo: as células recusadas voltam ao valor gravado
+        st.session_state[f"_grid_errors_{name}"] = errors
+        st.session_state.pop(f"_grid_sync_{name}", None)
+    else:
+        st.session_state[f"_grid_sync_{name}"] = _grid_signature(items, marked)
+
+def mrc_grid(name: str, items, *, marked=frozenset(), allow_sign: bool = False, derived: bool = True):
+    # Valores alterados fora da grade (import, limpar, pop-up) trocam a geração da key:
+    # sem isso as edições antigas do data_editor seriam reaplicadas por cima
+    sig = _grid_signature(items, marked)
+    if st.session_state.get(f"_grid_sync_{name}") != sig:
+        st.session_state[f"_grid_gen_{name}"] = st.session_state.get(f"_grid_gen_{name}", 0) + 1
+        st.session_state[f"_grid_sync_{name}"] = sig
+    wkey = f"grid_{name}_{st.session_state[f'_grid_gen_{name}']}"
+
+    cell = st.column_config.TextColumn(max_chars=2 if allow_sign else 1, validate=grid.cell_pattern(allow_sign))
+    config = {
+        grid.COL_LABEL: st.column_config.TextColumn(grid.COL_LABEL, disabled=True, width="large"),
+        grid.COL_D: cell,
+        grid.COL_E: cell,
+        grid.COL_VALUE: cell,
+    }
+    if marked:
+        config[grid.COL_MARK] = st.column_config.CheckboxColumn(grid.COL_MARK, disabled=True, width="small")
+    st.data_editor(
+        grid.rows(st.session_state, items, marked),
+        key=wkey,
+        column_config=config,
+        hide_index=True,
+        num_rows="fixed",
+        height=35 * (len(items) + 1) + 3,  # todas as linhas, sem rolagem interna
+        on_change=_apply_mrc_grid,
+        args=(name, wkey, items, marked, allow_sign, derived),
+    )
+    errors = st.session_state.pop(f"_grid_errors_{name}", None)
+    if errors:
+        st.warning("Valores não gravados:\n\n" + "\n".join(f"- {e}" for e in errors))
+
+# =========================================================
+# ARQUIVO LOCAL DE CONSULTAS (opcional: NERVO_ARCHIVE_PATH)
+# =========================================================
+@st.cache_resource
+def visit_archive() -> VisitArchive | None:
+    # um por processo; cada operação abre a própria conexão (sessões gravam em paralelo)
+    return open_archive()
+
+def _fmt_date(iso: str) -> str:
+    return "/".join(reversed(iso.split("-")))
+
+def _load_last_visit(carry: bool = False):
+    patient = st.session_state.get("archive_patient", "")
+    try:
+        hit = visit_archive().latest(patient, SCHEMA.name)
+        if hit is None:
+            st.session_state["_archive_result"] = (False, "Nenhuma consulta deste prontuário no arquivo local.")
+            return
+        visit_date, state_json = hit[0], SCHEMA.join_parts(hit[1])
+    except (ArchiveError, ValueError) as e:
+        st.session_state["_archive_result"] = (False, str(e))
+        return
+    if carry:
+        cache = st.session_state.setdefault("_section_cache", {})
+        ok, msg = carry_forward_export(st.session_state, state_json, cache=cache)
+        st.session_state["_archive_result"] = (ok, f"Consulta de {_fmt_date(visit_date)}. {msg}" if ok else msg)
+        return
+    ok, msg = import_full_export(st.session_state, state_json)
+    st.session_state["_archive_result"] = (ok, f"Consulta de {_fmt_date(visit_date)} carregada no formulário." if ok else msg)
+
+def archive_visit():
+    # Exportar = consulta pronta: grava o estado estruturado (por seção) no arquivo local, se ativo
+    patient = st.session_state.get("archive_patient", "").strip()
+    if not patient:
+        return
+    try:
+        archive = visit_archive()
+        if archive is None:
+            return
+        visit_date = archive.save(patient, SCHEMA.name, SCHEMA.dump_parts(st.session_state))
+    except ArchiveError as e:
+        st.session_state["_archive_saved"] = (False, str(e))
+        return
+    st.session_state["_archive_saved"] = (True, f"Consulta salva no arquivo local ({patient}, {_fmt_date(visit_date)}).")
+
+def archive_panel():
+    try:
+        archive = visit_archive()
+    except ArchiveError as e:
+        st.error(str(e))
+        return
+    if archive is None:
+        return
+    no_patient = not st.session_state.get("archive_patient", "").strip()
+    c_a1, c_a2, c_a3, _fill = st.columns([3.0, 2.2, 2.6, 5.4], vertical_alignment="bottom")
+    with c_a1:
+        st.text_input("Prontuário do paciente", key="archive_patient", placeholder="Ex.: RGHC 1234567")
+    with c_a2:
+        st.button(
+            "Carregar última consulta",
+            key="btn_archive_load",
+            on_click=_load_last_visit,
+            disabled=no_patient,
+        )
+    with c_a3:
+        st.button(
+            "Retorno: herdar seções estáveis",
+            key="btn_archive_carry",
+            on_click=_load_last_visit,
+            kwargs={"carry": True},
+            disabled=no_patient,
+            help="Herda da última consulta só anamnese, antecedentes e desenvolvimento neuropsicomotor; o resto do formulário fica como está.",
+        )
+    res = st.session_state.pop("_archive_result", None)
+    if res:
+        ok, msg = res
+        if ok:
+            st.success(msg)
+        else:
+            st.warning(msg)
+    st.caption("Ao exportar, o formulário é salvo no arquivo local com este prontuário e a data de hoje.")
+
+def archive_saved_message():
+    res = st.session_state.pop("_archive_saved", None)
+    if res:
+        ok, msg = res
+        if ok:
+            st.caption(msg)
+        else:
+            st.error(msg)
+
+# Retorno: seções herdadas ficam marcadas até o usuário editá-las (o texto delas já está no cache)
+def inherited_note(title: str):
+    if title in SCHEMA.inherited(st.session_state):
+        st.caption("Herdado da consulta anterior, sem alterações.")
 
 # =========================================================
 # SESSION STATE INIT
@@ -575,1203 +348,557 @@ st.session_state.setdefault("_do_import", False)
 # NOVO: Escalas + IBM-FRS modal
 st.session_state.setdefault("escalas", "")
 st.session_state.setdefault("ibmfrs_open", False)
+
+# As entradas dos derivados ficam em painéis que nem sempre são desenhados: reatribuir
+# a cada execução impede o Streamlit de descartar o valor (e os resumos de ficarem defasados)
+for _k in DERIVED.keys:
+    if _k in st.session_state:
+        st.session_state[_k] = st.session_state[_k]
 for it in IBM_FRS_ITEMS_PT:
     st.session_state.setdefault(it["key"], 4)
 
-# =========================================================
-# IMPORT PARSER FUNCS
-# =========================================================
-def split_sections(text: str) -> dict[str, str]:
-    text = _norm(text).strip()
-    if not text:
-        return {}
-    patt = r"^(%s)\s*$" % "|".join(re.escape(t) for t in _SECTION_TITLES)
-    matches = list(re.finditer(patt, text, flags=re.M))
-    if not matches:
-        return {}
-    out: dict[str, str] = {}
-    for i, m in enumerate(matches):
-        title = m.group(1)
-        start = m.end()
-        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
-        out[title] = text[start:end].strip("\n").strip()
-    return out
-
-def _extract_block(body: str, marker: str, end_markers: list[str]) -> str:
-    body = _norm(body)
-    if not end_markers:
-        pattern = re.escape(marker) + r"\n(.*)\Z"
-        m = re.search(pattern, body, flags=re.S)
-        return (m.group(1).strip() if m else "")
-    esc_end = "|".join(re.escape(e) for e in end_markers)
-    pattern = re.escape(marker) + r"\n(.*?)(?=\n(?:" + esc_end + r")|\Z)"
-    m = re.search(pattern, body, flags=re.S)
-    return (m.group(1).strip() if m else "")
-
-def _extract_line_value(body: str, prefix: str) -> str:
-    body = _norm(body)
-    for ln in body.split("\n"):
-        if ln.strip().startswith(prefix):
-            return ln.split(prefix, 1)[1].strip()
-    return ""
-
-def _parse_freq(line: str) -> tuple[bool, str]:
-    # "Nome: 2x/sem" -> (True, "2")
-    m = re.search(r":\s*([0-9]+(?:[.,][0-9]+)?)\s*x/", line)
-    if m:
-        return True, m.group(1).replace(",", ".").strip()
-    return True, ""  # marcou sim, mas não tem número
-
-def _reset_form_state():
-    keys_to_clear = [
-        # Text areas / inputs
-        "Id", "idade_inicio", "idade_diagnostico", "hda",
-        "antecedentes_pessoais", "antecedentes_familiares", "meds_em_uso", "meds_previas",
-        "evolucao",
-        "dnpm_sustento_cefalico", "dnpm_engatinhar", "dnpm_andar_sem_apoio", "dnpm_formar_frases", "dnpm_sentar_meses",
-        "dnpm_ficar_de_pe_anos", "dnpm_andar_com_apoio_anos", "dnpm_primeiras_palavras_anos", "dnpm_controle_esfincteriano_meses",
-        "perda_marcha_idade", "perda_marcha_ano",
-        "vent_inicio_idade", "vent_inicio_ano", "vent_info_adicional",
-        "ort_inicio_idade", "ort_inicio_ano",
-        "nut_inicio_idade", "nut_inicio_ano",
-        "fisio_motora_freq", "fisio_resp_freq", "ambu_freq", "fono_freq", "outras_terapias",
-        "escalas",
-        "neuro_geral",
-        "exame_neuromuscular_especifico", "pele_clinico_geral", "osteo_dismorfismos",
-        "ex_cpk", "ex_enmg", "ex_decremento_jitter", "ex_anticorpos_juncao", "ex_rm_muscular", "ex_biopsia_muscular",
-        "ex_eco", "ex_holter", "ex_espirometria", "ex_polissonografia", "ex_outros",
-        "tg_exame_nome", "tg_data", "tg_local", "tg_gene_outro",
-        "dx_topografico_outro", "dx_noso_outros",
-        "impressao", "conduta",
-        "forca_resumo", "func_resumo", "export_text",
-        # Radios / selects
-        "dnpm_radio", "vent_radio", "tg_radio", "tg_gene_sel", "dx_topografico", "dx_noso_sel",
-        # Checkboxes
-        "mi_marcha_aux", "mi_cr_longas", "mi_cr_perm", "mi_nao_transfere",
-        "ms_nao_acima_cabeca", "ms_nao_acima_ombros", "ms_nao_flex_antebraco",
-        "ortese_mi", "ortese_ms", "colete_ortopedico",
-        "nut_gtt",
-        "fisio_motora_chk", "fisio_resp_chk", "ambu_chk", "fono_chk",
-        # IBM-FRS modal
-        "ibmfrs_open",
-    ]
-
-    # IBM-FRS item keys
-    keys_to_clear += [it["key"] for it in IBM_FRS_ITEMS_PT]
-
-    mrc_keys = [
-        "mrc_ext_tronco", "mrc_flex_pescoco", "mrc_flex_tronco",
-        "mrc_abd_ombro_D", "mrc_abd_ombro_E", "mrc_add_ombro_D", "mrc_add_ombro_E",
-        "mrc_flex_cotovelo_D", "mrc_flex_cotovelo_E", "mrc_ext_cotovelo_D", "mrc_ext_cotovelo_E",
-        "mrc_ext_punho_D", "mrc_ext_punho_E", "mrc_flex_punho_D", "mrc_flex_punho_E",
-        "mrc_ext_dedos_D", "mrc_ext_dedos_E", "mrc_fpd_D", "mrc_fpd_E",
-        "mrc_abd_dedos_D", "mrc_abd_dedos_E", "mrc_op_polegar_D", "mrc_op_polegar_E",
-        "mrc_op_minimo_D", "mrc_op_minimo_E",
-        "mrc_flex_quadril_D", "mrc_flex_quadril_E", "mrc_ext_quadril_D", "mrc_ext_quadril_E",
-        "mrc_abd_quadril_D", "mrc_abd_quadril_E", "mrc_add_quadril_D", "mrc_add_quadril_E",
-        "mrc_flex_joelho_D", "mrc_flex_joelho_E", "mrc_ext_joelho_D", "mrc_ext_joelho_E",
-        "mrc_df_pe_D", "mrc_df_pe_E", "mrc_pf_pe_D", "mrc_pf_pe_E",
-        "mrc_ev_pe_D", "mrc_ev_pe_E", "mrc_inv_pe_D", "mrc_inv_pe_E",
-        "mrc_ext_halux_D", "mrc_ext_halux_E", "mrc_flex_halux_D", "mrc_flex_halux_E",
-    ]
-
-    for k in keys_to_clear + mrc_keys:
-        st.session_state.pop(k, None)
-
-def _import_from_full_export(text: str) -> tuple[bool, str]:
-    """
-    Importa um texto colado cuja formatação esteja exatamente no padrão do
-    'Exportar histórico completo'. Campos ausentes -> ficam em branco.
-    """
-    secs = split_sections(text)
-    if not secs:
-        return False, "Não foi possível identificar as seções. Confirme se o texto foi exportado pelo botão 'Exportar histórico completo'."
-
-    _reset_form_state()
-
-    # --- ANAMNESE ---
-    anam = secs.get("ANAMNESE", "")
-    if anam:
-        st.session_state["Id"] = _extract_block(
-            anam,
-            "# Identificação:",
-            ["Idade de início:", "Idade ao diagnóstico:", "# HMA:"],
-        )
-        st.session_state["idade_inicio"] = _extract_line_value(anam, "Idade de início:")
-        st.session_state["idade_diagnostico"] = _extract_line_value(anam, "Idade ao diagnóstico:")
-        st.session_state["hda"] = _extract_block(anam, "# HMA:", [])
-
-    # --- ANTECEDENTES ---
-    ant = secs.get("ANTECEDENTES", "")
-    if ant:
-        st.session_state["antecedentes_pessoais"] = _extract_block(
-            ant,
-            "# Antecedentes pessoais:",
-            ["# História familiar:", "# Medicações em uso:", "Medicações prévias / motivo da suspensão:"],
-        )
-        st.session_state["antecedentes_familiares"] = _extract_block(
-            ant,
-            "# História familiar:",
-            ["# Medicações em uso:", "Medicações prévias / motivo da suspensão:"],
-        )
-        st.session_state["meds_em_uso"] = _extract_block(
-            ant,
-            "# Medicações em uso:",
-            ["Medicações prévias / motivo da suspensão:"],
-        )
-        st.session_state["meds_previas"] = _extract_block(ant, "Medicações prévias / motivo da suspensão:", [])
-
-    # --- DNPM ---
-    dnpm_txt = secs.get("DESENVOLVIMENTO NEUROPSICOMOTOR", "")
-    if dnpm_txt:
-        m = re.search(r"^Status:\s*(.+)\s*$", _norm(dnpm_txt), flags=re.M)
-        if m:
-            val = m.group(1).strip()
-            if val in ["Normal", "Não sabe informar", "Atraso desenvolvimento"]:
-                st.session_state["dnpm_radio"] = val
-
-        if st.session_state.get("dnpm_radio") == "Atraso desenvolvimento":
-            mm = re.search(r"Marcos:\n(.*)", _norm(dnpm_txt), flags=re.S)
-            if mm:
-                map_milestones = {
-                    "Sustento cefálico": "dnpm_sustento_cefalico",
-                    "Engatinhar": "dnpm_engatinhar",
-                    "Andar sem apoio": "dnpm_andar_sem_apoio",
-                    "Formar frases": "dnpm_formar_frases",
-                    "Sentar (meses)": "dnpm_sentar_meses",
-                    "Ficar de pé (anos)": "dnpm_ficar_de_pe_anos",
-                    "Andar com apoio (anos)": "dnpm_andar_com_apoio_anos",
-                    "Primeiras palavras (anos)": "dnpm_primeiras_palavras_anos",
-                    "Controle esfincteriano (meses)": "dnpm_controle_esfincteriano_meses",
-                }
-                for ln in mm.group(1).split("\n"):
-                    if ":" in ln:
-                        k, v = ln.split(":", 1)
-                        k = k.strip()
-                        v = v.strip()
-                        if k in map_milestones:
-                            st.session_state[map_milestones[k]] = v
-
-    # --- EVOLUÇÃO ---
-    st.session_state["evolucao"] = secs.get("EVOLUÇÃO CLÍNICA", "").strip()
-
-    # --- DISPOSITIVOS E SUPORTE FUNCIONAL ---
-    func = secs.get(">> Dispositivos e suporte funcional:", "")
-    if func:
-        for ln in _norm(func).split("\n"):
-            l = ln.strip()
-            if l.startswith("MMII:"):
-                items = [x.strip() for x in l.split("MMII:", 1)[1].split(";") if x.strip()]
-                st.session_state["mi_marcha_aux"] = any("Marcha com auxiliar" in x for x in items)
-                st.session_state["mi_cr_longas"] = any("longas distâncias" in x for x in items)
-                st.session_state["mi_cr_perm"] = any("permanente" in x for x in items)
-                st.session_state["mi_nao_transfere"] = any("transferências" in x for x in items)
-
-            if l.startswith("Perda da marcha independente:"):
-                idade = re.search(r"idade\s+([0-9]+)", l)
-                ano = re.search(r"ano\s+([0-9]{4})", l)
-                if idade:
-                    st.session_state["perda_marcha_idade"] = idade.group(1)
-                if ano:
-                    st.session_state["perda_marcha_ano"] = ano.group(1)
-
-            if l.startswith("MMSS:"):
-                items = [x.strip() for x in l.split("MMSS:", 1)[1].split(";") if x.strip()]
-                st.session_state["ms_nao_acima_cabeca"] = any("acima da cabeça" in x for x in items)
-                st.session_state["ms_nao_acima_ombros"] = any("acima dos ombros" in x for x in items)
-                st.session_state["ms_nao_flex_antebraco"] = any("flexão dos antebraços" in x for x in items)
-
-            if l.startswith("Ventilação:"):
-                rest = l.split("Ventilação:", 1)[1].strip()
-                parts = [p.strip() for p in rest.split("—") if p.strip()]
-                if parts:
-                    opt = parts[0].strip()
-                    if opt in VENT_OPTIONS:
-                        st.session_state["vent_radio"] = opt
-                for p in parts[1:]:
-                    if p.startswith("Início:"):
-                        idade = re.search(r"idade\s+([0-9]+)", p)
-                        ano = re.search(r"ano\s+([0-9]{4})", p)
-                        if idade:
-                            st.session_state["vent_inicio_idade"] = idade.group(1)
-                        if ano:
-                            st.session_state["vent_inicio_ano"] = ano.group(1)
-                    else:
-                        st.session_state["vent_info_adicional"] = (
-                            (st.session_state.get("vent_info_adicional", "") + ("\n" if st.session_state.get("vent_info_adicional") else "") + p).strip()
-                        )
-
-            if l.startswith("Ortopédicos:"):
-                rest = l.split("Ortopédicos:", 1)[1].strip()
-                chunks = [p.strip() for p in rest.split("—") if p.strip()]
-                items = [x.strip() for x in chunks[0].split(";") if x.strip()] if chunks else []
-                st.session_state["ortese_mi"] = any("Órtese MMII" in x for x in items)
-                st.session_state["ortese_ms"] = any("Órtese MMSS" in x for x in items)
-                st.session_state["colete_ortopedico"] = any("Colete" in x for x in items)
-                for p in chunks[1:]:
-                    if p.startswith("Início:"):
-                        idade = re.search(r"idade\s+([0-9]+)", p)
-                        ano = re.search(r"ano\s+([0-9]{4})", p)
-                        if idade:
-                            st.session_state["ort_inicio_idade"] = idade.group(1)
-                        if ano:
-                            st.session_state["ort_inicio_ano"] = ano.group(1)
-
-            if l.startswith("Nutrição:"):
-                rest = l.split("Nutrição:", 1)[1].strip()
-                st.session_state["nut_gtt"] = "Gastrostomia (GTT)" in rest
-                if "Início:" in rest:
-                    idade = re.search(r"idade\s+([0-9]+)", rest)
-                    ano = re.search(r"ano\s+([0-9]{4})", rest)
-                    if idade:
-                        st.session_state["nut_inicio_idade"] = idade.group(1)
-                    if ano:
-                        st.session_state["nut_inicio_ano"] = ano.group(1)
-
-        st.session_state["func_resumo"] = build_func_summary()
-
-    # --- MULTIDISCIPLINAR ---
-    multi = secs.get(">> Seguimento multidisciplinar", "")
-    if multi:
-        t = _norm(multi)
-        for ln in t.split("\n"):
-            l = ln.strip()
-            if l.startswith("Fisioterapia motora:"):
-                ok, num = _parse_freq(l)
-                st.session_state["fisio_motora_chk"] = ok
-                st.session_state["fisio_motora_freq"] = num
-            if l.startswith("Fisioterapia respiratória:"):
-                ok, num = _parse_freq(l)
-                st.session_state["fisio_resp_chk"] = ok
-                st.session_state["fisio_resp_freq"] = num
-            if l.startswith("AMBU / máscara facial:"):
-                ok, num = _parse_freq(l)
-                st.session_state["ambu_chk"] = ok
-                st.session_state["ambu_freq"] = num
-            if l.startswith("Fonoterapia:"):
-                ok, num = _parse_freq(l)
-                st.session_state["fono_chk"] = ok
-                st.session_state["fono_freq"] = num
-
-        # captura Outras e Escalas como blocos
-        st.session_state["outras_terapias"] = _extract_block(t, "Outras:", ["Escalas:"])
-        st.session_state["escalas"] = _extract_block(t, "Escalas:", [])
-
-    # --- EXAME FÍSICO ---
-    exf = secs.get("EXAME FÍSICO", "")
-    if exf:
-        body = _norm(exf)
-
-        st.session_state["neuro_geral"] = _extract_block(
-            body,
-            "# Exame Neurológico:",
-            [
-                "Força motora (MRC):",
-                "Exame neuromuscular específico:",
-                "Alterações de pele e exame clínico geral:",
-                "Alterações osteoesqueléticas e dismorfismos:",
-            ],
-        )
-
-        # Força (tenta reconstituir os MRCs)
-        m = re.search(r"^Força motora \(MRC\):\s*(.*)$", body, flags=re.M)
-        if m:
-            line = m.group(0).strip()
-            line = re.sub(r"^Força motora \(MRC\):\s*", "", line).strip()
-            items = [x.strip() for x in line.split("|") if x.strip()]
-
-            axial_labels = {
-                "Extensores do tronco": "mrc_ext_tronco",
-                "Flexores do pescoço": "mrc_flex_pescoco",
-                "Flexores do tronco": "mrc_flex_tronco",
-            }
-            bilat_map = {
-                "Abdução do ombro": ("mrc_abd_ombro_D", "mrc_abd_ombro_E"),
-                "Adução do ombro": ("mrc_add_ombro_D", "mrc_add_ombro_E"),
-                "Flexores do cotovelo": ("mrc_flex_cotovelo_D", "mrc_flex_cotovelo_E"),
-                "Extensores do cotovelo": ("mrc_ext_cotovelo_D", "mrc_ext_cotovelo_E"),
-                "Extensores de punho": ("mrc_ext_punho_D", "mrc_ext_punho_E"),
-                "Flexores de punho": ("mrc_flex_punho_D", "mrc_flex_punho_E"),
-                "Extensores de dedos": ("mrc_ext_dedos_D", "mrc_ext_dedos_E"),
-                "Flexores profundos dos dedos": ("mrc_fpd_D", "mrc_fpd_E"),
-                "Abdução dos dedos": ("mrc_abd_dedos_D", "mrc_abd_dedos_E"),
-                "Oponência do polegar": ("mrc_op_polegar_D", "mrc_op_polegar_E"),
-                "Abdutor do dedo mínimo": ("mrc_op_minimo_D", "mrc_op_minimo_E"),
-                "Flexores de quadril": ("mrc_flex_quadril_D", "mrc_flex_quadril_E"),
-                "Extensores do quadril": ("mrc_ext_quadril_D", "mrc_ext_quadril_E"),
-                "Abdutores do quadril": ("mrc_abd_quadril_D", "mrc_abd_quadril_E"),
-                "Adutores do quadril": ("mrc_add_quadril_D", "mrc_add_quadril_E"),
-                "Flexores do joelho": ("mrc_flex_joelho_D", "mrc_flex_joelho_E"),
-                "Extensores do joelho": ("mrc_ext_joelho_D", "mrc_ext_joelho_E"),
-                "Dorsiflexão do pé": ("mrc_df_pe_D", "mrc_df_pe_E"),
-                "Flexão do pé": ("mrc_pf_pe_D", "mrc_pf_pe_E"),
-                "Eversores do pé": ("mrc_ev_pe_D", "mrc_ev_pe_E"),
-                "Inversores do pé": ("mrc_inv_pe_D", "mrc_inv_pe_E"),
-                "Extensores do hálux": ("mrc_ext_halux_D", "mrc_ext_halux_E"),
-                "Flexores do hálux": ("mrc_flex_halux_D", "mrc_flex_halux_E"),
-            }
-
-            for it in items:
-                it = it.replace("Axiais:", "").strip()
-
-                # UPDATED: accepts 0-5 plus optional +/-
-                mm = re.match(
-                    r"^(Extensores do tronco|Flexores do pescoço|Flexores do tronco)\s+([0-5][+-]?)\s*$",
-                    it,
-                )
-                if mm:
-                    st.session_state[axial_labels[mm.group(1)]] = mm.group(2)
-                    continue
-
-                # UPDATED: accepts 0-5 plus optional +/- OR '-' placeholder
-                mm = re.match(
-                    r"^(.*?):\s*D\s*([0-5][+-]?|-)?\s*/\s*E\s*([0-5][+-]?|-)?\s*$",
-                    it,
-                )
-                if mm:
-                    lbl = mm.group(1).strip()
-                    vd = (mm.group(2) or "").strip()
-                    ve = (mm.group(3) or "").strip()
-                    vd = "" if vd == "-" else vd
-                    ve = "" if ve == "-" else ve
-                    if lbl in bilat_map:
-                        kd, ke = bilat_map[lbl]
-                        st.session_state[kd] = vd
-                        st.session_state[ke] = ve
-
-            st.session_state["forca_resumo"] = build_forca_summary()
-
-        st.session_state["exame_neuromuscular_especifico"] = _extract_block(
-            body,
-            "Exame neuromuscular específico:",
-            ["Alterações de pele e exame clínico geral:", "Alterações osteoesqueléticas e dismorfismos:"],
-        )
-        st.session_state["pele_clinico_geral"] = _extract_block(
-            body,
-            "Alterações de pele e exame clínico geral:",
-            ["Alterações osteoesqueléticas e dismorfismos:"],
-        )
-        st.session_state["osteo_dismorfismos"] = _extract_block(
-            body,
-            "Alterações osteoesqueléticas e dismorfismos:",
-            [],
-        )
-
-    # --- EXAMES COMPLEMENTARES ---
-    exc = secs.get("EXAMES COMPLEMENTARES", "")
-    if exc:
-        body = _norm(exc)
-
-        st.session_state["ex_cpk"] = _extract_line_value(body, "CPK:")
-
-        st.session_state["ex_enmg"] = _extract_block(
-            body,
-            "Eletroneuromiografia:",
-            [
-                "Decremento / Jitter na EMG:",
-                "Anticorpos de junção:",
-                "RM muscular:",
-                "Biópsia muscular:",
-                "ECO:",
-                "Holter:",
-                "Espirometria:",
-                "Polissonografia:",
-                "Outros exames:",
-            ],
-        )
-        st.session_state["ex_decremento_jitter"] = _extract_line_value(body, "Decremento / Jitter na EMG:")
-        st.session_state["ex_anticorpos_juncao"] = _extract_line_value(body, "Anticorpos de junção:")
-
-        st.session_state["ex_rm_muscular"] = _extract_block(
-            body,
-            "RM muscular:",
-            ["Biópsia muscular:", "ECO:", "Holter:", "Espirometria:", "Polissonografia:", "Outros exames:"],
-        )
-        st.session_state["ex_biopsia_muscular"] = _extract_block(
-            body,
-            "Biópsia muscular:",
-            ["ECO:", "Holter:", "Espirometria:", "Polissonografia:", "Outros exames:"],
-        )
-
-        for marker, key in [
-            ("ECO:", "ex_eco"),
-            ("Holter:", "ex_holter"),
-            ("Espirometria:", "ex_espirometria"),
-            ("Polissonografia:", "ex_polissonografia"),
-            ("Outros exames:", "ex_outros"),
-        ]:
-            st.session_state[key] = _extract_block(body, marker, [])
-
-    # --- TESTE GENÉTICO ---
-    tgsec = secs.get(">> Teste genético", "")
-    if tgsec:
-        lines = [ln.strip() for ln in _norm(tgsec).split("\n") if ln.strip()]
-        if lines:
-            status = lines[0]
-            if status in ["Não se aplica", "Não realizado", "Teste genético realizado"]:
-                st.session_state["tg_radio"] = status
-
-        for ln in lines[1:]:
-            if ln.startswith("Gene/resultado:"):
-                gene = ln.split("Gene/resultado:", 1)[1].strip()
-                if gene in GENES_OPTIONS:
-                    st.session_state["tg_gene_sel"] = gene
-                else:
-                    st.session_state["tg_gene_sel"] = "Outro"
-                    st.session_state["tg_gene_outro"] = gene
-
-            if ln.startswith("Detalhes:"):
-                det = ln.split("Detalhes:", 1)[1].strip()
-                for part in [p.strip() for p in det.split("|") if p.strip()]:
-                    if part.startswith("Exame:"):
-                        st.session_state["tg_exame_nome"] = part.split("Exame:", 1)[1].strip()
-                    if part.startswith("Data:"):
-                        st.session_state["tg_data"] = part.split("Data:", 1)[1].strip()
-                    if part.startswith("Local:"):
-                        st.session_state["tg_local"] = part.split("Local:", 1)[1].strip()
-
-    # --- DIAGNÓSTICO ---
-    dxsec = secs.get("DIAGNÓSTICO", "")
-    if dxsec:
-        for ln in _norm(dxsec).split("\n"):
-            l = ln.strip()
-            if l.startswith("Topográfico:"):
-                items = [x.strip() for x in l.split("Topográfico:", 1)[1].split("|")]
-                sel = []
-                other_txts = []
-                for it in items:
-                    if it in TOPO_OPTIONS:
-                        sel.append(it)
-                    elif it:
-                        other_txts.append(it)
-                if other_txts:
-                    if "Outro" not in sel:
-                        sel.append("Outro")
-                    st.session_state["dx_topografico_outro"] = " / ".join(other_txts)
-                st.session_state["dx_topografico"] = sel
-
-            if l.startswith("Nosológico:"):
-                val = l.split("Nosológico:", 1)[1].strip()
-                if val in DX_NOSO_OPTIONS:
-                    st.session_state["dx_noso_sel"] = val
-                else:
-                    st.session_state["dx_noso_sel"] = "Outros"
-                    st.session_state["dx_noso_outros"] = val
-
-    # --- IMPRESSÃO / CONDUTA ---
-    st.session_state["impressao"] = secs.get("IMPRESSÃO", "").strip()
-    st.session_state["conduta"] = secs.get("CONDUTA", "").strip()
-
-    # Recalcula resumos (garante consistência)
-    st.session_state["func_resumo"] = build_func_summary()
-    st.session_state["forca_resumo"] = build_forca_summary()
-
-    return True, "Importação concluída. Campos ausentes no texto permaneceram em branco."
+# Passo a passo e visualização: os widgets fora da tela não são desenhados; reatribuir as
+# chaves do formulário mantém os valores deles pelo mesmo motivo
+if st.session_state.get("wizard", False) or st.session_state.get("visit_view", False):
+    for _k in SCHEMA.data_keys:
+        if _k in st.session_state:
+            st.session_state[_k] = st.session_state[_k]
 
 # =========================================================
 # EXECUTA IMPORT NO TOPO (antes da UI) – evita NameError
 # =========================================================
 if st.session_state.get("_do_import", False):
     st.session_state["_do_import"] = False
-    ok, msg = _import_from_full_export(st.session_state.get("_import_raw", ""))
+    raw = st.session_state.get("_import_raw", "")
+    if st.session_state.pop("_import_carry", False):
+        ok, msg = carry_forward_export(st.session_state, raw, cache=st.session_state.setdefault("_section_cache", {}))
+    else:
+        ok, msg = import_full_export(st.session_state, raw)
     st.session_state["_import_result"] = (ok, msg)
     st.rerun()
 
 # =========================================================
 # 1) ANAMNESE
 # =========================================================
-st.subheader("Anamnese")
-
-st.markdown("**Identificação:**")
-_ = text_area_lines(label="", lines=1, key="Id", placeholder="")
-
-# Idade de início
-c_label, c_input, _fill = st.columns([3.2, 7.0, 10.0], vertical_alignment="center")
-with c_label:
-    st.markdown('<div class="inline-label"><strong>Idade de início</strong></div>', unsafe_allow_html=True)
-with c_input:
-    st.text_input("", key="idade_inicio", placeholder="Ex.: 12 anos / 2021 / infância", label_visibility="collapsed")
-
-# Idade ao diagnóstico
-c_label, c_input, _fill = st.columns([3.2, 7.0, 10.0], vertical_alignment="center")
-with c_label:
-    st.markdown('<div class="inline-label"><strong>Idade ao diagnóstico</strong></div>', unsafe_allow_html=True)
-with c_input:
-    st.text_input("", key="idade_diagnostico", placeholder="Ex.: 15 anos / 2024", label_visibility="collapsed")
-
-st.markdown("**História da doença atual:**")
-_ = text_area_lines(label="", lines=10, key="hda", placeholder="")
-
-# =========================================================
-# 2) ANTECEDENTES
-# =========================================================
-st.subheader("Antecedentes")
-
-st.markdown("**Antecedentes pessoais:**")
-_ = text_area_lines(
-    label="",
-    lines=6,
-    key="antecedentes_pessoais",
-    placeholder=(
-        "Descrever cardiopatias, distúrbios do sono, catarata, neoplasias, distúrbios respiratórios, "
-        "endocrinopatias, exposição ocupacional, diabetes, hipertensão, etilismo, cirurgias prévias, etc."
-    ),
+st.toggle(
+    "Digitação em lote",
+    key="batch_entry",
+    help="Os campos de texto de cada bloco só são enviados ao clicar em 'Aplicar' (um recarregamento por bloco).",
 )
-
-st.markdown("**História familiar:**")
-_ = text_area_lines(
-    label="",
-    lines=4,
-    key="antecedentes_familiares",
-    placeholder="Familiares acometidos / estado de saúde de pais, irmãos e filhos / cidade de origem dos pais / consanguinidade / etc.",
+st.toggle(
+    "MRC em tabela",
+    key="mrc_table",
+    help="Cada grade de MRC vira uma tabela editável (um único elemento na tela) em vez de duas caixas por músculo.",
 )
-
-st.markdown("**Medicações em uso:**")
-_ = text_area_lines(label="", lines=6, key="meds_em_uso", placeholder="")
-
-st.markdown("**Medicações de uso prévio e motivo da suspensão:**")
-_ = text_area_lines(label="", lines=1, key="meds_previas", placeholder="")
-
-# =========================================================
-# 3) DESENVOLVIMENTO NEUROPSICOMOTOR
-# =========================================================
-st.subheader("Desenvolvimento neuropsicomotor")
-
-dnpm = st.radio(
-    "",
-    options=["Normal", "Não sabe informar", "Atraso desenvolvimento"],
-    index=None,
-    key="dnpm_radio",
+st.toggle(
+    "Passo a passo",
+    key="wizard",
+    help="Mostra só a seção em edição; as demais aparecem resumidas. Exportar e importar continuam no fim da página.",
 )
-
-if dnpm == "Atraso desenvolvimento":
-    st.markdown("**Idade de obtenção dos marcos motores e cognitivos:**")
-    colA, colB = st.columns(2, vertical_alignment="top")
-
-    with colA:
-        inline_label_input_dnpm("Sustento cefálico", key="dnpm_sustento_cefalico", placeholder="Ex.: 4 meses")
-        inline_label_input_dnpm("Engatinhar", key="dnpm_engatinhar", placeholder="Ex.: 10 meses")
-        inline_label_input_dnpm("Andar sem apoio", key="dnpm_andar_sem_apoio", placeholder="Ex.: 18 meses")
-        inline_label_input_dnpm("Formar frases", key="dnpm_formar_frases", placeholder="Ex.: 3 anos")
-        inline_label_input_dnpm("Sentar (meses)", key="dnpm_sentar_meses", placeholder="Ex.: 8")
-
-    with colB:
-        inline_label_input_dnpm("Ficar de pé (anos)", key="dnpm_ficar_de_pe_anos", placeholder="Ex.: 2")
-        inline_label_input_dnpm("Andar com apoio (anos)", key="dnpm_andar_com_apoio_anos", placeholder="Ex.: 2")
-        inline_label_input_dnpm("Primeiras palavras (anos)", key="dnpm_primeiras_palavras_anos", placeholder="Ex.: 2")
-        inline_label_input_dnpm("Controle esfincteriano (meses)", key="dnpm_controle_esfincteriano_meses", placeholder="Ex.: 30")
-
-# =========================================================
-# 4) EVOLUÇÃO
-# =========================================================
-st.subheader("Evolução clínica")
-st.markdown("**Descrição da evolução:**")
-_ = text_area_lines(label="", lines=5, key="evolucao", placeholder="")
-
-# =========================================================
-# 8) DISPOSITIVOS E SUPORTE FUNCIONAL (panel summary)
-# =========================================================
-st.markdown("**Dispositivos e suporte funcional**")
-
-cL, cR = st.columns([2.2, 9.8], vertical_alignment="top")
-with cL:
-    if st.button("Suporte funcional e uso de dispositivos", key="btn_open_func"):
-        st.session_state["func_open"] = True
-with cR:
-    disp = st.session_state.get("func_resumo", "").strip()
-    if not disp:
-        disp = "Gerado automaticamente ao preencher o suporte funcional"
-    st.text_area("Suporte funcional (resumo)", value=disp, height=120, disabled=True)
-
-if st.session_state.get("func_open", False):
-    st.markdown("#### DISPOSITIVOS E SUPORTE FUNCIONAL")
-
-    st.markdown("### Membros inferiores")
-    st.checkbox("Marcha com auxiliar de marcha (bengala, muleta, andador)", key="mi_marcha_aux")
-    st.checkbox("Cadeira de rodas para longas distâncias", key="mi_cr_longas")
-    st.checkbox("Cadeira de rodas permanente", key="mi_cr_perm")
-    st.checkbox("Não faz transferências sem ajuda (cadeira para cama, por exemplo)", key="mi_nao_transfere")
-
-    st.markdown("**Perda da marcha independente**")
-    c_label, c_idade, c_ano = st.columns([4.5, 2.5, 2.5], vertical_alignment="center")
-    with c_label:
-        st.markdown('<div class="inline-label">Idade ou ano:</div>', unsafe_allow_html=True)
-    with c_idade:
-        st.text_input("", key="perda_marcha_idade", placeholder="idade", label_visibility="collapsed")
-    with c_ano:
-        st.text_input("", key="perda_marcha_ano", placeholder="ou ano", label_visibility="collapsed")
-
-    st.markdown("---")
-    st.markdown("### Membros superiores")
-    st.checkbox("Não eleva os braços acima da cabeça", key="ms_nao_acima_cabeca")
-    st.checkbox("Não eleva os braços acima dos ombros", key="ms_nao_acima_ombros")
-    st.checkbox("Não faz flexão dos antebraços", key="ms_nao_flex_antebraco")
-
-    st.markdown("---")
-    st.markdown("### Ventilação")
-    st.radio("", options=VENT_OPTIONS, index=None, key="vent_radio")
-
-    st.markdown("**Início (ventilação)**")
-    c1, c2, c3, _f = st.columns([2.4, 2.2, 2.2, 10.0], vertical_alignment="center")
-    with c1:
-        st.markdown('<div class="inline-label">Início</div>', unsafe_allow_html=True)
-    with c2:
-        st.text_input("", key="vent_inicio_idade", placeholder="idade", label_visibility="collapsed")
-    with c3:
-        st.text_input("", key="vent_inicio_ano", placeholder="ou ano", label_visibility="collapsed")
-
-    _ = text_area_lines(
-        label="",
-        lines=3,
-        key="vent_info_adicional",
-        placeholder="Informações adicionais (tempo diário de ventilação, equipamento, parâmetros).",
-    )
-
-    st.markdown("---")
-    st.markdown("### Ortopédicos")
-    st.checkbox("Órtese MMII", key="ortese_mi")
-    st.checkbox("Órtese MMSS", key="ortese_ms")
-    st.checkbox("Colete ortopédico", key="colete_ortopedico")
-
-    st.markdown("**Início (ortopédicos)**")
-    c1, c2, c3, _f = st.columns([2.4, 2.2, 2.2, 10.0], vertical_alignment="center")
-    with c1:
-        st.markdown('<div class="inline-label">Início</div>', unsafe_allow_html=True)
-    with c2:
-        st.text_input("", key="ort_inicio_idade", placeholder="idade", label_visibility="collapsed")
-    with c3:
-        st.text_input("", key="ort_inicio_ano", placeholder="ou ano", label_visibility="collapsed")
-
-    st.markdown("---")
-    st.markdown("### Nutrição")
-    st.checkbox("Gastrostomia (GTT)", key="nut_gtt")
-
-    st.markdown("**Início (GTT)**")
-    c1, c2, c3, _f = st.columns([2.4, 2.2, 2.2, 10.0], vertical_alignment="center")
-    with c1:
-        st.markdown('<div class="inline-label">Início</div>', unsafe_allow_html=True)
-    with c2:
-        st.text_input("", key="nut_inicio_idade", placeholder="idade", label_visibility="collapsed")
-    with c3:
-        st.text_input("", key="nut_inicio_ano", placeholder="ou ano", label_visibility="collapsed")
-
-    b1, b2, _bf = st.columns([1.8, 1.2, 10.0], vertical_alignment="center")
-    with b1:
-        if st.button("Salvar suporte funcional", key="btn_save_func", type="primary"):
-            st.session_state["func_resumo"] = build_func_summary()
-            st.session_state["func_open"] = False
-            st.rerun()
-    with b2:
-        if st.button("Minimizar menu de seleção", key="btn_cancel_func"):
-            st.session_state["func_open"] = False
-            st.rerun()
-
-# =========================================================
-# 9) SEGUIMENTO MULTIDISCIPLINAR
-# =========================================================
-st.markdown("**Seguimento multidisciplinar**")
-
-def freq_row(label: str, check_key: str, freq_key: str, placeholder: str = "vezes/semana"):
-    c0, c1, c2, _f = st.columns([3.2, 1.6, 2.2, 10.0], vertical_alignment="center")
-    with c0:
-        st.markdown(f'<div class="inline-label">{label}</div>', unsafe_allow_html=True)
-    with c1:
-        checked = st.checkbox("Sim", key=check_key)
-    with c2:
-        st.text_input("", key=freq_key, placeholder=placeholder, label_visibility="collapsed", disabled=not checked)
-
-freq_row("Fisioterapia motora", "fisio_motora_chk", "fisio_motora_freq")
-freq_row("Fisioterapia respiratória", "fisio_resp_chk", "fisio_resp_freq")
-freq_row("AMBU / máscara facial", "ambu_chk", "ambu_freq", placeholder="vezes/dia")
-freq_row("Fonoterapia", "fono_chk", "fono_freq")
-
-st.markdown("**Outras terapias e informações:**")
-_ = text_area_lines("", 3, "outras_terapias", placeholder="Ex.: Terapia ocupacional (frequência), Psicoterapia (frequência), outras")
-
-# Escalas + botão IBM-FRS
-st.markdown("**Escalas:**")
-_ = text_area_lines("", 2, "escalas", placeholder="IBM-FRS, ALS-FRS, CHOP INTEND, HFMSE, etc.")
-
-if st.button("IBM-FRS", key="btn_open_ibmfrs"):
-    st.session_state["ibmfrs_open"] = True
-    st.rerun()
-
-def _render_ibmfrs_form_body():
-    st.markdown("Preencha a **IBM-FRS** (0–4 por item). O total é calculado automaticamente (máximo **40**).")
-
-    def fmt_factory(desc_map):
-        return lambda x: f"{int(x)} — {desc_map[int(x)]}"
-
-    total = 0
-    for it in IBM_FRS_ITEMS_PT:
-        st.markdown(f"**{it['n']}. {it['title']}**")
-        st.radio(
-            "",
-            options=[4, 3, 2, 1, 0],
-            key=it["key"],
-            format_func=fmt_factory(it["desc"]),
-            horizontal=False,
-        )
-        total += int(st.session_state.get(it["key"], 4))
-
-    st.markdown("---")
-    st.metric("Total IBM-FRS", f"{total}/40")
-
-    c1, c2, _ = st.columns([1.9, 1.2, 10.0], vertical_alignment="center")
-    with c1:
-        if st.button("Salvar IBM-FRS em 'Escalas'", key="btn_save_ibmfrs", type="primary"):
-            line = _build_ibmfrs_line(total)
-            _upsert_scale_line("IBM-FRS", line, target_key="escalas")
-            st.session_state["ibmfrs_open"] = False
-            st.rerun()
-    with c2:
-        if st.button("Cancelar", key="btn_cancel_ibmfrs"):
-            st.session_state["ibmfrs_open"] = False
-            st.rerun()
-
-# Modal (st.dialog / st.experimental_dialog) com fallback inline
-_ibm_dialog = None
-if hasattr(st, "dialog"):
-    @st.dialog("IBM-FRS")
-    def _ibm_dialog():
-        _render_ibmfrs_form_body()
-elif hasattr(st, "experimental_dialog"):
-    @st.experimental_dialog("IBM-FRS")
-    def _ibm_dialog():
-        _render_ibmfrs_form_body()
-
-if st.session_state.get("ibmfrs_open", False):
-    if _ibm_dialog is not None:
-        _ibm_dialog()
-    else:
-        st.info("Seu Streamlit não suporta modal (st.dialog). Mostrando o formulário IBM-FRS inline.")
-        st.markdown("### IBM-FRS")
-        _render_ibmfrs_form_body()
-
-# =========================================================
-# 4) NEUROLÓGICO GERAL + EXAME DE FORÇA (panel)
-# =========================================================
-st.subheader("Exame físico")
-
-st.markdown("**Exame neurológico geral**")
-_ = text_area_lines(
-    label="",
-    lines=5,
-    key="neuro_geral",
-    placeholder=(
-        "Descrever cognição, força, reflexos osteotendinosos, reflexos patológicos (cutâneo plantar, axiais da face), "
-        "tônus, sensibilidade, coordenação, marcha, nervos cranianos"
-    ),
+st.toggle(
+    "Visualizar consulta",
+    key="visit_view",
+    help="Consulta inteira em um único bloco somente leitura (o texto da exportação, com as escalas em tabela).",
 )
+archive_panel()
+
+if st.session_state.get("visit_view", False):
+    # Somente leitura: um único bloco montado da exportação, sem nenhum widget do formulário
+    cache = st.session_state.setdefault("_section_cache", {})
+    refresh_summaries(st.session_state, cache)
+    page_stylesheet("visit.css")
+    st.html(visit_html(SCHEMA.name, st.session_state, cache))
+    st.stop()
+
+wizard_nav()
+
+if step(0):
+    with entry_block("anamnese"):
+        st.subheader("Anamnese")
+        inherited_note("ANAMNESE")
+
+        _ = schema_field("Id")
+
+        # Idade de início
+        c_label, c_input, _fill = st.columns([3.2, 7.0, 10.0], vertical_alignment="center")
+        with c_label:
+            st.markdown('<div class="inline-label"><strong>Idade de início</strong></div>', unsafe_allow_html=True)
+        with c_input:
+            st.text_input("", key="idade_inicio", placeholder="Ex.: 12 anos / 2021 / infância", label_visibility="collapsed")
+
+        # Idade ao diagnóstico
+        c_label, c_input, _fill = st.columns([3.2, 7.0, 10.0], vertical_alignment="center")
+        with c_label:
+            st.markdown('<div class="inline-label"><strong>Idade ao diagnóstico</strong></div>', unsafe_allow_html=True)
+        with c_input:
+            st.text_input("", key="idade_diagnostico", placeholder="Ex.: 15 anos / 2024", label_visibility="collapsed")
+
+        _ = schema_field("hda")
+
+        # =========================================================
+        # 2) ANTECEDENTES
+        # =========================================================
+        st.subheader("Antecedentes")
+        inherited_note("ANTECEDENTES")
+
+        _ = schema_field("antecedentes_pessoais")
+
+        _ = schema_field("antecedentes_familiares")
+
+        _ = schema_field("meds_em_uso")
+
+        _ = schema_field("meds_previas")
+
+    # =========================================================
+    # 3) DESENVOLVIMENTO NEUROPSICOMOTOR
+    # =========================================================
+    st.subheader("Desenvolvimento neuropsicomotor")
+    inherited_note("DESENVOLVIMENTO NEUROPSICOMOTOR")
+
+    dnpm = st.radio(
+        "",
+        options=DNPM_OPTIONS,
+        index=None,
+        key="dnpm_radio",
+    )
 
-c_left, c_right = st.columns([2.2, 9.8], vertical_alignment="top")
-with c_left:
-    if st.button("Exame de força", key="btn_open_forca"):
-        st.session_state["forca_open"] = True
-with c_right:
-    display_forca = st.session_state.get("forca_resumo", "").strip()
-    if not display_forca:
-        display_forca = "Gerado automaticamente ao preencher o exame de força"
-    st.text_area("Força motora (resumo)", value=display_forca, height=120, disabled=True)
-
-def _force_row_bilateral(label: str, key_d: str, key_e: str):
-    c0, c1, c2, _fill = st.columns([3.2, 1.4, 1.4, 10.0], vertical_alignment="center")
-    with c0:
-        st.markdown(f'<div class="inline-label">{label}</div>', unsafe_allow_html=True)
-    with c1:
-        small_mrc_box(key_d)
-    with c2:
-        small_mrc_box(key_e)
-
-def _force_row_single(label: str, key: str, placeholder: str = "0-5"):
-    c0, c1, _fill = st.columns([3.2, 3.0, 10.0], vertical_alignment="center")
-    with c0:
-        st.markdown(f'<div class="inline-label">{label}</div>', unsafe_allow_html=True)
-    with c1:
-        st.text_input(
-            "",
-            key=key,
-            placeholder=placeholder,
-            label_visibility="collapsed",
-            max_chars=2,  # UPDATED (was 1)
+    if dnpm == "Atraso desenvolvimento":
+        with entry_block("dnpm"):
+            st.markdown("**Idade de obtenção dos marcos motores e cognitivos:**")
+            colA, colB = st.columns(2, vertical_alignment="top")
+
+            with colA:
+                inline_label_input_dnpm("Sustento cefálico", key="dnpm_sustento_cefalico", placeholder="Ex.: 4 meses")
+                inline_label_input_dnpm("Engatinhar", key="dnpm_engatinhar", placeholder="Ex.: 10 meses")
+                inline_label_input_dnpm("Andar sem apoio", key="dnpm_andar_sem_apoio", placeholder="Ex.: 18 meses")
+                inline_label_input_dnpm("Formar frases", key="dnpm_formar_frases", placeholder="Ex.: 3 anos")
+                inline_label_input_dnpm("Sentar (meses)", key="dnpm_sentar_meses", placeholder="Ex.: 8")
+
+            with colB:
+                inline_label_input_dnpm("Ficar de pé (anos)", key="dnpm_ficar_de_pe_anos", placeholder="Ex.: 2")
+                inline_label_input_dnpm("Andar com apoio (anos)", key="dnpm_andar_com_apoio_anos", placeholder="Ex.: 2")
+                inline_label_input_dnpm("Primeiras palavras (anos)", key="dnpm_primeiras_palavras_anos", placeholder="Ex.: 2")
+                inline_label_input_dnpm("Controle esfincteriano (meses)", key="dnpm_controle_esfincteriano_meses", placeholder="Ex.: 30")
+
+if step(1):
+    # =========================================================
+    # 4) EVOLUÇÃO
+    # =========================================================
+    st.subheader("Evolução clínica")
+    with entry_block("evolucao"):
+        _ = schema_field("evolucao")
+
+    # =========================================================
+    # 8) DISPOSITIVOS E SUPORTE FUNCIONAL (panel summary)
+    # =========================================================
+    st.markdown("**Dispositivos e suporte funcional**")
+
+    cL, cR = st.columns([2.2, 9.8], vertical_alignment="top")
+    with cL:
+        if st.button("Suporte funcional e uso de dispositivos", key="btn_open_func"):
+            st.session_state["func_open"] = True
+    with cR:
+        disp = st.session_state.get("func_resumo", "").strip()
+        if not disp:
+            disp = "Gerado automaticamente ao preencher o suporte funcional"
+        st.text_area("Suporte funcional (resumo)", value=disp, height=120, disabled=True)
+
+    def _save_func():
+        st.session_state["func_resumo"] = build_func_summary(st.session_state)
+        st.session_state["func_open"] = False
+        mark_commit("_func_commit")
+
+    def _close_func():
+        st.session_state["func_open"] = False
+
+    @fragment_decorator
+    def func_panel():
+        rerun_after_commit("_func_commit")
+        if not st.session_state.get("func_open", False):
+            return
+
+        st.markdown("#### DISPOSITIVOS E SUPORTE FUNCIONAL")
+
+        st.markdown("### Membros inferiores")
+        st.checkbox("Marcha com auxiliar de marcha (bengala, muleta, andador)", key="mi_marcha_aux", **track("mi_marcha_aux"))
+        st.checkbox("Cadeira de rodas para longas distâncias", key="mi_cr_longas", **track("mi_cr_longas"))
+        st.checkbox("Cadeira de rodas permanente", key="mi_cr_perm", **track("mi_cr_perm"))
+        st.checkbox("Não faz transferências sem ajuda (cadeira para cama, por exemplo)", key="mi_nao_transfere", **track("mi_nao_transfere"))
+
+        st.markdown("**Perda da marcha independente**")
+        c_label, c_idade, c_ano = st.columns([4.5, 2.5, 2.5], vertical_alignment="center")
+        with c_label:
+            st.markdown('<div class="inline-label">Idade ou ano:</div>', unsafe_allow_html=True)
+        with c_idade:
+            st.text_input("", key="perda_marcha_idade", placeholder="idade", label_visibility="collapsed", **track("perda_marcha_idade"))
+        with c_ano:
+            st.text_input("", key="perda_marcha_ano", placeholder="ou ano", label_visibility="collapsed", **track("perda_marcha_ano"))
+
+        st.markdown("---")
+        st.markdown("### Membros superiores")
+        st.checkbox("Não eleva os braços acima da cabeça", key="ms_nao_acima_cabeca", **track("ms_nao_acima_cabeca"))
+        st.checkbox("Não eleva os braços acima dos ombros", key="ms_nao_acima_ombros", **track("ms_nao_acima_ombros"))
+        st.checkbox("Não faz flexão dos antebraços", key="ms_nao_flex_antebraco", **track("ms_nao_flex_antebraco"))
+
+        st.markdown("---")
+        st.markdown("### Ventilação")
+        st.radio("", options=VENT_OPTIONS, index=None, key="vent_radio", **track("vent_radio"))
+
+        st.markdown("**Início (ventilação)**")
+        c1, c2, c3, _f = st.columns([2.4, 2.2, 2.2, 10.0], vertical_alignment="center")
+        with c1:
+            st.markdown('<div class="inline-label">Início</div>', unsafe_allow_html=True)
+        with c2:
+            st.text_input("", key="vent_inicio_idade", placeholder="idade", label_visibility="collapsed", **track("vent_inicio_idade"))
+        with c3:
+            st.text_input("", key="vent_inicio_ano", placeholder="ou ano", label_visibility="collapsed", **track("vent_inicio_ano"))
+
+        _ = text_area_lines(
+            label="",
+            lines=3,
+            key="vent_info_adicional",
+            placeholder="Informações adicionais (tempo diário de ventilação, equipamento, parâmetros).",
+            **track("vent_info_adicional"),
         )
 
-if st.session_state.get("forca_open", False):
-    st.markdown("#### Força motora (escala MRC)")
-
-    st.markdown("**Músculos axiais:**")
-    _force_row_single("Extensores do tronco", "mrc_ext_tronco")
-    _force_row_single("Flexores do pescoço", "mrc_flex_pescoco")
-    _force_row_single("Flexores do tronco", "mrc_flex_tronco")
-
-    st.markdown("---")
-    st.markdown("**Músculos dos membros superiores:**")
-    h0, h1, h2, _hf = st.columns([3.2, 1.4, 1.4, 10.0], vertical_alignment="center")
-    with h0:
-        st.markdown("**Grupo muscular**")
-    with h1:
-        st.markdown("**Direito**")
-    with h2:
-        st.markdown("**Esquerdo**")
-
-    _force_row_bilateral("Abdução do ombro", "mrc_abd_ombro_D", "mrc_abd_ombro_E")
-    _force_row_bilateral("Adução do ombro", "mrc_add_ombro_D", "mrc_add_ombro_E")
-    _force_row_bilateral("Flexores do cotovelo", "mrc_flex_cotovelo_D", "mrc_flex_cotovelo_E")
-    _force_row_bilateral("Extensores do cotovelo", "mrc_ext_cotovelo_D", "mrc_ext_cotovelo_E")
-    _force_row_bilateral("Extensores de punho", "mrc_ext_punho_D", "mrc_ext_punho_E")
-    _force_row_bilateral("Flexores de punho", "mrc_flex_punho_D", "mrc_flex_punho_E")
-    _force_row_bilateral("Extensores de dedos", "mrc_ext_dedos_D", "mrc_ext_dedos_E")
-    _force_row_bilateral("Flexores profundos dos dedos", "mrc_fpd_D", "mrc_fpd_E")
-    _force_row_bilateral("Abdução dos dedos", "mrc_abd_dedos_D", "mrc_abd_dedos_E")
-    _force_row_bilateral("Oponência do polegar", "mrc_op_polegar_D", "mrc_op_polegar_E")
-    _force_row_bilateral("Abdutor do dedo mínimo", "mrc_op_minimo_D", "mrc_op_minimo_E")
-
-    st.markdown("---")
-    st.markdown("**Músculos dos membros inferiores:**")
-    h0, h1, h2, _hf = st.columns([3.2, 1.4, 1.4, 10.0], vertical_alignment="center")
-    with h0:
-        st.markdown("**Grupo muscular**")
-    with h1:
-        st.markdown("**Direito**")
-    with h2:
-        st.markdown("**Esquerdo**")
-
-    _force_row_bilateral("Flexores de quadril", "mrc_flex_quadril_D", "mrc_flex_quadril_E")
-    _force_row_bilateral("Extensores do quadril", "mrc_ext_quadril_D", "mrc_ext_quadril_E")
-    _force_row_bilateral("Abdutores do quadril", "mrc_abd_quadril_D", "mrc_abd_quadril_E")
-    _force_row_bilateral("Adutores do quadril", "mrc_add_quadril_D", "mrc_add_quadril_E")
-    _force_row_bilateral("Flexores do joelho", "mrc_flex_joelho_D", "mrc_flex_joelho_E")
-    _force_row_bilateral("Extensores do joelho", "mrc_ext_joelho_D", "mrc_ext_joelho_E")
-    _force_row_bilateral("Dorsiflexão do pé", "mrc_df_pe_D", "mrc_df_pe_E")
-    _force_row_bilateral("Flexão do pé", "mrc_pf_pe_D", "mrc_pf_pe_E")
-    _force_row_bilateral("Eversores do pé", "mrc_ev_pe_D", "mrc_ev_pe_E")
-    _force_row_bilateral("Inversores do pé", "mrc_inv_pe_D", "mrc_inv_pe_E")
-    _force_row_bilateral("Extensores do hálux", "mrc_ext_halux_D", "mrc_ext_halux_E")
-    _force_row_bilateral("Flexores do hálux", "mrc_flex_halux_D", "mrc_flex_halux_E")
-
-    b1, b2, _bfill = st.columns([1.6, 1.2, 10.0], vertical_alignment="center")
-    with b1:
-        if st.button("Salvar exame de força", key="btn_save_forca", type="primary"):
-            st.session_state["forca_resumo"] = build_forca_summary()
-            st.session_state["forca_open"] = False
-            st.rerun()
-    with b2:
-        if st.button("Minimizar menu de seleção", key="btn_cancel_forca"):
-            st.session_state["forca_open"] = False
-            st.rerun()
-
-st.divider()
-
-# =========================================================
-# 5) EXAME NEUROMUSCULAR ESPECÍFICO
-# =========================================================
-st.markdown("**Exame neuromuscular específico**")
-_ = text_area_lines(
-    label="",
-    lines=4,
-    key="exame_neuromuscular_especifico",
-    placeholder=(
-        "Testes de fatigabilidade para miastenia, Simpson, Cogan, sinal da cortina, língua tri-sulcada, "
-        "facilitação do reflexo pós-esforço, lentificação do reflexo pupilar.\n"
-        "Fasciculações, mioquimias, rippling.\n"
-        "Miotonia (língua, membros, percussão)."
-    ),
-)
-
-# =========================================================
-# 6) PELE / EXAME CLÍNICO GERAL
-# =========================================================
-st.markdown("**Alterações de pele e exame clínico geral**")
-_ = text_area_lines(
-    label="",
-    lines=3,
-    key="pele_clinico_geral",
-    placeholder="Alterações da pele (quelóide, hiperqueratose folicular), cardíaco, respiratório, abdominal, etc.",
-)
-
-# =========================================================
-# 7) OSTEOESQUELÉTICAS / DISMORFISMOS
-# =========================================================
-st.markdown("**Alterações osteoesqueléticas e dismorfismos**")
-_ = text_area_lines(
-    label="",
-    lines=3,
-    key="osteo_dismorfismos",
-    placeholder=(
-        "Deformidades de coluna, retrações articulares, deformidades torácicas, deformidade de quadril, "
-        "escápula alada, hiperextensibilidade distal, palato em ogiva, maloclusão dentária."
-    ),
-)
-
-# =========================================================
-# 12) EXAMES COMPLEMENTARES
-# =========================================================
-st.subheader("Exames complementares")
-
-_ = inline_label_input("CPK", key="ex_cpk", placeholder="Ex.: 350 U/L (data)")
-st.markdown("**Eletroneuromiografia**")
-_ = text_area_lines("", 3, "ex_enmg", placeholder="")
-
-_ = inline_label_input("Decremento / Jitter na EMG", key="ex_decremento_jitter", placeholder="")
-_ = inline_label_input("Anticorpos de junção", key="ex_anticorpos_juncao", placeholder="")
-
-st.markdown("**RM muscular e USG de nervos**")
-_ = text_area_lines("", 3, "ex_rm_muscular", placeholder="")
-st.markdown("**Biópsia muscular**")
-_ = text_area_lines("", 3, "ex_biopsia_muscular", placeholder="")
-
-st.markdown("**Cardiorrespiratórios**")
-_ = text_area_lines("", 2, "ex_eco", placeholder="ECO (data e achados)")
-_ = text_area_lines("", 2, "ex_holter", placeholder="Holter (data e achados)")
-_ = text_area_lines("", 2, "ex_espirometria", placeholder="Espirometria (data e achados)")
-_ = text_area_lines("", 2, "ex_polissonografia", placeholder="Polissonografia (data e achados)")
-
-st.markdown("**Outros exames**")
-_ = text_area_lines("", 3, "ex_outros", placeholder="")
+        st.markdown("---")
+        st.markdown("### Ortopédicos")
+        st.checkbox("Órtese MMII", key="ortese_mi", **track("ortese_mi"))
+        st.checkbox("Órtese MMSS", key="ortese_ms", **track("ortese_ms"))
+        st.checkbox("Colete ortopédico", key="colete_ortopedico", **track("colete_ortopedico"))
+
+        st.markdown("**Início (ortopédicos)**")
+        c1, c2, c3, _f = st.columns([2.4, 2.2, 2.2, 10.0], vertical_alignment="center")
+        with c1:
+            st.markdown('<div class="inline-label">Início</div>', unsafe_allow_html=True)
+        with c2:
+            st.text_input("", key="ort_inicio_idade", placeholder="idade", label_visibility="collapsed", **track("ort_inicio_idade"))
+        with c3:
+            st.text_input("", key="ort_inicio_ano", placeholder="ou ano", label_visibility="collapsed", **track("ort_inicio_ano"))
+
+        st.markdown("---")
+        st.markdown("### Nutrição")
+        st.checkbox("Gastrostomia (GTT)", key="nut_gtt", **track("nut_gtt"))
+
+        st.markdown("**Início (GTT)**")
+        c1, c2, c3, _f = st.columns([2.4, 2.2, 2.2, 10.0], vertical_alignment="center")
+        with c1:
+            st.markdown('<div class="inline-label">Início</div>', unsafe_allow_html=True)
+        with c2:
+            st.text_input("", key="nut_inicio_idade", placeholder="idade", label_visibility="collapsed", **track("nut_inicio_idade"))
+        with c3:
+            st.text_input("", key="nut_inicio_ano", placeholder="ou ano", label_visibility="collapsed", **track("nut_inicio_ano"))
+
+        b1, b2, _bf = st.columns([1.8, 1.2, 10.0], vertical_alignment="center")
+        with b1:
+            st.button("Salvar suporte funcional", key="btn_save_func", type="primary", on_click=_save_func)
+        with b2:
+            st.button("Minimizar menu de seleção", key="btn_cancel_func", on_click=_close_func)
+
+    func_panel()
+
+    # =========================================================
+    # 9) SEGUIMENTO MULTIDISCIPLINAR
+    # =========================================================
+    st.markdown("**Seguimento multidisciplinar**")
+
+    def freq_row(label: str, check_key: str, freq_key: str, placeholder: str = "vezes/semana"):
+        c0, c1, c2, _f = st.columns([3.2, 1.6, 2.2, 10.0], vertical_alignment="center")
+        with c0:
+            st.markdown(f'<div class="inline-label">{label}</div>', unsafe_allow_html=True)
+        with c1:
+            checked = st.checkbox("Sim", key=check_key)
+        with c2:
+            st.text_input("", key=freq_key, placeholder=placeholder, label_visibility="collapsed", disabled=not checked)
+
+    freq_row("Fisioterapia motora", "fisio_motora_chk", "fisio_motora_freq")
+    freq_row("Fisioterapia respiratória", "fisio_resp_chk", "fisio_resp_freq")
+    freq_row("AMBU / máscara facial", "ambu_chk", "ambu_freq", placeholder="vezes/dia")
+    freq_row("Fonoterapia", "fono_chk", "fono_freq")
+
+    _ = schema_field("outras_terapias")
+
+    # Escalas + botão IBM-FRS
+    _ = schema_field("escalas")
+
+    def _open_ibmfrs():
+        st.session_state["ibmfrs_open"] = True
+
+    def _save_ibmfrs():
+        total = IBM_FRS_SUM.get(st.session_state)
+        line = build_ibmfrs_line(st.session_state, total)
+        upsert_scale_line(st.session_state, "IBM-FRS", line, target_key="escalas")
+        st.session_state["ibmfrs_open"] = False
+        mark_commit("_ibmfrs_commit")
+
+    def _cancel_ibmfrs():
+        st.session_state["ibmfrs_open"] = False
+        mark_commit("_ibmfrs_commit")
+
+    st.button("IBM-FRS", key="btn_open_ibmfrs", on_click=_open_ibmfrs)
+
+    def _render_ibmfrs_form_body():
+        # Salvar/Cancelar já gravaram o estado no callback: um único rerun fecha o pop-up
+        rerun_after_commit("_ibmfrs_commit")
+
+        st.markdown("Preencha a **IBM-FRS** (0–4 por item). O total é calculado automaticamente (máximo **40**).")
+
+        def fmt_factory(desc_map):
+            return lambda x: f"{int(x)} — {desc_map[int(x)]}"
+
+        for it in IBM_FRS_ITEMS_PT:
+            st.markdown(f"**{it['n']}. {it['title']}**")
+            st.radio(
+                "",
+                options=[4, 3, 2, 1, 0],
+                key=it["key"],
+                format_func=fmt_factory(it["desc"]),
+                horizontal=False,
+                **track(it["key"]),
+            )
+
+        total = IBM_FRS_SUM.get(st.session_state)
+        st.markdown("---")
+        st.metric("Total IBM-FRS", f"{total}/{IBM_FRS_MAX_TOTAL}")
+
+        c1, c2, _ = st.columns([1.9, 1.2, 10.0], vertical_alignment="center")
+        with c1:
+            st.button("Salvar IBM-FRS em 'Escalas'", key="btn_save_ibmfrs", type="primary", on_click=_save_ibmfrs)
+        with c2:
+            st.button("Cancelar", key="btn_cancel_ibmfrs", on_click=_cancel_ibmfrs)
+
+    # Modal (st.dialog / st.experimental_dialog) com fallback inline
+    _ibm_dialog = None
+    if hasattr(st, "dialog"):
+        @st.dialog("IBM-FRS")
+        def _ibm_dialog():
+            _render_ibmfrs_form_body()
+    elif hasattr(st, "experimental_dialog"):
+        @st.experimental_dialog("IBM-FRS")
+        def _ibm_dialog():
+            _render_ibmfrs_form_body()
+
+    if st.session_state.get("ibmfrs_open", False):
+        if _ibm_dialog is not None:
+            _ibm_dialog()
+        else:
+            st.info("Seu Streamlit não suporta modal (st.dialog). Mostrando o formulário IBM-FRS inline.")
+            st.markdown("### IBM-FRS")
+            fragment_decorator(_render_ibmfrs_form_body)()
+
+if step(2):
+    # =========================================================
+    # 4) NEUROLÓGICO GERAL + EXAME DE FORÇA (panel)
+    # =========================================================
+    st.subheader("Exame físico")
+
+    with entry_block("exame_neuro"):
+        _ = schema_field("neuro_geral")
+
+    c_left, c_right = st.columns([2.2, 9.8], vertical_alignment="top")
+    with c_left:
+        if st.button("Exame de força", key="btn_open_forca"):
+            st.session_state["forca_open"] = True
+    with c_right:
+        display_forca = st.session_state.get("forca_resumo", "").strip()
+        if not display_forca:
+            display_forca = "Gerado automaticamente ao preencher o exame de força"
+        st.text_area("Força motora (resumo)", value=display_forca, height=120, disabled=True)
+
+    def _force_row_bilateral(label: str, key_d: str, key_e: str):
+        c0, c1, c2, _fill = st.columns([3.2, 1.4, 1.4, 10.0], vertical_alignment="center")
+        with c0:
+            st.markdown(f'<div class="inline-label">{label}</div>', unsafe_allow_html=True)
+        with c1:
+            small_mrc_box(key_d)
+        with c2:
+            small_mrc_box(key_e)
+
+    def _force_row_single(label: str, key: str, placeholder: str = "0-5"):
+        c0, c1, _fill = st.columns([3.2, 3.0, 10.0], vertical_alignment="center")
+        with c0:
+            st.markdown(f'<div class="inline-label">{label}</div>', unsafe_allow_html=True)
+        with c1:
+            st.text_input(
+                "",
+                key=key,
+                placeholder=placeholder,
+                label_visibility="collapsed",
+                max_chars=2,  # UPDATED (was 1)
+                **track(key),
+            )
+
+    def _save_forca():
+        st.session_state["forca_resumo"] = build_forca_summary(st.session_state)
+        st.session_state["forca_open"] = False
+        mark_commit("_forca_commit")
+
+    def _close_forca():
+        st.session_state["forca_open"] = False
+
+    def _forca_rows():
+        st.markdown("**Músculos axiais:**")
+        for lbl, k in FORCA_AXIAL_ITEMS:
+            _force_row_single(lbl, k)
+
+        st.markdown("---")
+        st.markdown("**Músculos dos membros superiores:**")
+        h0, h1, h2, _hf = st.columns([3.2, 1.4, 1.4, 10.0], vertical_alignment="center")
+        with h0:
+            st.markdown("**Grupo muscular**")
+        with h1:
+            st.markdown("**Direito**")
+        with h2:
+            st.markdown("**Esquerdo**")
+
+        for lbl, kd, ke in FORCA_UPPER_ITEMS:
+            _force_row_bilateral(lbl, kd, ke)
+
+        st.markdown("---")
+        st.markdown("**Músculos dos membros inferiores:**")
+        h0, h1, h2, _hf = st.columns([3.2, 1.4, 1.4, 10.0], vertical_alignment="center")
+        with h0:
+            st.markdown("**Grupo muscular**")
+        with h1:
+            st.markdown("**Direito**")
+        with h2:
+            st.markdown("**Esquerdo**")
+
+        for lbl, kd, ke in FORCA_LOWER_ITEMS:
+            _force_row_bilateral(lbl, kd, ke)
+
+    @fragment_decorator
+    def forca_panel():
+        rerun_after_commit("_forca_commit")
+        if not st.session_state.get("forca_open", False):
+            return
+
+        st.markdown("#### Força motora (escala MRC)")
+
+        if st.session_state.get("mrc_table", False):
+            g0, _gf = st.columns([6.0, 10.0])
+            with g0:
+                st.markdown("**Músculos axiais:**")
+                mrc_grid("forca_axial", FORCA_AXIAL_ITEMS, allow_sign=True)
+                st.markdown("**Músculos dos membros superiores:**")
+                mrc_grid("forca_upper", FORCA_UPPER_ITEMS, allow_sign=True)
+                st.markdown("**Músculos dos membros inferiores:**")
+                mrc_grid("forca_lower", FORCA_LOWER_ITEMS, allow_sign=True)
+        else:
+            _forca_rows()
+
+        b1, b2, _bfill = st.columns([1.6, 1.2, 10.0], vertical_alignment="center")
+        with b1:
+            st.button("Salvar exame de força", key="btn_save_forca", type="primary", on_click=_save_forca)
+        with b2:
+            st.button("Minimizar menu de seleção", key="btn_cancel_forca", on_click=_close_forca)
+
+    forca_panel()
+
+    st.divider()
+
+    # =========================================================
+    # 5) EXAME NEUROMUSCULAR ESPECÍFICO
+    # =========================================================
+    with entry_block("exame_especifico"):
+        _ = schema_field("exame_neuromuscular_especifico")
+
+        # =========================================================
+        # 6) PELE / EXAME CLÍNICO GERAL
+        # =========================================================
+        _ = schema_field("pele_clinico_geral")
+
+        # =========================================================
+        # 7) OSTEOESQUELÉTICAS / DISMORFISMOS
+        # =========================================================
+        _ = schema_field("osteo_dismorfismos")
+
+if step(3):
+    # =========================================================
+    # 12) EXAMES COMPLEMENTARES
+    # =========================================================
+    st.subheader("Exames complementares")
+
+    with entry_block("exames"):
+        _ = schema_field("ex_cpk")
+        _ = schema_field("ex_enmg")
+
+        _ = schema_field("ex_decremento_jitter")
+        _ = schema_field("ex_anticorpos_juncao")
+
+        _ = schema_field("ex_rm_muscular")
+        _ = schema_field("ex_biopsia_muscular")
+
+        st.markdown("**Cardiorrespiratórios**")
+        _ = schema_field("ex_eco")
+        _ = schema_field("ex_holter")
+        _ = schema_field("ex_espirometria")
+        _ = schema_field("ex_polissonografia")
+
+        _ = schema_field("ex_outros")
+
+    # =========================================================
+    # 14) TESTE GENÉTICO (obrigatório)
+    # =========================================================
+    st.subheader("Teste genético")
+
+    tg = st.radio(
+        "",
+        options=TG_OPTIONS,
+        index=None,
+        key="tg_radio",
+    )
 
-# =========================================================
-# 14) TESTE GENÉTICO (obrigatório)
-# =========================================================
-st.subheader("Teste genético")
+    if tg is None:
+        st.warning("⚠️ Selecione uma opção em **Teste genético** (campo obrigatório).")
 
-tg = st.radio(
-    "",
-    options=["Não se aplica", "Não realizado", "Teste genético realizado"],
-    index=None,
-    key="tg_radio",
-)
+    if tg == TG_REALIZADO:
+        st.markdown("**Resultado / gene (pesquise digitando):**")
+        gene_sel = st.selectbox("Gene / Resultado", options=GENES_OPTIONS, index=0, key="tg_gene_sel")
 
-if tg is None:
-    st.warning("⚠️ Selecione uma opção em **Teste genético** (campo obrigatório).")
+        if gene_sel == "Outro":
+            _ = inline_label_input("Especifique o gene", key="tg_gene_outro", placeholder="Ex.: PMP22 / MYH7 / etc.")
 
-if tg == "Teste genético realizado":
-    st.markdown("**Resultado / gene (pesquise digitando):**")
-    gene_sel = st.selectbox("Gene / Resultado", options=GENES_OPTIONS, index=0, key="tg_gene_sel")
+        st.markdown("**Detalhes do exame:**")
+        _ = inline_label_input("Exame genético realizado", key="tg_exame_nome", placeholder="Ex.: Painel miopatias / Exoma / MLPA / etc.")
+        _ = inline_label_input("Data", key="tg_data", placeholder="Ex.: 10/2024")
+        _ = inline_label_input("Local do exame", key="tg_local", placeholder="Ex.: Fleury / Einstein / laboratório X")
 
-    if gene_sel == "Outro":
-        _ = inline_label_input("Especifique o gene", key="tg_gene_outro", placeholder="Ex.: PMP22 / MYH7 / etc.")
+if step(4):
+    # =========================================================
+    # 13) DIAGNÓSTICO TOPOGRÁFICO
+    # =========================================================
+    st.subheader("Diagnóstico topográfico")
 
-    st.markdown("**Detalhes do exame:**")
-    _ = inline_label_input("Exame genético realizado", key="tg_exame_nome", placeholder="Ex.: Painel miopatias / Exoma / MLPA / etc.")
-    _ = inline_label_input("Data", key="tg_data", placeholder="Ex.: 10/2024")
-    _ = inline_label_input("Local do exame", key="tg_local", placeholder="Ex.: Fleury / Einstein / laboratório X")
+    topo_sel = st.multiselect("Selecione todos que se aplicam ao caso", options=TOPO_OPTIONS, key="dx_topografico")
 
-# =========================================================
-# 13) DIAGNÓSTICO TOPOGRÁFICO
-# =========================================================
-st.subheader("Diagnóstico topográfico")
-
-topo_sel = st.multiselect("Selecione todos que se aplicam ao caso", options=TOPO_OPTIONS, key="dx_topografico")
+    if "Outro" in (topo_sel or []):
+        _ = inline_label_input("Especifique (topográfico)", key="dx_topografico_outro", placeholder="")
 
-if "Outro" in (topo_sel or []):
-    _ = inline_label_input("Especifique (topográfico)", key="dx_topografico_outro", placeholder="")
+    # =========================================================
+    # 15) DIAGNÓSTICO NOSOLÓGICO
+    # =========================================================
+    st.subheader("Diagnóstico nosológico")
 
-# =========================================================
-# 15) DIAGNÓSTICO NOSOLÓGICO
-# =========================================================
-st.subheader("Diagnóstico nosológico")
-
-dx_noso = st.selectbox(
-    "Selecione (pesquise digitando)",
-    options=DX_NOSO_OPTIONS,
-    index=0,
-    key="dx_noso_sel",
-)
+    dx_noso = st.selectbox(
+        "Selecione (pesquise digitando)",
+        options=DX_NOSO_OPTIONS,
+        index=0,
+        key="dx_noso_sel",
+    )
 
-if dx_noso == "Outros":
-    _ = inline_label_input("Especifique", key="dx_noso_outros", placeholder="")
+    if dx_noso == "Outros":
+        _ = inline_label_input("Especifique", key="dx_noso_outros", placeholder="")
 
-# =========================================================
-# 16) IMPRESSÃO / CONDUTA
-# =========================================================
-st.subheader("Impressão")
-_ = text_area_lines("", 4, "impressao", placeholder="")
+    # =========================================================
+    # 16) IMPRESSÃO / CONDUTA
+    # =========================================================
+    with entry_block("impressao_conduta"):
+        st.subheader("Impressão")
+        _ = schema_field("impressao")
 
-st.subheader("Conduta")
-_ = text_area_lines("", 4, "conduta", placeholder="")
-
-# =========================================================
-# EXPORT
-# =========================================================
-def build_export_text(include_all: bool) -> str:
-    parts: list[str] = []
-
-    if include_all:
-        # ANAMNESE
-        anam_lines = []
-        if _get("Id"):
-            anam_lines.append("# Identificação:\n" + _get("Id"))
-        if _get("idade_inicio"):
-            anam_lines.append("Idade de início: " + _get("idade_inicio"))
-        if _get("idade_diagnostico"):
-            anam_lines.append("Idade ao diagnóstico: " + _get("idade_diagnostico"))
-        if _get("hda"):
-            anam_lines.append("# HMA:\n" + _get("hda"))
-        parts.append(_section("ANAMNESE", "\n\n".join([x for x in anam_lines if x.strip()])))
-
-        # ANTECEDENTES
-        ant_lines = []
-        if _get("antecedentes_pessoais"):
-            ant_lines.append("# Antecedentes pessoais:\n" + _get("antecedentes_pessoais"))
-        if _get("antecedentes_familiares"):
-            ant_lines.append("# História familiar:\n" + _get("antecedentes_familiares"))
-        if _get("meds_em_uso"):
-            ant_lines.append("# Medicações em uso:\n" + _get("meds_em_uso"))
-        if _get("meds_previas"):
-            ant_lines.append("Medicações prévias / motivo da suspensão:\n" + _get("meds_previas"))
-        parts.append(_section("ANTECEDENTES", "\n\n".join([x for x in ant_lines if x.strip()])))
-
-        # DNPM
-        dnpm_radio = _get("dnpm_radio")
-        dnpm_block = f"Status: {dnpm_radio}" if dnpm_radio else ""
-        if dnpm_radio == "Atraso desenvolvimento":
-            milestones = []
-            for lbl, k in [
-                ("Sustento cefálico", "dnpm_sustento_cefalico"),
-                ("Engatinhar", "dnpm_engatinhar"),
-                ("Andar sem apoio", "dnpm_andar_sem_apoio"),
-                ("Formar frases", "dnpm_formar_frases"),
-                ("Sentar (meses)", "dnpm_sentar_meses"),
-                ("Ficar de pé (anos)", "dnpm_ficar_de_pe_anos"),
-                ("Andar com apoio (anos)", "dnpm_andar_com_apoio_anos"),
-                ("Primeiras palavras (anos)", "dnpm_primeiras_palavras_anos"),
-                ("Controle esfincteriano (meses)", "dnpm_controle_esfincteriano_meses"),
-            ]:
-                v = _get(k)
-                if v:
-                    milestones.append(f"{lbl}: {v}")
-            if milestones:
-                dnpm_block = (dnpm_block + "\n" if dnpm_block else "") + "Marcos:\n" + "\n".join(milestones)
-        parts.append(_section("DESENVOLVIMENTO NEUROPSICOMOTOR", dnpm_block))
-
-    # Evolução (sempre)
-    parts.append(_section("EVOLUÇÃO CLÍNICA", _get("evolucao")))
-
-    # Suporte funcional
-    func_block = _get("func_resumo") or build_func_summary()
-    parts.append(_section(">> Dispositivos e suporte funcional:", func_block))
-
-    # Seguimento multidisciplinar
-    multi_lines = []
-
-    def add_freq(name: str, chk: str, freq: str, suffix: str):
-        if st.session_state.get(chk):
-            f = _get(freq)
-            multi_lines.append(f"{name}: {f + suffix if f else '(freq. não informada)'}")
-
-    add_freq("Fisioterapia motora", "fisio_motora_chk", "fisio_motora_freq", "x/sem")
-    add_freq("Fisioterapia respiratória", "fisio_resp_chk", "fisio_resp_freq", "x/sem")
-    add_freq("AMBU / máscara facial", "ambu_chk", "ambu_freq", "x/dia")
-    add_freq("Fonoterapia", "fono_chk", "fono_freq", "x/sem")
-
-    outras = _get("outras_terapias")
-    if outras:
-        multi_lines.append("Outras:\n" + outras)
-
-    escalas = _get("escalas")
-    if escalas:
-        multi_lines.append("Escalas:\n" + escalas)
-
-    parts.append(_section(">> Seguimento multidisciplinar", "\n".join([x for x in multi_lines if x.strip()])))
-
-    # Exame físico
-    exf_lines = []
-    if _get("neuro_geral"):
-        exf_lines.append("# Exame Neurológico:\n" + _get("neuro_geral"))
-
-    forca = _get("forca_resumo") or build_forca_summary()
-    if forca:
-        exf_lines.append(forca)
-
-    if _get("exame_neuromuscular_especifico"):
-        exf_lines.append("Exame neuromuscular específico:\n" + _get("exame_neuromuscular_especifico"))
-    if _get("pele_clinico_geral"):
-        exf_lines.append("Alterações de pele e exame clínico geral:\n" + _get("pele_clinico_geral"))
-    if _get("osteo_dismorfismos"):
-        exf_lines.append("Alterações osteoesqueléticas e dismorfismos:\n" + _get("osteo_dismorfismos"))
-
-    parts.append(_section("EXAME FÍSICO", "\n\n".join([x for x in exf_lines if x.strip()])))
-
-    # Exames complementares
-    ex_lines = []
-    if _get("ex_cpk"):
-        ex_lines.append(f"CPK: {_get('ex_cpk')}")
-    if _get("ex_enmg"):
-        ex_lines.append("Eletroneuromiografia:\n" + _get("ex_enmg"))
-    if _get("ex_decremento_jitter"):
-        ex_lines.append(f"Decremento / Jitter na EMG: {_get('ex_decremento_jitter')}")
-    if _get("ex_anticorpos_juncao"):
-        ex_lines.append(f"Anticorpos de junção: {_get('ex_anticorpos_juncao')}")
-    if _get("ex_rm_muscular"):
-        ex_lines.append("RM muscular:\n" + _get("ex_rm_muscular"))
-    if _get("ex_biopsia_muscular"):
-        ex_lines.append("Biópsia muscular:\n" + _get("ex_biopsia_muscular"))
-
-    for lbl, k in [
-        ("ECO", "ex_eco"),
-        ("Holter", "ex_holter"),
-        ("Espirometria", "ex_espirometria"),
-        ("Polissonografia", "ex_polissonografia"),
-        ("Outros exames", "ex_outros"),
-    ]:
-        if _get(k):
-            ex_lines.append(f"{lbl}:\n{_get(k)}")
-
-    parts.append(_section("EXAMES COMPLEMENTARES", "\n\n".join([x for x in ex_lines if x.strip()])))
-
-    # Teste genético
-    tg_radio = st.session_state.get("tg_radio")
-    tg_lines = []
-    if tg_radio:
-        tg_lines.append(str(tg_radio))
-        if tg_radio == "Teste genético realizado":
-            gene_sel = _get("tg_gene_sel")
-            if gene_sel:
-                if gene_sel == "Outro":
-                    gene_outro = _get("tg_gene_outro")
-                    tg_lines.append("Gene/resultado: " + (gene_outro if gene_outro else "Outro (não especificado)"))
-                else:
-                    tg_lines.append("Gene/resultado: " + gene_sel)
-
-            det = []
-            if _get("tg_exame_nome"):
-                det.append("Exame: " + _get("tg_exame_nome"))
-            if _get("tg_data"):
-                det.append("Data: " + _get("tg_data"))
-            if _get("tg_local"):
-                det.append("Local: " + _get("tg_local"))
-            if det:
-                tg_lines.append("Detalhes: " + " | ".join(det))
-
-    parts.append(_section(">> Teste genético", "\n".join([x for x in tg_lines if x.strip()])))
-
-    # Diagnóstico
-    dx_lines = []
-
-    topo_list = st.session_state.get("dx_topografico", []) or []
-    topo_list = [str(x).strip() for x in topo_list if str(x).strip()]
-    if topo_list:
-        topo_fmt = []
-        for item in topo_list:
-            if item == "Outro":
-                other = _get("dx_topografico_outro")
-                topo_fmt.append(other if other else "Outro (não especificado)")
-            else:
-                topo_fmt.append(item)
-        dx_lines.append("Topográfico: " + " | ".join(topo_fmt))
-
-    noso = _get("dx_noso_sel")
-    if noso:
-        if noso == "Outros":
-            noso = _get("dx_noso_outros") or "Outros (não especificado)"
-        dx_lines.append(f"Nosológico: {noso}")
-
-    parts.append(_section("DIAGNÓSTICO", "\n".join([x for x in dx_lines if x.strip()])))
-    parts.append(_section("IMPRESSÃO", _get("impressao")))
-    parts.append(_section("CONDUTA", _get("conduta")))
-
-    cleaned = [p for p in parts if p.strip()]
-    return "\n".join(cleaned).strip() + "\n"
+        st.subheader("Conduta")
+        _ = schema_field("conduta")
 
 # =========================================================
 # SEÇÃO: EXPORTAR / IMPORTAR
@@ -1796,11 +923,12 @@ def do_export(include_all: bool):
         st.session_state["export_text"] = ""
         return
 
-    # Atualiza resumos mesmo se o usuário não clicou em "Salvar"
-    st.session_state["func_resumo"] = build_func_summary()
-    st.session_state["forca_resumo"] = build_forca_summary()
-
-    st.session_state["export_text"] = build_export_text(include_all=include_all)
+    # Resumos e seções guardados na sessão: só o que mudou desde a última exportação é refeito
+    cache = st.session_state.setdefault("_section_cache", {})
+    refresh_summaries(st.session_state, cache)
+    st.session_state["export_text"] = build_export_text(st.session_state, include_all=include_all, cache=cache)
+    st.session_state["export_json"] = build_export_json(st.session_state)
+    archive_visit()
 
 c_exp1, c_exp2, c_exp3 = st.columns([1.3, 2.0, 1.3], vertical_alignment="center")
 with c_exp1:
@@ -1822,10 +950,12 @@ with c_exp2:
 with c_exp3:
     def clear_export():
         st.session_state["export_text"] = ""
+        st.session_state["export_json"] = ""
     st.button("Limpar exportação", key="btn_clear_export", on_click=clear_export)
 
 if not tg_ok:
     st.error("Para exportar, selecione uma opção em **Teste genético** (campo obrigatório).")
+archive_saved_message()
 
 export_text = st.session_state.get("export_text", "")
 if export_text:
@@ -1835,20 +965,32 @@ if export_text:
         height=320,
         key="export_text_area",
     )
-    st.download_button(
-        "Baixar .txt",
-        data=export_text.encode("utf-8"),
-        file_name="template_neuromuscular_geral_export.txt",
-        mime="text/plain",
-        key="download_txt_export",
-    )
+    c_dl1, c_dl2, _ = st.columns([1.0, 1.0, 8.0], vertical_alignment="center")
+    with c_dl1:
+        st.download_button(
+            "Baixar .txt",
+            data=export_text.encode("utf-8"),
+            file_name="template_neuromuscular_geral_export.txt",
+            mime="text/plain",
+            key="download_txt_export",
+        )
+    with c_dl2:
+        st.download_button(
+            "Baixar .json",
+            data=st.session_state.get("export_json", "").encode("utf-8"),
+            file_name="template_neuromuscular_geral_export.json",
+            mime="application/json",
+            key="download_json_export",
+            help="Formato estruturado: colado abaixo, volta ao formulário sem perda.",
+        )
 
 # -------- IMPORT --------
 st.markdown("---")
 st.markdown("#### Importar para o formulário")
 
 st.markdown(
-    "A importação funciona apenas para texto no formato exato gerado por **Exportar histórico completo**."
+    "A importação funciona apenas para texto no formato exato gerado por **Exportar histórico completo**"
+    " ou para o conteúdo do **Baixar .json** (lido sem perda)."
 )
 
 st.text_area(
@@ -1858,10 +1000,11 @@ st.text_area(
     placeholder="Cole aqui o texto exportado por 'Exportar histórico completo'",
 )
 
-c_i1, c_i2, _ = st.columns([1.8, 1.4, 10.0], vertical_alignment="center")
+c_i1, c_i2, c_i3, _ = st.columns([1.8, 1.8, 1.4, 8.2], vertical_alignment="center")
 
-def _request_import():
+def _request_import(carry: bool = False):
     st.session_state["_import_raw"] = st.session_state.get("import_text", "")
+    st.session_state["_import_carry"] = carry
     st.session_state["_do_import"] = True  # será tratado no topo do script
 
 with c_i1:
@@ -1873,6 +1016,15 @@ with c_i1:
     )
 
 with c_i2:
+    st.button(
+        "Importar como retorno",
+        key="btn_import_carry",
+        on_click=_request_import,
+        kwargs={"carry": True},
+        help="Consulta de retorno: herda só as seções estáveis (anamnese, antecedentes e desenvolvimento neuropsicomotor); o resto do formulário fica como está.",
+    )
+
+with c_i3:
     def clear_import():
         st.session_state["import_text"] = ""
     st.button("Limpar texto colado", key="btn_clear_import", on_click=clear_import)
@@ -1886,3 +1038,11 @@ if res:
     else:
         st.error(msg)
     st.session_state.pop("_import_result", None)
+
+if st.query_params.get("debug") == "1":
+    st.caption(f"Execuções completas do script nesta sessão: {st.session_state['_script_runs']}")
+    problems = DERIVED.check(st.session_state)
+    if problems:
+        st.error("Derivados divergentes do recálculo completo:\n\n" + "\n".join(f"- {p}" for p in problems))
+    else:
+        st.caption("Derivados incrementais conferem com o recálculo completo.")
@@ -0,0 +1,114 @@
+"""
+Ida e volta nos dois formatos do arquivo local (SQLite e ``*.vlog``):
+gravar e ler, reabrir depois de uma gravação interrompida, trocar o
+dicionário de compressão e refazer o índice de busca.
+"""
+import os
+import shutil
+import sqlite3
+from contextlib import closing
+
+import pytest
+
+from nervo_core import nervo
+from nervo_core.archive import ArchiveError, VisitArchive, open_archive
+from nervo_core.compress import train_dictionary
+from nervo_core.visitlog import VisitLog
+
+PATIENT = "RGHC 123"
+
+def _parts(conduta: str) -> dict[str, str]:
+    state = {
+        "id_texto": "Maria, 54a, RGHC 123",
+        "historia_clinica_texto": "Parestesias distais há 9 anos.\nPiora progressiva.",
+        "antecedentes_patologicos_texto": "DM2, HAS",
+        "conduta": conduta,
+    }
+    return nervo.SCHEMA.dump_parts(state)
+
+def _conduta(parts: dict[str, str]) -> str:
+    return nervo.SCHEMA.loads(nervo.SCHEMA.join_parts(parts))["conduta"]
+
+@pytest.fixture(params=["visits.sqlite", "visits.vlog"])
+def path(request, tmp_path) -> str:
+    return str(tmp_path / request.param)
+
+def _fill(archive):
+    archive.save(PATIENT, "nervo", _parts("retorno em 6 meses"), "2025-01-10")
+    archive.save(PATIENT, "nervo", _parts("iniciar IGIV"), "2025-03-02")
+    archive.save("rghc  123", "nervo", _parts("IGIV 2 g/kg"), "2025-03-02")  # mesmo paciente e dia: substitui
+    archive.save("RGHC 456", "nervo", _parts("alta"), "2025-02-01")
+
+def _crash(path: str) -> str:
+    # cópia dos arquivos no meio da última gravação: o fim dela fica pela metade
+    crashed = path.replace("visits.", "crashed.")
+    if path.endswith(".vlog"):
+        for suffix in ("", ".idx", ".tail"):
+            if os.path.exists(path + suffix):
+                shutil.copy(path + suffix, crashed + suffix)
+        with open(crashed, "ab") as f:
+            f.write(b"NVL1\x00\x00\x10\x00" + b"x" * 40)  # registro sem o resto nem a entrada no índice
+        with open(crashed + ".tail", "ab") as f:
+            f.write(b"\x01\x02\x03")  # entrada do índice pela metade
+    else:
+        with closing(sqlite3.connect(path)) as keep:  # aberto: o WAL não volta para o banco ao fechar
+            keep.execute("SELECT 1 FROM visits").fetchall()
+            VisitArchive(path).save("RGHC 789", "nervo", _parts("perdida"), "2025-05-05")
+            shutil.copy(path, crashed)
+            shutil.copy(path + "-wal", crashed + "-wal")
+        size = os.path.getsize(crashed + "-wal")
+        os.truncate(crashed + "-wal", size - 100)  # último frame (o commit) incompleto
+    return crashed
+
+def test_save_latest_history(path):
+    archive = open_archive(path)
+    assert archive.latest(PATIENT, "nervo") is None
+    assert archive.history(PATIENT, "nervo") == []
+    _fill(archive)
+    visit_date, parts = archive.latest(PATIENT, "nervo")
+    assert (visit_date, _conduta(parts)) == ("2025-03-02", "IGIV 2 g/kg")
+    history = archive.history(PATIENT, "nervo")
+    assert [(d, _conduta(p)) for d, p in history] == [
+        ("2025-01-10", "retorno em 6 meses"),
+        ("2025-03-02", "IGIV 2 g/kg"),
+    ]
+    assert _conduta(archive.get(PATIENT, "nervo", "2025-01-10")) == "retorno em 6 meses"
+    assert _conduta(archive.get(PATIENT, "nervo", "2025-03-02")) == "IGIV 2 g/kg"
+    assert archive.get(PATIENT, "nervo", "2025-02-01") is None
+    assert archive.report()["visits"] == 3
+
+def test_reopen_after_interrupted_save(path):
+    _fill(open_archive(path))
+    crashed = open_archive(_crash(path))
+    assert crashed.latest("RGHC 789", "nervo") is None
+    assert [d for d, _ in crashed.history(PATIENT, "nervo")] == ["2025-01-10", "2025-03-02"]
+    if path.endswith(".vlog"):
+        assert os.path.getsize(crashed.path) == os.path.getsize(path)
+        assert os.path.getsize(crashed.path + ".tail") % 24 == 0
+    crashed.save(PATIENT, "nervo", _parts("nova"), "2025-06-01")
+    assert _conduta(open_archive(crashed.path).latest(PATIENT, "nervo")[1]) == "nova"
+
+def test_add_dictionary_recompress(path):
+    archive = open_archive(path)
+    _fill(archive)
+    zdict = train_dictionary(archive.texts())
+    if isinstance(archive, VisitLog):
+        with pytest.raises(ArchiveError):
+            archive.add_dictionary(zdict, recompress=True)
+        return
+    before = archive.history(PATIENT, "nervo")
+    dict_id = archive.add_dictionary(zdict, recompress=True)
+    assert archive.dictionary() == (dict_id, zdict)
+    reopened = VisitArchive(path)
+    assert reopened.history(PATIENT, "nervo") == before
+    with closing(sqlite3.connect(path)) as con:
+        assert {d for (d,) in con.execute("SELECT DISTINCT dict FROM bodies")} == {dict_id}
+
+def test_reindex(path):
+    archive = open_archive(path)
+    if not archive._search:
+        pytest.skip("SQLite sem FTS5")
+    _fill(archive)
+    assert archive.reindex() == 3
+    hits = archive.search("IGIV")
+    assert [(h["patient"], h["visit_date"]) for h in hits] == [("rghc 123", "2025-03-02")]